@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步OCR客户端 - 在asyncio代码中调用OCR API识别图片文字
+使用/ocr/recognize/base64接口，支持Umi-OCR和PaddleOCR引擎，返回纯文本结果
+
+特性:
+  - 连接池：限制到API服务的最大连接数并复用连接
+  - 并发控制：通过信号量限制同时进行的识别请求数
+  - 真正的单请求超时：每个请求都设置连接、读取、写入超时
+  - recognize_many()：批量识别，按完成顺序逐个返回结果
+  - 可选的gzip压缩请求体（响应的gzip压缩由httpx自动协商和解压）
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import AsyncIterator, Iterable, Optional, Tuple, Union
+
+import httpx
+
+from client_utils import gzip_json, prepare_image_base64
+
+
+class AsyncOCRClient:
+    """异步OCR客户端类"""
+
+    def __init__(self, api_url: str = "http://192.168.16.228:8000", engine: str = "umi_ocr",
+                 device: str = "gpu", max_connections: int = 10, max_concurrency: int = 4,
+                 timeout: float = 30.0, api_key: Optional[str] = None, compress: bool = False):
+        """
+        初始化异步OCR客户端
+
+        Args:
+            api_url: OCR API服务地址
+            engine: OCR引擎 (umi_ocr/paddleocr)
+            device: PaddleOCR设备类型 (gpu/cpu)，仅PaddleOCR引擎
+            max_connections: 连接池最大连接数
+            max_concurrency: 同时进行的最大识别请求数
+            timeout: 单个请求的超时时间（秒）
+            api_key: API密钥，通过X-API-Key请求头发送，服务端按密钥限流（可选）
+            compress: 是否gzip压缩请求体（默认否，上行带宽有限时建议开启）
+        """
+        self.api_url = api_url.rstrip('/')
+        self.engine = engine
+        self.device = device
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.compress = compress
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.api_url,
+            timeout=httpx.Timeout(timeout),
+            headers={"X-API-Key": api_key} if api_key else None,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+    async def __aenter__(self) -> "AsyncOCRClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._client.aclose()
+
+    def _build_options(self, language: Optional[str]) -> dict:
+        """构建识别选项"""
+        options = {"data.format": "text"}  # 指定返回纯文本格式
+        if self.engine == "paddleocr":
+            options["ocr.engine"] = "paddleocr"
+            options["paddleocr.device"] = self.device
+        if language:
+            options["ocr.language"] = language
+        return options
+
+    async def recognize_text(self, image_path: str, language: Optional[str] = None) -> str:
+        """
+        识别图片中的文字
+
+        Args:
+            image_path: 图片文件路径
+            language: 语言模型（可选，仅Umi-OCR引擎）
+
+        Returns:
+            str: 识别的文字结果（纯文本）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 文件格式不支持或文件损坏
+            Exception: OCR识别失败
+        """
+        async with self._semaphore:
+            # 读取和编码文件在线程池中执行，避免阻塞事件循环
+            loop = asyncio.get_running_loop()
+            base64_image, _ = await loop.run_in_executor(None, prepare_image_base64, image_path)
+
+            request_data = {
+                "base64": base64_image,
+                "options": self._build_options(language)
+            }
+
+            try:
+                if self.compress:
+                    # 压缩几MB的请求体需要几十毫秒，同样放到线程池中执行
+                    body = await loop.run_in_executor(None, gzip_json, request_data)
+                    response = await self._client.post(
+                        "/ocr/recognize/base64", content=body,
+                        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+                    )
+                else:
+                    response = await self._client.post("/ocr/recognize/base64", json=request_data)
+            except httpx.TimeoutException as e:
+                raise Exception(f"OCR请求超时（{self.timeout}秒）: {e!r}")
+            except httpx.HTTPError as e:
+                raise Exception(f"网络请求失败: {e!r}")
+
+        if response.status_code == 200:
+            # text模式下直接返回纯文本
+            return response.text
+
+        # 尝试解析错误信息
+        try:
+            error_msg = response.json().get('detail', f"HTTP {response.status_code}")
+        except ValueError:
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+        raise Exception(f"OCR识别失败: {error_msg}")
+
+    async def recognize_many(self, image_paths: Iterable[str], language: Optional[str] = None,
+                             return_exceptions: bool = True) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+        """
+        批量识别多张图片，按完成顺序逐个返回结果
+
+        同时排队的任务数量有上限，因此可以传入很长的路径序列（例如生成器）而不会一次性创建全部任务。
+
+        Args:
+            image_paths: 图片文件路径序列
+            language: 语言模型（可选，仅Umi-OCR引擎）
+            return_exceptions: 为True时识别失败的图片返回异常对象，为False时直接抛出异常
+
+        Yields:
+            Tuple[str, Union[str, Exception]]: (图片路径, 识别结果或异常)
+        """
+        paths = iter(image_paths)
+        pending = {}
+        max_pending = self.max_concurrency * 2
+
+        def fill():
+            for image_path in paths:
+                task = asyncio.ensure_future(self.recognize_text(image_path, language))
+                pending[task] = image_path
+                if len(pending) >= max_pending:
+                    break
+
+        fill()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    image_path = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        if not return_exceptions:
+                            raise error
+                        yield image_path, error
+                    else:
+                        yield image_path, task.result()
+                fill()
+        finally:
+            # 调用方提前退出或出现异常时取消剩余任务
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _run(args) -> int:
+    """命令行批量识别"""
+    failed = 0
+    start_time = time.time()
+    async with AsyncOCRClient(args.url, engine=args.engine, device=args.device,
+                              max_connections=args.connections, max_concurrency=args.concurrency,
+                              timeout=args.timeout, api_key=args.api_key, compress=args.compress) as client:
+        async for image_path, result in client.recognize_many(args.image_path, args.language):
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"❌ {image_path}: {result}", file=sys.stderr)
+            else:
+                print(f"✓ {image_path}\n{result}\n" + "-" * 40)
+
+    total = len(args.image_path)
+    elapsed = time.time() - start_time
+    print(f"完成: {total - failed}/{total} 成功，耗时 {elapsed:.2f}秒")
+    return 1 if failed else 0
+
+
+def main():
+    """命令行主函数"""
+    parser = argparse.ArgumentParser(
+        description="异步OCR客户端 - 并发识别多张图片中的文字",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  python async_ocr_client.py a.jpg b.png c.jpg
+  python async_ocr_client.py --engine paddleocr --device cpu --concurrency 8 *.jpg
+        """
+    )
+    parser.add_argument('image_path', nargs='+', help='要识别的图片文件路径')
+    parser.add_argument('--url', default='http://192.168.16.228:8000',
+                        help='OCR API服务地址 (默认: http://192.168.16.228:8000)')
+    parser.add_argument('--engine', choices=['umi_ocr', 'paddleocr'], default='umi_ocr',
+                        help='OCR引擎 (默认: umi_ocr)')
+    parser.add_argument('--device', choices=['gpu', 'cpu'], default='gpu',
+                        help='PaddleOCR设备类型 (默认: gpu)')
+    parser.add_argument('--language', help='语言模型路径 (可选，仅Umi-OCR引擎)')
+    parser.add_argument('--concurrency', type=int, default=4, help='最大并发请求数 (默认: 4)')
+    parser.add_argument('--connections', type=int, default=10, help='连接池最大连接数 (默认: 10)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单个请求超时时间，秒 (默认: 30)')
+    parser.add_argument('--api-key', help='API密钥，服务端按密钥限流 (可选)')
+    parser.add_argument('--compress', action='store_true', help='gzip压缩请求体（上行带宽有限时建议开启）')
+
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+base64请求体解析的内存测试
+对比原来的解析方式（完整读取请求体、json解析、请求模型校验、清理base64字符串、解码）与流式解析，
+从接收请求体到得到引擎输入的图片字节，每个请求的峰值内存（tracemalloc）和耗时
+
+使用示例:
+  python benchmarks/bench_base64_body.py
+  python benchmarks/bench_base64_body.py --megabytes 20 --chunk-size 65536
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ocr_models import OCRRequest
+from utils.base64_body import parse_base64_body
+from utils.image_utils import clean_base64_string, inspect_image
+
+_MB = 1024 * 1024
+MAX_BYTES = 1024 * _MB
+MAX_PIXELS = 1_000_000_000
+
+
+def make_body(megabytes: float) -> bytes:
+    """构造请求体：随机像素的PNG图片（几乎不可压缩，文件大小约为指定的MB数）"""
+    import io
+    import numpy as np
+    from PIL import Image
+
+    side = int((megabytes * _MB / 3) ** 0.5)
+    pixels = np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+    options = {"ocr.engine": "paddleocr", "data.format": "dict"}
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return json.dumps({"base64": "data:image/png;base64," + encoded, "options": options}).encode()
+
+
+async def receive_chunks(body: bytes, chunk_size: int):
+    """模拟ASGI服务器逐块交付的请求体"""
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+async def buffered(body: bytes, chunk_size: int):
+    """原来的解析方式：FastAPI先读取完整的请求体，再由json和请求模型解析"""
+    chunks = [chunk async for chunk in receive_chunks(body, chunk_size)]
+    raw = b"".join(chunks)
+    request = OCRRequest.model_validate(json.loads(raw))
+    request.base64 = clean_base64_string(request.base64)
+    # 解码base64得到图片字节，校验图片头
+    image = base64.b64decode(request.base64)
+    inspect_image(image, MAX_PIXELS)
+    return raw, request, image
+
+
+async def streaming(body: bytes, chunk_size: int):
+    """流式解析：base64字段按块解码为图片字节"""
+    image, document = await parse_base64_body(receive_chunks(body, chunk_size), MAX_BYTES)
+    request = OCRRequest.from_image(image, OCRRequest.model_validate(document).options)
+    inspect_image(request.image, MAX_PIXELS)
+    return request
+
+
+def measure(func, body: bytes, chunk_size: int):
+    """返回 (峰值内存MB, 耗时毫秒)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = asyncio.run(func(body, chunk_size))
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / _MB, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="base64请求体解析的内存测试")
+    parser.add_argument("--megabytes", type=float, default=10, help="图片大小MB (默认: 10)")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="请求体数据块大小 (默认: 65536)")
+    args = parser.parse_args()
+
+    body = make_body(args.megabytes)
+    megabytes = len(body) * 3 / 4 / _MB
+    print(f"图片 {megabytes:.1f} MB，请求体 {len(body) / _MB:.1f} MB，数据块 {args.chunk_size} bytes")
+    print(f"{'方式':<16}{'峰值内存(MB)':>14}{'峰值/图片':>10}{'耗时(毫秒)':>12}")
+    for name, func in (("完整读取", buffered), ("流式解析", streaming)):
+        peak, elapsed = measure(func, body, args.chunk_size)
+        print(f"{name:<16}{peak:>14.1f}{peak / megabytes:>10.2f}{elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客户端上传预处理性能测试
+对比原图上传与缩小、重新压缩后上传的字节数和端到端耗时
+
+使用示例:
+  python benchmarks/bench_client_upload.py --url http://localhost:8000 scan1.png scan2.jpg
+  python benchmarks/bench_client_upload.py --max-side 1600 2048 --format webp --bandwidth 20 scan.png
+  python benchmarks/bench_client_upload.py --dry-run scan.png   # 只统计字节数，不请求服务
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client_utils import UPLOAD_FORMATS, prepare_image_bytes
+from ocr_client import OCRClient
+
+
+def measure(client: OCRClient, image_path: str, dry_run: bool) -> dict:
+    """执行一次预处理和识别，返回字节数和各阶段耗时"""
+    start = time.perf_counter()
+    image_bytes, scale = prepare_image_bytes(image_path, client.max_side, client.quality, client.image_format)
+    body_size = len(base64.b64encode(image_bytes))
+    prepare_time = time.perf_counter() - start
+
+    total_time = None
+    if not dry_run:
+        start = time.perf_counter()
+        client.recognize_blocks(image_path)
+        total_time = time.perf_counter() - start
+
+    return {
+        "bytes": len(image_bytes),
+        "body": body_size,
+        "scale": scale,
+        "prepare": prepare_time,
+        "total": total_time
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="客户端上传预处理性能测试")
+    parser.add_argument("image_path", nargs="+", help="测试图片路径")
+    parser.add_argument("--url", default="http://localhost:8000", help="OCR API服务地址 (默认: http://localhost:8000)")
+    parser.add_argument("--max-side", type=int, nargs="+", default=[1600, 2400],
+                        help="测试的目标长边列表 (默认: 1600 2400)")
+    parser.add_argument("--quality", type=int, default=85, help="压缩质量 (默认: 85)")
+    parser.add_argument("--format", choices=sorted(UPLOAD_FORMATS), default="jpeg", help="压缩格式 (默认: jpeg)")
+    parser.add_argument("--bandwidth", type=float, default=10.0,
+                        help="用于估算上传耗时的上行带宽，Mbps (默认: 10)")
+    parser.add_argument("--repeat", type=int, default=3, help="每种配置的重复次数，取最佳值 (默认: 3)")
+    parser.add_argument("--dry-run", action="store_true", help="只统计字节数和预处理耗时，不请求服务")
+    args = parser.parse_args()
+
+    configs = [("原图", None)] + [(f"长边{side}", side) for side in args.max_side]
+
+    print(f"{'图片':<24}{'配置':<12}{'图片字节':>12}{'请求体字节':>12}{'节省':>8}"
+          f"{'预处理(s)':>11}{'估算上传(s)':>12}{'端到端(s)':>11}")
+    for image_path in args.image_path:
+        baseline_body = None
+        for name, max_side in configs:
+            client = OCRClient(args.url, max_side=max_side, quality=args.quality, image_format=args.format)
+            samples = [measure(client, image_path, args.dry_run) for _ in range(args.repeat)]
+            best = min(samples, key=lambda sample: (sample["total"] or 0.0) + sample["prepare"])
+
+            if baseline_body is None:
+                baseline_body = best["body"]
+            saved = 1 - best["body"] / baseline_body
+            upload_estimate = best["body"] * 8 / (args.bandwidth * 1_000_000)
+            total = "-" if best["total"] is None else f"{best['total']:.3f}"
+
+            print(f"{os.path.basename(image_path)[:22]:<24}{name:<12}{best['bytes']:>12}{best['body']:>12}"
+                  f"{saved:>8.0%}{best['prepare']:>11.3f}{upload_estimate:>12.3f}{total:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩性能测试
+对一页典型文档图片，统计base64请求体和dict格式识别结果在gzip压缩前后的字节数、压缩/解压耗时，
+按指定带宽估算传输耗时，并（可选）对比真实服务在是否压缩请求体/响应时的端到端延迟
+
+使用示例:
+  python benchmarks/bench_compression.py --dry-run                      # 只统计字节数和CPU耗时
+  python benchmarks/bench_compression.py --url http://localhost:8000 --engine paddleocr --device cpu
+  python benchmarks/bench_compression.py --bandwidth 20 scan.jpg
+"""
+
+import argparse
+import base64
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_tiling import make_synthetic_image
+from client_utils import GZIP_LEVEL, gzip_json
+
+
+def make_page(image_format: str) -> bytes:
+    """生成A4、200dpi的合成文档页并按指定格式编码"""
+    from PIL import Image
+
+    png = make_synthetic_image(1654, 2339, font_size=28)
+    if image_format == "png":
+        return png
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(png)).convert("RGB").save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def make_dict_result(lines: int = 80, columns: int = 2) -> dict:
+    """构造一页文档的dict格式识别结果（每个文本块带四点坐标和置信度，文字和坐标带随机扰动）"""
+    rng = random.Random(0)
+    words = ["the", "invoice", "total", "amount", "payment", "date", "account", "number", "识别", "文字",
+             "发票", "金额", "合计", "日期", "编号", "客户", "地址", "电话"]
+    blocks = []
+    for row in range(lines):
+        for column in range(columns):
+            x0 = 60 + column * 800 + rng.randint(0, 12)
+            y0 = 60 + row * 28 + rng.randint(0, 3)
+            width = rng.randint(300, 720)
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 10))) + f" {rng.randint(0, 99999)}"
+            blocks.append({
+                "text": text,
+                "score": rng.uniform(0.8, 1.0),
+                "box": [[x0, y0], [x0 + width, y0 + rng.randint(-1, 1)], [x0 + width, y0 + 24], [x0, y0 + 24]],
+                "end": "\n"
+            })
+    return {"code": 100, "data": blocks, "time": 0.53, "timestamp": time.time()}
+
+
+def cpu_time(func, repeat: int = 5) -> float:
+    """多次执行取最佳耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def transfer_ms(size: int, bandwidth: float) -> float:
+    return size * 8 / (bandwidth * 1_000_000) * 1000
+
+
+def report(name: str, raw: bytes, level: int, bandwidth: float):
+    compressed = gzip.compress(raw, compresslevel=level)
+    compress_ms = cpu_time(lambda: gzip.compress(raw, compresslevel=level))
+    decompress_ms = cpu_time(lambda: gzip.decompress(compressed))
+    saved_ms = transfer_ms(len(raw), bandwidth) - transfer_ms(len(compressed), bandwidth)
+    print(f"{name:<16}{len(raw):>12}{len(compressed):>12}{1 - len(compressed) / len(raw):>8.0%}"
+          f"{compress_ms:>10.1f}{decompress_ms:>10.1f}{saved_ms:>12.1f}")
+
+
+def bench_server(args, body: dict):
+    """对比四种组合下真实服务的端到端延迟"""
+    import requests
+
+    session = requests.Session()
+    if args.api_key:
+        session.headers["X-API-Key"] = args.api_key
+    url = f"{args.url.rstrip('/')}/ocr/recognize/base64"
+    plain_body = json.dumps(body).encode("utf-8")
+
+    modes = [
+        ("不压缩", False, "identity"),
+        ("压缩请求", True, "identity"),
+        ("压缩响应", False, "gzip"),
+        ("两者都压缩", True, "gzip"),
+    ]
+    print(f"\n{'模式':<12}{'请求体字节':>12}{'响应字节':>12}{'端到端(ms)':>12}")
+    for name, compress_request, accept in modes:
+        samples = []
+        for _ in range(args.repeat):
+            headers = {"Content-Type": "application/json", "Accept-Encoding": accept}
+            start = time.perf_counter()
+            if compress_request:
+                data = gzip_json(body)
+                headers["Content-Encoding"] = "gzip"
+            else:
+                data = plain_body
+            response = session.post(url, data=data, headers=headers, stream=True, timeout=120)
+            wire = response.raw.read(decode_content=False)
+            if accept == "gzip" and response.headers.get("content-encoding") == "gzip":
+                gzip.decompress(wire)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {wire[:200]!r}")
+            samples.append((elapsed, len(data), len(wire)))
+        elapsed, request_size, response_size = min(samples)
+        print(f"{name:<12}{request_size:>12}{response_size:>12}{elapsed * 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩性能测试")
+    parser.add_argument("image_path", nargs="?", help="测试图片路径 (默认: 生成A4合成文档页)")
+    parser.add_argument("--format", choices=["png", "jpeg"], default="jpeg", help="合成文档页的编码格式 (默认: jpeg)")
+    parser.add_argument("--url", default="http://localhost:8000", help="OCR API服务地址 (默认: http://localhost:8000)")
+    parser.add_argument("--engine", choices=["umi_ocr", "paddleocr"], default="umi_ocr", help="OCR引擎 (默认: umi_ocr)")
+    parser.add_argument("--device", choices=["gpu", "cpu"], default="gpu", help="PaddleOCR设备类型 (默认: gpu)")
+    parser.add_argument("--api-key", help="API密钥 (可选)")
+    parser.add_argument("--bandwidth", type=float, default=10.0, help="用于估算传输耗时的带宽，Mbps (默认: 10)")
+    parser.add_argument("--response-level", type=int, default=5, help="响应压缩级别，与OCR_GZIP_LEVEL一致 (默认: 5)")
+    parser.add_argument("--repeat", type=int, default=3, help="端到端测试的重复次数，取最佳值 (默认: 3)")
+    parser.add_argument("--dry-run", action="store_true", help="只统计字节数和CPU耗时，不请求服务")
+    args = parser.parse_args()
+
+    if args.image_path:
+        with open(args.image_path, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = make_page(args.format)
+
+    options = {"ocr.engine": args.engine, "data.format": "dict"}
+    if args.engine == "paddleocr":
+        options["paddleocr.device"] = args.device
+    body = {"base64": base64.b64encode(image_bytes).decode("ascii"), "options": options}
+
+    print(f"{'内容':<16}{'原始字节':>12}{'压缩后字节':>12}{'节省':>8}{'压缩(ms)':>10}{'解压(ms)':>10}"
+          f"{'节省传输(ms)':>12}")
+    report("base64请求体", json.dumps(body).encode("utf-8"), GZIP_LEVEL, args.bandwidth)
+    report("dict识别结果", json.dumps(make_dict_result(), ensure_ascii=False).encode("utf-8"),
+           args.response_level, args.bandwidth)
+
+    if not args.dry_run:
+        bench_server(args, body)
+
+
+if __name__ == "__main__":
+    main()
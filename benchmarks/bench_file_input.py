@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文件输入性能测试
+对比base64接口（客户端读取文件、base64编码后上传）与本地文件接口（只发送路径，服务端mmap映射）的
+请求体字节数、客户端CPU、服务端CPU和端到端延迟
+
+测试图片为随机噪声PNG（几乎无法压缩），生成在 --root 目录下，服务端需要以相同目录启动：
+  OCR_FILE_INPUT_ROOT=/data/ocr-input python start.py
+服务端CPU通过psutil读取服务进程的CPU时间，需要传入 --server-pid（可选，未安装psutil时跳过）。
+
+使用示例:
+  python benchmarks/bench_file_input.py --root /data/ocr-input --url http://localhost:8000
+  python benchmarks/bench_file_input.py --root /data/ocr-input --sizes 1 5 10 --engine paddleocr --server-pid 12345
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_upload_transport import generate_image, server_cpu_time
+
+
+def post_base64(client: httpx.Client, url: str, image_path: str, options: dict) -> httpx.Response:
+    """base64接口：读取文件并编码后上传"""
+    with open(image_path, "rb") as file:
+        encoded = base64.b64encode(file.read()).decode("ascii")
+    body = json.dumps({"base64": encoded, "options": options}).encode()
+    return client.post(f"{url}/ocr/recognize/base64", content=body, headers={"Content-Type": "application/json"})
+
+
+def post_file(client: httpx.Client, url: str, image_path: str, options: dict) -> httpx.Response:
+    """本地文件接口：只发送路径"""
+    body = json.dumps({"path": image_path, "options": options}).encode()
+    return client.post(f"{url}/ocr/recognize/file", content=body, headers={"Content-Type": "application/json"})
+
+
+MODES = (("base64", post_base64), ("file", post_file))
+
+
+def measure(func, client, url: str, image_path: str, options: dict, process) -> dict:
+    """执行一次识别，返回请求体字节数、客户端CPU、服务端CPU和延迟"""
+    server_start = server_cpu_time(process)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    response = func(client, url, image_path, options)
+    latency = time.perf_counter() - start
+    client_cpu = time.process_time() - cpu_start
+    server_cpu = server_cpu_time(process) - server_start
+    response.raise_for_status()
+    return {
+        "body": int(response.request.headers.get("Content-Length", 0)),
+        "client_cpu": client_cpu,
+        "server_cpu": server_cpu,
+        "latency": latency
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地文件输入性能测试")
+    parser.add_argument("--root", required=True, help="生成测试图片的目录，与服务端的OCR_FILE_INPUT_ROOT相同")
+    parser.add_argument("--url", default="http://localhost:8000", help="OCR API服务地址 (默认: http://localhost:8000)")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10], help="测试图片大小，MB (默认: 1 5 10)")
+    parser.add_argument("--engine", choices=["umi_ocr", "paddleocr"], default="umi_ocr", help="OCR引擎 (默认: umi_ocr)")
+    parser.add_argument("--repeat", type=int, default=5, help="每种配置的重复次数，取中位数 (默认: 5)")
+    parser.add_argument("--server-pid", type=int, help="服务进程PID，用于统计服务端CPU时间（需要psutil）")
+    args = parser.parse_args()
+
+    process = None
+    if args.server_pid:
+        try:
+            import psutil
+            process = psutil.Process(args.server_pid)
+        except ImportError:
+            print("未安装psutil，跳过服务端CPU统计: pip install psutil")
+
+    options = {"ocr.engine": args.engine, "data.format": "text"}
+    root = os.path.abspath(args.root)
+    os.makedirs(root, exist_ok=True)
+    print(f"{'大小(MB)':<10}{'输入方式':<10}{'请求体字节':>14}{'客户端CPU(s)':>14}{'服务端CPU(s)':>14}{'延迟(s)':>10}")
+    with httpx.Client(timeout=120) as client:
+        for size_mb in args.sizes:
+            image_path = os.path.join(root, f"bench_noise_{size_mb:g}mb.png")
+            generate_image(image_path, size_mb)
+            try:
+                for mode, func in MODES:
+                    # 预热连接和页面缓存
+                    measure(func, client, args.url, image_path, options, process)
+                    samples = [measure(func, client, args.url, image_path, options, process) for _ in range(args.repeat)]
+
+                    def median(key: str) -> float:
+                        return float(np.median([sample[key] for sample in samples]))
+
+                    server_cpu = f"{median('server_cpu'):.3f}" if process else "-"
+                    print(f"{size_mb:<10g}{mode:<10}{samples[0]['body']:>14}{median('client_cpu'):>14.3f}"
+                          f"{server_cpu:>14}{median('latency'):>10.3f}")
+            finally:
+                os.remove(image_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量识别性能测试
+模拟屏幕画面：在布满文字的合成图片上每帧只改动一行，对比每帧整帧识别与只识别变化区域的耗时
+
+使用示例:
+  python benchmarks/bench_incremental.py --device cpu
+  python benchmarks/bench_incremental.py --width 2560 --height 1440 --frames 30
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.bench_tiling import make_synthetic_image
+
+
+def make_frames(width: int, height: int, count: int, font_size: int = 32) -> list:
+    """生成连续的帧：背景相同，每帧只有右上角的计数器一行文字不同"""
+    base = Image.open(io.BytesIO(make_synthetic_image(width, height, font_size))).convert("RGB")
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    frames = []
+    for index in range(count):
+        image = base.copy()
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((width - font_size * 12, 0, width, font_size * 2), fill="white")
+        draw.text((width - font_size * 11, font_size // 2), f"Frame {index:05d}", fill="black", font=font)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        frames.append(buffer.getvalue())
+    return frames
+
+
+async def run_stream(service, frames: list, options) -> tuple:
+    """按顺序识别所有帧，返回 (每帧平均耗时, 各识别方式的帧数)"""
+    from services.frame_stream import FrameStream
+    from services.request_context import RequestContext
+
+    stream = FrameStream(service, options)
+    modes = {}
+    start = time.perf_counter()
+    for data in frames:
+        result = await stream.recognize(data, RequestContext())
+        if result.code not in (100, 101):
+            raise RuntimeError(result.data)
+        mode = stream.last_update["mode"] if stream.last_update else "full"
+        modes[mode] = modes.get(mode, 0) + 1
+    return (time.perf_counter() - start) / len(frames), modes
+
+
+def bench_diff(frames: list, repeat: int) -> float:
+    """帧差分本身的耗时（解码已完成，只计算变化区域），返回毫秒"""
+    import numpy as np
+    from utils.frame_diff import changed_regions
+
+    arrays = [np.asarray(Image.open(io.BytesIO(data)).convert("RGB")) for data in frames[:2]]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        changed_regions(arrays[0], arrays[1])
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量识别性能测试")
+    parser.add_argument("--width", type=int, default=1920, help="帧宽度 (默认: 1920)")
+    parser.add_argument("--height", type=int, default=1080, help="帧高度 (默认: 1080)")
+    parser.add_argument("--frames", type=int, default=20, help="帧数 (默认: 20)")
+    parser.add_argument("--device", choices=["gpu", "cpu"], default="cpu", help="PaddleOCR设备类型 (默认: cpu)")
+    args = parser.parse_args()
+
+    print(f"生成 {args.frames} 帧合成画面: {args.width}x{args.height}")
+    frames = make_frames(args.width, args.height, args.frames)
+    print(f"帧差分耗时: {bench_diff(frames, 20):.2f}毫秒/帧")
+
+    from models.ocr_models import OCROptions
+    from services.ocr_service import ocr_service
+
+    engine_options = {"ocr.engine": "paddleocr", "paddleocr.device": args.device}
+    modes = [
+        ("整帧识别", OCROptions(**engine_options)),
+        ("增量识别", OCROptions(**engine_options, **{"stream.incremental": True})),
+    ]
+
+    timings = {}
+    for name, options in modes:
+        # 预热一次，排除模型首次推理的初始化开销
+        asyncio.run(run_stream(ocr_service, frames[:1], options))
+        elapsed, counts = asyncio.run(run_stream(ocr_service, frames, options))
+        timings[name] = elapsed
+        print(f"{name}: 平均 {elapsed * 1000:.1f}毫秒/帧，识别方式 {counts}")
+
+    print(f"加速比: {timings['整帧识别'] / timings['增量识别']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志性能测试
+对比请求处理线程中同步输出（StreamHandler）与队列日志（QueueHandler）每条日志的耗时，
+以及原来每个请求的多行INFO日志（含完整识别结果）与一行请求摘要的耗时
+
+使用示例:
+  python benchmarks/bench_logging.py
+  python benchmarks/bench_logging.py --count 20000 --blocks 2000 --output /tmp/ocr.log
+  python benchmarks/bench_logging.py --write-delay-ms 1     # 模拟写入阻塞的控制台
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ocr_models import OCRResponse, OCRTextBlock
+from utils.log_utils import LogSampler, create_queue_handler, format_fields
+
+
+class SlowStream:
+    """每次写入都等待一段时间，模拟被阻塞的控制台、管道或容器日志驱动"""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    """创建只使用指定处理器的日志记录器"""
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    bench_logger = logging.Logger("bench")
+    bench_logger.addHandler(handler)
+    return bench_logger
+
+
+def per_request_verbose(bench_logger: logging.Logger, result: OCRResponse):
+    """原来每个请求的日志：上传处理、引擎调用各一行，外加完整的识别结果"""
+    bench_logger.info(f"开始处理图片数据，类型: {type(b'')}")
+    bench_logger.info(f"成功读取UploadFile，大小: {123456} bytes")
+    bench_logger.info(f"成功将图片转换为base64，长度: {164608}")
+    bench_logger.info(f"使用OCR引擎: paddleocr，优先级: interactive，客户端: ip:127.0.0.1")
+    bench_logger.info(f"PaddleOCR识别完成，耗时: {0.5:.2f}秒，文本块数量: {len(result.data)}")
+    bench_logger.info(f"Base64图片识别完成，状态码: {result.code}")
+    bench_logger.info(f"Base64图片识别: {result}")
+
+
+def per_request_summary(bench_logger: logging.Logger, sampler: LogSampler, result: OCRResponse):
+    """请求摘要：一行key=value，按采样器决定是否输出"""
+    emit, suppressed = sampler.allow()
+    if emit:
+        bench_logger.info("request %s", format_fields({
+            "method": "POST", "path": "/ocr/recognize/base64", "status": 200, "duration_ms": 512.3,
+            "bytes": 4096, "engine": "paddleocr", "client": "ip:127.0.0.1", "code": result.code,
+            "blocks": len(result.data), "suppressed": suppressed or None,
+        }))
+
+
+def measure(label: str, func, count: int):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{elapsed / count * 1e6:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志性能测试")
+    parser.add_argument("--count", type=int, default=2000, help="每种方式的请求数 (默认: 2000)")
+    parser.add_argument("--blocks", type=int, default=200, help="识别结果的文本块数量 (默认: 200)")
+    parser.add_argument("--output", default=os.devnull, help="日志输出文件 (默认: 丢弃)")
+    parser.add_argument("--write-delay-ms", type=float, default=0.0,
+                        help="每次写入的额外等待，模拟慢速控制台，毫秒 (默认: 0)")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="请求摘要的采样比例 (默认: 0.1)")
+    args = parser.parse_args()
+
+    result = OCRResponse(code=100, time=0.5, timestamp=0.0, data=[
+        OCRTextBlock(text=f"第 {i} 行文字", score=0.9, box=[[0, i * 30], [400, i * 30], [400, i * 30 + 20], [0, i * 30 + 20]],
+                     end="\n")
+        for i in range(args.blocks)
+    ])
+
+    output = open(args.output, "w", encoding="utf-8")
+    stream = SlowStream(output, args.write_delay_ms / 1000) if args.write_delay_ms > 0 else output
+    sync_logger = make_logger(logging.StreamHandler(stream))
+    queue_handler = create_queue_handler(logging.StreamHandler(stream))
+    queue_logger = make_logger(queue_handler)
+
+    print(f"{'方式':<28}{'每个请求(微秒)':>12}")
+    measure("同步输出-多行日志", lambda: per_request_verbose(sync_logger, result), args.count)
+    measure("队列日志-多行日志", lambda: per_request_verbose(queue_logger, result), args.count)
+    measure("同步输出-请求摘要", lambda: per_request_summary(sync_logger, LogSampler(), result), args.count)
+    measure("队列日志-请求摘要", lambda: per_request_summary(queue_logger, LogSampler(), result), args.count)
+    sampler = LogSampler(sample_rate=args.sample_rate)
+    measure(f"队列日志-请求摘要(采样{args.sample_rate:g})", lambda: per_request_summary(queue_logger, sampler, result),
+            args.count)
+
+    queue_handler.stop_listener()
+    output.close()
+
+
+if __name__ == "__main__":
+    main()
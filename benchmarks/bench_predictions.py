@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预测结果转换性能测试
+对几千到几万行文字的页面（密集扫描件、表格、日志截图），对比逐个文本框转换与整页数组一次性转换的耗时，
+不需要加载模型
+
+使用示例:
+  python benchmarks/bench_predictions.py
+  python benchmarks/bench_predictions.py --lines 2000 10000 --repeat 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models.ocr_models import OCRTextBlock
+from services.inference_pool import _pack_result, _unpack_result
+from test_predictions import make_prediction
+from utils.predictions import prediction_blocks
+
+
+def per_box_blocks(res) -> list:
+    """逐个文本框转换（原来的实现）：每个文本框单独取置信度、转换坐标数组并校验构造文本块"""
+    blocks = []
+    rec_scores = res.get("rec_scores")
+    rec_polys = res.get("rec_polys")
+    for i, rec_text in enumerate(res.get("rec_texts")):
+        if rec_text:
+            rec_score = 1.0
+            if rec_scores is not None and i < len(rec_scores):
+                rec_score = float(rec_scores[i])
+            rec_box = []
+            if rec_polys is not None and i < len(rec_polys):
+                rec_box = np.asarray(rec_polys[i]).astype(int).tolist()
+            blocks.append(OCRTextBlock(text=rec_text, score=rec_score, box=rec_box, end=" "))
+    return blocks
+
+
+def best_time(func, res, repeat: int) -> float:
+    """多次执行取最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(res)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预测结果转换性能测试")
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 5000, 20000], help="每页的文本行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最佳值 (默认: 5)")
+    args = parser.parse_args()
+
+    print(f"{'行数':>8}{'来源':>10}{'逐个转换(ms)':>14}{'整页转换(ms)':>14}{'加速':>8}")
+    for lines in args.lines:
+        local = make_prediction(lines)
+        # 推理进程模式下结果从共享内存数组还原
+        pooled = _unpack_result(_pack_result(local))
+        for name, res in (("进程内", local), ("推理进程", pooled)):
+            assert per_box_blocks(res) == prediction_blocks(res)
+            before = best_time(per_box_blocks, res, args.repeat)
+            after = best_time(prediction_blocks, res, args.repeat)
+            print(f"{lines:>8}{name:>10}{before:>14.1f}{after:>14.1f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理进程池性能测试
+在CPU上对比线程执行器（服务进程内多个模型实例）与推理进程池的吞吐量
+
+使用示例:
+  python benchmarks/bench_process_pool.py --concurrency 4
+  python benchmarks/bench_process_pool.py --concurrency 1 2 4 8 --requests 64 --width 1600 --height 1200
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_tiling import make_synthetic_image
+
+
+async def run_requests(service, base64_image: str, total: int, concurrency: int) -> float:
+    """以固定并发发送total个识别请求，返回总耗时"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def recognize():
+        async with semaphore:
+            result = await service.recognize_image(base64_image)
+            if result.code != 100:
+                raise RuntimeError(result.data)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[recognize() for _ in range(total)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理进程池性能测试")
+    parser.add_argument("--width", type=int, default=1280, help="合成图片宽度 (默认: 1280)")
+    parser.add_argument("--height", type=int, default=960, help="合成图片高度 (默认: 960)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[os.cpu_count() or 1],
+                        help="并发数列表，线程数/进程数与并发数相同 (默认: CPU核心数)")
+    parser.add_argument("--requests", type=int, default=32, help="每种配置的请求数 (默认: 32)")
+    args = parser.parse_args()
+
+    from services.paddleocr_service import PaddleOCRService
+
+    print(f"生成合成图片: {args.width}x{args.height}，CPU核心数: {os.cpu_count()}")
+    base64_image = base64.b64encode(make_synthetic_image(args.width, args.height, font_size=24)).decode("utf-8")
+
+    print(f"{'并发数':<8}{'模式':<10}{'总耗时(s)':>12}{'吞吐量(张/s)':>14}")
+    for concurrency in args.concurrency:
+        for name, kwargs in (("线程", {"workers": concurrency, "processes": 0}),
+                             ("进程", {"processes": concurrency})):
+            service = PaddleOCRService(device="cpu", **kwargs)
+            try:
+                # 预热：每个模型实例各执行一次推理
+                asyncio.run(run_requests(service, base64_image, concurrency, concurrency))
+                elapsed = asyncio.run(run_requests(service, base64_image, args.requests, concurrency))
+            finally:
+                service.close()
+            print(f"{concurrency:<8}{name:<10}{elapsed:>12.2f}{args.requests / elapsed:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
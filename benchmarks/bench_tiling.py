@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块识别性能测试
+生成超大尺寸的合成文本图片，对比整图识别与分块并行识别的耗时
+
+使用示例:
+  PADDLEOCR_WORKERS=4 python benchmarks/bench_tiling.py --device cpu
+  python benchmarks/bench_tiling.py --width 20000 --height 4000 --tile-size 2048 --tile-overlap 128
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+def make_synthetic_image(width: int, height: int, font_size: int = 48) -> bytes:
+    """生成布满文本行的合成图片，返回PNG字节数据"""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        # 旧版本Pillow的默认字体不支持调整字号
+        font = ImageFont.load_default()
+
+    line_height = font_size * 2
+    column_width = font_size * 24
+    index = 0
+    for y in range(line_height, height - line_height, line_height):
+        for x in range(font_size, width - column_width, column_width + font_size * 4):
+            draw.text((x, y), f"Line {index:06d} tiled OCR benchmark", fill="black", font=font)
+            index += 1
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def run_once(service, base64_image: str, options) -> tuple:
+    """执行一次识别，返回 (耗时, 文本块数量)"""
+    start = time.perf_counter()
+    result = await service.recognize_image(base64_image, options)
+    elapsed = time.perf_counter() - start
+    if result.code != 100:
+        raise RuntimeError(result.data)
+    return elapsed, len(result.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分块识别性能测试")
+    parser.add_argument("--width", type=int, default=20000, help="合成图片宽度 (默认: 20000)")
+    parser.add_argument("--height", type=int, default=3000, help="合成图片高度 (默认: 3000)")
+    parser.add_argument("--tile-size", type=int, default=2048, help="分块边长 (默认: 2048)")
+    parser.add_argument("--tile-overlap", type=int, default=128, help="分块重叠宽度 (默认: 128)")
+    parser.add_argument("--device", choices=["gpu", "cpu"], default="cpu", help="PaddleOCR设备类型 (默认: cpu)")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式的重复次数 (默认: 3)")
+    args = parser.parse_args()
+
+    from models.ocr_models import OCROptions
+    from services.paddleocr_service import PaddleOCRService
+
+    print(f"生成合成图片: {args.width}x{args.height}")
+    base64_image = base64.b64encode(make_synthetic_image(args.width, args.height)).decode("utf-8")
+
+    service = PaddleOCRService(device=args.device)
+    print(f"引擎执行器并发数: {service.workers}")
+
+    modes = [
+        ("整图识别", None),
+        ("分块识别", OCROptions(**{"ocr.tile_size": args.tile_size, "ocr.tile_overlap": args.tile_overlap})),
+    ]
+
+    timings = {}
+    for name, options in modes:
+        # 预热一次，排除模型首次推理的初始化开销
+        asyncio.run(run_once(service, base64_image, options))
+        samples = [asyncio.run(run_once(service, base64_image, options)) for _ in range(args.repeat)]
+        best = min(elapsed for elapsed, _ in samples)
+        timings[name] = best
+        print(f"{name}: 最佳耗时 {best:.2f}秒，文本块数量 {samples[0][1]}")
+
+    print(f"加速比: {timings['整图识别'] / timings['分块识别']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求追踪开销测试
+模拟一次识别请求经过的各个阶段（约12个span），对比不追踪、追踪但未采样、采样并导出到JSONL文件时每个请求的额外耗时
+
+使用示例:
+  python benchmarks/bench_tracing.py
+  python benchmarks/bench_tracing.py --count 50000 --output /tmp/ocr-traces.jsonl
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import tracing
+
+
+def handle_request():
+    """与识别接口相同的span结构，各阶段不做实际工作"""
+    with tracing.span(tracing.HANDLER_SPAN, handler="recognize_base64_image"):
+        with tracing.span("request.stream_parse", bytes=1000):
+            pass
+        with tracing.span("rate_limit", client="ip:127.0.0.1"):
+            pass
+        with tracing.span("ocr.recognize", priority="interactive") as span:
+            queued = tracing.now()
+            tracing.record_span("scheduler.wait", queued, engine="paddleocr", priority="interactive")
+            with tracing.span("engine.paddleocr"):
+                with tracing.span("image.decode"):
+                    pass
+                with tracing.span("paddleocr.executor"):
+                    with tracing.span("paddleocr.predict", batch=1):
+                        pass
+                with tracing.span("paddleocr.convert"):
+                    pass
+            span.set(code=100, reused=False)
+        tracing.propagation_headers()
+
+
+def run(tracer, count: int) -> float:
+    """每个请求的耗时（微秒），tracer为None时不追踪"""
+    start = time.perf_counter()
+    for _ in range(count):
+        if tracer is None:
+            handle_request()
+            continue
+        root = tracer.start("POST /ocr/recognize/base64")
+        token = tracing._current_span.set(root)
+        try:
+            handle_request()
+        finally:
+            tracing._current_span.reset(token)
+        tracer.finish(root)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="请求追踪开销测试")
+    parser.add_argument("--count", type=int, default=20000, help="每种方式的请求数 (默认: 20000)")
+    parser.add_argument("--output", default=None, help="JSONL导出文件 (默认: 临时目录)")
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    path = args.output or os.path.join(directory.name, "traces.jsonl")
+    exporter = tracing.JsonlSpanExporter(path, max_bytes=100 * 1024 * 1024, backups=1)
+
+    print(f"{'方式':<24}{'每个请求(微秒)':>12}")
+    print(f"{'不追踪':<24}{run(None, args.count):>12.2f}")
+    print(f"{'追踪-未采样':<24}{run(tracing.Tracer(exporter, 0.0), args.count):>12.2f}")
+    print(f"{'追踪-采样0.1':<24}{run(tracing.Tracer(exporter, 0.1), args.count):>12.2f}")
+    print(f"{'追踪-全部采样':<24}{run(tracing.Tracer(exporter, 1.0), args.count):>12.2f}")
+
+    exporter.close()
+    print(f"导出span数: {exporter.exported}，文件大小: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客户端上传方式性能测试
+对比multipart直接上传文件与base64内嵌JSON上传的请求体字节数、客户端CPU、服务端CPU和端到端延迟
+
+测试图片为随机噪声PNG（几乎无法压缩），按目标大小生成，默认1/5/10MB三档。
+服务端CPU通过psutil读取服务进程的CPU时间，需要传入 --server-pid（可选，未安装psutil时跳过）。
+
+使用示例:
+  python benchmarks/bench_upload_transport.py --url http://localhost:8000
+  python benchmarks/bench_upload_transport.py --sizes 1 5 10 --repeat 5 --server-pid 12345
+  python benchmarks/bench_upload_transport.py --engine paddleocr --device cpu
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client_utils import MAX_UPLOAD_SIZE, TRANSPORTS
+from ocr_client import OCRClient
+from paddleocr_client import PaddleOCRClient
+
+
+def generate_image(path: str, size_mb: float):
+    """生成大小约为 size_mb 的随机噪声PNG（不超过服务端上传限制）"""
+    target = min(int(size_mb * 1024 * 1024), MAX_UPLOAD_SIZE - 64 * 1024)
+    side = int((target / 3) ** 0.5)
+    pixels = np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, format="PNG", compress_level=1)
+
+
+def server_cpu_time(process) -> float:
+    """读取服务进程（包括子进程）的CPU时间"""
+    if process is None:
+        return 0.0
+    processes = [process] + process.children(recursive=True)
+    total = 0.0
+    for proc in processes:
+        try:
+            times = proc.cpu_times()
+            total += times.user + times.system
+        except Exception:
+            continue
+    return total
+
+
+def measure(client, image_path: str, process) -> dict:
+    """执行一次识别，返回请求体字节数、客户端CPU、服务端CPU和延迟"""
+    server_start = server_cpu_time(process)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    response, _ = client._request_ocr(image_path, client_options(client), verbose=False)
+    latency = time.perf_counter() - start
+    client_cpu = time.process_time() - cpu_start
+    server_cpu = server_cpu_time(process) - server_start
+    return {
+        "body": int(response.request.headers.get("Content-Length", 0)),
+        "client_cpu": client_cpu,
+        "server_cpu": server_cpu,
+        "latency": latency
+    }
+
+
+def client_options(client) -> dict:
+    """构建识别选项，只请求纯文本结果"""
+    if isinstance(client, PaddleOCRClient):
+        return client._build_options(None, "text")
+    return {"data.format": "text"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="客户端上传方式性能测试")
+    parser.add_argument("--url", default="http://localhost:8000", help="OCR API服务地址 (默认: http://localhost:8000)")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10], help="测试图片大小，MB (默认: 1 5 10)")
+    parser.add_argument("--engine", choices=["umi_ocr", "paddleocr"], default="umi_ocr", help="OCR引擎 (默认: umi_ocr)")
+    parser.add_argument("--device", default="gpu", help="PaddleOCR设备类型 (默认: gpu)")
+    parser.add_argument("--repeat", type=int, default=3, help="每种配置的重复次数，取中位数 (默认: 3)")
+    parser.add_argument("--server-pid", type=int, help="服务进程PID，用于统计服务端CPU时间（需要psutil）")
+    args = parser.parse_args()
+
+    process = None
+    if args.server_pid:
+        try:
+            import psutil
+            process = psutil.Process(args.server_pid)
+        except ImportError:
+            print("未安装psutil，跳过服务端CPU统计: pip install psutil")
+
+    print(f"{'大小(MB)':<10}{'上传方式':<12}{'请求体字节':>14}{'客户端CPU(s)':>14}{'服务端CPU(s)':>14}{'延迟(s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size_mb in args.sizes:
+            image_path = os.path.join(tmp_dir, f"noise_{size_mb:g}mb.png")
+            generate_image(image_path, size_mb)
+
+            for transport in TRANSPORTS:
+                if args.engine == "paddleocr":
+                    client = PaddleOCRClient(args.url, args.device, transport=transport)
+                else:
+                    client = OCRClient(args.url, transport=transport)
+                # 预热连接
+                measure(client, image_path, process)
+                samples = [measure(client, image_path, process) for _ in range(args.repeat)]
+
+                def median(key: str) -> float:
+                    return float(np.median([sample[key] for sample in samples]))
+
+                server_cpu = f"{median('server_cpu'):.3f}" if process else "-"
+                print(f"{size_mb:<10g}{transport:<12}{samples[0]['body']:>14}{median('client_cpu'):>14.3f}"
+                      f"{server_cpu:>14}{median('latency'):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR客户端公共工具
+上传前的图片预处理：缩小到目标长边并重新压缩，识别结果坐标的还原，流式multipart上传，以及gzip压缩的JSON请求体
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# 支持的图片格式
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+# 上传大小限制（与API服务端一致）
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# 预处理支持的编码格式
+UPLOAD_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "png": "PNG"}
+
+# 上传传输方式：multipart直接上传文件字节，base64为JSON内嵌base64字符串
+TRANSPORTS = ("multipart", "base64")
+
+# 请求体gzip压缩级别：base64字符串在级别1就能得到绝大部分压缩收益，更高级别耗时明显增加
+GZIP_LEVEL = 1
+
+# 文件扩展名对应的Content-Type（仅作为multipart的声明类型发送）。服务端忽略声明的类型，按文件头的魔数识别实际格式，
+# 扩展名与内容不符的文件按实际格式处理；不是JPEG、PNG、BMP、TIFF、WebP，或图片头无法解析的文件被拒绝
+CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.bmp': 'image/bmp',
+    '.tiff': 'image/tiff',
+    '.webp': 'image/webp'
+}
+
+
+def check_image_path(image_path: str):
+    """
+    检查图片文件是否存在且格式受支持
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件格式不支持
+    """
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件不存在: {image_path}")
+
+    file_ext = Path(image_path).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"不支持的图片格式: {file_ext}。支持的格式: {', '.join(ALLOWED_EXTENSIONS)}")
+
+
+def prepare_image_bytes(image_path: str, max_side: Optional[int] = None, quality: int = 90,
+                        image_format: str = "jpeg") -> Tuple[bytes, float]:
+    """
+    读取图片并按需缩小、重新压缩
+
+    图片长边超过 max_side 时等比缩小到 max_side，然后按指定格式和质量重新编码；
+    如果处理后反而比原始文件更大（例如本身压缩率很高的截图PNG），则直接使用原始文件。
+
+    Args:
+        image_path: 图片文件路径
+        max_side: 目标长边（像素），为None时不做预处理，直接返回原始文件内容
+        quality: 有损格式的压缩质量（1-100）
+        image_format: 编码格式 (jpeg/webp/png)
+
+    Returns:
+        Tuple[bytes, float]: (上传的图片数据, 坐标还原比例)，比例为原图边长 / 上传图片边长
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件格式不支持、文件损坏或文件过大
+    """
+    check_image_path(image_path)
+
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    if max_side:
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ValueError("图片预处理需要安装Pillow: pip install pillow")
+
+        pil_format = UPLOAD_FORMATS.get(image_format.lower())
+        if pil_format is None:
+            raise ValueError(f"不支持的编码格式: {image_format}。支持的格式: {', '.join(UPLOAD_FORMATS)}")
+
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            width, height = image.size
+            scale = 1.0
+            if max(width, height) > max_side:
+                scale = max(width, height) / max_side
+                target = (max(1, round(width / scale)), max(1, round(height / scale)))
+                # JPEG可以在解码阶段直接按2的幂缩小，减少解码开销
+                image.draft("RGB", target)
+                image = image.convert("RGB").resize(target, Image.LANCZOS)
+                # 以实际缩放后的宽度计算还原比例
+                scale = width / target[0]
+            elif pil_format != "PNG":
+                image = image.convert("RGB")
+
+            buffer = io.BytesIO()
+            save_options = {"quality": quality} if pil_format in ("JPEG", "WEBP") else {"optimize": True}
+            image.save(buffer, format=pil_format, **save_options)
+            encoded = buffer.getvalue()
+        except Exception as e:
+            raise ValueError(f"图片预处理失败: {str(e)}")
+
+        if len(encoded) < len(image_bytes):
+            image_bytes = encoded
+        else:
+            scale = 1.0
+    else:
+        scale = 1.0
+
+    # 检查文件大小（限制为10MB，与API服务端一致）
+    if len(image_bytes) > MAX_UPLOAD_SIZE:
+        raise ValueError(f"文件过大: {len(image_bytes)} bytes，最大允许: 10MB")
+
+    return image_bytes, scale
+
+
+def prepare_image_base64(image_path: str, max_side: Optional[int] = None, quality: int = 90,
+                         image_format: str = "jpeg") -> Tuple[str, float]:
+    """
+    读取图片、按需预处理并转换为base64编码字符串
+
+    Returns:
+        Tuple[str, float]: (base64编码字符串（不含前缀）, 坐标还原比例)
+    """
+    image_bytes, scale = prepare_image_bytes(image_path, max_side, quality, image_format)
+    return base64.b64encode(image_bytes).decode('utf-8'), scale
+
+
+def prepare_upload_source(image_path: str, max_side: Optional[int] = None, quality: int = 90,
+                          image_format: str = "jpeg") -> Tuple[Union[str, bytes], str, float]:
+    """
+    准备multipart上传的文件来源
+
+    不做预处理时返回文件路径，由 MultipartFileStream 从磁盘流式读取；
+    需要缩小、重新压缩时返回处理后的字节数据。
+
+    Returns:
+        Tuple[Union[str, bytes], str, float]: (文件路径或字节数据, Content-Type, 坐标还原比例)
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件格式不支持、文件损坏或文件过大
+    """
+    if max_side:
+        image_bytes, scale = prepare_image_bytes(image_path, max_side, quality, image_format)
+        if scale == 1.0 and len(image_bytes) == os.path.getsize(image_path):
+            # 预处理没有带来收益，仍然使用原始文件
+            return image_path, CONTENT_TYPES[Path(image_path).suffix.lower()], 1.0
+        return image_bytes, detect_content_type(image_bytes), scale
+
+    check_image_path(image_path)
+    file_size = os.path.getsize(image_path)
+    # 检查文件大小（限制为10MB，与API服务端一致）
+    if file_size > MAX_UPLOAD_SIZE:
+        raise ValueError(f"文件过大: {file_size} bytes，最大允许: 10MB")
+    return image_path, CONTENT_TYPES[Path(image_path).suffix.lower()], 1.0
+
+
+def gzip_json(data: dict, level: int = GZIP_LEVEL) -> bytes:
+    """
+    把请求数据编码为gzip压缩的JSON请求体，需要配合 Content-Encoding: gzip 请求头发送
+
+    Args:
+        data: 请求数据
+        level: 压缩级别（1-9）
+
+    Returns:
+        bytes: 压缩后的请求体
+    """
+    return gzip.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"), compresslevel=level)
+
+
+def rescale_blocks(blocks: List[dict], scale: float) -> List[dict]:
+    """
+    将文本块坐标从上传图片还原到原图像素
+
+    Args:
+        blocks: 文本块字典列表（包含box字段）
+        scale: 坐标还原比例
+
+    Returns:
+        List[dict]: 坐标已还原的文本块列表
+    """
+    if scale == 1.0:
+        return blocks
+    for block in blocks:
+        box = block.get("box")
+        if box:
+            block["box"] = [[round(x * scale), round(y * scale)] for x, y in box]
+    return blocks
+
+
+def detect_content_type(image_bytes: bytes) -> str:
+    """根据文件头判断预处理后图片的Content-Type"""
+    if image_bytes.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if image_bytes.startswith(b"RIFF") and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+class MultipartFileStream:
+    """
+    流式multipart/form-data请求体
+
+    表单字段和文件内容按需分块读取，上传文件时不会把整个文件读入内存。
+    同时提供 __len__（用于设置Content-Length）、read() 和 __iter__，可以直接作为requests的data参数。
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields: Dict[str, str], filename: str, content_type: str,
+                 source: Union[str, bytes], file_field: str = "file"):
+        """
+        初始化请求体
+
+        Args:
+            fields: 表单字段（值为None的字段会被跳过，列表和字典按JSON编码）
+            filename: 上传的文件名
+            content_type: 文件的Content-Type
+            source: 文件路径（从磁盘流式读取）或内存中的文件字节
+            file_field: 文件字段名
+        """
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = io.BytesIO()
+        for name, value in fields.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value)
+            head.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode('utf-8'))
+            head.write(str(value).encode('utf-8') + b"\r\n")
+        safe_filename = os.path.basename(filename).replace('"', '_')
+        head.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{safe_filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+        )
+        tail = f"\r\n--{boundary}--\r\n".encode('utf-8')
+
+        if isinstance(source, (bytes, bytearray)):
+            body = io.BytesIO(source)
+            body_size = len(source)
+        else:
+            body = open(source, 'rb')
+            body_size = os.fstat(body.fileno()).st_size
+
+        self._length = head.tell() + body_size + len(tail)
+        head.seek(0)
+        self._parts = [head, body, io.BytesIO(tail)]
+        self._index = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        """读取请求体，size为负数时读取剩余全部内容"""
+        chunks = []
+        while self._index < len(self._parts) and size != 0:
+            chunk = self._parts[self._index].read(size)
+            if not chunk:
+                self._parts[self._index].close()
+                self._index += 1
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        """关闭打开的文件"""
+        for part in self._parts:
+            part.close()
@@ -0,0 +1,176 @@
+"""
+应用配置
+所有配置项都可以通过同名的环境变量覆盖
+"""
+
+import os
+from typing import Dict, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数类型的环境变量"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"环境变量 {name} 必须是整数，当前值: {value}")
+
+
+def _env_float(name: str, default: float) -> float:
+    """读取浮点数类型的环境变量"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"环境变量 {name} 必须是数字，当前值: {value}")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """读取布尔类型的环境变量（1/true/yes/on 为真）"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_weights(name: str, default: str) -> Dict[str, int]:
+    """读取 "名称:整数,名称:整数" 格式的环境变量"""
+    value = os.environ.get(name) or default
+    weights = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, number = item.partition(":")
+        try:
+            weights[key.strip()] = int(number)
+        except ValueError:
+            raise ValueError(f"环境变量 {name} 格式错误，应为 名称:整数,名称:整数，当前值: {value}")
+    return weights
+
+
+def _env_key_limits(name: str) -> Dict[str, Tuple[float, float]]:
+    """读取 "API密钥=每秒请求数/每秒百万像素数,..." 格式的环境变量"""
+    value = os.environ.get(name) or ""
+    limits = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, rates = item.rpartition("=")
+        requests_rate, _, megapixels_rate = rates.partition("/")
+        try:
+            limits[key.strip()] = (float(requests_rate), float(megapixels_rate or 0))
+        except ValueError:
+            raise ValueError(f"环境变量 {name} 格式错误，应为 密钥=请求数/百万像素数,...，当前值: {value}")
+    return limits
+
+
+class Settings:
+    """应用配置项"""
+
+    def __init__(self):
+        # PaddleOCR引擎执行器的并发数（每个并发持有一个独立的模型实例）
+        self.paddleocr_workers = _env_int("PADDLEOCR_WORKERS", 1)
+
+        # PaddleOCR推理进程数，大于0时模型实例运行在独立的工作进程中（覆盖PADDLEOCR_WORKERS），0表示在服务进程内的线程中推理
+        self.paddleocr_processes = _env_int("PADDLEOCR_PROCESSES", 0)
+
+        # 分块识别时相邻分块的默认重叠宽度（像素）
+        self.tile_overlap = _env_int("OCR_TILE_OVERLAP", 128)
+
+        # 近似重复图片查找：开关、判定为重复的最大汉明距离（64位哈希）、缓存容量
+        # 64位哈希只反映整体亮度分布，只差几个字的文档图片哈希距离通常为0，仅靠阈值会误判为重复并返回错误的文字；
+        # 哈希相近的候选还要逐像素比较128x128灰度缩略图，最大亮度差（0-255）不超过像素容差才复用结果。
+        # 重新压缩（JPEG质量20以上）的差异在8以内，A4文档改动一个字符的差异在14以上；调大容差会重新引入误判
+        self.near_duplicate_enabled = _env_bool("OCR_NEAR_DUPLICATE", False)
+        self.near_duplicate_threshold = _env_int("OCR_NEAR_DUPLICATE_THRESHOLD", 4)
+        self.near_duplicate_pixel_tolerance = _env_int("OCR_NEAR_DUPLICATE_PIXEL_TOLERANCE", 10)
+        self.near_duplicate_capacity = _env_int("OCR_NEAR_DUPLICATE_CAPACITY", 1024)
+
+        # 合并相同图片、相同选项的并发请求，只识别一次
+        self.single_flight_enabled = _env_bool("OCR_SINGLE_FLIGHT", True)
+
+        # 请求优先级：各优先级的调度权重、预留的并发槽位数、未指定时的默认优先级
+        # 默认不预留槽位：默认的并发数为1，预留总数最多为并发数减一，预留只在并发数大于1时生效
+        self.priority_weights = _env_weights("OCR_PRIORITY_WEIGHTS", "interactive:4,bulk:1")
+        self.priority_reserved = _env_weights("OCR_PRIORITY_RESERVED", "")
+        self.default_priority = os.environ.get("OCR_DEFAULT_PRIORITY") or "interactive"
+
+        # Umi-OCR的并发识别数（PaddleOCR使用引擎执行器的并发数）
+        self.umi_ocr_concurrency = _env_int("OCR_UMI_CONCURRENCY", 1)
+
+        # 请求的默认处理时限（秒），可以通过X-OCR-Timeout请求头单独指定，但不超过最大时限；0表示不限制
+        # 超过时限仍在排队的请求直接丢弃，正在进行的上游调用被取消，上游调用的超时时间为剩余时限
+        self.request_timeout = _env_float("OCR_REQUEST_TIMEOUT", 60)
+        self.max_request_timeout = _env_float("OCR_MAX_REQUEST_TIMEOUT", 300)
+
+        # 流式识别的增量模式：像素差值阈值、变化检测网格边长、每隔多少帧强制整帧识别（0表示不强制）、
+        # 变化面积超过该比例时直接整帧识别
+        self.stream_diff_threshold = _env_int("OCR_STREAM_DIFF_THRESHOLD", 24)
+        self.stream_diff_cell = _env_int("OCR_STREAM_DIFF_CELL", 16)
+        self.stream_keyframe_interval = _env_int("OCR_STREAM_KEYFRAME_INTERVAL", 30)
+        self.stream_max_changed_ratio = _env_float("OCR_STREAM_MAX_CHANGED_RATIO", 0.5)
+
+        # 使用Umi-OCR时在服务内进行排版解析（tbpu.parser），与PaddleOCR的阅读顺序和换行规则一致；关闭时由Umi-OCR解析
+        self.umi_local_layout = _env_bool("OCR_UMI_LOCAL_LAYOUT", False)
+
+        # 响应压缩：客户端声明接受gzip且响应体不小于该字节数时压缩，0表示不压缩响应；压缩级别1-9
+        self.gzip_minimum_size = _env_int("OCR_GZIP_MIN_SIZE", 1024)
+        self.gzip_level = _env_int("OCR_GZIP_LEVEL", 5)
+        # gzip请求体解压后的最大字节数（10MB图片的base64约13.4MB），超过时返回413
+        self.max_decompressed_body = _env_int("OCR_MAX_DECOMPRESSED_BODY", 16 * 1024 * 1024)
+
+        # 图片校验：文件（base64解码后）最大字节数、最大像素数（百万像素）、最大帧数（多帧TIFF、动画WebP/PNG）；
+        # 请求体边接收边计数，超过大小上限时不再继续接收
+        self.max_image_bytes = _env_int("OCR_MAX_IMAGE_BYTES", 10 * 1024 * 1024)
+        self.max_image_megapixels = _env_float("OCR_MAX_IMAGE_MEGAPIXELS", 100)
+        self.max_image_frames = _env_int("OCR_MAX_IMAGE_FRAMES", 1)
+
+        # 本地文件输入：允许按路径识别的根目录（与API同一主机或共享卷上的目录），为空表示不启用；
+        # 文件通过mmap只读映射，大小上限与OCR_MAX_IMAGE_BYTES相同
+        self.file_input_root = os.environ.get("OCR_FILE_INPUT_ROOT") or ""
+
+        # 内存预算：进程内所有进行中的识别预估占用的内存总量上限（MB），0表示不限制；
+        # 预算不足时最多等待的秒数（超时返回503）；本地解码时每个像素预估占用的字节数（解码后的图片与RGB数组）
+        self.memory_budget_mb = _env_int("OCR_MEMORY_BUDGET_MB", 0)
+        self.memory_max_wait = _env_float("OCR_MEMORY_MAX_WAIT", 30)
+        self.memory_bytes_per_pixel = _env_float("OCR_MEMORY_BYTES_PER_PIXEL", 7)
+
+        # 日志级别；是否使用队列日志（请求处理线程只把日志放入队列，输出在后台线程中完成）
+        self.log_level = (os.environ.get("OCR_LOG_LEVEL") or "INFO").upper()
+        self.log_queue = _env_bool("OCR_LOG_QUEUE", True)
+        # 请求摘要：成功请求的采样比例、每秒最多输出的行数（0表示不限），耗时不小于慢请求阈值（毫秒）或失败的请求总是输出
+        self.log_sample_rate = _env_float("OCR_LOG_SAMPLE_RATE", 1.0)
+        self.log_max_per_second = _env_float("OCR_LOG_MAX_PER_SECOND", 0)
+        self.log_slow_ms = _env_float("OCR_LOG_SLOW_MS", 1000)
+
+        # 请求追踪：导出方式（jsonl/otlp，为空时不追踪）、采样比例（调用方traceparent标记为已采样的请求总是追踪）
+        self.trace_exporter = (os.environ.get("OCR_TRACE_EXPORTER") or "").strip().lower()
+        self.trace_sample_rate = _env_float("OCR_TRACE_SAMPLE_RATE", 0.1)
+        # JSONL文件路径、单个文件的最大字节数、保留的轮转文件数
+        self.trace_file = os.environ.get("OCR_TRACE_FILE") or "traces/ocr-traces.jsonl"
+        self.trace_file_max_bytes = _env_int("OCR_TRACE_FILE_MAX_BYTES", 10 * 1024 * 1024)
+        self.trace_file_backups = _env_int("OCR_TRACE_FILE_BACKUPS", 5)
+        # OTLP/HTTP采集器地址和上报的服务名称
+        self.trace_otlp_endpoint = os.environ.get("OCR_TRACE_OTLP_ENDPOINT") or "http://127.0.0.1:4318/v1/traces"
+        self.trace_service_name = os.environ.get("OCR_TRACE_SERVICE_NAME") or "umi-ocr-api"
+
+        # 按客户端（API密钥，未提供时为客户端IP）的令牌桶限流：每秒请求数、每秒图片百万像素数及对应的突发容量
+        # 速率为0表示不限制，突发容量为0表示等于1秒的速率（至少为1）
+        self.rate_limit_requests = _env_float("OCR_RATE_LIMIT_RPS", 0)
+        self.rate_limit_request_burst = _env_float("OCR_RATE_LIMIT_BURST", 0)
+        self.rate_limit_megapixels = _env_float("OCR_RATE_LIMIT_MPPS", 0)
+        self.rate_limit_megapixel_burst = _env_float("OCR_RATE_LIMIT_MP_BURST", 0)
+        # 单独指定部分API密钥的限流速率（突发容量等于1秒的速率），覆盖上面的默认值
+        self.rate_limit_keys = _env_key_limits("OCR_RATE_LIMIT_KEYS")
+        # 最多跟踪的客户端数量，超过后淘汰最久未出现的客户端
+        self.rate_limit_max_clients = _env_int("OCR_RATE_LIMIT_MAX_CLIENTS", 4096)
+
+
+# 创建全局配置实例
+settings = Settings()
@@ -1,22 +1,51 @@
+import asyncio
+import dataclasses
+import json
 import logging
-import logging.handlers
+import time
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, WebSocket
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
+from pydantic_core import to_json
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.requests import HTTPConnection
 
 from models.ocr_models import (
     OCRRequest, 
+    OCRFileRequest,
     OCRResponse, 
     OCROptions, 
+    OCREngine,
     ImageUploadResponse,
     ErrorResponse
 )
+from config import settings
+from services.frame_stream import FrameStream, stream_metrics
 from services.ocr_service import ocr_service
-from utils.image_utils import image_to_base64, validate_image_file, clean_base64_string
+from services.rate_limiter import resolve_client_id, retry_after_header
+from services.memory_budget import MemoryBudgetExceeded
+from services.request_context import DeadlineExceeded, RequestContext
+from services import tracing
+from services.tracing import TracingMiddleware, create_tracer, traced_handler
+from utils.base64_body import parse_base64_body
+from utils.body_limit import BodySizeLimitMiddleware
+from utils.compression import GzipRequestMiddleware
+from utils.file_input import FileInputError, map_file, resolve_input_path
+from utils.log_utils import LogSampler, RequestLogMiddleware, create_queue_handler
+from utils.projection import response_content
+from utils.image_utils import (
+    ImageRejected,
+    inspect_upload,
+    read_upload,
+    inspect_image
+)
 
 
 def configure_application_logging():
@@ -26,9 +55,13 @@ def configure_application_logging():
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
+    level = logging.getLevelName(settings.log_level)
+    if not isinstance(level, int):
+        raise ValueError(f"环境变量 OCR_LOG_LEVEL 不是有效的日志级别，当前值: {settings.log_level}")
+    
     # 创建控制台处理器
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(level)
     
     # 设置日志格式
     formatter = logging.Formatter(
@@ -37,9 +70,9 @@ def configure_application_logging():
     )
     console_handler.setFormatter(formatter)
     
-    # 配置根日志记录器
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(console_handler)
+    # 配置根日志记录器：队列日志模式下控制台输出在后台线程中完成，不阻塞请求处理
+    root_logger.setLevel(level)
+    root_logger.addHandler(create_queue_handler(console_handler) if settings.log_queue else console_handler)
     
     # 配置第三方库的日志级别
     third_party_loggers = [
@@ -63,7 +96,7 @@ def configure_application_logging():
     
     # 配置应用程序专用日志记录器
     app_logger = logging.getLogger(__name__)
-    app_logger.setLevel(logging.INFO)
+    app_logger.setLevel(level)
     
     return app_logger
 
@@ -80,6 +113,9 @@ async def lifespan(app: FastAPI):
     logger.info("OCR API服务启动")
     yield
     # 关闭时执行
+    await ocr_service.aclose()
+    if tracer is not None:
+        tracer.close()
     logger.info("OCR API服务关闭")
 
 
@@ -100,10 +136,248 @@ app.add_middleware(
     allow_headers=["*"],         # 允许所有请求头
 )
 
+# 响应压缩：识别结果（尤其是带坐标的dict格式）按客户端的Accept-Encoding协商gzip压缩，流式响应逐块压缩
+if settings.gzip_minimum_size > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size, compresslevel=settings.gzip_level)
+
+# 识别接口的请求体大小上限：图片（base64接口按base64长度）加上表单字段、JSON选项等的余量，边接收边计数
+MAX_IMAGE_PIXELS = int(settings.max_image_megapixels * 1_000_000)
+_BODY_OVERHEAD = 64 * 1024
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/ocr/recognize": settings.max_image_bytes + _BODY_OVERHEAD,
+    "/ocr/recognize/base64": (settings.max_image_bytes + 2) // 3 * 4 + _BODY_OVERHEAD,
+})
+
+# base64接口接受gzip压缩的请求体（在大小限制之外解压，限制的是解压后的大小）
+app.add_middleware(GzipRequestMiddleware, paths=["/ocr/recognize/base64"], max_size=settings.max_decompressed_body)
+
+# 每个请求一行摘要（最外层，耗时和字节数包含压缩），按配置采样和限速
+app.add_middleware(
+    RequestLogMiddleware,
+    sampler=LogSampler(settings.log_sample_rate, settings.log_max_per_second),
+    slow_ms=settings.log_slow_ms
+)
+
+# 请求追踪（配置了导出方式时启用），最外层，根span覆盖整个请求
+tracer = create_tracer()
+if tracer is not None:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+def plain_text_headers(result: OCRResponse) -> Dict[str, str]:
+    """构建纯文本响应头，复用了近似重复图片的结果时通过响应头标记"""
+    headers = {"Content-Type": "text/plain; charset=utf-8"}
+    if result.reused:
+        headers["X-OCR-Reused"] = "true"
+        headers["X-OCR-Reuse-Distance"] = str(result.reuse_distance)
+    return headers
+
+
+def projected_response(result: OCRResponse, fields, message: Optional[str] = None) -> Response:
+    """
+    构建只包含指定文本块字段的JSON响应
+
+    文本块投影为只含所需字段的字典后由pydantic-core直接序列化，跳过响应模型的校验和完整序列化；
+    message不为None时按上传接口的结构包装（ImageUploadResponse）
+    """
+    with tracing.span("response.project", fields=",".join(fields)):
+        content = response_content(result, fields)
+        if message is not None:
+            content = {"message": message, "ocr_result": content}
+        body = to_json(content)
+    return Response(content=body, media_type="application/json")
+
+
+def result_content(result: OCRResponse, options: Optional[OCROptions], exclude_none: bool = False) -> Dict[str, Any]:
+    """识别结果转换为可以JSON序列化的字典，选项中指定了data.fields时只包含这些文本块字段"""
+    if options and options.data_fields:
+        return response_content(result, options.data_fields, exclude_none=exclude_none)
+    return result.model_dump(mode="json", exclude_none=exclude_none)
+
+
+def record_log_fields(http_request: Request, context: RequestContext, options: Optional[OCROptions],
+                      result: OCRResponse, **fields):
+    """补充请求摘要中的识别字段（引擎、客户端、优先级、状态码、文本块数量等）"""
+    http_request.state.log_fields = {
+        "engine": (options.ocr_engine.value if options and options.ocr_engine else OCREngine.UMI_OCR.value),
+        "client": context.client_id,
+        "priority": context.priority,
+        "code": result.code,
+        "blocks": len(result.data) if isinstance(result.data, list) else None,
+        "reused": True if result.reused else None,
+        "trace": tracing.current_trace_id(sampled_only=True),
+        **fields
+    }
+
+
+def request_timeout(connection: HTTPConnection) -> float:
+    """请求的处理时限（秒）：请求头 X-OCR-Timeout（不超过最大时限），未指定时使用默认时限，0表示不限制"""
+    timeout = settings.request_timeout
+    timeout_header = connection.headers.get("X-OCR-Timeout")
+    if timeout_header:
+        try:
+            timeout = float(timeout_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"X-OCR-Timeout必须是秒数，当前值: {timeout_header}")
+        if timeout <= 0:
+            raise HTTPException(status_code=400, detail="X-OCR-Timeout必须大于0")
+        if settings.max_request_timeout > 0:
+            timeout = min(timeout, settings.max_request_timeout)
+    return timeout
+
+
+def build_request_context(http_request: HTTPConnection, priority: Optional[str] = None) -> RequestContext:
+    """
+    构建请求上下文
+    
+    优先级取自选项 ocr.priority，其次是请求头 X-OCR-Priority，都未指定时使用默认优先级；
+    客户端标识取自请求头 X-API-Key（哈希后，仅限 OCR_RATE_LIMIT_KEYS 中配置的密钥），否则使用客户端IP；
+    处理时限取自请求头 X-OCR-Timeout（秒，不超过最大时限），未指定时使用默认时限
+    """
+    priority = priority or http_request.headers.get("X-OCR-Priority") or settings.default_priority
+    if priority not in settings.priority_weights:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的优先级: {priority}，可选: {', '.join(settings.priority_weights)}"
+        )
+    
+    host = http_request.client.host if http_request.client else None
+    client_id = resolve_client_id(http_request.headers.get("X-API-Key"), host, settings.rate_limit_keys)
+    
+    timeout = request_timeout(http_request)
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    return RequestContext(priority=priority, client_id=client_id, deadline=deadline)
+
+
+async def wait_for_disconnect(http_request: Request):
+    """等待客户端断开连接（请求体已经读取完毕，之后只会收到断开消息）"""
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_abandoned(http_request: Request, context: RequestContext,
+                              recognition: Awaitable[OCRResponse]) -> OCRResponse:
+    """
+    执行识别，客户端断开或超过处理时限时取消识别
+    
+    取消会传递到调度器和引擎：还在排队的请求直接移出队列，进行中的上游调用被中止，
+    不再为没有人读取的响应继续识别和序列化
+    
+    Raises:
+        HTTPException: 超过处理时限（504）或客户端已断开（499）
+    """
+    task = asyncio.ensure_future(recognition)
+    watcher = asyncio.ensure_future(wait_for_disconnect(http_request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, timeout=context.remaining(),
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    
+    if task in done:
+        try:
+            return task.result()
+        except DeadlineExceeded:
+            ocr_service.record_abandoned("deadline")
+            raise HTTPException(status_code=504, detail="识别超过处理时限")
+        except MemoryBudgetExceeded as e:
+            raise memory_budget_error(e)
+    
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    if watcher in done:
+        ocr_service.record_abandoned("disconnect")
+        logger.info(f"客户端 {context.client_id} 已断开，取消识别")
+        raise HTTPException(status_code=499, detail="客户端已断开连接")
+    ocr_service.record_abandoned("deadline")
+    logger.warning(f"客户端 {context.client_id} 的请求超过处理时限，取消识别")
+    raise HTTPException(status_code=504, detail="识别超过处理时限")
+
+
+def image_rejected_error(error: ImageRejected) -> HTTPException:
+    """图片未通过校验：不支持的格式返回415，文件或像素数过大返回413，其余返回400"""
+    status_code = {"format": 415, "too_large": 413}.get(error.reason, 400)
+    return HTTPException(status_code=status_code, detail=str(error))
+
+
+async def read_base64_request(http_request: Request) -> OCRRequest:
+    """
+    边接收边解析base64接口的请求体，返回携带已解码图片的请求
+
+    base64字段按块解码为图片字节，不生成完整的请求体、base64字符串和清理后的副本；
+    其余字段按OCRRequest校验，校验失败时与FastAPI解析请求体一样返回422
+    """
+    try:
+        image, document = await parse_base64_body(http_request.stream(), settings.max_image_bytes)
+    except ImageRejected as e:
+        raise image_rejected_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        request = OCRRequest.model_validate(document)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+    if not image:
+        raise HTTPException(status_code=400, detail="无效的base64图片数据")
+    return OCRRequest.from_image(image, request.options)
+
+
+def inline_json_schema(model) -> dict:
+    """生成不含$ref的JSON Schema，用于openapi_extra中声明的请求体（引用的模型不会出现在components中）"""
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(definitions[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+
+    return resolve(schema)
+
+
+def memory_budget_error(error: MemoryBudgetExceeded) -> HTTPException:
+    """内存预算不足：超过整个预算的图片返回413，等待超时返回503"""
+    if error.too_large:
+        return HTTPException(status_code=413, detail=str(error))
+    logger.warning(f"内存预算不足，拒绝请求: {error}")
+    return HTTPException(status_code=503, detail=str(error), headers=retry_after_header(1))
+
+
+def enforce_rate_limit(context: RequestContext, read_size: Callable[[], Optional[Tuple[int, int]]]):
+    """
+    按客户端限流，超过限制时返回429
+    
+    Args:
+        context: 请求上下文
+        read_size: 读取图片宽高的函数（只在启用限流时调用），用于按百万像素计费
+    """
+    rate_limiter = ocr_service.rate_limiter
+    if rate_limiter is None:
+        return
+    with tracing.span("rate_limit", client=context.client_id):
+        size = read_size()
+        megapixels = size[0] * size[1] / 1_000_000 if size else 0.0
+        wait = rate_limiter.acquire(context.client_id, megapixels)
+    if wait > 0:
+        logger.warning(f"客户端 {context.client_id} 超过限流，建议 {wait:.2f} 秒后重试")
+        raise HTTPException(
+            status_code=429,
+            detail=f"请求过于频繁，请在 {wait:.1f} 秒后重试",
+            headers=retry_after_header(wait)
+        )
+
+
 @app.get("/")
 async def root():
     """根路径，返回API信息"""
@@ -114,7 +388,10 @@ async def root():
         "endpoints": {
             "recognize_upload": "/ocr/recognize",
             "recognize_base64": "/ocr/recognize/base64",
+            "recognize_file": "/ocr/recognize/file",
+            "recognize_stream": "/ocr/stream",
             "get_options": "/ocr/options",
+            "metrics": "/metrics",
             "test_page": "/test"
         }
     }
@@ -127,7 +404,9 @@ async def redirect_to_test_page():
 
 
 @app.post("/ocr/recognize", response_model=ImageUploadResponse)
+@traced_handler
 async def recognize_uploaded_image(
+    http_request: Request,
     file: UploadFile = File(..., description="要识别的图片文件"),
     ocr_engine: str = Form("umi_ocr", alias="ocr.engine"),
     ocr_language: str = Form(None, alias="ocr.language"),
@@ -135,7 +414,14 @@ async def recognize_uploaded_image(
     ocr_limit_side_len: int = Form(None, alias="ocr.limit_side_len"),
     tbpu_parser: str = Form(None, alias="tbpu.parser"),
     data_format: str = Form("dict", alias="data.format"),
-    paddleocr_device: str = Form("gpu", alias="paddleocr.device")
+    paddleocr_device: str = Form("gpu", alias="paddleocr.device"),
+    ocr_tile_size: int = Form(None, alias="ocr.tile_size"),
+    ocr_tile_overlap: int = Form(None, alias="ocr.tile_overlap"),
+    ocr_regions: str = Form(None, alias="ocr.regions"),
+    ocr_priority: str = Form(None, alias="ocr.priority"),
+    data_fields: str = Form(None, alias="data.fields"),
+    data_min_score: float = Form(None, alias="data.min_score"),
+    data_max_blocks: int = Form(None, alias="data.max_blocks")
 ):
     """
     通过上传图片文件进行OCR识别
@@ -146,40 +432,72 @@ async def recognize_uploaded_image(
     - **ocr.limit_side_len**: 限制图像边长（可选）
     - **tbpu.parser**: 排版解析方案（可选）
     - **data.format**: 数据返回格式，dict或text（可选，默认dict）
+    - **ocr.tile_size**: 分块识别的分块边长，超过该尺寸的大图将分块并行识别（可选，仅PaddleOCR引擎）
+    - **ocr.tile_overlap**: 相邻分块的重叠宽度（可选，仅PaddleOCR引擎）
+    - **ocr.regions**: 识别区域，JSON数组，每一项为[[左上角x,y],[右下角x,y]]，只识别这些区域（可选）
+    - **ocr.priority**: 请求优先级，如interactive、bulk（可选，也可以通过X-OCR-Priority请求头指定）
+    - **data.fields**: 返回的文本块字段，逗号分隔，如text,box（可选，默认全部字段）
+    - **data.min_score**: 最低置信度，低于该值的文本块不返回（可选）
+    - **data.max_blocks**: 最多返回的文本块数量（可选）
+    
+    启用限流时按X-API-Key请求头（未提供时按客户端IP）计算请求数和图片像素数，超过限制返回429；
+    X-OCR-Timeout请求头指定处理时限（秒），超过时限返回504，客户端断开时取消识别
     """
     try:
-        # 验证图片文件
-        if not validate_image_file(file):
-            raise HTTPException(status_code=400, detail="无效的图片文件或文件过大（最大10MB）")
+        # 验证图片文件：按魔数识别实际格式，只读取图片头中的尺寸和帧数，在解码和调用引擎之前拒绝无效或过大的图片
+        try:
+            info = inspect_upload(file, settings.max_image_bytes, MAX_IMAGE_PIXELS, settings.max_image_frames)
+        except ImageRejected as e:
+            raise image_rejected_error(e)
         
-        # 重置文件指针到开始位置（validate_image_file可能会移动指针）
-        file.file.seek(0)
+        context = build_request_context(http_request, ocr_priority)
+        enforce_rate_limit(context, lambda: info.size)
         
-        # 转换为base64
-        base64_image = image_to_base64(file)
+        # 解析识别区域
+        regions = None
+        if ocr_regions:
+            try:
+                regions = json.loads(ocr_regions)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail="ocr.regions必须是JSON数组")
+        
+        # 读取图片字节（直接交给引擎，不生成base64字符串）
+        with tracing.span("upload.read"):
+            image_data = read_upload(file)
         
         # 构建OCR选项
-        options = OCROptions(
-            ocr_engine=ocr_engine,
-            ocr_language=ocr_language,
-            ocr_cls=ocr_cls,
-            ocr_limit_side_len=ocr_limit_side_len,
-            tbpu_parser=tbpu_parser,
-            data_format=data_format,
-            paddleocr_device=paddleocr_device
-        )
+        try:
+            options = OCROptions(
+                ocr_engine=ocr_engine,
+                ocr_language=ocr_language,
+                ocr_cls=ocr_cls,
+                ocr_limit_side_len=ocr_limit_side_len,
+                tbpu_parser=tbpu_parser,
+                data_format=data_format,
+                paddleocr_device=paddleocr_device,
+                ocr_tile_size=ocr_tile_size,
+                ocr_tile_overlap=ocr_tile_overlap,
+                ocr_regions=regions,
+                data_fields=data_fields,
+                data_min_score=data_min_score,
+                data_max_blocks=data_max_blocks
+            )
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail="无效的识别选项: " + "; ".join(error["msg"] for error in e.errors()))
         
         # 创建OCR请求
-        ocr_request = OCRRequest(
-            base64=base64_image,
-            options=options if any([ocr_engine != "umi_ocr", ocr_language, ocr_cls, ocr_limit_side_len, tbpu_parser, data_format != "dict", paddleocr_device != "gpu"]) else None
+        ocr_request = OCRRequest.from_image(
+            image_data,
+            options if any([ocr_engine != "umi_ocr", ocr_language, ocr_cls, ocr_limit_side_len, tbpu_parser, data_format != "dict", paddleocr_device != "gpu", ocr_tile_size, ocr_tile_overlap is not None, regions is not None, data_fields, data_min_score is not None, data_max_blocks is not None]) else None
         )
         
         # 调用OCR服务
-        ocr_result = await ocr_service.recognize_image(ocr_request)
+        ocr_result = await run_until_abandoned(
+            http_request, context, ocr_service.recognize_image(ocr_request, context)
+        )
         
-        logger.info(f"图片识别完成: {file.filename}, 状态码: {ocr_result.code}, 数据格式：{data_format}")
-        # logger.info(f"图片识别结果: {ocr_result.data}")
+        record_log_fields(http_request, context, options, ocr_result, file=file.filename)
+        logger.debug("图片识别完成: %s, 状态码: %s, 数据格式：%s", file.filename, ocr_result.code, data_format)
         
         # 如果请求的是纯文本格式且识别成功，检查数据类型并处理
         if data_format == "text" and ocr_result.code == 100:
@@ -194,18 +512,20 @@ async def recognize_uploaded_image(
                         end = getattr(item, 'end', '')
                         text_parts.append(text + end)
                 plain_text = "".join(text_parts)
-                logger.info(f"手动拼接OCR文本块，结果长度: {len(plain_text)}")
+                logger.debug("手动拼接OCR文本块，结果长度: %d", len(plain_text))
                 return PlainTextResponse(
                     content=plain_text,
-                    headers={"Content-Type": "text/plain; charset=utf-8"}
+                    headers=plain_text_headers(ocr_result)
                 )
             else:
                 # 如果已经是字符串，直接返回
                 return PlainTextResponse(
                     content=str(ocr_result.data),
-                    headers={"Content-Type": "text/plain; charset=utf-8"}
+                    headers=plain_text_headers(ocr_result)
                 )
         
+        if options.data_fields:
+            return projected_response(ocr_result, options.data_fields, message="图片识别成功")
         return ImageUploadResponse(
             message="图片识别成功",
             ocr_result=ocr_result
@@ -218,63 +538,242 @@ async def recognize_uploaded_image(
         raise HTTPException(status_code=500, detail=f"图片识别失败: {str(e)}")
 
 
-@app.post("/ocr/recognize/base64", response_model=OCRResponse)
-async def recognize_base64_image(request: OCRRequest):
+async def recognize_decoded_image(request: OCRRequest, http_request: Request, source: str):
+    """
+    识别携带已解码图片字节的请求（base64接口、本地文件接口共用）：校验图片头、限流、调用OCR服务并按选项生成响应
+    
+    Args:
+        request: 携带图片字节的OCR请求
+        http_request: HTTP请求
+        source: 输入方式（用于日志）
+    """
+    context = build_request_context(http_request, request.options.ocr_priority if request.options else None)
+    
+    try:
+        info = inspect_image(request.image, MAX_IMAGE_PIXELS, settings.max_image_frames)
+    except ImageRejected as e:
+        raise image_rejected_error(e)
+    enforce_rate_limit(context, lambda: info.size)
+    
+    # 调用OCR服务
+    result = await run_until_abandoned(
+        http_request, context, ocr_service.recognize_image(request, context)
+    )
+    
+    record_log_fields(http_request, context, request.options, result)
+    if logger.isEnabledFor(logging.DEBUG):
+        # 完整的识别结果可能有上万个文本块，只在调试时格式化
+        logger.debug("%s图片识别完成，状态码: %s，结果: %s", source, result.code, result)
+    
+    # 如果请求的是纯文本格式且识别成功，检查数据类型并处理
+    if request.options and request.options.data_format and request.options.data_format.value == "text" and result.code == 100:
+        from fastapi.responses import PlainTextResponse
+        
+        # 如果data是列表，手动拼接为纯文本
+        if isinstance(result.data, list):
+            text_parts = []
+            for item in result.data:
+                if hasattr(item, 'text'):
+                    text = item.text
+                    end = getattr(item, 'end', '')
+                    text_parts.append(text + end)
+            plain_text = "".join(text_parts)
+            logger.debug("%s接口手动拼接OCR文本块，结果长度: %d", source, len(plain_text))
+            return PlainTextResponse(
+                content=plain_text,
+                headers=plain_text_headers(result)
+            )
+        else:
+            # 如果已经是字符串，直接返回
+            return PlainTextResponse(
+                content=str(result.data),
+                headers=plain_text_headers(result)
+            )
+    
+    if request.options and request.options.data_fields:
+        return projected_response(result, request.options.data_fields)
+    return result
+
+
+@app.post(
+    "/ocr/recognize/base64",
+    response_model=OCRResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": inline_json_schema(OCRRequest)}}
+    }}
+)
+@traced_handler
+async def recognize_base64_image(http_request: Request):
     """
     通过base64编码的图片进行OCR识别
     
-    - **base64**: Base64编码的图片数据（无需前缀）
+    - **base64**: Base64编码的图片数据（可以带data:image前缀）
     - **options**: OCR识别选项（可选）
+    
+    请求优先级可以通过选项ocr.priority或X-OCR-Priority请求头指定；
+    X-OCR-Timeout请求头指定处理时限（秒），超过时限返回504，客户端断开时取消识别；
+    请求体可以使用gzip压缩（Content-Encoding: gzip）；
+    请求体边接收边解析，base64字段按块解码为图片字节
     """
     try:
-        # 清理base64字符串
-        cleaned_base64 = clean_base64_string(request.base64)
-        if not cleaned_base64:
-            raise HTTPException(status_code=400, detail="无效的base64图片数据")
-        
-        # 更新请求中的base64数据
-        request.base64 = cleaned_base64
-        
-        # 调用OCR服务
-        result = await ocr_service.recognize_image(request)
-        
-        logger.info(f"Base64图片识别完成，状态码: {result.code}")
-        logger.info(f"Base64图片识别: {result}")
-        
-        # 如果请求的是纯文本格式且识别成功，检查数据类型并处理
-        if request.options and request.options.data_format and request.options.data_format.value == "text" and result.code == 100:
-            from fastapi.responses import PlainTextResponse
-            
-            # 如果data是列表，手动拼接为纯文本
-            if isinstance(result.data, list):
-                text_parts = []
-                for item in result.data:
-                    if hasattr(item, 'text'):
-                        text = item.text
-                        end = getattr(item, 'end', '')
-                        text_parts.append(text + end)
-                plain_text = "".join(text_parts)
-                logger.info(f"base64接口手动拼接OCR文本块，结果长度: {len(plain_text)}")
-                return PlainTextResponse(
-                    content=plain_text,
-                    headers={"Content-Type": "text/plain; charset=utf-8"}
-                )
-            else:
-                # 如果已经是字符串，直接返回
-                return PlainTextResponse(
-                    content=str(result.data),
-                    headers={"Content-Type": "text/plain; charset=utf-8"}
-                )
+        # 流式解析请求体
+        with tracing.span("request.stream_parse") as span:
+            request = await read_base64_request(http_request)
+            span.set(bytes=len(request.image))
         
-        return result
+        return await recognize_decoded_image(request, http_request, "base64")
         
-    except HTTPException:
+    except (StarletteHTTPException, RequestValidationError):
+        # 包括接收请求体时BodySizeLimitMiddleware抛出的413
         raise
     except Exception as e:
         logger.error(f"Base64图片识别失败: {e}")
         raise HTTPException(status_code=500, detail=f"图片识别失败: {str(e)}")
 
 
+@app.post("/ocr/recognize/file", response_model=OCRResponse)
+@traced_handler
+async def recognize_file(request: OCRFileRequest, http_request: Request):
+    """
+    识别API所在主机（或共享卷）上的图片文件
+    
+    - **path**: 图片文件路径，必须位于 OCR_FILE_INPUT_ROOT 目录下（相对路径相对该目录）
+    - **options**: OCR识别选项（可选，与base64接口相同）
+    
+    文件通过mmap只读映射，不经过base64编码和上传；未启用或路径不在允许的目录下返回403，文件不存在返回404
+    """
+    try:
+        try:
+            path = resolve_input_path(request.path, settings.file_input_root)
+            with map_file(path, settings.max_image_bytes) as image:
+                ocr_request = OCRRequest.from_image(image, request.options, borrowed=True)
+                return await recognize_decoded_image(ocr_request, http_request, "本地文件")
+        except FileInputError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"本地文件识别失败: {e}")
+        raise HTTPException(status_code=500, detail=f"图片识别失败: {str(e)}")
+
+
+@app.websocket("/ocr/stream")
+async def recognize_stream(websocket: WebSocket):
+    """
+    WebSocket流式识别，适合连续的屏幕截图、摄像头画面
+    
+    - 第一条消息可以是JSON文本，内容为会话的识别选项（与base64接口的options相同），之后只发送二进制图片帧
+    - 每识别完一帧推送一条JSON消息：{"type": "result", "frame": 帧序号, "dropped": 已丢弃帧数, "result": 识别结果}
+    - 帧到达速度超过识别速度时只保留最新的一帧，过时的帧直接丢弃不再识别
+    - 选项中 stream.incremental 为 true 时只重新识别与上一帧相比发生变化的区域，结果消息中的update说明本帧的识别方式
+    - 优先级、API密钥、每帧的处理时限通过握手请求头 X-OCR-Priority、X-API-Key、X-OCR-Timeout 指定
+    """
+    try:
+        base_context = build_request_context(websocket)
+        timeout = request_timeout(websocket)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    stream = FrameStream(ocr_service)
+    stream_metrics.sessions += 1
+    stream_metrics.active_sessions += 1
+    # 正在识别的帧序号，会话结束时还在识别的帧被取消
+    processing = None
+    
+    async def process_frames():
+        """不断取出最新的一帧进行识别并推送结果"""
+        nonlocal processing
+        while True:
+            frame, data = await stream.frames.get()
+            processing = frame
+            context = dataclasses.replace(
+                base_context, deadline=time.monotonic() + timeout if timeout > 0 else None
+            )
+            try:
+                try:
+                    info = inspect_image(data, MAX_IMAGE_PIXELS, settings.max_image_frames)
+                except ImageRejected as e:
+                    raise image_rejected_error(e)
+                enforce_rate_limit(context, lambda: info.size)
+                try:
+                    result = await asyncio.wait_for(stream.recognize(data, context), timeout=context.remaining())
+                except MemoryBudgetExceeded as e:
+                    raise memory_budget_error(e)
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                processing = None
+                ocr_service.record_abandoned("deadline")
+                await websocket.send_json({"type": "error", "frame": frame, "detail": "识别超过处理时限"})
+                continue
+            except HTTPException as e:
+                processing = None
+                message = {"type": "error", "frame": frame, "detail": e.detail}
+                if e.headers and "Retry-After" in e.headers:
+                    message["retry_after"] = int(e.headers["Retry-After"])
+                await websocket.send_json(message)
+                continue
+            except Exception as e:
+                processing = None
+                logger.error(f"流式识别失败: {e}")
+                await websocket.send_json({"type": "error", "frame": frame, "detail": f"图片识别失败: {str(e)}"})
+                continue
+            
+            processing = None
+            stream_metrics.frames_processed += 1
+            message = {
+                "type": "result",
+                "frame": frame,
+                "dropped": stream.frames.dropped,
+                "result": result_content(result, stream.options, exclude_none=True)
+            }
+            if stream.last_update is not None:
+                message["update"] = stream.last_update
+            await websocket.send_json(message)
+    
+    worker = asyncio.ensure_future(process_frames())
+    try:
+        first_message = True
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                data = message["bytes"]
+                if len(data) > settings.max_image_bytes:
+                    await websocket.send_json({"type": "error", "detail": f"图片帧过大（最大 {settings.max_image_bytes} bytes）"})
+                else:
+                    dropped = stream.frames.dropped
+                    stream.frames.put(data)
+                    stream_metrics.frames_received += 1
+                    stream_metrics.frames_dropped += stream.frames.dropped - dropped
+            elif first_message:
+                # 会话选项，只能在第一条消息中发送
+                try:
+                    stream.options = OCROptions.model_validate_json(message.get("text") or "{}")
+                    if stream.options.ocr_priority:
+                        base_context = build_request_context(websocket, stream.options.ocr_priority)
+                except (ValidationError, HTTPException) as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    await websocket.close(code=1008, reason=f"无效的会话选项: {detail}"[:120])
+                    break
+                await websocket.send_json({"type": "ready"})
+            else:
+                await websocket.send_json({"type": "error", "detail": "会话选项只能在第一条消息中发送，之后只接受二进制图片帧"})
+            first_message = False
+    finally:
+        worker.cancel()
+        if processing is not None:
+            ocr_service.record_abandoned("disconnect")
+        stream_metrics.active_sessions -= 1
+        logger.info(f"流式识别会话结束，客户端: {base_context.client_id}，接收帧数: {stream.frames.received}，"
+                    f"丢弃帧数: {stream.frames.dropped}")
+        await asyncio.gather(worker, return_exceptions=True)
+
+
 @app.get("/ocr/options")
 async def get_ocr_options():
     """
@@ -315,6 +814,27 @@ async def health_check():
         )
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    服务运行指标
+    
+    - **scheduler**: 各引擎调度器的并发槽位，以及各优先级的运行数、排队数、排队等待和端到端延迟分位数（秒）
+    - **abandoned**: 因客户端断开或超过处理时限而放弃的请求数，以及其中排队时被丢弃、进行中被取消的请求数
+    - **stream**: WebSocket流式识别的会话数，以及接收、识别、丢弃的帧数
+    - **rate_limit**: 客户端限流的速率配置，以及各客户端的剩余令牌和放行/拒绝次数（启用时）
+    - **memory**: 内存预算的容量、当前和峰值预留字节数、等待和拒绝次数（启用时）
+    - **single_flight**: 相同请求合并的进行中请求数和合并次数
+    - **near_duplicate**: 近似重复查找的缓存大小和命中次数（启用时）
+    - **tracing**: 请求追踪的追踪数、采样数，以及导出和丢弃的span数（启用时）
+    """
+    metrics = ocr_service.get_metrics()
+    metrics["stream"] = stream_metrics.stats()
+    if tracer is not None:
+        metrics["tracing"] = tracer.stats()
+    return metrics
+
+
 # 全局异常处理器
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+import base64
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator, model_validator
 from typing import Optional, Dict, Any, List, Union
 from enum import Enum
 
@@ -13,8 +14,15 @@ class OCREngine(str, Enum):
     PADDLEOCR = "paddleocr"
 
 
+# 文本块的字段（data.fields可选的字段）
+TEXT_BLOCK_FIELDS = ("text", "score", "box", "end")
+
+
 class OCROptions(BaseModel):
     """OCR识别选项"""
+    # 允许通过字段名构造（表单上传接口使用字段名传参）
+    model_config = ConfigDict(populate_by_name=True)
+    
     ocr_engine: Optional[OCREngine] = Field(OCREngine.UMI_OCR, alias="ocr.engine")
     ocr_language: Optional[str] = Field(None, alias="ocr.language")
     ocr_cls: Optional[bool] = Field(None, alias="ocr.cls")
@@ -23,12 +31,102 @@ class OCROptions(BaseModel):
     tbpu_ignoreArea: Optional[List[List[List[int]]]] = Field(None, alias="tbpu.ignoreArea")
     data_format: Optional[OCRDataFormat] = Field(OCRDataFormat.DICT, alias="data.format")
     paddleocr_device: Optional[str] = Field("gpu", alias="paddleocr.device")
+    ocr_tile_size: Optional[int] = Field(None, alias="ocr.tile_size", gt=0)
+    ocr_tile_overlap: Optional[int] = Field(None, alias="ocr.tile_overlap", ge=0)
+    ocr_regions: Optional[List[List[List[int]]]] = Field(None, alias="ocr.regions")
+    ocr_priority: Optional[str] = Field(None, alias="ocr.priority")
+    stream_incremental: Optional[bool] = Field(None, alias="stream.incremental")
+    data_fields: Optional[List[str]] = Field(None, alias="data.fields")
+    data_min_score: Optional[float] = Field(None, alias="data.min_score", ge=0, le=1)
+    data_max_blocks: Optional[int] = Field(None, alias="data.max_blocks", gt=0)
+    
+    @field_validator("data_fields", mode="before")
+    @classmethod
+    def _parse_data_fields(cls, value):
+        """文本块字段，支持逗号分隔的字符串（如 text,box），按固定顺序去重"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.split(",")
+        fields = {str(field).strip() for field in value} - {""}
+        unknown = fields - set(TEXT_BLOCK_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的文本块字段: {', '.join(sorted(unknown))}。支持的字段: {', '.join(TEXT_BLOCK_FIELDS)}")
+        if not fields:
+            raise ValueError("data.fields不能为空")
+        return [field for field in TEXT_BLOCK_FIELDS if field in fields]
+    
+    @field_validator("ocr_regions")
+    @classmethod
+    def _check_regions(cls, value):
+        """识别区域必须是 [[左上角x,y],[右下角x,y]] 格式"""
+        for region in value or ():
+            if len(region) != 2 or any(len(point) != 2 for point in region):
+                raise ValueError(f"识别区域格式错误，应为[[左上角x,y],[右下角x,y]]: {region}")
+        return value
+    
+    @model_validator(mode="after")
+    def _check_tile_overlap(self):
+        """分块重叠宽度必须小于分块边长"""
+        if self.ocr_tile_size is not None and self.ocr_tile_overlap is not None \
+                and self.ocr_tile_overlap >= self.ocr_tile_size:
+            raise ValueError(f"ocr.tile_overlap必须小于ocr.tile_size: {self.ocr_tile_overlap} >= {self.ocr_tile_size}")
+        return self
+
+
+# 已解码的图片数据：bytes、流式解码的bytearray、文件映射（mmap）的memoryview
+ImageData = Union[bytes, bytearray, memoryview]
 
 
 class OCRRequest(BaseModel):
     """OCR请求模型"""
     base64: str = Field(..., description="Base64编码的图片数据")
     options: Optional[OCROptions] = Field(None, description="OCR识别选项")
+    # 已解码的图片数据（流式解析的请求体），设置时base64为空字符串，识别时直接使用图片字节
+    _image: Optional[ImageData] = PrivateAttr(None)
+    # 图片数据只在调用方的作用域内有效（例如文件映射，调用方退出时解除映射）
+    _borrowed: bool = PrivateAttr(False)
+    
+    @classmethod
+    def from_image(cls, image: ImageData, options: Optional[OCROptions] = None,
+                   borrowed: bool = False) -> "OCRRequest":
+        """
+        由已解码的图片数据构造请求，不生成base64字符串
+        
+        borrowed为True表示图片数据在调用方返回（或被取消）后失效，识别不能交给可能比调用方活得更久的共享任务
+        """
+        request = cls(base64="", options=options)
+        request._image = image
+        request._borrowed = borrowed
+        return request
+    
+    @property
+    def borrowed(self) -> bool:
+        """图片数据是否只在调用方的作用域内有效"""
+        return self._borrowed
+    
+    @property
+    def image(self) -> Optional[ImageData]:
+        """已解码的图片数据，请求只有base64字符串时为None"""
+        return self._image
+    
+    def image_bytes(self) -> ImageData:
+        """图片字节：已解码时直接返回，否则解码base64字符串"""
+        if self._image is not None:
+            return self._image
+        return base64.b64decode(self.base64)
+    
+    def base64_length(self) -> int:
+        """base64字符数，已解码的图片按编码后的长度计算"""
+        if self._image is not None:
+            return (len(self._image) + 2) // 3 * 4
+        return len(self.base64)
+
+
+class OCRFileRequest(BaseModel):
+    """本地文件识别请求模型"""
+    path: str = Field(..., description="图片文件路径（相对路径相对OCR_FILE_INPUT_ROOT，必须位于该目录下）")
+    options: Optional[OCROptions] = Field(None, description="OCR识别选项")
 
 
 class OCRTextBlock(BaseModel):
@@ -45,6 +143,8 @@ class OCRResponse(BaseModel):
     data: Union[str, List[OCRTextBlock]] = Field(..., description="识别结果")
     time: float = Field(..., description="识别耗时（秒）")
     timestamp: float = Field(..., description="任务开始时间戳（秒）")
+    reused: Optional[bool] = Field(None, description="是否复用了近似重复图片的识别结果")
+    reuse_distance: Optional[int] = Field(None, description="复用结果时与原图片感知哈希的汉明距离")
 
 
 class ErrorResponse(BaseModel):
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 OCR客户端 - 调用OCR API识别图片文字
-使用/ocr/recognize/base64接口，返回纯文本结果
+默认通过/ocr/recognize接口直接上传文件（可切换为/ocr/recognize/base64），返回纯文本结果
 """
 
 import base64
@@ -12,23 +12,56 @@ import sys
 import os
 import argparse
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from client_utils import (
+    TRANSPORTS,
+    UPLOAD_FORMATS,
+    MultipartFileStream,
+    gzip_json,
+    prepare_image_base64,
+    prepare_upload_source,
+    rescale_blocks
+)
 
 
 class OCRClient:
     """OCR客户端类"""
     
-    def __init__(self, api_url: str = "http://192.168.16.228:8000"):
+    def __init__(self, api_url: str = "http://192.168.16.228:8000", max_side: Optional[int] = None,
+                 quality: int = 90, image_format: str = "jpeg",
+                 transport: str = "multipart", priority: Optional[str] = None,
+                 api_key: Optional[str] = None, compress: bool = False):
         """
         初始化OCR客户端
         
         Args:
             api_url: OCR API服务地址
+            max_side: 上传前将图片缩小到的目标长边（可选，默认不预处理）
+            quality: 上传前重新压缩的质量（1-100，默认90）
+            image_format: 上传前重新压缩的格式 (jpeg/webp/png，默认jpeg)
+            transport: 上传方式，multipart直接上传文件（默认），base64为JSON内嵌base64字符串
+            priority: 请求优先级（如interactive、bulk），通过X-OCR-Priority请求头发送（可选，默认由服务端决定）
+            api_key: API密钥，通过X-API-Key请求头发送，服务端按密钥限流（可选）
+            compress: base64上传方式下是否gzip压缩请求体（默认否，上行带宽有限时建议开启）
         """
         self.api_url = api_url.rstrip('/')
+        self.max_side = max_side
+        self.quality = quality
+        self.image_format = image_format
+        if transport not in TRANSPORTS:
+            raise ValueError(f"不支持的上传方式: {transport}。支持的方式: {', '.join(TRANSPORTS)}")
+        self.transport = transport
+        self.compress = compress
+        self.priority = priority
         self.session = requests.Session()
-        # 设置请求超时时间
-        self.session.timeout = 30
+        if priority:
+            self.session.headers["X-OCR-Priority"] = priority
+        self.api_key = api_key
+        if api_key:
+            self.session.headers["X-API-Key"] = api_key
+        # 请求超时时间（秒），requests不支持Session级别的超时，需要在每次请求时传入
+        self.timeout = 30
     
     def image_to_base64(self, image_path: str) -> str:
         """
@@ -113,6 +146,114 @@ class OCRClient:
         except Exception as e:
             raise ValueError(f"图片处理失败: {str(e)}")
     
+    def _prepare_image(self, image_path: str) -> Tuple[str, float]:
+        """
+        读取图片并按客户端设置做上传前预处理
+        
+        Returns:
+            Tuple[str, float]: (base64编码字符串, 坐标还原比例)
+        """
+        if not self.max_side:
+            return self._image_to_base64_silent(image_path), 1.0
+        return prepare_image_base64(image_path, self.max_side, self.quality, self.image_format)
+    
+    def _post_multipart(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """通过multipart接口上传图片，文件内容从磁盘流式读取"""
+        source, content_type, scale = prepare_upload_source(
+            image_path, self.max_side, self.quality, self.image_format
+        )
+        if verbose and scale != 1.0:
+            print(f"上传前缩小图片，缩放比例: 1/{scale:.2f}")
+        
+        api_endpoint = f"{self.api_url}/ocr/recognize"
+        if verbose:
+            print(f"正在请求OCR接口: {api_endpoint}")
+        
+        body = MultipartFileStream(options, image_path, content_type, source)
+        try:
+            response = self.session.post(
+                api_endpoint,
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=self.timeout
+            )
+        finally:
+            body.close()
+        return response, scale
+    
+    def _post_base64(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """通过base64接口上传图片（JSON内嵌base64字符串）"""
+        # 转换图片为base64
+        base64_image, scale = self._prepare_image(image_path)
+        if verbose and scale != 1.0:
+            print(f"上传前缩小图片，缩放比例: 1/{scale:.2f}")
+        
+        # 构建请求数据
+        request_data = {
+            "base64": base64_image,
+            "options": options
+        }
+        
+        # 发送请求
+        api_endpoint = f"{self.api_url}/ocr/recognize/base64"
+        if verbose:
+            print(f"正在请求OCR接口: {api_endpoint}")
+        
+        if self.compress:
+            # 响应的gzip压缩由requests自动协商和解压，请求体需要自行压缩
+            response = self.session.post(
+                api_endpoint,
+                data=gzip_json(request_data),
+                headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+                timeout=self.timeout
+            )
+        else:
+            response = self.session.post(
+                api_endpoint,
+                json=request_data,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+        return response, scale
+    
+    def _request_ocr(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """
+        上传图片并请求OCR接口
+        
+        Args:
+            image_path: 图片文件路径
+            options: OCR识别选项
+            verbose: 是否显示详细进度信息
+            
+        Returns:
+            Tuple[requests.Response, float]: (成功的HTTP响应, 坐标还原比例)
+            
+        Raises:
+            Exception: OCR识别失败
+        """
+        if verbose:
+            print(f"正在处理图片: {image_path}")
+        
+        if self.transport == "multipart":
+            response, scale = self._post_multipart(image_path, options, verbose)
+        else:
+            response, scale = self._post_base64(image_path, options, verbose)
+        
+        # 检查响应状态
+        if response.status_code != 200:
+            # 尝试解析错误信息
+            try:
+                error_info = response.json()
+                error_msg = error_info.get('detail', f"HTTP {response.status_code}")
+            except:
+                error_msg = f"HTTP {response.status_code}: {response.text}"
+            
+            raise Exception(f"OCR识别失败: {error_msg}")
+        
+        if verbose:
+            print(f"✓ OCR识别成功，耗时: {response.elapsed.total_seconds():.2f}秒")
+        return response, scale
+    
     def recognize_text(self, image_path: str, language: Optional[str] = None, verbose: bool = True) -> str:
         """
         识别图片中的文字
@@ -129,53 +270,61 @@ class OCRClient:
             Exception: OCR识别失败
         """
         try:
-            # 转换图片为base64
-            if verbose:
-                print(f"正在处理图片: {image_path}")
-            base64_image = self._image_to_base64_silent(image_path)
-            
-            # 构建请求数据
-            request_data = {
-                "base64": base64_image,
-                "options": {
-                    "data.format": "text"  # 指定返回纯文本格式
-                }
+            options = {
+                "data.format": "text"  # 指定返回纯文本格式
             }
             
             # 如果指定了语言模型，添加到选项中
             if language:
-                request_data["options"]["ocr.language"] = language
+                options["ocr.language"] = language
                 if verbose:
                     print(f"使用语言模型: {language}")
             
-            # 发送请求
-            api_endpoint = f"{self.api_url}/ocr/recognize/base64"
-            if verbose:
-                print(f"正在请求OCR接口: {api_endpoint}")
+            # text模式下直接返回纯文本
+            response, _ = self._request_ocr(image_path, options, verbose)
+            return response.text
+                
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"网络请求失败: {str(e)}")
+        except Exception as e:
+            if isinstance(e, (FileNotFoundError, ValueError)):
+                raise
+            raise Exception(f"OCR处理异常: {str(e)}")
+    
+    def recognize_blocks(self, image_path: str, language: Optional[str] = None, verbose: bool = False) -> List[dict]:
+        """
+        识别图片中的文字，返回带坐标的文本块
+        
+        上传前缩小过的图片，返回的文本框坐标会还原到原图像素。
+        
+        Args:
+            image_path: 图片文件路径
+            language: 语言模型（可选）
+            verbose: 是否显示详细进度信息（默认False）
             
-            response = self.session.post(
-                api_endpoint,
-                json=request_data,
-                headers={'Content-Type': 'application/json'}
-            )
+        Returns:
+            List[dict]: 文本块列表，每项包含text、score、box、end（图片中没有文字时为空列表）
+            
+        Raises:
+            Exception: OCR识别失败
+        """
+        try:
+            options = {"data.format": "dict"}
+            if language:
+                options["ocr.language"] = language
+            
+            response, scale = self._request_ocr(image_path, options, verbose)
+            result = response.json()
+            # multipart接口的识别结果包装在ocr_result字段中
+            result = result.get("ocr_result") or result
+            
+            # 100为成功，101为图片中没有文字
+            if result.get("code") == 101:
+                return []
+            if result.get("code") != 100 or not isinstance(result.get("data"), list):
+                raise Exception(f"OCR识别失败: {result.get('data')}")
+            return rescale_blocks(result["data"], scale)
             
-            # 检查响应状态
-            if response.status_code == 200:
-                # text模式下直接返回纯文本
-                text_result = response.text
-                if verbose:
-                    print(f"✓ OCR识别成功，耗时: {response.elapsed.total_seconds():.2f}秒")
-                return text_result
-            else:
-                # 尝试解析错误信息
-                try:
-                    error_info = response.json()
-                    error_msg = error_info.get('detail', f"HTTP {response.status_code}")
-                except:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                
-                raise Exception(f"OCR识别失败: {error_msg}")
-                
         except requests.exceptions.RequestException as e:
             raise Exception(f"网络请求失败: {str(e)}")
         except Exception as e:
@@ -231,6 +380,7 @@ def main():
   python ocr_client.py image.jpg
   python ocr_client.py --url http://localhost:8000 image.png
   python ocr_client.py --language models/config_chinese.txt photo.jpg
+  python ocr_client.py --max-side 2048 --quality 85 --format webp scan.png
         """
     )
     
@@ -255,11 +405,56 @@ def main():
         help='输出文件路径 (可选，默认输出到控制台)'
     )
     
+    parser.add_argument(
+        '--max-side',
+        type=int,
+        help='上传前将图片缩小到的目标长边，单位像素 (可选，默认不缩小)'
+    )
+    
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=90,
+        help='上传前重新压缩的质量，1-100 (默认: 90，需配合--max-side)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=sorted(UPLOAD_FORMATS),
+        default='jpeg',
+        help='上传前重新压缩的格式 (默认: jpeg，需配合--max-side)'
+    )
+    
+    parser.add_argument(
+        '--api-key',
+        help='API密钥，服务端按密钥限流'
+    )
+    
+    parser.add_argument(
+        '--priority',
+        help='请求优先级，如interactive、bulk（批量任务建议使用bulk，避免影响交互请求）'
+    )
+    
+    parser.add_argument(
+        '--transport',
+        choices=TRANSPORTS,
+        default='multipart',
+        help='上传方式 (默认: multipart，直接上传文件字节；base64为兼容模式)'
+    )
+    
+    parser.add_argument(
+        '--compress',
+        action='store_true',
+        help='gzip压缩请求体（仅base64上传方式，上行带宽有限时建议开启）'
+    )
+    
     args = parser.parse_args()
     
     try:
         # 创建OCR客户端
-        client = OCRClient(args.url)
+        client = OCRClient(args.url, max_side=args.max_side, quality=args.quality, image_format=args.format,
+                           transport=args.transport, priority=args.priority,
+                           api_key=args.api_key, compress=args.compress)
         
         # 执行OCR识别
         result = client.recognize_text(args.image_path, args.language)
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 PaddleOCR客户端 - 调用OCR API识别图片文字
-使用PaddleOCR引擎，通过/ocr/recognize/base64接口，返回纯文本结果
+使用PaddleOCR引擎，默认通过/ocr/recognize接口直接上传文件（可切换为/ocr/recognize/base64），返回纯文本结果
 """
 
 import base64
@@ -11,26 +11,66 @@ import json
 import sys
 import os
 import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from glob import glob
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
+
+from client_utils import (
+    TRANSPORTS,
+    UPLOAD_FORMATS,
+    MultipartFileStream,
+    gzip_json,
+    prepare_image_base64,
+    prepare_upload_source,
+    rescale_blocks
+)
+
+# 支持的图片格式
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
 
 
 class PaddleOCRClient:
     """PaddleOCR客户端类"""
     
-    def __init__(self, api_url: str = "http://192.168.16.228:8000", device: str = "gpu"):
+    def __init__(self, api_url: str = "http://192.168.16.228:8000", device: str = "gpu",
+                 max_side: Optional[int] = None, quality: int = 90, image_format: str = "jpeg",
+                 transport: str = "multipart", priority: Optional[str] = None,
+                 api_key: Optional[str] = None, compress: bool = False):
         """
         初始化PaddleOCR客户端
         
         Args:
             api_url: OCR API服务地址
             device: PaddleOCR设备类型 (gpu/cpu)
+            max_side: 上传前将图片缩小到的目标长边（可选，默认不预处理）
+            quality: 上传前重新压缩的质量（1-100，默认90）
+            image_format: 上传前重新压缩的格式 (jpeg/webp/png，默认jpeg)
+            transport: 上传方式，multipart直接上传文件（默认），base64为JSON内嵌base64字符串
+            priority: 请求优先级（如interactive、bulk），通过X-OCR-Priority请求头发送（可选，默认由服务端决定）
+            api_key: API密钥，通过X-API-Key请求头发送，服务端按密钥限流（可选）
+            compress: base64上传方式下是否gzip压缩请求体（默认否，上行带宽有限时建议开启）
         """
         self.api_url = api_url.rstrip('/')
         self.device = device
+        self.max_side = max_side
+        self.quality = quality
+        self.image_format = image_format
+        if transport not in TRANSPORTS:
+            raise ValueError(f"不支持的上传方式: {transport}。支持的方式: {', '.join(TRANSPORTS)}")
+        self.transport = transport
+        self.compress = compress
+        self.priority = priority
         self.session = requests.Session()
-        # 设置请求超时时间
-        self.session.timeout = 30
+        if priority:
+            self.session.headers["X-OCR-Priority"] = priority
+        self.api_key = api_key
+        if api_key:
+            self.session.headers["X-API-Key"] = api_key
+        # 请求超时时间（秒），requests不支持Session级别的超时，需要在每次请求时传入
+        self.timeout = 30
     
     def image_to_base64(self, image_path: str) -> str:
         """
@@ -115,6 +155,123 @@ class PaddleOCRClient:
         except Exception as e:
             raise ValueError(f"图片处理失败: {str(e)}")
     
+    def _prepare_image(self, image_path: str) -> Tuple[str, float]:
+        """
+        读取图片并按客户端设置做上传前预处理
+        
+        Returns:
+            Tuple[str, float]: (base64编码字符串, 坐标还原比例)
+        """
+        if not self.max_side:
+            return self._image_to_base64_silent(image_path), 1.0
+        return prepare_image_base64(image_path, self.max_side, self.quality, self.image_format)
+    
+    def _post_multipart(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """通过multipart接口上传图片，文件内容从磁盘流式读取"""
+        source, content_type, scale = prepare_upload_source(
+            image_path, self.max_side, self.quality, self.image_format
+        )
+        if verbose and scale != 1.0:
+            print(f"上传前缩小图片，缩放比例: 1/{scale:.2f}")
+        
+        api_endpoint = f"{self.api_url}/ocr/recognize"
+        if verbose:
+            print(f"正在请求OCR接口: {api_endpoint}")
+        
+        body = MultipartFileStream(options, image_path, content_type, source)
+        try:
+            response = self.session.post(
+                api_endpoint,
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=self.timeout
+            )
+        finally:
+            body.close()
+        return response, scale
+    
+    def _post_base64(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """通过base64接口上传图片（JSON内嵌base64字符串）"""
+        # 转换图片为base64
+        base64_image, scale = self._prepare_image(image_path)
+        if verbose and scale != 1.0:
+            print(f"上传前缩小图片，缩放比例: 1/{scale:.2f}")
+        
+        # 构建请求数据
+        request_data = {
+            "base64": base64_image,
+            "options": options
+        }
+        
+        # 发送请求
+        api_endpoint = f"{self.api_url}/ocr/recognize/base64"
+        if verbose:
+            print(f"正在请求OCR接口: {api_endpoint}")
+        
+        if self.compress:
+            # 响应的gzip压缩由requests自动协商和解压，请求体需要自行压缩
+            response = self.session.post(
+                api_endpoint,
+                data=gzip_json(request_data),
+                headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+                timeout=self.timeout
+            )
+        else:
+            response = self.session.post(
+                api_endpoint,
+                json=request_data,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+        return response, scale
+    
+    def _request_ocr(self, image_path: str, options: dict, verbose: bool) -> Tuple[requests.Response, float]:
+        """
+        上传图片并请求OCR接口（使用PaddleOCR引擎）
+        
+        Args:
+            image_path: 图片文件路径
+            options: OCR识别选项
+            verbose: 是否显示详细进度信息
+            
+        Returns:
+            Tuple[requests.Response, float]: (成功的HTTP响应, 坐标还原比例)
+            
+        Raises:
+            Exception: OCR识别失败
+        """
+        if verbose:
+            print(f"正在处理图片: {image_path}")
+            print(f"使用PaddleOCR引擎，设备: {options['paddleocr.device']}")
+        
+        if self.transport == "multipart":
+            response, scale = self._post_multipart(image_path, options, verbose)
+        else:
+            response, scale = self._post_base64(image_path, options, verbose)
+        
+        # 检查响应状态
+        if response.status_code != 200:
+            # 尝试解析错误信息
+            try:
+                error_info = response.json()
+                error_msg = error_info.get('detail', f"HTTP {response.status_code}")
+            except:
+                error_msg = f"HTTP {response.status_code}: {response.text}"
+            
+            raise Exception(f"PaddleOCR识别失败: {error_msg}")
+        
+        if verbose:
+            print(f"✓ PaddleOCR识别成功，耗时: {response.elapsed.total_seconds():.2f}秒")
+        return response, scale
+    
+    def _build_options(self, device: Optional[str], data_format: str) -> dict:
+        """构建识别选项，指定使用PaddleOCR引擎"""
+        return {
+            "ocr.engine": "paddleocr",  # 指定使用PaddleOCR引擎
+            "paddleocr.device": device if device else self.device,  # 指定设备类型
+            "data.format": data_format
+        }
+    
     def recognize_text(self, image_path: str, device: Optional[str] = None, verbose: bool = True) -> str:
         """
         使用PaddleOCR识别图片中的文字
@@ -131,53 +288,44 @@ class PaddleOCRClient:
             Exception: OCR识别失败
         """
         try:
-            # 确定使用的设备
-            current_device = device if device else self.device
-            
-            # 转换图片为base64
-            if verbose:
-                print(f"正在处理图片: {image_path}")
-                print(f"使用PaddleOCR引擎，设备: {current_device}")
-            base64_image = self._image_to_base64_silent(image_path)
+            # text模式下直接返回纯文本
+            response, _ = self._request_ocr(image_path, self._build_options(device, "text"), verbose)
+            return response.text
+                
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"网络请求失败: {str(e)}")
+        except Exception as e:
+            if isinstance(e, (FileNotFoundError, ValueError)):
+                raise
+            raise Exception(f"PaddleOCR处理异常: {str(e)}")
+    
+    def recognize_blocks(self, image_path: str, device: Optional[str] = None, verbose: bool = False) -> List[dict]:
+        """
+        使用PaddleOCR识别图片中的文字，返回带坐标的文本块
+        
+        上传前缩小过的图片，返回的文本框坐标会还原到原图像素。
+        
+        Args:
+            image_path: 图片文件路径
+            device: PaddleOCR设备类型（可选，覆盖初始化设置）
+            verbose: 是否显示详细进度信息（默认False）
             
-            # 构建请求数据，指定使用PaddleOCR引擎
-            request_data = {
-                "base64": base64_image,
-                "options": {
-                    "ocr.engine": "paddleocr",  # 指定使用PaddleOCR引擎
-                    "paddleocr.device": current_device,  # 指定设备类型
-                    "data.format": "text"  # 指定返回纯文本格式
-                }
-            }
+        Returns:
+            List[dict]: 文本块列表，每项包含text、score、box、end
             
-            # 发送请求
-            api_endpoint = f"{self.api_url}/ocr/recognize/base64"
-            if verbose:
-                print(f"正在请求OCR接口: {api_endpoint}")
+        Raises:
+            Exception: OCR识别失败
+        """
+        try:
+            response, scale = self._request_ocr(image_path, self._build_options(device, "dict"), verbose)
+            result = response.json()
+            # multipart接口的识别结果包装在ocr_result字段中
+            result = result.get("ocr_result") or result
             
-            response = self.session.post(
-                api_endpoint,
-                json=request_data,
-                headers={'Content-Type': 'application/json'}
-            )
+            if result.get("code") != 100 or not isinstance(result.get("data"), list):
+                raise Exception(f"PaddleOCR识别失败: {result.get('data')}")
+            return rescale_blocks(result["data"], scale)
             
-            # 检查响应状态
-            if response.status_code == 200:
-                # text模式下直接返回纯文本
-                text_result = response.text
-                if verbose:
-                    print(f"✓ PaddleOCR识别成功，耗时: {response.elapsed.total_seconds():.2f}秒")
-                return text_result
-            else:
-                # 尝试解析错误信息
-                try:
-                    error_info = response.json()
-                    error_msg = error_info.get('detail', f"HTTP {response.status_code}")
-                except:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                
-                raise Exception(f"PaddleOCR识别失败: {error_msg}")
-                
         except requests.exceptions.RequestException as e:
             raise Exception(f"网络请求失败: {str(e)}")
         except Exception as e:
@@ -229,6 +377,228 @@ class PaddleOCRClient:
         
         return results
 
+    def batch_recognize_to_jsonl(self, image_paths: List[str], output_path: str, workers: int = 4,
+                                 manifest_path: Optional[str] = None, device: Optional[str] = None,
+                                 verbose: bool = True) -> dict:
+        """
+        并发批量识别多张图片，结果逐行写入JSONL文件，支持中断后续跑
+        
+        每识别完一张图片就向JSONL文件追加一行结果，成功的图片同时记录到清单文件。
+        再次运行时会跳过清单中已完成的图片，因此中断（Ctrl+C、进程被杀）后可以从中断处继续。
+        识别失败的图片不会记入清单，续跑时会重新识别；续跑前先从结果文件中删除这些图片上一次的行，
+        每张图片在结果文件中只保留一行。
+        
+        Args:
+            image_paths: 图片文件路径列表
+            output_path: JSONL结果文件路径（追加写入）
+            workers: 并发请求数
+            manifest_path: 清单文件路径（可选，默认为结果文件路径加.manifest后缀）
+            device: PaddleOCR设备类型（可选）
+            verbose: 是否显示进度、吞吐量和预计剩余时间（默认True）
+            
+        Returns:
+            dict: 统计信息 {"total", "skipped", "succeeded", "failed", "elapsed"}
+        """
+        manifest_path = manifest_path or f"{output_path}.manifest"
+        completed = load_manifest(manifest_path)
+        removed = compact_results(output_path, completed)
+        if verbose and removed:
+            print(f"已从结果文件中删除 {removed} 行未完成图片的旧结果，这些图片将重新识别")
+        pending_paths = [path for path in image_paths if os.path.abspath(path) not in completed]
+        
+        stats = {
+            "total": len(image_paths),
+            "skipped": len(image_paths) - len(pending_paths),
+            "succeeded": 0,
+            "failed": 0,
+            "elapsed": 0.0
+        }
+        if verbose:
+            print(f"开始批量识别 {len(pending_paths)} 张图片（已完成 {stats['skipped']} 张，并发数 {workers}）...")
+        
+        # requests.Session不保证线程安全，每个工作线程使用独立的客户端
+        local = threading.local()
+        
+        def recognize(image_path: str) -> dict:
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = PaddleOCRClient(self.api_url, self.device, self.max_side,
+                                                        self.quality, self.image_format, self.transport,
+                                                        self.priority, self.api_key, self.compress)
+                client.timeout = self.timeout
+            start = time.time()
+            try:
+                text = client.recognize_text(image_path, device, verbose=False)
+                return {"path": image_path, "text": text, "error": None, "elapsed": round(time.time() - start, 3)}
+            except Exception as e:
+                return {"path": image_path, "text": None, "error": str(e), "elapsed": round(time.time() - start, 3)}
+        
+        start_time = time.time()
+        last_report = 0.0
+        path_iter = iter(pending_paths)
+        in_flight = set()
+        
+        with open(output_path, 'a', encoding='utf-8') as output_file, \
+                open(manifest_path, 'a', encoding='utf-8') as manifest_file, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            
+            def submit_more():
+                # 限制排队中的任务数量，避免为海量文件一次性创建任务
+                for image_path in path_iter:
+                    in_flight.add(executor.submit(recognize, image_path))
+                    if len(in_flight) >= workers * 2:
+                        break
+            
+            try:
+                submit_more()
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.discard(future)
+                        record = future.result()
+                        
+                        # 先落盘结果，再记录清单，保证清单中的图片一定有结果
+                        output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        output_file.flush()
+                        if record["error"] is None:
+                            manifest_file.write(os.path.abspath(record["path"]) + "\n")
+                            manifest_file.flush()
+                            stats["succeeded"] += 1
+                        else:
+                            stats["failed"] += 1
+                            if verbose:
+                                print(f"❌ {record['path']}: {record['error']}")
+                    
+                    submit_more()
+                    
+                    now = time.time()
+                    if verbose and (now - last_report >= 1.0 or not in_flight):
+                        last_report = now
+                        print(_format_progress(stats["succeeded"] + stats["failed"], len(pending_paths),
+                                               now - start_time))
+            except KeyboardInterrupt:
+                for future in in_flight:
+                    future.cancel()
+                if verbose:
+                    print("\n已中断，再次运行相同命令即可从中断处继续")
+                raise
+        
+        stats["elapsed"] = time.time() - start_time
+        if verbose:
+            print(f"\n批量识别完成: 成功 {stats['succeeded']}，失败 {stats['failed']}，"
+                  f"跳过 {stats['skipped']}，耗时 {stats['elapsed']:.1f}秒")
+            print(f"结果文件: {output_path}")
+        
+        return stats
+
+
+def _format_progress(finished: int, total: int, elapsed: float) -> str:
+    """格式化进度、吞吐量和预计剩余时间"""
+    throughput = finished / elapsed if elapsed > 0 else 0.0
+    if throughput > 0:
+        eta = int((total - finished) / throughput)
+        eta_text = f"{eta // 3600:d}:{eta % 3600 // 60:02d}:{eta % 60:02d}"
+    else:
+        eta_text = "--:--:--"
+    return f"[{finished}/{total}] {throughput:.2f} 张/秒，预计剩余 {eta_text}"
+
+
+def load_manifest(manifest_path: str) -> set:
+    """
+    读取清单文件中已完成的图片路径
+    
+    Args:
+        manifest_path: 清单文件路径
+        
+    Returns:
+        set: 已完成图片的绝对路径集合（文件不存在时为空集合）
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def compact_results(output_path: str, completed: set) -> int:
+    """
+    删除结果文件中不在清单里的行（上一次识别失败、或结果已落盘但未记入清单的图片）
+    
+    这些图片续跑时会重新识别并追加新的一行，先删除旧行避免同一图片出现多行。
+    清单中图片的重复行（同样来自结果落盘后、记入清单前的中断）只保留第一行。
+    没有需要删除的行时不改写文件。
+    
+    Args:
+        output_path: JSONL结果文件路径
+        completed: 已完成图片的绝对路径集合
+        
+    Returns:
+        int: 删除的行数
+    """
+    if not os.path.exists(output_path):
+        return 0
+    
+    kept = []
+    seen = set()
+    removed = 0
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                key = os.path.abspath(json.loads(line)["path"])
+            except (ValueError, KeyError, TypeError):
+                # 中断时写了一半的行
+                key = None
+            if key is None or key not in completed or key in seen:
+                removed += 1
+                continue
+            seen.add(key)
+            kept.append(line)
+    
+    if removed:
+        # 先写临时文件再替换，改写过程中被中断也不会丢失已有结果
+        temp_path = f"{output_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(temp_path, output_path)
+    return removed
+
+
+def collect_image_paths(patterns: Iterable[str]) -> List[str]:
+    """
+    展开命令行给出的图片路径
+    
+    支持普通文件、目录（递归查找支持格式的图片）和通配符（支持**递归匹配）。
+    
+    Args:
+        patterns: 文件路径、目录或通配符列表
+        
+    Returns:
+        List[str]: 去重后的图片路径列表，保持输入顺序，目录内按路径排序
+    """
+    image_paths = []
+    seen = set()
+    
+    def add(path: str):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            image_paths.append(path)
+    
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+                        add(os.path.join(root, name))
+        elif any(char in pattern for char in '*?['):
+            for path in sorted(glob(pattern, recursive=True)):
+                if os.path.isfile(path) and Path(path).suffix.lower() in IMAGE_EXTENSIONS:
+                    add(path)
+        else:
+            add(pattern)
+    
+    return image_paths
+
 
 def recognize_image_text(image_path: str, api_url: str = "http://192.168.16.228:8000", device: str = "gpu") -> str:
     """
@@ -279,13 +649,15 @@ def main():
   python paddleocr_client.py --url http://localhost:8000 image.png
   python paddleocr_client.py --device cpu photo.jpg
   python paddleocr_client.py --batch *.jpg --output results/
+  python paddleocr_client.py --workers 8 --jsonl results.jsonl images/ "scans/**/*.png"
+  python paddleocr_client.py --max-side 2048 --quality 85 --format webp scan.png
         """
     )
     
     parser.add_argument(
         'image_path',
         nargs='*',
-        help='要识别的图片文件路径（支持多文件或通配符）'
+        help='要识别的图片文件路径（支持多文件、目录或通配符）'
     )
     
     parser.add_argument(
@@ -312,6 +684,66 @@ def main():
         help='输出文件路径 (可选，默认输出到控制台)'
     )
     
+    parser.add_argument(
+        '--jsonl',
+        help='JSONL结果文件路径，指定后以并发、可续跑的方式批量识别，结果逐行追加写入'
+    )
+    
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=4,
+        help='JSONL批量模式的并发请求数 (默认: 4)'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        help='JSONL批量模式的清单文件路径，记录已完成的图片 (默认: 结果文件路径加.manifest后缀)'
+    )
+    
+    parser.add_argument(
+        '--max-side',
+        type=int,
+        help='上传前将图片缩小到的目标长边，单位像素 (可选，默认不缩小)'
+    )
+    
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=90,
+        help='上传前重新压缩的质量，1-100 (默认: 90，需配合--max-side)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=sorted(UPLOAD_FORMATS),
+        default='jpeg',
+        help='上传前重新压缩的格式 (默认: jpeg，需配合--max-side)'
+    )
+    
+    parser.add_argument(
+        '--api-key',
+        help='API密钥，服务端按密钥限流'
+    )
+    
+    parser.add_argument(
+        '--priority',
+        help='请求优先级，如interactive、bulk（批量任务建议使用bulk，避免影响交互请求）'
+    )
+    
+    parser.add_argument(
+        '--transport',
+        choices=TRANSPORTS,
+        default='multipart',
+        help='上传方式 (默认: multipart，直接上传文件字节；base64为兼容模式)'
+    )
+    
+    parser.add_argument(
+        '--compress',
+        action='store_true',
+        help='gzip压缩请求体（仅base64上传方式，上行带宽有限时建议开启）'
+    )
+    
     args = parser.parse_args()
     
     # 检查是否提供了图片路径
@@ -320,20 +752,31 @@ def main():
         parser.print_help()
         sys.exit(1)
     
-    # 处理通配符和多个文件
-    if len(args.image_path) == 1 and ('*' in args.image_path[0] or '?' in args.image_path[0]):
-        from glob import glob
-        args.image_path = glob(args.image_path[0])
-        if not args.image_path:
-            print(f"❌ 错误: 未找到匹配的文件: {args.image_path[0]}", file=sys.stderr)
-            sys.exit(1)
+    # 展开目录和通配符
+    patterns = args.image_path
+    args.image_path = collect_image_paths(patterns)
+    if not args.image_path:
+        print(f"❌ 错误: 未找到匹配的文件: {' '.join(patterns)}", file=sys.stderr)
+        sys.exit(1)
     
     try:
         # 创建PaddleOCR客户端
-        client = PaddleOCRClient(args.url, args.device)
+        client = PaddleOCRClient(args.url, args.device, max_side=args.max_side,
+                                 quality=args.quality, image_format=args.format, transport=args.transport,
+                                 priority=args.priority, api_key=args.api_key, compress=args.compress)
         
+        if args.jsonl:
+            # 并发、可续跑的批量处理模式
+            stats = client.batch_recognize_to_jsonl(
+                args.image_path, args.jsonl,
+                workers=args.workers,
+                manifest_path=args.manifest,
+                device=args.device
+            )
+            if stats["failed"]:
+                sys.exit(1)
         # 判断是否为批量处理
-        if len(args.image_path) > 1 or args.batch:
+        elif len(args.image_path) > 1 or args.batch:
             # 批量处理模式
             results = client.batch_recognize(args.image_path, args.device)
             
@@ -371,6 +814,8 @@ def main():
                 print(result)
                 print("="*50)
         
+    except KeyboardInterrupt:
+        sys.exit(130)
     except Exception as e:
         print(f"❌ 错误: {str(e)}", file=sys.stderr)
         sys.exit(1)
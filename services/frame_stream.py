@@ -0,0 +1,220 @@
+"""
+连续帧流式识别
+屏幕、摄像头画面每秒产生多帧，WebSocket会话中只发送一次选项、之后只发送二进制帧；
+帧到达速度超过识别速度时丢弃过时的帧，始终识别最新的一帧。
+增量模式下会话保存上一帧及其识别结果，只重新识别发生变化的区域
+"""
+
+import asyncio
+import io
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+from models.ocr_models import OCRDataFormat, OCROptions, OCRRequest, OCRResponse, OCRTextBlock
+from services.request_context import RequestContext
+from utils.frame_diff import Box, changed_regions, expand_to_blocks, splice_blocks
+from utils.layout import parse_layout
+from utils.projection import has_selection, join_blocks, select_blocks
+
+logger = logging.getLogger(__name__)
+
+
+class LatestFrame:
+    """
+    只保留最新一帧的邮箱
+
+    新帧到达时如果上一帧还没有被取走，直接覆盖上一帧（计为丢弃），识别方取到的总是最新的帧
+    """
+
+    def __init__(self):
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, data: bytes) -> int:
+        """放入一帧，返回帧序号"""
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, data)
+        self._ready.set()
+        return self.received
+
+    async def get(self) -> Tuple[int, bytes]:
+        """等待并取出最新的一帧"""
+        await self._ready.wait()
+        self._ready.clear()
+        frame, self._frame = self._frame, None
+        return frame
+
+
+class StreamMetrics:
+    """流式识别会话的统计"""
+
+    def __init__(self):
+        self.active_sessions = 0
+        self.sessions = 0
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        # 增量模式：整帧识别、只识别变化区域、没有变化直接复用的帧数，以及帧总像素数和实际识别的像素数
+        self.frames_full = 0
+        self.frames_incremental = 0
+        self.frames_unchanged = 0
+        self.frame_pixels = 0
+        self.recognized_pixels = 0
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": self.active_sessions,
+            "sessions": self.sessions,
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "frames_full": self.frames_full,
+            "frames_incremental": self.frames_incremental,
+            "frames_unchanged": self.frames_unchanged,
+            "recognized_pixel_ratio": round(self.recognized_pixels / self.frame_pixels, 4) if self.frame_pixels else None,
+        }
+
+
+def _decode_frame(data: bytes) -> np.ndarray:
+    """解码图片帧为RGB数组"""
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def _plan_update(data: bytes, previous: Optional[np.ndarray]) -> Tuple[np.ndarray, Optional[List[Box]]]:
+    """解码当前帧并与上一帧比较，返回 (当前帧, 变化区域)，变化区域为None时需要整帧识别"""
+    frame = _decode_frame(data)
+    if previous is None:
+        return frame, None
+    return frame, changed_regions(previous, frame, settings.stream_diff_threshold, settings.stream_diff_cell)
+
+
+class FrameStream:
+    """一个流式识别会话：会话选项固定，逐帧调用OCR服务"""
+
+    def __init__(self, service, options: Optional[OCROptions] = None):
+        """
+        初始化会话
+
+        Args:
+            service: OCR服务（OCRService）
+            options: 会话的识别选项
+        """
+        self.service = service
+        self.options = options
+        self.frames = LatestFrame()
+        # 增量模式的状态：上一帧、上一帧的文本块、距离上次整帧识别的帧数
+        self._previous_frame: Optional[np.ndarray] = None
+        self._previous_blocks: List[OCRTextBlock] = []
+        self._since_keyframe = 0
+        # 最近一帧的识别方式（增量模式）：{"mode": full/incremental/unchanged, "regions": 区域数, "changed_ratio": 变化面积占比}
+        self.last_update: Optional[dict] = None
+
+    @property
+    def incremental(self) -> bool:
+        """是否启用增量模式（指定了识别区域时不启用）"""
+        return bool(self.options and self.options.stream_incremental and self.options.ocr_regions is None)
+
+    async def recognize(self, data: bytes, context: RequestContext) -> OCRResponse:
+        """
+        识别一帧
+
+        Args:
+            data: 编码后的图片字节（PNG/JPEG等）
+            context: 本帧的请求上下文
+
+        Returns:
+            OCRResponse: 识别结果
+        """
+        if not self.incremental:
+            request = OCRRequest.from_image(data, self.options)
+            return await self.service.recognize_image(request, context)
+        return await self._recognize_incremental(data, context)
+
+    async def _recognize_incremental(self, data: bytes, context: RequestContext) -> OCRResponse:
+        """
+        增量识别一帧
+
+        与上一帧逐像素比较（在线程池中完成解码和比较），只把变化区域作为识别区域提交给OCR服务，
+        再把新的文本块替换掉上一帧结果中对应区域的文本块；没有变化时直接复用上一帧的结果。
+        每隔固定帧数、帧尺寸变化或变化面积过大时整帧识别
+        """
+        previous = self._previous_frame
+        if settings.stream_keyframe_interval and self._since_keyframe >= settings.stream_keyframe_interval:
+            previous = None
+        loop = asyncio.get_running_loop()
+        frame, regions = await loop.run_in_executor(None, _plan_update, data, previous)
+
+        height, width = frame.shape[:2]
+        frame_area = width * height
+        if regions is not None:
+            regions = expand_to_blocks(regions, self._previous_blocks)
+            changed_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+            if changed_area > frame_area * settings.stream_max_changed_ratio:
+                regions = None
+
+        # 增量拼接需要文本块坐标和完整的结果，统一按dict格式识别、不做筛选，需要纯文本或筛选时最后再处理
+        options = (self.options or OCROptions()).model_copy(update={
+            "data_format": OCRDataFormat.DICT,
+            "data_min_score": None,
+            "data_max_blocks": None,
+            "ocr_regions": [[[x0, y0], [x1, y1]] for x0, y0, x1, y1 in regions] if regions else None
+        })
+
+        stream_metrics.frame_pixels += frame_area
+        if regions == []:
+            stream_metrics.frames_unchanged += 1
+            self.last_update = {"mode": "unchanged", "regions": 0, "changed_ratio": 0.0}
+            result = OCRResponse(code=100 if self._previous_blocks else 101, data=list(self._previous_blocks),
+                                 time=0.0, timestamp=0.0)
+        else:
+            request = OCRRequest.from_image(data, options)
+            result = await self.service.recognize_image(request, context)
+            if result.code not in (100, 101):
+                # 识别失败时丢弃保存的状态，下一帧整帧识别
+                self._previous_frame = None
+                self._previous_blocks = []
+                return result
+
+            blocks = result.data if isinstance(result.data, list) else []
+            if regions is None:
+                stream_metrics.frames_full += 1
+                stream_metrics.recognized_pixels += frame_area
+                self._since_keyframe = 0
+                self.last_update = {"mode": "full", "regions": 0, "changed_ratio": 1.0}
+            else:
+                stream_metrics.frames_incremental += 1
+                stream_metrics.recognized_pixels += changed_area
+                blocks = splice_blocks(self._previous_blocks, regions, blocks)
+                if self.options.tbpu_parser:
+                    # 拼接后重新排版，新旧文本块之间的阅读顺序和结束符保持一致（复制后修改，不影响缓存中的结果）
+                    blocks = parse_layout([block.model_copy() for block in blocks], self.options.tbpu_parser)
+                self.last_update = {"mode": "incremental", "regions": len(regions),
+                                    "changed_ratio": round(changed_area / frame_area, 4)}
+            self._previous_blocks = blocks
+            result = OCRResponse(code=100 if blocks else 101, data=blocks, time=result.time,
+                                 timestamp=result.timestamp)
+
+        self._previous_frame = frame
+        self._since_keyframe += 1
+
+        if has_selection(self.options) and isinstance(result.data, list):
+            blocks = select_blocks(result.data, self.options.data_min_score, self.options.data_max_blocks)
+            result = result.model_copy(update={"code": 100 if blocks else 101, "data": blocks})
+        if self.options and self.options.data_format == OCRDataFormat.TEXT:
+            result.data = join_blocks(result.data) if isinstance(result.data, list) else result.data
+        elif not result.data:
+            result.data = ""
+        return result
+
+
+# 全局流式识别统计
+stream_metrics = StreamMetrics()
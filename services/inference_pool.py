@@ -0,0 +1,402 @@
+"""
+PaddleOCR推理进程池
+每个工作进程常驻并只加载一次模型；图片像素和识别结果通过 multiprocessing.shared_memory 传递，
+管道中只传输缓冲区名称和数组布局，不对像素数据和识别结果做pickle序列化
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 数组在共享内存中按8字节对齐
+_ALIGNMENT = 8
+
+# 共享内存缓冲区的最小容量，扩容时按2的幂增长，减少重复创建
+_MIN_BUFFER_SIZE = 1024 * 1024
+
+# 等待工作进程返回结果时检查进程存活的间隔（秒）
+_POLL_INTERVAL = 1.0
+
+# 推理工作进程的环境变量标记：spawn方式启动的子进程会重新导入主模块，据此跳过服务实例的创建
+WORKER_ENV = "PADDLEOCR_INFERENCE_WORKER"
+
+# 启动工作进程时临时设置环境变量标记，多个线程同时重启工作进程时需要互斥
+_start_lock = threading.Lock()
+
+# 数组布局：(偏移, 形状, dtype字符串)
+ArrayLayout = List[Tuple[int, tuple, str]]
+
+
+def in_inference_worker() -> bool:
+    """当前进程是否为推理工作进程"""
+    return os.environ.get(WORKER_ENV) == "1"
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _buffer_size(needed: int) -> int:
+    """需要的缓冲区容量，按2的幂向上取整"""
+    size = _MIN_BUFFER_SIZE
+    while size < needed:
+        size *= 2
+    return size
+
+
+def _ensure_buffer(shm: Optional[shared_memory.SharedMemory], needed: int) -> shared_memory.SharedMemory:
+    """返回容量不小于needed的缓冲区，容量不足时释放旧缓冲区并创建新的"""
+    if shm is not None and shm.size >= needed:
+        return shm
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+    return shared_memory.SharedMemory(create=True, size=_buffer_size(needed))
+
+
+def _write_arrays(buffer, arrays: List[np.ndarray]) -> ArrayLayout:
+    """把数组依次写入共享内存（非连续的切片视图在写入时完成复制），返回布局"""
+    layout = []
+    offset = 0
+    for array in arrays:
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=offset)
+        target[...] = array
+        layout.append((offset, array.shape, array.dtype.str))
+        offset = _aligned(offset + array.nbytes)
+    return layout
+
+
+def _arrays_size(arrays: List[np.ndarray]) -> int:
+    return sum(_aligned(array.nbytes) for array in arrays)
+
+
+def _read_arrays(buffer, layout: ArrayLayout, copy: bool) -> List[np.ndarray]:
+    """按布局读取共享内存中的数组，copy为False时返回共享内存上的视图"""
+    arrays = []
+    for offset, shape, dtype in layout:
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        arrays.append(array.copy() if copy else array)
+    return arrays
+
+
+def _pack_result(res) -> List[np.ndarray]:
+    """
+    把单张图片的识别结果编码为数组：置信度、各文本框点数、文本框坐标、文本偏移、UTF-8文本
+    """
+    texts = list(res.get("rec_texts") or [])
+    scores = res.get("rec_scores")
+    polys = res.get("rec_polys")
+    count = len(texts)
+
+    score_array = np.ones(count, dtype=np.float64)
+    if scores is not None:
+        scores = np.asarray(scores, dtype=np.float64)[:count]
+        score_array[:len(scores)] = scores
+
+    point_arrays = []
+    for i in range(count):
+        if polys is not None and i < len(polys):
+            point_arrays.append(np.asarray(polys[i]).reshape(-1, 2).astype(np.int32))
+        else:
+            point_arrays.append(np.empty((0, 2), dtype=np.int32))
+    point_counts = np.array([len(points) for points in point_arrays], dtype=np.int32)
+    points = np.concatenate(point_arrays) if point_arrays else np.empty((0, 2), dtype=np.int32)
+
+    encoded = [str(text).encode("utf-8") for text in texts]
+    text_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=text_offsets[1:])
+    text_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    return [score_array, point_counts, points, text_offsets, text_bytes]
+
+
+def _unpack_result(arrays: List[np.ndarray]) -> dict:
+    """还原为与PaddleOCR预测结果相同字段的字典"""
+    scores, point_counts, points, text_offsets, text_bytes = arrays
+    raw = text_bytes.tobytes()
+    offsets = text_offsets.tolist()
+    texts = [raw[start:stop].decode("utf-8") for start, stop in zip(offsets, offsets[1:])]
+    if len(point_counts) and (point_counts == point_counts[0]).all() and point_counts[0]:
+        # 顶点数相同（通常都是四边形）时还原为 (N, P, 2) 数组，转换为文本块时不需要再逐个合并
+        polys = points.reshape(len(point_counts), int(point_counts[0]), 2)
+    else:
+        polys = np.split(points, np.cumsum(point_counts)[:-1]) if len(point_counts) else []
+    return {"rec_texts": texts, "rec_scores": scores, "rec_polys": polys}
+
+
+def _predict_shared(engine, input_shm: shared_memory.SharedMemory, layout: ArrayLayout, batch: bool) -> List[np.ndarray]:
+    """
+    对共享内存中的图片执行推理并编码结果
+
+    图片视图和引擎返回的结果（可能引用输入图片）都是局部变量，函数返回后即释放，
+    保证之后可以安全地关闭输入缓冲区
+    """
+    images = _read_arrays(input_shm.buf, layout, copy=False)
+    results = engine.predict(input=images if batch else images[0])
+    return [array for res in results for array in _pack_result(res)]
+
+
+def _worker_main(device: str, conn):
+    """推理工作进程：加载一次模型，循环处理管道中的推理任务"""
+    from services.paddleocr_engine import create_paddleocr_engine
+
+    if hasattr(os, "setsid"):
+        # 终端的Ctrl-C、timeout等会把信号发给整个进程组：工作进程使用独立的会话，由服务进程在关闭时按顺序停止，
+        # 否则监控线程会在服务关闭期间把被信号结束的工作进程重新启动。服务进程退出后管道关闭，工作进程随之退出
+        os.setsid()
+
+    try:
+        engine = create_paddleocr_engine(device)
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", os.getpid()))
+
+    input_shm = None
+    output_shm = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if message[0] == "stop":
+                break
+
+            _, name, layout, batch = message
+            try:
+                if input_shm is None or input_shm.name != name:
+                    if input_shm is not None:
+                        input_shm.close()
+                    input_shm = shared_memory.SharedMemory(name=name)
+
+                arrays = _predict_shared(engine, input_shm, layout, batch)
+                output_shm = _ensure_buffer(output_shm, _arrays_size(arrays))
+                conn.send(("ok", output_shm.name, _write_arrays(output_shm.buf, arrays)))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        if input_shm is not None:
+            input_shm.close()
+        if output_shm is not None:
+            output_shm.close()
+            output_shm.unlink()
+
+
+class ProcessEngine:
+    """
+    运行在独立进程中的PaddleOCR模型实例
+
+    提供与PaddleOCR实例相同的 predict(input=...) 接口，可以直接放入服务的模型实例队列。
+    同一时间只能被一个线程使用（由服务的实例队列保证）。
+    每个工作进程由一个监控线程等待其退出，空闲时异常退出的工作进程立即重启；推理过程中异常退出时，
+    在重启的工作进程上重试一次当前请求。在fork出的子进程中使用时会启动自己的工作进程。
+    """
+
+    def __init__(self, device: str, index: int = 0):
+        self.device = device
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self._owner_pid = None
+        self._input = None
+        self._output = None
+        # 可重入：wait_ready失败时在持有锁的情况下调用stop()
+        self._lock = threading.RLock()
+        # 已调用stop()，监控线程不再重启工作进程
+        self._closed = False
+
+    def start(self):
+        """启动工作进程（不等待模型加载完成），并启动监控线程"""
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.device, child_conn),
+            name=f"paddleocr-worker-{self.index}",
+            daemon=True
+        )
+        with _start_lock:
+            os.environ[WORKER_ENV] = "1"
+            try:
+                self.process.start()
+            finally:
+                del os.environ[WORKER_ENV]
+        child_conn.close()
+        self._owner_pid = os.getpid()
+        self._closed = False
+        threading.Thread(target=self._supervise, args=(self.process,),
+                         name=f"{self.process.name}-supervisor", daemon=True).start()
+
+    def _supervise(self, process):
+        """
+        监控线程：等待工作进程退出，异常退出时重启
+
+        正在推理时由predict负责重启和重试，这里等它结束后确认；
+        工作进程已被替换（predict重启、stop()或_discard()）时直接退出
+        """
+        wait([process.sentinel])
+        # 管道先于进程回收关闭，回收之前is_alive()仍可能为True
+        process.join()
+        while self.process is process and not self._closed:
+            if not self._lock.acquire(timeout=_POLL_INTERVAL):
+                continue
+            try:
+                if self.process is process and not self._closed:
+                    self._ensure_running()
+            except Exception as e:
+                logger.error(f"重启推理进程失败，下一次使用时重试: {e}")
+            finally:
+                self._lock.release()
+            return
+
+    def wait_ready(self):
+        """等待工作进程加载模型完成"""
+        status, detail = self._receive()
+        if status != "ready":
+            self.stop()
+            raise Exception(f"推理进程启动失败: {detail}")
+        logger.info(f"推理进程已就绪: {self.process.name} (pid {detail})")
+
+    def _alive(self) -> bool:
+        return (self.process is not None and self._owner_pid == os.getpid()
+                and self.process.is_alive())
+
+    def _ensure_running(self):
+        """工作进程不存在或已退出时（重新）启动"""
+        if self._alive():
+            return
+        if self.process is not None:
+            if self._owner_pid == os.getpid():
+                self.restarts += 1
+                logger.warning(f"推理进程 {self.process.name} 已退出（退出码 {self.process.exitcode}），重新启动")
+            else:
+                # fork出的子进程：继承的工作进程和共享内存属于父进程，不能使用也不能释放
+                self._input = None
+                self._output = None
+            self._discard()
+        self.start()
+        self.wait_ready()
+
+    def _receive(self):
+        """等待工作进程的回复，进程退出时抛出异常"""
+        while not self.conn.poll(_POLL_INTERVAL):
+            if not self.process.is_alive():
+                raise Exception(f"推理进程异常退出（退出码 {self.process.exitcode}）")
+        try:
+            return self.conn.recv()
+        except EOFError:
+            raise Exception("推理进程异常退出")
+
+    def predict(self, input):
+        """
+        在工作进程中执行推理
+
+        Args:
+            input: 单张图片数组或图片数组列表（可以是非连续的切片视图）
+
+        Returns:
+            list: 每张图片一个结果字典，包含rec_texts、rec_scores、rec_polys
+        """
+        with self._lock:
+            self._ensure_running()
+
+            batch = isinstance(input, list)
+            images = input if batch else [input]
+            self._input = _ensure_buffer(self._input, max(1, _arrays_size(images)))
+            layout = _write_arrays(self._input.buf, images)
+
+            try:
+                reply = self._request(layout, batch)
+            except Exception as e:
+                # 工作进程在推理过程中退出：在重新启动的工作进程上重试一次
+                self.restarts += 1
+                logger.warning(f"推理进程 {self.process.name} 在推理过程中退出，重新启动后重试: {e}")
+                self._discard()
+                self.start()
+                self.wait_ready()
+                try:
+                    reply = self._request(layout, batch)
+                except Exception:
+                    # 重试仍然失败（例如图片本身导致进程崩溃），下一次使用时重启
+                    self._discard()
+                    raise
+
+            status, *detail = reply
+            if status != "ok":
+                raise Exception(detail[0])
+
+            name, out_layout = detail
+            if self._output is None or self._output.name != name:
+                if self._output is not None:
+                    self._output.close()
+                self._output = shared_memory.SharedMemory(name=name)
+            arrays = _read_arrays(self._output.buf, out_layout, copy=True)
+            return [_unpack_result(arrays[i:i + 5]) for i in range(0, len(arrays), 5)]
+
+    def _request(self, layout: ArrayLayout, batch: bool):
+        """发送输入缓冲区中的推理任务并等待回复"""
+        self.conn.send(("predict", self._input.name, layout, batch))
+        return self._receive()
+
+    def _discard(self):
+        """终止并丢弃当前工作进程"""
+        if self.process is not None and self._owner_pid == os.getpid():
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process.join(timeout=5)
+            if self._output is not None:
+                # 工作进程异常退出时来不及释放自己的输出缓冲区
+                self._output.close()
+                try:
+                    self._output.unlink()
+                except FileNotFoundError:
+                    pass
+                self._output = None
+        if self.conn is not None:
+            self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def stop(self):
+        """停止工作进程并释放共享内存（等待监控线程正在进行的重启完成）"""
+        self._closed = True
+        with self._lock:
+            if self._alive():
+                try:
+                    self.conn.send(("stop",))
+                    self.process.join(timeout=5)
+                except Exception:
+                    pass
+            if self._output is not None:
+                self._output.close()
+                self._output = None
+            self._discard()
+            if self._input is not None:
+                self._input.close()
+                self._input.unlink()
+                self._input = None
+
+
+def create_process_engines(device: str, processes: int) -> List[ProcessEngine]:
+    """启动指定数量的推理进程，并行加载模型"""
+    engines = [ProcessEngine(device, index) for index in range(processes)]
+    for engine in engines:
+        engine.start()
+    try:
+        for engine in engines:
+            engine.wait_ready()
+    except Exception:
+        for engine in engines:
+            engine.stop()
+        raise
+    return engines
@@ -0,0 +1,147 @@
+"""
+内存预算
+识别前只解析图片头，按宽高和base64长度预估解码后占用的内存，从进程内的字节预算中预留，识别结束后归还；
+预算不足时按到达顺序排队等待，几张大图同时解码也不会让工作进程内存溢出
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(Exception):
+    """内存预算不足：单个请求超过整个预算（too_large），或者等待超时"""
+
+    def __init__(self, message: str, too_large: bool = False):
+        super().__init__(message)
+        self.too_large = too_large
+
+
+def estimate_bytes(encoded_length: int, size: Optional[Tuple[int, int]], bytes_per_pixel: float) -> int:
+    """
+    预估一次识别占用的内存
+
+    Args:
+        encoded_length: base64字符数，识别时还会生成约两份同样大小的副本（解码后的文件字节、上游请求体）
+        size: 图片宽高，None表示不在本进程解码（只计算base64副本）
+        bytes_per_pixel: 每个像素占用的字节数
+
+    Returns:
+        int: 预估字节数
+    """
+    estimate = encoded_length * 2
+    if size is not None:
+        estimate += int(size[0] * size[1] * bytes_per_pixel)
+    return estimate
+
+
+class MemoryBudget:
+    """
+    进程内的内存预算
+
+    请求按预估字节数预留预算，预算不足时按到达顺序等待（先到的大图不会被之后的小图一直插队），
+    等待超过max_wait秒时拒绝；超过整个预算的请求直接拒绝
+    """
+
+    def __init__(self, capacity: int, max_wait: float):
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.reserved = 0
+        self.peak = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self.admitted = 0
+        # 需要排队等待的次数
+        self.waited = 0
+        self.rejected = {"too_large": 0, "timeout": 0}
+
+    def _grant(self, nbytes: int):
+        self.reserved += nbytes
+        self.peak = max(self.peak, self.reserved)
+
+    def _dispatch(self):
+        """按到达顺序把归还的预算分配给等待中的请求"""
+        while self._waiters and self.reserved + self._waiters[0][0] <= self.capacity:
+            nbytes, waiter = self._waiters.popleft()
+            self._grant(nbytes)
+            waiter.set_result(None)
+
+    async def acquire(self, nbytes: int):
+        """
+        预留nbytes字节，预算不足时等待
+
+        Raises:
+            MemoryBudgetExceeded: 超过整个预算，或者等待超时
+        """
+        if nbytes > self.capacity:
+            self.rejected["too_large"] += 1
+            raise MemoryBudgetExceeded(
+                f"图片解码后预计占用 {nbytes / _MB:.0f}MB，超过内存预算 {self.capacity / _MB:.0f}MB", too_large=True
+            )
+        if not self._waiters and self.reserved + nbytes <= self.capacity:
+            self._grant(nbytes)
+            self.admitted += 1
+            return
+
+        entry = (nbytes, asyncio.get_running_loop().create_future())
+        self._waiters.append(entry)
+        self.waited += 1
+        try:
+            done, _ = await asyncio.wait([entry[1]], timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        if not done:
+            self._abandon(entry)
+            self.rejected["timeout"] += 1
+            raise MemoryBudgetExceeded(f"内存预算不足，等待 {self.max_wait:g} 秒后仍未获得 {nbytes / _MB:.1f}MB")
+        self.admitted += 1
+
+    def _abandon(self, entry: Tuple[int, asyncio.Future]):
+        """放弃等待：已经分配到预算时归还，否则移出队列（队首移出后之后的请求可能已经放得下）"""
+        nbytes, waiter = entry
+        if waiter.done():
+            self.release(nbytes)
+        else:
+            waiter.cancel()
+            self._waiters.remove(entry)
+            self._dispatch()
+
+    def release(self, nbytes: int):
+        self.reserved -= nbytes
+        self._dispatch()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        """在识别期间预留nbytes字节"""
+        await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def stats(self) -> dict:
+        return {
+            "capacity_bytes": self.capacity,
+            "reserved_bytes": self.reserved,
+            "peak_reserved_bytes": self.peak,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": dict(self.rejected),
+        }
+
+
+def create_memory_budget() -> Optional[MemoryBudget]:
+    """根据配置创建内存预算，未配置预算时返回None"""
+    if settings.memory_budget_mb <= 0:
+        return None
+    logger.info(f"内存预算已启用: {settings.memory_budget_mb}MB，预算不足时最多等待 {settings.memory_max_wait:g} 秒")
+    return MemoryBudget(settings.memory_budget_mb * _MB, settings.memory_max_wait)
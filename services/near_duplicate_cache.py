@@ -0,0 +1,201 @@
+"""
+近似重复图片结果缓存
+对视觉上相同但字节不同的图片（重新压缩、元数据不同等）复用之前的识别结果
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from models.ocr_models import OCRRequest, OCRResponse
+from utils.phash import HASH_BITS, fingerprint_bytes, hamming_distance, max_pixel_difference
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """缓存条目"""
+
+    __slots__ = ("key", "phash", "thumbnail", "response")
+
+    def __init__(self, key: tuple, phash: int, thumbnail: Optional[np.ndarray], response: OCRResponse):
+        self.key = key
+        self.phash = phash
+        self.thumbnail = thumbnail
+        self.response = response
+
+
+class NearDuplicateCache:
+    """
+    基于感知哈希的近似重复查找缓存
+
+    使用多索引哈希（multi-index hashing）查找汉明距离不超过阈值的哈希：
+    把64位哈希切分为 threshold+1 段，根据抽屉原理，距离不超过阈值的两个哈希至少有一段完全相同，
+    因此只需要在各段的精确索引中取候选，再逐个计算完整距离。
+    哈希相近只是必要条件：同一版式、只差几个字的文档图片哈希通常完全相同，
+    因此距离不超过阈值的候选还要逐像素比较灰度缩略图，最大亮度差不超过容差才算命中。
+    条目按LRU淘汰，插入、删除都是 O(段数)。
+    """
+
+    def __init__(self, threshold: int = 4, capacity: int = 1024, pixel_tolerance: int = 10):
+        """
+        初始化缓存
+
+        Args:
+            threshold: 判定为近似重复的最大汉明距离
+            capacity: 最多缓存的结果数量
+            pixel_tolerance: 确认近似重复时缩略图逐像素亮度差的最大值
+        """
+        if not 0 <= threshold < HASH_BITS:
+            raise ValueError(f"汉明距离阈值必须在 [0, {HASH_BITS}) 范围内: {threshold}")
+        self.threshold = threshold
+        self.capacity = capacity
+        self.pixel_tolerance = pixel_tolerance
+
+        # 各段的比特范围 (起始位, 掩码)
+        segments = threshold + 1
+        bounds = [HASH_BITS * i // segments for i in range(segments + 1)]
+        self._segments: List[Tuple[int, int]] = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])
+        ]
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._index: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        # 哈希相近但缩略图不一致而被排除的候选数（哈希的误判）
+        self.rejected = 0
+
+    def _segment_keys(self, phash: int) -> List[Tuple[int, int]]:
+        """计算哈希在各段索引中的键"""
+        return [(i, (phash >> start) & mask) for i, (start, mask) in enumerate(self._segments)]
+
+    def lookup(self, key: tuple, phash: int, thumbnail: Optional[np.ndarray] = None) -> Optional[Tuple[OCRResponse, int]]:
+        """
+        查找近似重复的缓存结果
+
+        Args:
+            key: 精确匹配部分（图片尺寸、识别选项等）
+            phash: 图片的感知哈希
+            thumbnail: 确认用的灰度缩略图，为None时只比较哈希
+
+        Returns:
+            Optional[Tuple[OCRResponse, int]]: (缓存结果, 汉明距离)，未命中时返回None
+        """
+        best_id, best_distance = None, self.threshold + 1
+        candidates: Set[int] = set()
+        for segment_key in self._segment_keys(phash):
+            candidates.update(self._index.get(segment_key, ()))
+
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry.key != key:
+                continue
+            distance = hamming_distance(phash, entry.phash)
+            if distance >= best_distance:
+                continue
+            if thumbnail is not None and entry.thumbnail is not None \
+                    and max_pixel_difference(thumbnail, entry.thumbnail) > self.pixel_tolerance:
+                self.rejected += 1
+                continue
+            best_id, best_distance = entry_id, distance
+
+        if best_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id].response, best_distance
+
+    def store(self, key: tuple, phash: int, response: OCRResponse, thumbnail: Optional[np.ndarray] = None):
+        """
+        缓存识别结果
+
+        Args:
+            key: 精确匹配部分（图片尺寸、识别选项等）
+            phash: 图片的感知哈希
+            response: 识别结果
+            thumbnail: 确认用的灰度缩略图
+        """
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = _Entry(key, phash, thumbnail, response)
+        for segment_key in self._segment_keys(phash):
+            self._index.setdefault(segment_key, set()).add(entry_id)
+
+        while len(self._entries) > self.capacity:
+            self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的条目"""
+        entry_id, entry = self._entries.popitem(last=False)
+        for segment_key in self._segment_keys(entry.phash):
+            bucket = self._index[segment_key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._index[segment_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NearDuplicateLookup:
+    """在OCR引擎前做近似重复查找，命中时直接返回之前的识别结果"""
+
+    def __init__(self, threshold: int, capacity: int, pixel_tolerance: int):
+        self.cache = NearDuplicateCache(threshold=threshold, capacity=capacity, pixel_tolerance=pixel_tolerance)
+
+    @staticmethod
+    def _fingerprint(request: OCRRequest) -> tuple:
+        """计算请求的感知哈希、确认用的缩略图与精确匹配部分（在线程池中执行）"""
+        image_bytes = request.image_bytes()
+        phash, thumbnail, width, height = fingerprint_bytes(image_bytes)
+        options_key = request.options.model_dump_json(by_alias=True) if request.options else ""
+        # 文本框坐标与图片尺寸相关，尺寸不同的图片不能复用结果
+        return (width, height, options_key), phash, thumbnail
+
+    async def fingerprint(self, request: OCRRequest) -> Optional[tuple]:
+        """
+        计算请求指纹，图片无法解码时返回None（交由OCR引擎报告错误）
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self._fingerprint, request)
+        except Exception as e:
+            logger.debug("计算感知哈希失败，跳过近似重复查找: %s", e)
+            return None
+
+    def lookup(self, fingerprint: tuple) -> Optional[OCRResponse]:
+        """查找近似重复的结果，命中时返回带有复用标记的结果副本"""
+        key, phash, thumbnail = fingerprint
+        hit = self.cache.lookup(key, phash, thumbnail)
+        if hit is None:
+            return None
+
+        response, distance = hit
+        logger.debug("命中近似重复图片，复用识别结果，汉明距离: %d", distance)
+        return response.model_copy(update={"reused": True, "reuse_distance": distance})
+
+    def store(self, fingerprint: tuple, response: OCRResponse):
+        """缓存识别成功（含无文本）的结果"""
+        if response.code not in (100, 101):
+            return
+        key, phash, thumbnail = fingerprint
+        self.cache.store(key, phash, response, thumbnail)
+
+
+def create_near_duplicate_lookup() -> Optional[NearDuplicateLookup]:
+    """根据配置创建近似重复查找，未启用时返回None"""
+    if not settings.near_duplicate_enabled:
+        return None
+    logger.info(f"启用近似重复查找，汉明距离阈值: {settings.near_duplicate_threshold}，"
+                f"缩略图像素容差: {settings.near_duplicate_pixel_tolerance}，缓存容量: {settings.near_duplicate_capacity}")
+    return NearDuplicateLookup(settings.near_duplicate_threshold, settings.near_duplicate_capacity,
+                               settings.near_duplicate_pixel_tolerance)
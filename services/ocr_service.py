@@ -1,26 +1,64 @@
+import asyncio
+import base64
 import json
-import requests
 import logging
+import httpx
 from typing import Dict, Any, Optional
-from models.ocr_models import OCRRequest, OCRResponse, OCROptions, OCRTextBlock, OCREngine
+from models.ocr_models import ImageData, OCRRequest, OCRResponse, OCROptions, OCRTextBlock, OCREngine, OCRDataFormat
 from services.paddleocr_service import paddleocr_service
+from services.memory_budget import create_memory_budget, estimate_bytes
+from services.near_duplicate_cache import create_near_duplicate_lookup
+from services.rate_limiter import create_rate_limiter
+from services.request_context import DeadlineExceeded, RequestContext
+from services.scheduler import PriorityScheduler
+from services import tracing
+from services.single_flight import create_request_coalescer
+from config import settings
+from utils.image_utils import decode_image, encode_image, read_base64_image_size, read_image_size
+from utils.layout import check_parser, layout_text, parse_layout
+from utils.projection import has_selection, join_blocks, select_blocks
+from utils.regions import clip_regions, translate_blocks
 
 logger = logging.getLogger(__name__)
 
 
+def _encode_regions(image_data: ImageData, regions) -> list:
+    """解码图片，裁剪各识别区域并编码为PNG，返回 [((x0, y0, x1, y1), 图片字节)]（在线程池中执行）"""
+    image = decode_image(image_data)
+    boxes = clip_regions(regions, image.width, image.height)
+    # 只用于发送给Umi-OCR，压缩率不重要，使用最快的压缩级别
+    return [(box, encode_image(image.crop(box), compress_level=1)) for box in boxes]
+
+
 class OCRService:
     """OCR服务调用类，支持多引擎"""
     
     def __init__(self, ocr_url: str = "http://127.0.0.1:1224/api/ocr"):
         self.ocr_url = ocr_url
-        self.timeout = 60  # 请求超时时间（秒）
+        self.timeout = 60  # 请求超时时间上限（秒），请求带有处理时限时使用剩余时限
+        # 调用Umi-OCR的异步HTTP客户端（首次使用时创建，复用连接）
+        self._http: Optional[httpx.AsyncClient] = None
+        # 近似重复查找（按配置启用，未启用时为None）
+        self.near_duplicate = create_near_duplicate_lookup()
+        # 相同并发请求合并（按配置启用，未启用时为None）
+        self.coalescer = create_request_coalescer()
+        # 按客户端限流（配置了限流速率时启用，未启用时为None）
+        self.rate_limiter = create_rate_limiter()
+        # 进程内的内存预算（配置了预算时启用，未启用时为None）
+        self.memory_budget = create_memory_budget()
+        # 各引擎的优先级调度器（首次使用时创建）
+        self.schedulers: Dict[OCREngine, PriorityScheduler] = {}
+        # 因客户端断开或超过时限而放弃的请求数，以及其中引擎调用进行到一半被取消的次数
+        self.abandoned = {"disconnect": 0, "deadline": 0}
+        self.cancelled_in_flight = 0
     
-    async def recognize_image(self, request: OCRRequest) -> OCRResponse:
+    async def recognize_image(self, request: OCRRequest, context: Optional[RequestContext] = None) -> OCRResponse:
         """
         调用OCR服务进行图片识别，支持多引擎
         
         Args:
             request: OCR请求对象
+            context: 请求上下文（优先级等调度属性，可选）
             
         Returns:
             OCRResponse: OCR识别结果
@@ -28,18 +66,146 @@ class OCRService:
         Raises:
             Exception: OCR服务调用失败时
         """
+        context = context or RequestContext()
+        options = request.options
+        if options and (options.data_fields or has_selection(options)):
+            # 筛选、投影只影响返回内容，识别时去掉这些选项：只差筛选条件的请求共享合并和复用的结果；
+            # 筛选后需要拼接纯文本时按dict格式识别
+            update = {"data_fields": None, "data_min_score": None, "data_max_blocks": None}
+            if has_selection(options) and options.data_format == OCRDataFormat.TEXT:
+                update["data_format"] = OCRDataFormat.DICT
+            request = request.model_copy(update={"options": options.model_copy(update=update)})
+        
+        with tracing.span("ocr.recognize", priority=context.priority) as span:
+            if self.coalescer is None:
+                result = await self._recognize(request, context)
+            else:
+                # 相同图片、相同选项的并发请求只识别一次；优先级不同的请求不合并，避免交互请求等待排在批量队列中的识别
+                result = await self.coalescer.run(request, lambda: self._recognize(request, context),
+                                                  partition=context.priority)
+            span.set(code=result.code, reused=bool(result.reused))
+            
+            if not has_selection(options) or result.code != 100 or not isinstance(result.data, list):
+                return result
+            # 合并、复用的结果是共享的，筛选后生成新的响应
+            with tracing.span("response.select"):
+                blocks = select_blocks(result.data, options.data_min_score, options.data_max_blocks)
+                data = join_blocks(blocks) if options.data_format == OCRDataFormat.TEXT else blocks
+            return result.model_copy(update={"code": 100 if blocks else 101, "data": data if blocks else ""})
+    
+    async def _recognize(self, request: OCRRequest, context: RequestContext) -> OCRResponse:
+        """识别图片，启用近似重复查找时优先复用之前的结果"""
+        if self.near_duplicate is None:
+            return await self._recognize_with_engine(request, context)
+        
+        # 视觉上相同的图片直接复用之前的识别结果
+        with tracing.span("near_duplicate.fingerprint"):
+            fingerprint = await self.near_duplicate.fingerprint(request)
+        if fingerprint is None:
+            return await self._recognize_with_engine(request, context)
+        
+        cached = self.near_duplicate.lookup(fingerprint)
+        if cached is not None:
+            return cached
+        
+        result = await self._recognize_with_engine(request, context)
+        self.near_duplicate.store(fingerprint, result)
+        return result
+    
+    async def _recognize_with_engine(self, request: OCRRequest, context: RequestContext) -> OCRResponse:
+        """根据请求选项选择OCR引擎，按优先级排队获得引擎槽位后进行识别"""
         # 确定使用的OCR引擎
         engine = OCREngine.UMI_OCR  # 默认使用Umi-OCR
         if request.options and request.options.ocr_engine:
             engine = request.options.ocr_engine
         
-        logger.info(f"使用OCR引擎: {engine}")
+        logger.debug("使用OCR引擎: %s，优先级: %s，客户端: %s", engine, context.priority, context.client_id)
         
-        # 根据引擎类型调用相应的服务
-        if engine == OCREngine.PADDLEOCR:
-            return await self._recognize_with_paddleocr(request)
-        else:
-            return await self._recognize_with_umi_ocr(request)
+        if self.memory_budget is None:
+            return await self._recognize_in_slot(request, context, engine)
+        
+        # 合并、复用的请求不再解码，只有实际调用引擎的请求预留内存；在排队获得引擎槽位之前预留，等待内存时不占用槽位
+        nbytes = self._estimate_memory(request, engine)
+        queued = tracing.now()
+        async with self.memory_budget.reserve(nbytes):
+            tracing.record_span("memory.wait", queued, bytes=nbytes)
+            return await self._recognize_in_slot(request, context, engine)
+    
+    async def _recognize_in_slot(self, request: OCRRequest, context: RequestContext, engine: OCREngine) -> OCRResponse:
+        """按优先级排队获得引擎槽位后调用引擎"""
+        queued = tracing.now()
+        async with self._scheduler(engine).slot(context.priority, context.client_id):
+            tracing.record_span("scheduler.wait", queued, engine=engine.value, priority=context.priority)
+            try:
+                # 根据引擎类型调用相应的服务
+                with tracing.span(f"engine.{engine.value}"):
+                    if engine == OCREngine.PADDLEOCR:
+                        return await self._recognize_with_paddleocr(request)
+                    else:
+                        return await self._recognize_with_umi_ocr(request, context)
+            except asyncio.CancelledError:
+                # 客户端断开或超过时限：上游调用被中止，尚未开始的分块/区域不再识别
+                self.cancelled_in_flight += 1
+                raise
+    
+    def _estimate_memory(self, request: OCRRequest, engine: OCREngine) -> int:
+        """
+        预估识别占用的内存：PaddleOCR和Umi-OCR区域识别在本进程解码图片，按图片头中的宽高计算像素数据；
+        其余情况图片由Umi-OCR解码，只计算base64副本
+        """
+        decoded = engine == OCREngine.PADDLEOCR or (request.options is not None and request.options.ocr_regions is not None)
+        size = None
+        if decoded:
+            size = read_image_size(request.image) if request.image is not None else read_base64_image_size(request.base64)
+        return estimate_bytes(request.base64_length(), size, settings.memory_bytes_per_pixel)
+    
+    def _scheduler(self, engine: OCREngine) -> PriorityScheduler:
+        """获取引擎的优先级调度器，并发槽位数与引擎的并发能力一致"""
+        scheduler = self.schedulers.get(engine)
+        if scheduler is None:
+            if engine == OCREngine.PADDLEOCR:
+                capacity = paddleocr_service.workers
+            else:
+                capacity = settings.umi_ocr_concurrency
+            scheduler = PriorityScheduler(engine.value, capacity, settings.priority_weights,
+                                          settings.priority_reserved)
+            self.schedulers[engine] = scheduler
+        return scheduler
+    
+    def record_abandoned(self, reason: str):
+        """记录一次被放弃的请求，reason为disconnect（客户端断开）或deadline（超过时限）"""
+        self.abandoned[reason] += 1
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """服务运行指标：各引擎调度器的排队情况与分优先级延迟，被放弃的请求及节省的工作，客户端限流状态，请求合并与近似重复复用的命中情况"""
+        metrics: Dict[str, Any] = {
+            "scheduler": {engine.value: scheduler.stats() for engine, scheduler in self.schedulers.items()},
+            "abandoned": {
+                **self.abandoned,
+                # 还在排队就被丢弃、没有占用引擎的请求数
+                "dropped_before_start": sum(
+                    stats["dropped"]
+                    for scheduler in self.schedulers.values()
+                    for stats in scheduler.stats()["classes"].values()
+                ),
+                # 引擎调用进行到一半被取消的请求数
+                "cancelled_in_flight": self.cancelled_in_flight
+            }
+        }
+        if self.rate_limiter is not None:
+            metrics["rate_limit"] = self.rate_limiter.stats()
+        if self.memory_budget is not None:
+            metrics["memory"] = self.memory_budget.stats()
+        if self.coalescer is not None:
+            metrics["single_flight"] = {
+                "in_flight": len(self.coalescer.flights),
+                "shared": self.coalescer.flights.shared
+            }
+        if self.near_duplicate is not None:
+            cache = self.near_duplicate.cache
+            metrics["near_duplicate"] = {"size": len(cache), "hits": cache.hits, "misses": cache.misses,
+                                         "rejected": cache.rejected}
+        return metrics
     
     async def _recognize_with_paddleocr(self, request: OCRRequest) -> OCRResponse:
         """使用PaddleOCR进行识别"""
@@ -49,18 +215,34 @@ class OCRService:
                 # 重新初始化PaddleOCR服务以使用指定设备
                 global paddleocr_service
                 if paddleocr_service.device != request.options.paddleocr_device:
-                    logger.info(f"重新初始化PaddleOCR，使用设备: {request.options.paddleocr_device}")
+                    logger.info(f"重新初始化PaddleOCR，使用设备: {request.options.paddleocr_device}，"
+                                f"旧服务上进行中的识别: {paddleocr_service.active}")
                     from services.paddleocr_service import PaddleOCRService
+                    previous = paddleocr_service
                     paddleocr_service = PaddleOCRService(device=request.options.paddleocr_device)
+                    # 旧服务上进行中的识别结束后才停止它的推理进程（借出中的实例归还后一并停止）
+                    previous.close()
+                    scheduler = self.schedulers.get(OCREngine.PADDLEOCR)
+                    if scheduler is not None:
+                        scheduler.resize(paddleocr_service.workers)
+            
+            # PaddleOCR没有排版解析，指定了tbpu.parser时在服务内按阅读顺序排列
+            parser = request.options.tbpu_parser if request.options else None
+            if parser:
+                check_parser(parser)
             
             # 调用PaddleOCR服务
-            result = await paddleocr_service.recognize_image(request.base64)
+            result = await paddleocr_service.recognize_image(request.image_bytes(), request.options)
+            
+            if parser and result.code == 100 and isinstance(result.data, list):
+                with tracing.span("layout.parse", parser=parser, blocks=len(result.data)):
+                    result.data = parse_layout(result.data, parser)
             
             # 如果请求的是纯文本格式且识别成功，转换为纯文本
             if (request.options and request.options.data_format and 
                 request.options.data_format.value == "text" and result.code == 100):
                 if isinstance(result.data, list):
-                    merged_text = " ".join([block.text for block in result.data])
+                    merged_text = layout_text(result.data) if parser else " ".join([block.text for block in result.data])
                     result.data = merged_text
             
             return result
@@ -74,8 +256,102 @@ class OCRService:
                 timestamp=0.0
             )
     
-    async def _recognize_with_umi_ocr(self, request: OCRRequest) -> OCRResponse:
-        """使用Umi-OCR进行识别"""
+    async def _recognize_regions_with_umi_ocr(self, request: OCRRequest, context: RequestContext) -> OCRResponse:
+        """
+        使用Umi-OCR只识别调用方指定的区域
+        
+        Umi-OCR每次请求只接受一张图片，没有批量接口：解码、裁剪和编码在线程池中一次完成（PNG使用最快的压缩级别），
+        各区域再逐个发送给Umi-OCR（Umi-OCR串行识别，并发发送不会更快，还会绕过调度器的并发限制），
+        识别结果平移回原图坐标后按区域顺序拼接
+        """
+        import time
+        start_time = time.time()
+        
+        loop = asyncio.get_running_loop()
+        crops = await loop.run_in_executor(None, _encode_regions, request.image_bytes(), request.options.ocr_regions)
+        logger.debug("Umi-OCR区域识别: 区域数 %d", len(crops))
+        
+        # 区域识别需要坐标信息来换算，上游统一使用dict格式，纯文本由调用方按需拼接
+        region_options = request.options.model_copy(update={
+            "ocr_regions": None,
+            "data_format": OCRDataFormat.DICT
+        })
+        
+        text_blocks = []
+        for (x0, y0, _, _), crop in crops:
+            options = region_options
+            if region_options.tbpu_ignoreArea:
+                # 忽略区域使用原图坐标，需要换算到区域坐标
+                options = region_options.model_copy(update={"tbpu_ignoreArea": [
+                    [[point[0] - x0, point[1] - y0] for point in area]
+                    for area in region_options.tbpu_ignoreArea
+                ]})
+            region_request = OCRRequest.from_image(crop, options)
+            result = await self._recognize_with_umi_ocr(region_request, context)
+            
+            # 101表示区域内没有文字
+            if result.code == 101:
+                continue
+            if result.code != 100 or not isinstance(result.data, list):
+                return result
+            text_blocks.extend(translate_blocks(result.data, x0, y0))
+        
+        return OCRResponse(
+            code=100 if text_blocks else 101,
+            data=text_blocks if text_blocks else "",
+            time=time.time() - start_time,
+            timestamp=start_time
+        )
+    
+    async def _recognize_with_local_layout(self, request: OCRRequest, context: RequestContext) -> OCRResponse:
+        """
+        Umi-OCR只识别文字（tbpu.parser为none、dict格式），排版解析在服务内完成
+        
+        与PaddleOCR使用同一个排版解析实现，两个引擎的阅读顺序和换行规则一致
+        """
+        options = request.options
+        check_parser(options.tbpu_parser)
+        upstream = request.model_copy(update={"options": options.model_copy(update={
+            "tbpu_parser": "none",
+            "data_format": OCRDataFormat.DICT
+        })})
+        result = await self._recognize_with_umi_ocr(upstream, context)
+        if result.code != 100 or not isinstance(result.data, list):
+            return result
+        
+        blocks = parse_layout(result.data, options.tbpu_parser)
+        result.data = layout_text(blocks) if options.data_format == OCRDataFormat.TEXT else blocks
+        return result
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """获取调用Umi-OCR的异步HTTP客户端"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+    
+    @staticmethod
+    def _umi_ocr_body(image: ImageData, options: Optional[Dict[str, Any]]) -> bytes:
+        """由图片字节拼接Umi-OCR的JSON请求体（base64字符不需要转义）"""
+        parts = [b'{"base64":"', base64.b64encode(image), b'"']
+        if options:
+            parts += [b',"options":', json.dumps(options, ensure_ascii=False).encode("utf-8")]
+        parts.append(b"}")
+        return b"".join(parts)
+    
+    async def _recognize_with_umi_ocr(self, request: OCRRequest, context: RequestContext) -> OCRResponse:
+        """
+        使用Umi-OCR进行识别
+        
+        上游调用的超时时间为请求的剩余时限；请求被取消时（客户端断开或超过时限）连接随之关闭，不再等待上游结果
+        """
+        if request.options and request.options.ocr_regions is not None:
+            return await self._recognize_regions_with_umi_ocr(request, context)
+        if settings.umi_local_layout and request.options and request.options.tbpu_parser not in (None, "none"):
+            return await self._recognize_with_local_layout(request, context)
+        
+        # 超过时限的请求不再调用上游
+        timeout = context.timeout(self.timeout)
+        
         try:
             # 构建请求数据
             payload = {
@@ -88,34 +364,44 @@ class OCRService:
                 if options_dict:
                     payload["options"] = options_dict
             
-            logger.info(f"调用Umi-OCR服务: {self.ocr_url}")
-            logger.debug(f"请求数据: base64长度={len(request.base64)}, options={payload.get('options', {})}")
+            logger.debug("调用Umi-OCR服务: %s", self.ocr_url)
+            logger.debug("请求数据: base64长度=%d, options=%s", request.base64_length(), payload.get("options", {}))
             
-            # 发送请求
-            response = requests.post(
-                self.ocr_url,
-                json=payload,
-                timeout=self.timeout,
-                headers={"Content-Type": "application/json"}
-            )
+            if request.image is not None:
+                # 已解码的图片：编码后直接拼接请求体，不生成base64字符串和JSON序列化的副本
+                body = {"content": self._umi_ocr_body(request.image, payload.get("options"))}
+            else:
+                body = {"json": payload}
+            
+            # 发送请求（带上traceparent，Umi-OCR一侧的日志或追踪可以与本次请求关联）
+            with tracing.span("umi_ocr.request", kind=tracing.SPAN_KIND_CLIENT, **{"http.url": self.ocr_url}) as span:
+                response = await self._http_client().post(
+                    self.ocr_url,
+                    **body,
+                    timeout=timeout,
+                    headers={"Content-Type": "application/json", **tracing.propagation_headers()}
+                )
+                span.set(**{"http.status_code": response.status_code})
             
             # 检查HTTP状态
             response.raise_for_status()
             
-            # 解析响应
-            result_dict = response.json()
-            logger.info(f"Umi-OCR服务响应成功，状态码: {result_dict.get('code')}")
+            # 解析响应并转换为OCRResponse对象
+            with tracing.span("umi_ocr.convert"):
+                result_dict = response.json()
+                logger.debug("Umi-OCR服务响应成功，状态码: %s", result_dict.get("code"))
+                return self._convert_response(result_dict)
             
-            # 转换为OCRResponse对象
-            return self._convert_response(result_dict)
-            
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
+            if context.deadline is not None and timeout < self.timeout:
+                logger.warning(f"Umi-OCR服务调用超过请求时限（{timeout:.2f}秒）")
+                raise DeadlineExceeded("请求已超过处理时限")
             logger.error("Umi-OCR服务请求超时")
             raise Exception("OCR服务请求超时")
-        except requests.exceptions.ConnectionError:
+        except httpx.TransportError:
             logger.error("无法连接到Umi-OCR服务")
             raise Exception("无法连接到OCR服务，请确保OCR服务正在运行")
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logger.error(f"Umi-OCR服务HTTP错误: {e}")
             raise Exception(f"OCR服务HTTP错误: {e}")
         except json.JSONDecodeError as e:
@@ -207,7 +493,7 @@ class OCRService:
             url = self.ocr_url.replace("/api/ocr", "/api/ocr/get_options")
             logger.info(f"获取OCR参数选项: {url}")
             
-            response = requests.get(url, timeout=self.timeout)
+            response = await self._http_client().get(url, timeout=self.timeout)
             response.raise_for_status()
             
             options_dict = response.json()
@@ -217,6 +503,17 @@ class OCRService:
         except Exception as e:
             logger.error(f"获取OCR参数选项失败: {e}")
             raise Exception(f"获取OCR参数选项失败: {e}")
+    
+    def close(self):
+        """释放引擎资源（停止PaddleOCR推理进程池）"""
+        paddleocr_service.close()
+    
+    async def aclose(self):
+        """关闭调用Umi-OCR的HTTP客户端并释放引擎资源"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self.close()
 
 
 # 创建全局OCR服务实例
@@ -1,121 +1,159 @@
+import asyncio
+import contextvars
 import logging
 import base64
-import io
-from typing import Dict, Any, Optional
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union
 from PIL import Image
 import numpy as np
-from models.ocr_models import OCRResponse, OCRTextBlock
+from config import settings
+from models.ocr_models import ImageData, OCRResponse, OCRTextBlock, OCROptions
+from services.inference_pool import create_process_engines, in_inference_worker
+from services.paddleocr_engine import create_paddleocr_engine
+from services import tracing
+from utils.image_utils import open_buffer
+from utils.predictions import prediction_blocks
+from utils.regions import clip_regions, translate_blocks
+from utils.tiling import compute_tiles, merge_tile_blocks
 
 logger = logging.getLogger(__name__)
 
 
-def _configure_paddleocr_logging():
-    """配置PaddleOCR的日志，防止覆盖应用日志"""
-    # 设置PaddleOCR相关的日志级别为WARNING，减少输出噪音
-    paddleocr_loggers = [
-        'paddleocr',
-        'paddle',
-        'ppocr',
-        'paddle.utils',
-        'paddleocr.tools'
-    ]
-    
-    for logger_name in paddleocr_loggers:
-        try:
-            paddle_logger = logging.getLogger(logger_name)
-            paddle_logger.setLevel(logging.WARNING)
-            # 防止日志传播到根记录器
-            paddle_logger.propagate = False
-        except:
-            pass
-    
-    # 确保根记录器的格式正确
-    root_logger = logging.getLogger()
-    if not root_logger.handlers:
-        # 如果没有处理器，添加一个控制台处理器
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        root_logger.addHandler(handler)
-        root_logger.setLevel(logging.INFO)
-
-
 class PaddleOCRService:
     """PaddleOCR服务类"""
     
-    def __init__(self, device: str = "gpu"):
+    def __init__(self, device: str = "gpu", workers: Optional[int] = None, processes: Optional[int] = None):
         """
         初始化PaddleOCR服务
         
         Args:
             device: 设备类型，"gpu"或"cpu"
+            workers: 引擎执行器并发数，每个并发持有一个独立的模型实例（默认读取配置）
+            processes: 推理进程数，大于0时模型实例运行在独立的工作进程中，覆盖workers（默认读取配置）
         """
         self.device = device
+        self.processes = max(0, settings.paddleocr_processes if processes is None else processes)
+        self.workers = self.processes or max(1, workers or settings.paddleocr_workers)
         self.ocr = None
-        self._initialize_ocr()
+        # 空闲的模型实例，PaddleOCR实例不是线程安全的，每次推理独占一个实例
+        self._engines: "queue.Queue" = queue.Queue()
+        # 进行中的识别数，以及是否已请求关闭：关闭时还有识别在进行，则等最后一个识别结束后再停止
+        self._active = 0
+        self._closing = False
+        self._closed = False
+        if self.processes:
+            self._initialize_process_pool()
+        else:
+            self._initialize_ocr()
+            for _ in range(self.workers - 1):
+                self._engines.put(self._create_engine())
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="paddleocr")
     
     def _initialize_ocr(self):
         """初始化PaddleOCR实例"""
-        try:
-            # 在初始化PaddleOCR前配置日志
-            _configure_paddleocr_logging()
-            
-            from paddleocr import PaddleOCR
-            
-            # 临时设置环境变量来控制PaddleOCR的日志
-            import os
-            os.environ['FLAGS_logtostderr'] = '0'  # 禁用PaddlePaddle的日志输出
-            os.environ['FLAGS_verbosity'] = '0'     # 设置详细级别为0
-            
-            self.ocr = PaddleOCR(
-                use_doc_orientation_classify=False,
-                use_doc_unwarping=False,
-                use_textline_orientation=False,
-                device=self.device,
-                det_limit_side_len=1024*8,
-            )
-            logger.info(f"PaddleOCR初始化成功，使用设备: {self.device}")
-            
-            # 初始化后重新配置应用日志，确保格式正确
-            _configure_paddleocr_logging()
-            
-        except ImportError:
-            logger.error("PaddleOCR未安装，请运行: pip install paddleocr")
-            raise Exception("PaddleOCR未安装")
-        except Exception as e:
-            logger.error(f"PaddleOCR初始化失败: {e}")
-            raise Exception(f"PaddleOCR初始化失败: {e}")
+        self.ocr = self._create_engine()
+        self._engines.put(self.ocr)
+    
+    def _initialize_process_pool(self):
+        """
+        启动推理进程池
+        
+        每个工作进程常驻并持有一个模型实例，CPU推理可以利用多个核心而不受GIL限制；
+        进程代理对象与模型实例接口相同，放入同一个实例队列，由执行器线程借用
+        """
+        engines = create_process_engines(self.device, self.processes)
+        logger.info(f"PaddleOCR推理进程池已启动，进程数: {self.processes}，使用设备: {self.device}")
+        self.ocr = engines[0]
+        for engine in engines:
+            self._engines.put(engine)
+    
+    def _create_engine(self):
+        """创建一个PaddleOCR模型实例"""
+        return create_paddleocr_engine(self.device)
+    
+    def close(self):
+        """
+        停止引擎执行器和推理进程池
+        
+        还有识别在进行时（例如切换设备时旧服务上的请求）只标记为关闭，等最后一个识别结束、
+        借出的模型实例全部归还后再停止，避免借出中的推理进程被遗漏
+        """
+        self._closing = True
+        if not self._active:
+            self._shutdown()
+    
+    def _shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=False)
+        if not self.processes:
+            return
+        stopped = 0
+        while True:
+            try:
+                self._engines.get_nowait().stop()
+                stopped += 1
+            except queue.Empty:
+                break
+        logger.info(f"PaddleOCR推理进程池已停止，进程数: {stopped}，设备: {self.device}")
+    
+    @property
+    def active(self) -> int:
+        """进行中的识别数"""
+        return self._active
     
-    async def recognize_image(self, base64_image: str) -> OCRResponse:
+    async def recognize_image(self, image_data: Union[str, ImageData], options: Optional[OCROptions] = None) -> OCRResponse:
         """
         使用PaddleOCR识别图片
         
         Args:
-            base64_image: Base64编码的图片数据
+            image_data: Base64编码的图片数据，或已解码的图片字节
+            options: OCR识别选项（可选，用于分块识别等）
             
         Returns:
             OCRResponse: OCR识别结果
         """
+        # 计入进行中的识别：识别结束时推理都已完成（取消时也等待执行中的推理结束），模型实例已归还
+        self._active += 1
+        try:
+            return await self._recognize_image(image_data, options)
+        finally:
+            self._active -= 1
+            if self._closing and not self._active:
+                self._shutdown()
+    
+    async def _recognize_image(self, image_data: Union[str, ImageData], options: Optional[OCROptions]) -> OCRResponse:
+        """识别图片（recognize_image的实现）"""
         import time
         start_time = time.time()
         
         try:
-            # 解码base64图片
-            image = self._decode_base64_image(base64_image)
+            # 解码图片
+            with tracing.span("image.decode") as span:
+                image = self._decode_image(image_data)
+                span.set(width=image.shape[1], height=image.shape[0])
             
-            # 执行OCR识别
-            result = self.ocr.predict(input=image)
-            
-            # 处理识别结果
-            text_blocks = self._process_result(result)
-            merged_text = " ".join([block.text for block in text_blocks])
+            # 执行OCR识别：指定了识别区域时只识别这些区域，
+            # 设置了分块边长且图片超过分块大小时使用分块识别
+            tile_size = options.ocr_tile_size if options else None
+            if options and options.ocr_regions is not None:
+                text_blocks = await self._recognize_regions(image, options.ocr_regions)
+            elif tile_size and max(image.shape[:2]) > tile_size:
+                tile_overlap = options.ocr_tile_overlap
+                if tile_overlap is None:
+                    tile_overlap = min(settings.tile_overlap, tile_size // 2)
+                text_blocks = await self._recognize_tiled(image, tile_size, tile_overlap)
+            else:
+                result = await self._run_predict(image)
+                with tracing.span("paddleocr.convert"):
+                    text_blocks = self._process_result(result)
             
             # 计算耗时
             processing_time = time.time() - start_time
             
-            logger.info(f"PaddleOCR识别完成，耗时: {processing_time:.2f}秒，文本块数量: {len(text_blocks)}")
+            logger.debug("PaddleOCR识别完成，耗时: %.2f秒，文本块数量: %d", processing_time, len(text_blocks))
             
             # 返回统一格式的响应
             return OCRResponse(
@@ -134,26 +172,126 @@ class PaddleOCRService:
                 timestamp=start_time
             )
     
-    def _decode_base64_image(self, base64_string: str) -> np.ndarray:
+    def _predict(self, image):
+        """在执行器线程中独占一个模型实例执行推理，image为单张图片或图片列表"""
+        # 推理进程模式下切片视图在写入共享内存时完成复制，不需要先转换为连续数组
+        if not self.processes:
+            if isinstance(image, list):
+                image = [np.ascontiguousarray(item) for item in image]
+            else:
+                image = np.ascontiguousarray(image)
+        
+        # 执行器线程中的当前span是提交时的paddleocr.executor，从提交到开始执行的时间即为排队时间
+        parent = tracing.current_span()
+        if parent is not None:
+            tracing.record_span("paddleocr.queue_wait", parent.start)
+        
+        engine = self._engines.get()
+        try:
+            with tracing.span("paddleocr.predict", batch=len(image) if isinstance(image, list) else 1):
+                return engine.predict(input=image)
+        finally:
+            self._engines.put(engine)
+    
+    async def _run_predict(self, image):
+        """
+        将推理提交到引擎执行器，避免阻塞事件循环
+        
+        请求被取消时，还在执行器队列中的推理直接取消；已经开始的推理无法中断，
+        等待其结束后再向上传递取消，保证调度器的槽位数与实际占用的模型实例一致
+        """
+        with tracing.span("paddleocr.executor"):
+            # 复制上下文，执行器线程中记录的span挂在本次请求的追踪下
+            future = self._executor.submit(contextvars.copy_context().run, self._predict, image)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    await asyncio.wait([asyncio.wrap_future(future)])
+                raise
+    
+    async def _recognize_tiled(self, image: np.ndarray, tile_size: int, tile_overlap: int) -> List[OCRTextBlock]:
+        """
+        分块识别大图
+        
+        各分块通过引擎执行器并行识别，识别结果平移回整图坐标并对接缝处的重复文本块去重
+        
+        Args:
+            image: 图片数组
+            tile_size: 分块边长
+            tile_overlap: 相邻分块的重叠宽度
+            
+        Returns:
+            List[OCRTextBlock]: 整图坐标下的文本块列表
+        """
+        height, width = image.shape[:2]
+        tiles = compute_tiles(width, height, tile_size, tile_overlap)
+        logger.debug("PaddleOCR分块识别: 图片尺寸 %dx%d，分块数 %d，分块边长 %d，重叠 %d",
+                     width, height, len(tiles), tile_size, tile_overlap)
+        
+        # 分块为原图的切片视图，不复制像素数据
+        results = await asyncio.gather(*[
+            self._run_predict(image[y0:y1, x0:x1]) for (x0, y0, x1, y1), _ in tiles
+        ])
+        
+        with tracing.span("tiles.merge", tiles=len(tiles)):
+            return merge_tile_blocks([
+                (tile, self._process_result(result)) for tile, result in zip(tiles, results)
+            ])
+    
+    async def _recognize_regions(self, image: np.ndarray, regions: List[List[List[int]]]) -> List[OCRTextBlock]:
+        """
+        只识别调用方指定的区域
+        
+        各区域以切片视图的方式从原图中截取（不复制像素数据），作为一个批次提交给引擎，
+        识别结果平移回原图坐标后按区域顺序拼接
+        
+        Args:
+            image: 图片数组
+            regions: 识别区域列表，每一项为 [[左上角x,y],[右下角x,y]]
+            
+        Returns:
+            List[OCRTextBlock]: 原图坐标下的文本块列表
+        """
+        height, width = image.shape[:2]
+        boxes = clip_regions(regions, width, height)
+        if not boxes:
+            return []
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PaddleOCR区域识别: 区域数 %d，识别面积占比 %.1f%%", len(boxes),
+                         sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes) / (width * height) * 100)
+        
+        results = await self._run_predict([image[y0:y1, x0:x1] for x0, y0, x1, y1 in boxes])
+        
+        text_blocks = []
+        with tracing.span("paddleocr.convert", regions=len(boxes)):
+            for (x0, y0, _, _), result in zip(boxes, results):
+                # 转换结果时直接平移到原图坐标
+                text_blocks.extend(self._process_result([result], x0, y0))
+        return text_blocks
+    
+    def _decode_image(self, image_data: Union[str, ImageData]) -> np.ndarray:
         """
-        解码base64图片为numpy数组
+        解码图片为numpy数组
         
         Args:
-            base64_string: Base64编码的图片数据
+            image_data: Base64编码的图片数据，或已解码的图片字节
             
         Returns:
             np.ndarray: 图片数组
         """
         try:
-            # 清理base64字符串（移除可能的前缀）
-            if base64_string.startswith('data:image'):
-                base64_string = base64_string.split(',')[1]
-            
-            # 解码base64
-            image_data = base64.b64decode(base64_string)
+            if isinstance(image_data, str):
+                # 清理base64字符串（移除可能的前缀）
+                if image_data.startswith('data:image'):
+                    image_data = image_data.split(',')[1]
+                
+                # 解码base64
+                image_data = base64.b64decode(image_data)
             
-            # 转换为PIL Image
-            image = Image.open(io.BytesIO(image_data))
+            # 转换为PIL Image（不复制已解码的图片缓冲区）
+            image = Image.open(open_buffer(image_data))
             
             # 转换为RGB格式（如果需要）
             if image.mode != 'RGB':
@@ -168,12 +306,14 @@ class PaddleOCRService:
             logger.error(f"Base64图片解码失败: {e}")
             raise Exception(f"Base64图片解码失败: {e}")
     
-    def _process_result(self, result) -> list:
+    def _process_result(self, result, dx: int = 0, dy: int = 0) -> list:
         """
         处理PaddleOCR的识别结果
         
         Args:
             result: PaddleOCR返回的原始结果
+            dx: 文本框x坐标的平移量（区域识别时为区域左上角）
+            dy: 文本框y坐标的平移量
             
         Returns:
             list: OCRTextBlock对象列表
@@ -182,25 +322,16 @@ class PaddleOCRService:
         
         try:
             for res in result:
-                # 尝试获取文本内容
-                text = getattr(res, "rec_text", None)
+                # PaddleOCR 3.x：每张图片一个结果，整页的文本、置信度、文本框一次性转换
+                if isinstance(res, dict) and "rec_texts" in res:
+                    text_blocks.extend(prediction_blocks(res, dx, dy))
+                    continue
                 
+                # 旧结构：每个文本行一个结果
+                text = getattr(res, "rec_text", None)
                 if text is None and isinstance(res, dict):
                     text = res.get("rec_text")
-                
                 if text is None:
-                    # 回退到旧结构
-                    if isinstance(res, dict):
-                        recs = res.get("rec_texts")
-                        if recs and isinstance(recs, list):
-                            for rec_text in recs:
-                                if rec_text:  # 只添加非空文本
-                                    text_blocks.append(OCRTextBlock(
-                                        text=rec_text,
-                                        score=1.0,  # 默认置信度
-                                        box=[],    # PaddleOCR示例中没有坐标信息
-                                        end=" "    # 使用空格作为分隔符
-                                    ))
                     continue
                 
                 # 获取置信度
@@ -218,12 +349,13 @@ class PaddleOCRService:
                     box = []
                 
                 # 创建文本块
-                text_blocks.append(OCRTextBlock(
+                block = OCRTextBlock(
                     text=text,
                     score=float(score),
                     box=box,
                     end=" "  # 使用空格作为分隔符
-                ))
+                )
+                text_blocks.extend(translate_blocks([block], dx, dy) if dx or dy else [block])
                 
         except Exception as e:
             logger.error(f"处理PaddleOCR结果失败: {e}")
@@ -266,4 +398,5 @@ class PaddleOCRService:
 
 
 # 创建全局PaddleOCR服务实例
-paddleocr_service = PaddleOCRService()
+# 推理工作进程以spawn方式启动时会重新导入主模块，工作进程中不创建服务实例，避免重复加载模型
+paddleocr_service = None if in_inference_worker() else PaddleOCRService()
@@ -0,0 +1,228 @@
+"""
+按客户端限流
+每个客户端（API密钥，未提供时为客户端IP）各有两个令牌桶：请求数和图片百万像素数，
+防止单个客户端占满引擎容量；状态保存在进程内，每次检查都是O(1)
+"""
+
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Container, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def client_label(api_key: str) -> str:
+    """API密钥对应的客户端标识（哈希后的密钥，避免在日志和指标中暴露密钥）"""
+    return "key:" + hashlib.blake2b(api_key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def resolve_client_id(api_key: Optional[str], host: Optional[str], known_keys: Container[str]) -> str:
+    """
+    请求的客户端标识
+
+    X-API-Key 没有经过认证，任何客户端都可以随意填写；只有 OCR_RATE_LIMIT_KEYS 中配置的密钥按密钥区分，
+    其他密钥按客户端IP区分，否则每次换一个密钥就能得到一个新的令牌桶，绕过默认的限流速率
+
+    Args:
+        api_key: 请求头 X-API-Key
+        host: 客户端IP
+        known_keys: 单独配置了速率的API密钥
+
+    Returns:
+        str: 客户端标识，key:<哈希>、ip:<地址> 或 anonymous
+    """
+    if api_key and api_key in known_keys:
+        return client_label(api_key)
+    if host:
+        return f"ip:{host}"
+    return "anonymous"
+
+
+@dataclass(frozen=True)
+class ClientLimits:
+    """一个客户端的限流速率与突发容量，速率为0表示不限制"""
+
+    requests_per_second: float = 0
+    request_burst: float = 0
+    megapixels_per_second: float = 0
+    megapixel_burst: float = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests_per_second": self.requests_per_second,
+            "request_burst": self.request_burst,
+            "megapixels_per_second": self.megapixels_per_second,
+            "megapixel_burst": self.megapixel_burst,
+        }
+
+
+def _burst(rate: float, burst: float) -> float:
+    """突发容量未指定时等于1秒的速率，至少为1"""
+    return burst if burst > 0 else max(1.0, rate)
+
+
+def make_limits(requests_per_second: float, megapixels_per_second: float,
+                request_burst: float = 0, megapixel_burst: float = 0) -> ClientLimits:
+    """创建限流配置，补全未指定的突发容量"""
+    return ClientLimits(
+        requests_per_second=requests_per_second,
+        request_burst=_burst(requests_per_second, request_burst) if requests_per_second > 0 else 0,
+        megapixels_per_second=megapixels_per_second,
+        megapixel_burst=_burst(megapixels_per_second, megapixel_burst) if megapixels_per_second > 0 else 0,
+    )
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    不使用定时器补充令牌，每次检查时按距离上次更新的时间一次性补充
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """还需要等待多少秒才有足够的令牌（调用前先refill）"""
+        # 超过桶容量的请求（例如一张特别大的图片）在桶满时放行，否则永远无法通过
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _ClientState:
+    """一个客户端的令牌桶与计数"""
+
+    __slots__ = ("limits", "requests", "megapixels", "admitted", "rejected", "admitted_megapixels")
+
+    def __init__(self, limits: ClientLimits, now: float):
+        self.limits = limits
+        self.requests = (TokenBucket(limits.requests_per_second, limits.request_burst, now)
+                         if limits.requests_per_second > 0 else None)
+        self.megapixels = (TokenBucket(limits.megapixels_per_second, limits.megapixel_burst, now)
+                           if limits.megapixels_per_second > 0 else None)
+        self.admitted = 0
+        self.rejected = 0
+        self.admitted_megapixels = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "request_tokens": round(self.requests.tokens, 3) if self.requests else None,
+            "megapixel_tokens": round(self.megapixels.tokens, 3) if self.megapixels else None,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "admitted_megapixels": round(self.admitted_megapixels, 3),
+        }
+
+
+class RateLimiter:
+    """按客户端的请求数与百万像素数令牌桶限流"""
+
+    def __init__(self, default: ClientLimits, overrides: Optional[Dict[str, ClientLimits]] = None,
+                 max_clients: int = 4096):
+        """
+        初始化限流器
+
+        Args:
+            default: 默认的客户端限流配置
+            overrides: 按客户端标识单独指定的限流配置
+            max_clients: 最多跟踪的客户端数量，超过后淘汰最久未出现的客户端
+        """
+        self.default = default
+        self.overrides = dict(overrides or {})
+        self.max_clients = max(1, max_clients)
+        self._clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self.rejected = 0
+
+    def _state(self, client_id: str, now: float) -> _ClientState:
+        state = self._clients.get(client_id)
+        if state is None:
+            state = _ClientState(self.overrides.get(client_id, self.default), now)
+            self._clients[client_id] = state
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client_id)
+        return state
+
+    def acquire(self, client_id: str, megapixels: float = 0.0) -> float:
+        """
+        为一次识别请求扣除令牌
+
+        Args:
+            client_id: 客户端标识
+            megapixels: 图片的百万像素数（未知时为0，只计请求数）
+
+        Returns:
+            float: 0表示放行；大于0表示被限流，为建议的重试等待秒数（被限流时不扣除任何令牌）
+        """
+        now = time.monotonic()
+        state = self._state(client_id, now)
+
+        wait = 0.0
+        for bucket, amount in ((state.requests, 1.0), (state.megapixels, megapixels)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount))
+        if wait > 0:
+            state.rejected += 1
+            self.rejected += 1
+            return wait
+
+        if state.requests is not None:
+            state.requests.take(1.0)
+        if state.megapixels is not None:
+            state.megapixels.take(megapixels)
+        state.admitted += 1
+        state.admitted_megapixels += megapixels
+        return 0.0
+
+    def stats(self) -> dict:
+        """当前的限流配置与各客户端的剩余令牌、放行/拒绝次数"""
+        return {
+            "default": self.default.to_dict(),
+            "overrides": {client_id: limits.to_dict() for client_id, limits in self.overrides.items()},
+            "rejected": self.rejected,
+            "clients": {client_id: state.stats() for client_id, state in self._clients.items()},
+        }
+
+
+def retry_after_header(wait: float) -> Dict[str, str]:
+    """被限流时的Retry-After响应头（整数秒，向上取整）"""
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
+
+
+def create_rate_limiter() -> Optional[RateLimiter]:
+    """根据配置创建限流器，没有配置任何限流速率时返回None"""
+    default = make_limits(settings.rate_limit_requests, settings.rate_limit_megapixels,
+                          settings.rate_limit_request_burst, settings.rate_limit_megapixel_burst)
+    # 单独配置的API密钥突发容量等于1秒的速率
+    overrides = {
+        client_label(api_key): make_limits(requests_rate, megapixels_rate)
+        for api_key, (requests_rate, megapixels_rate) in settings.rate_limit_keys.items()
+    }
+    if not overrides and default.requests_per_second <= 0 and default.megapixels_per_second <= 0:
+        return None
+    logger.info(f"启用客户端限流，默认每秒请求数: {default.requests_per_second}，"
+                f"每秒百万像素数: {default.megapixels_per_second}，单独配置的API密钥数: {len(overrides)}")
+    return RateLimiter(default, overrides, settings.rate_limit_max_clients)
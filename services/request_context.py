@@ -0,0 +1,46 @@
+"""
+请求上下文
+与识别结果无关、只影响调度方式的请求属性（来自请求头或选项），随请求传递给OCR服务
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from config import settings
+
+
+class DeadlineExceeded(Exception):
+    """请求超过处理时限"""
+
+
+@dataclass
+class RequestContext:
+    """识别请求的调度属性"""
+
+    # 优先级类别，决定在调度器中的权重和可用的预留槽位
+    priority: str = field(default_factory=lambda: settings.default_priority)
+    # 客户端标识（哈希后的API密钥或客户端IP），用于限流和同一优先级内的客户端间公平排队
+    client_id: str = "anonymous"
+    # 处理截止时间（time.monotonic()），None表示不限制
+    deadline: Optional[float] = None
+
+    def remaining(self) -> Optional[float]:
+        """距离截止时间的剩余秒数，不限制时返回None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def timeout(self, default: float) -> float:
+        """
+        上游调用的超时时间：剩余时限与默认超时中较小的一个
+
+        Raises:
+            DeadlineExceeded: 已经超过截止时间
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            raise DeadlineExceeded("请求已超过处理时限")
+        return min(default, remaining)
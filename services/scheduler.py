@@ -0,0 +1,227 @@
+"""
+优先级调度器
+在OCR引擎前按优先级类别分配并发槽位：各类别按权重公平分享空闲槽位，并可以为类别预留槽位，
+保证批量任务占满引擎时交互请求仍然能及时得到处理；同一类别内各客户端轮流获得槽位，
+一个客户端一次提交大量请求不会让其他客户端排在它的整批请求之后
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个类别保留的最近延迟样本数，用于计算分位数
+_LATENCY_WINDOW = 1024
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """已排序样本的分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _PriorityClass:
+    """一个优先级类别的调度状态与延迟统计"""
+
+    def __init__(self, name: str, weight: int, reserved: int):
+        self.name = name
+        self.weight = weight
+        self.reserved = reserved
+        # 按客户端分开的等待队列，按轮转顺序排列：队首客户端获得槽位后移到队尾
+        self.queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.queued = 0
+        self.running = 0
+        # 虚拟时间：每分配一个槽位增加 1/weight，总是优先调度虚拟时间最小的类别
+        self.vtime = 0.0
+        self.completed = 0
+        # 还在排队时就被取消（客户端断开或超过时限）的请求数，这些请求没有占用引擎
+        self.dropped = 0
+        self.wait_times: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.total_times: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_times)
+        totals = sorted(self.total_times)
+        return {
+            "weight": self.weight,
+            "reserved": self.reserved,
+            "running": self.running,
+            "queued": self.queued,
+            "queued_clients": len(self.queues),
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "wait_p50": round(_percentile(waits, 0.5), 4),
+            "wait_p95": round(_percentile(waits, 0.95), 4),
+            "latency_p50": round(_percentile(totals, 0.5), 4),
+            "latency_p95": round(_percentile(totals, 0.95), 4),
+            "latency_p99": round(_percentile(totals, 0.99), 4),
+        }
+
+    def push(self, client_id: str, waiter: asyncio.Future):
+        queue = self.queues.get(client_id)
+        if queue is None:
+            queue = self.queues[client_id] = deque()
+        queue.append(waiter)
+        self.queued += 1
+
+    def pop(self) -> asyncio.Future:
+        """取出轮到的客户端最早的等待请求"""
+        client_id, queue = next(iter(self.queues.items()))
+        waiter = queue.popleft()
+        if queue:
+            self.queues.move_to_end(client_id)
+        else:
+            del self.queues[client_id]
+        self.queued -= 1
+        return waiter
+
+    def remove(self, client_id: str, waiter: asyncio.Future):
+        """移除被取消的等待请求"""
+        queue = self.queues.get(client_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        self.queued -= 1
+        if not queue:
+            del self.queues[client_id]
+
+
+class PriorityScheduler:
+    """
+    加权公平的并发槽位调度器
+
+    - 每个类别可以使用自己的预留槽位，以及所有类别共享的剩余槽位
+    - 有多个类别在等待时，按虚拟时间（stride scheduling）选择，长期来看各类别获得的槽位与权重成正比
+    - 类别内部各客户端轮流获得槽位，同一客户端的请求按到达顺序处理
+    """
+
+    def __init__(self, name: str, capacity: int, weights: Dict[str, int], reserved: Optional[Dict[str, int]] = None):
+        """
+        初始化调度器
+
+        Args:
+            name: 调度器名称（用于日志和统计）
+            capacity: 并发槽位总数
+            weights: 各优先级类别的权重
+            reserved: 各类别预留的槽位数，预留总数最多为 capacity-1，保证至少有一个共享槽位
+        """
+        self.name = name
+        self._reserved = dict(reserved or {})
+        self._classes: Dict[str, _PriorityClass] = {
+            class_name: _PriorityClass(class_name, max(1, weight), 0) for class_name, weight in weights.items()
+        }
+        self._vclock = 0.0
+        self._set_capacity(capacity)
+
+    def _set_capacity(self, capacity: int):
+        """设置槽位总数，按配置重新分配各类别的预留槽位"""
+        self.capacity = max(1, capacity)
+        budget = self.capacity - 1
+        for class_name, priority_class in self._classes.items():
+            count = min(max(0, self._reserved.get(class_name, 0)), budget)
+            if count < self._reserved.get(class_name, 0):
+                logger.warning(f"调度器 {self.name} 的并发数为 {self.capacity}，类别 {class_name} 的预留槽位调整为 {count}")
+            budget -= count
+            priority_class.reserved = count
+        self.shared_capacity = self.capacity - sum(c.reserved for c in self._classes.values())
+
+    def resize(self, capacity: int):
+        """
+        调整槽位总数（引擎的并发能力变化时，例如切换设备后重新创建了PaddleOCR服务）
+
+        已经运行的请求不受影响；槽位减少时，运行数降到新的槽位数以下之前不再分配新的槽位
+        """
+        if max(1, capacity) == self.capacity:
+            return
+        logger.info(f"调度器 {self.name} 的并发数调整为 {max(1, capacity)}")
+        self._set_capacity(capacity)
+        self._dispatch()
+
+    @property
+    def classes(self) -> List[str]:
+        return list(self._classes)
+
+    def _shared_in_use(self) -> int:
+        return sum(max(0, c.running - c.reserved) for c in self._classes.values())
+
+    def _admissible(self, priority_class: _PriorityClass) -> bool:
+        """类别还有空闲的预留槽位，或者共享槽位未用完"""
+        if priority_class.running < priority_class.reserved:
+            return True
+        return self._shared_in_use() < self.shared_capacity
+
+    def _dispatch(self):
+        """把空闲槽位分配给等待中的请求"""
+        while True:
+            candidates = [c for c in self._classes.values() if c.queued and self._admissible(c)]
+            if not candidates:
+                return
+            chosen = min(candidates, key=lambda c: (c.vtime, -c.weight))
+            waiter = chosen.pop()
+            if waiter.done():
+                continue
+            chosen.running += 1
+            self._vclock = chosen.vtime
+            chosen.vtime += 1.0 / chosen.weight
+            waiter.set_result(None)
+
+    async def _acquire(self, priority_class: _PriorityClass, client_id: str):
+        if not priority_class.queued:
+            # 空闲后重新开始排队的类别从当前虚拟时间开始，不能用空闲期间积累的额度抢占其他类别
+            priority_class.vtime = max(priority_class.vtime, self._vclock)
+        waiter = asyncio.get_running_loop().create_future()
+        priority_class.push(client_id, waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经分配到槽位后才被取消，归还槽位
+                self._release(priority_class)
+            else:
+                priority_class.remove(client_id, waiter)
+                priority_class.dropped += 1
+            raise
+
+    def _release(self, priority_class: _PriorityClass):
+        priority_class.running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str, client_id: str = ""):
+        """
+        占用一个并发槽位，槽位不足时按优先级排队等待
+
+        Args:
+            priority: 优先级类别名称
+            client_id: 客户端标识，同一类别内各客户端轮流获得槽位
+        """
+        priority_class = self._classes[priority]
+        enqueued = time.monotonic()
+        await self._acquire(priority_class, client_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            priority_class.completed += 1
+            priority_class.wait_times.append(started - enqueued)
+            priority_class.total_times.append(finished - enqueued)
+            self._release(priority_class)
+
+    def stats(self) -> dict:
+        """调度器状态与各类别的延迟统计（秒）"""
+        return {
+            "capacity": self.capacity,
+            "shared_capacity": self.shared_capacity,
+            "classes": {name: c.stats() for name, c in self._classes.items()},
+        }
@@ -0,0 +1,133 @@
+"""
+相同请求合并（single-flight）
+并发到达的相同图片、相同选项的请求只执行一次识别，所有等待方共享同一个结果
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+from models.ocr_models import OCRRequest, OCRResponse
+
+logger = logging.getLogger(__name__)
+
+# 超过该长度的图片数据在线程池中计算哈希，避免阻塞事件循环
+_EXECUTOR_HASH_THRESHOLD = 1024 * 1024
+
+
+class _Flight:
+    """一次进行中的识别及其等待方数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并进行中的异步计算
+
+    第一个请求创建共享任务，后续相同键的请求只等待该任务。
+    等待方通过 asyncio.shield 等待，单个等待方被取消不会取消共享任务；
+    只有最后一个等待方也被取消时才取消共享任务，避免继续做没有人需要的工作。
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        # 合并到已有计算的请求数
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[OCRResponse]], lead: bool = True) -> OCRResponse:
+        """
+        执行或加入键为 key 的计算
+
+        Args:
+            key: 合并键，键相同的并发调用共享同一次计算
+            func: 没有进行中的计算时调用，返回要执行的协程
+            lead: 没有进行中的计算时是否发起共享计算；为False时只加入已有的计算，否则单独执行，
+                其他请求不会加入（计算使用的数据在调用方返回后失效时）
+
+        Returns:
+            OCRResponse: 共享的识别结果（加入方拿到的是结果副本）
+        """
+        flight = self._flights.get(key)
+        owner = flight is None
+        if owner and not lead:
+            return await func()
+        if owner:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.shared += 1
+            logger.debug("合并相同的进行中请求，当前等待数: %d", flight.waiters + 1)
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # 最后一个等待方离开，先移除记录，后续相同请求会重新发起计算而不是加入正在取消的任务
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+        # 调用方可能会修改结果（例如纯文本拼接），加入方拿到独立的副本
+        return result if owner else result.model_copy()
+
+    def _forget(self, key: str, flight: _Flight):
+        """移除已结束的计算记录（记录可能已经被新的计算替换）"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+def _request_key(request: OCRRequest) -> str:
+    """计算请求的合并键：图片数据哈希 + 识别选项"""
+    data = request.image if request.image is not None else request.base64.encode("ascii", "replace")
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    options_key = request.options.model_dump_json(by_alias=True) if request.options else ""
+    return f"{digest}:{options_key}"
+
+
+class RequestCoalescer:
+    """在OCR服务入口合并相同的并发请求"""
+
+    def __init__(self):
+        self.flights = SingleFlight()
+
+    async def key(self, request: OCRRequest) -> str:
+        """计算请求的合并键，大图在线程池中计算"""
+        if request.base64_length() < _EXECUTOR_HASH_THRESHOLD:
+            return _request_key(request)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _request_key, request)
+
+    async def run(self, request: OCRRequest, func: Callable[[], Awaitable[OCRResponse]],
+                  partition: str = "") -> OCRResponse:
+        """
+        执行识别，存在相同的进行中请求时等待其结果
+
+        Args:
+            request: OCR请求对象
+            func: 执行识别的协程函数
+            partition: 分区键（例如优先级），分区不同的请求不会合并
+        """
+        key = await self.key(request)
+        # 借用的图片数据（文件映射）在第一个请求返回或断开时解除映射，不能交给其他请求等待的共享任务，只加入已有的计算
+        return await self.flights.do(f"{partition}:{key}", func, lead=not request.borrowed)
+
+
+def create_request_coalescer() -> Optional[RequestCoalescer]:
+    """根据配置创建请求合并器，未启用时返回None"""
+    if not settings.single_flight_enabled:
+        return None
+    return RequestCoalescer()
@@ -0,0 +1,485 @@
+"""
+请求链路追踪
+每个HTTP请求一个追踪（trace），请求经过的各个阶段（请求体解析、base64处理、调度排队、引擎执行器排队、推理、
+调用Umi-OCR、结果转换、序列化）记录为span，按W3C Trace Context（traceparent请求头）与上下游关联。
+
+- 采样：调用方的traceparent标记为已采样时跟随上游，否则按采样比例决定；未采样的请求只生成追踪ID用于传递，
+  各阶段的span是共享的空对象，开销只有一次上下文变量读取
+- 导出：采样的追踪在请求结束时交给后台线程，写入按大小轮转的本地JSONL文件，或以OTLP/HTTP JSON格式发送到本地的采集器
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from utils.log_utils import create_queue_handler
+
+logger = logging.getLogger(__name__)
+
+# OTLP中的span类型
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# 接口处理函数的span名称，请求体解析和响应序列化的耗时按它的起止时间推算
+HANDLER_SPAN = "fastapi.handler"
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# 当前的span（随asyncio任务和复制的上下文传递）
+_current_span: ContextVar[Optional["Span"]] = ContextVar("ocr_current_span", default=None)
+
+
+def now() -> int:
+    """当前时间（Unix纳秒）"""
+    return time.time_ns()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    解析traceparent请求头
+
+    Returns:
+        Optional[Tuple[str, str, bool]]: (追踪ID, 上游span ID, 是否已采样)，格式无效时为None
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Trace:
+    """一次请求的追踪：追踪ID、是否采样、已结束的span"""
+
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+
+
+class Span:
+    """一个阶段的耗时记录"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start: Optional[int] = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = start if start is not None else now()
+        self.end: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """补充属性"""
+        self.attributes.update(attributes)
+
+    def finish(self, end: Optional[int] = None):
+        """结束span，采样的追踪中记录下来"""
+        self.end = end if end is not None else now()
+        if self.trace.sampled:
+            self.trace.spans.append(self)
+
+    def traceparent(self) -> str:
+        """以本span为上游的traceparent请求头"""
+        return f"00-{self.trace.trace_id}-{self.span_id}-{'01' if self.trace.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSONL导出格式"""
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start,
+            "end_time_unix_nano": self.end,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class _SpanScope:
+    """span的上下文管理器：进入时设为当前span，退出时结束并恢复上一级"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.span.finish()
+        _current_span.reset(self._token)
+        return False
+
+
+class _NoopSpan:
+    """未采样或没有追踪时使用的空span"""
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    """当前的span（没有追踪时为None）"""
+    return _current_span.get()
+
+
+def current_trace_id(sampled_only: bool = False) -> Optional[str]:
+    """当前请求的追踪ID，sampled_only为True时只返回采样（会被导出）的追踪ID"""
+    span = _current_span.get()
+    if span is None or (sampled_only and not span.trace.sampled):
+        return None
+    return span.trace.trace_id
+
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    记录一个阶段：with span("阶段名称", 属性=值) as s: ...
+
+    当前请求未采样或没有追踪时返回空span，不分配任何对象
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.trace.sampled:
+        return _NOOP_SPAN
+    return _SpanScope(Span(parent.trace, name, parent.span_id, kind, attributes))
+
+
+def record_span(name: str, start: int, end: Optional[int] = None, **attributes):
+    """记录一个已经结束的阶段（起止时间为Unix纳秒），作为当前span的子span"""
+    parent = _current_span.get()
+    if parent is None or not parent.trace.sampled:
+        return
+    Span(parent.trace, name, parent.span_id, attributes=attributes, start=start).finish(end)
+
+
+def propagation_headers() -> Dict[str, str]:
+    """调用上游服务时传递的traceparent请求头（没有追踪时为空）"""
+    span = _current_span.get()
+    return {"traceparent": span.traceparent()} if span is not None else {}
+
+
+class _JsonlLines:
+    """日志记录的消息：输出时才序列化为JSONL，序列化在日志队列的后台线程中完成"""
+
+    __slots__ = ("spans",)
+
+    def __init__(self, spans: List[Span]):
+        self.spans = spans
+
+    def __str__(self) -> str:
+        return "\n".join(json.dumps(span.to_dict(), ensure_ascii=False) for span in self.spans)
+
+
+class JsonlSpanExporter:
+    """写入按大小轮转的本地JSONL文件，每个span一行，序列化和写入都由日志队列的后台线程完成"""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                            encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self.handler = create_queue_handler(file_handler)
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, spans: List[Span]):
+        # 直接放入队列：QueueHandler.handle会在当前线程格式化消息
+        self.handler.enqueue(logging.LogRecord("ocr.trace.export", logging.INFO, __file__, 0,
+                                               _JsonlLines(spans), None, None))
+        self.exported += len(spans)
+
+    def close(self):
+        self.handler.stop_listener()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP/HTTP JSON格式的导出请求体"""
+    otlp_spans = []
+    for item in spans:
+        otlp_span = {
+            "traceId": item.trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": item.kind,
+            "startTimeUnixNano": str(item.start),
+            "endTimeUnixNano": str(item.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+        }
+        if item.parent_id:
+            otlp_span["parentSpanId"] = item.parent_id
+        if item.error:
+            otlp_span["status"] = {"code": 2, "message": item.error}
+        otlp_spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "ocr-api"}, "spans": otlp_spans}],
+    }]}
+
+
+class OtlpSpanExporter:
+    """
+    以OTLP/HTTP JSON格式发送到采集器
+
+    请求线程只把span放入队列，后台线程每隔interval秒或攒够batch_size个span发送一次；
+    队列超过max_queue个span或采集器不可用时丢弃，不影响请求处理。
+    fork后（start.py --preload）子进程中后台线程不存在，子进程换用新的队列并重新启动后台线程
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "ocr-api", interval: float = 1.0,
+                 batch_size: int = 512, max_queue: int = 8192, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.exported = 0
+        self.dropped = 0
+        self._closed = False
+        self._start()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start(self):
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue()
+        # 队列中等待发送的span数量
+        self._pending = 0
+        self._lock = threading.Lock()
+        # 在调用线程中创建客户端：导入和初始化不会与fork交错，子进程也不会复用父进程连接池中的连接
+        self._client = httpx.Client(timeout=self.timeout)
+        self._thread = threading.Thread(target=self._run, name="otlp-span-exporter", daemon=True)
+        self._thread.start()
+
+    def _restart_in_child(self):
+        # 子进程中父进程的线程对象都已标记为结束，按是否关闭判断；计数从0开始，只统计本进程
+        if not self._closed:
+            self.exported = 0
+            self.dropped = 0
+            self._start()
+
+    def export(self, spans: List[Span]):
+        with self._lock:
+            if self._pending + len(spans) > self.max_queue:
+                self.dropped += len(spans)
+                return
+            self._pending += len(spans)
+        self._queue.put(spans)
+
+    def close(self):
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(self.timeout + self.interval)
+
+    def _run(self):
+        client = self._client
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.interval
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if item is None:
+                    running = False
+                else:
+                    batch.extend(item)
+            except queue.Empty:
+                pass
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or not running):
+                self._send(client, batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.interval
+        client.close()
+
+    def _send(self, client: httpx.Client, batch: List[Span]):
+        with self._lock:
+            self._pending -= len(batch)
+        try:
+            response = client.post(self.endpoint, json=otlp_payload(batch, self.service_name))
+            response.raise_for_status()
+            self.exported += len(batch)
+        except httpx.HTTPError as e:
+            if not self.dropped:
+                logger.warning(f"发送追踪数据到 {self.endpoint} 失败（之后的失败不再记录）: {e}")
+            self.dropped += len(batch)
+
+
+class Tracer:
+    """按采样比例开始追踪，请求结束时导出采样的追踪"""
+
+    def __init__(self, exporter, sample_rate: float):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.traces = 0
+        self.sampled = 0
+
+    def start(self, name: str, traceparent: Optional[str] = None, **attributes) -> Span:
+        """开始一次请求的追踪，返回根span（调用方负责设为当前span）"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        self.traces += 1
+        self.sampled += sampled
+        return Span(Trace(trace_id, sampled), name, parent_id, SPAN_KIND_SERVER, attributes)
+
+    def finish(self, root: Span):
+        """结束根span并导出整个追踪"""
+        root.finish()
+        if root.trace.sampled:
+            self.exporter.export(root.trace.spans)
+
+    def stats(self) -> dict:
+        return {
+            "traces": self.traces,
+            "sampled": self.sampled,
+            "exported_spans": self.exporter.exported,
+            "dropped_spans": self.exporter.dropped,
+        }
+
+    def close(self):
+        self.exporter.close()
+
+
+class TracingMiddleware:
+    """
+    为每个HTTP请求开始追踪
+
+    根span覆盖整个请求；接口处理函数记录为fastapi.handler时，它之前的部分记为请求体解析与校验（request.parse），
+    之后到开始发送响应的部分记为响应序列化（response.serialize）。响应头X-Trace-Id返回追踪ID
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = self.tracer.start(f"{scope['method']} {scope['path']}", traceparent,
+                                 **{"http.method": scope["method"], "http.target": scope["path"]})
+        response_started = None
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = now()
+                root.set(**{"http.status_code": message["status"]})
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace.trace_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            if root.trace.sampled:
+                self._derive_spans(root, response_started)
+            self.tracer.finish(root)
+
+    @staticmethod
+    def _derive_spans(root: Span, response_started: Optional[int]):
+        """按接口处理函数的起止时间推算请求体解析和响应序列化的耗时"""
+        handler = next((item for item in root.trace.spans if item.name == HANDLER_SPAN), None)
+        if handler is None:
+            return
+        Span(root.trace, "request.parse", root.span_id, start=root.start).finish(handler.start)
+        if response_started is not None and response_started > handler.end:
+            Span(root.trace, "response.serialize", root.span_id, start=handler.end).finish(response_started)
+
+
+def traced_handler(func):
+    """把接口处理函数记录为fastapi.handler span（保留函数签名，FastAPI按原函数解析参数）"""
+    import functools
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with span(HANDLER_SPAN, handler=func.__name__):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def create_tracer() -> Optional[Tracer]:
+    """根据配置创建追踪器，未配置导出方式时返回None（不追踪）"""
+    exporter_name = settings.trace_exporter
+    if not exporter_name:
+        return None
+    if exporter_name == "jsonl":
+        exporter = JsonlSpanExporter(settings.trace_file, settings.trace_file_max_bytes, settings.trace_file_backups)
+        target = settings.trace_file
+    elif exporter_name == "otlp":
+        exporter = OtlpSpanExporter(settings.trace_otlp_endpoint, settings.trace_service_name)
+        target = settings.trace_otlp_endpoint
+    else:
+        raise ValueError(f"环境变量 OCR_TRACE_EXPORTER 只支持 jsonl 或 otlp，当前值: {exporter_name}")
+    logger.info(f"请求追踪已启用: 导出到 {target}，采样比例 {settings.trace_sample_rate}")
+    return Tracer(exporter, settings.trace_sample_rate)
@@ -4,7 +4,12 @@ OCR API服务启动脚本
 """
 
 import os
+import gc
 import sys
+import time
+import random
+import signal
+import socket
 import subprocess
 import argparse
 
@@ -85,6 +90,194 @@ def start_server(host="0.0.0.0", port=8000, reload=False):
     except Exception as e:
         print(f"启动失败: {e}")
 
+def create_listen_socket(host, port, backlog, reuse_port=False):
+    """
+    创建监听套接字
+    
+    reuse_port为True时设置SO_REUSEPORT，每个工作进程绑定自己的套接字，由内核在进程间均衡分配新连接
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def describe_runtime(loop, http):
+    """返回实际使用的事件循环和HTTP解析器名称（auto时优先使用uvloop、httptools）"""
+    def available(module):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            return False
+    
+    if loop == "auto":
+        loop = "uvloop" if available("uvloop") and sys.platform != "win32" else "asyncio"
+    if http == "auto":
+        http = "httptools" if available("httptools") else "h11"
+    return loop, http
+
+
+def flush_worker_logs():
+    """os._exit不执行atexit：工作进程退出前输出日志队列中剩余的记录（应用启用了队列日志时）"""
+    log_utils = sys.modules.get("utils.log_utils")
+    if log_utils is not None:
+        log_utils.stop_queue_listeners()
+
+
+def run_worker(app, sock, options):
+    """工作进程：在从主进程继承的套接字上运行uvicorn，处理满max_requests个请求后优雅退出"""
+    import uvicorn
+    
+    random.seed()
+    
+    # 每个工作进程的回收阈值加上随机抖动，避免所有进程同时重启
+    max_requests = options["max_requests"]
+    if max_requests:
+        max_requests += random.randint(0, options["max_requests_jitter"])
+    
+    config = uvicorn.Config(
+        app=app,
+        loop=options["loop"],
+        http=options["http"],
+        backlog=options["backlog"],
+        limit_concurrency=options["limit_concurrency"],
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=options["graceful_timeout"],
+        log_level="warning",
+        access_log=False,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def start_production_server(host="0.0.0.0", port=8000, workers=2, preload=False, loop="auto", http="auto",
+                            backlog=2048, limit_concurrency=None, max_requests=0, max_requests_jitter=0,
+                            reuse_port=False, graceful_timeout=30, app="main:app"):
+    """
+    以多进程模式启动API服务（生产模式）
+    
+    主进程只负责创建、监控工作进程：工作进程退出（达到请求数上限被回收或异常崩溃）后自动补充新进程。
+    启用preload时主进程在fork前导入应用并加载模型，工作进程通过写时复制共享模型权重，回收后的重启也不需要重新加载模型。
+    fork只复制调用fork的线程：导入时启动的后台线程（日志队列、追踪导出等）不会出现在工作进程中，
+    这类组件需要通过 os.register_at_fork 在子进程中重新启动，否则工作进程中的日志和span只会入队、不会被写出。
+    """
+    options = {
+        "host": host,
+        "port": port,
+        "loop": loop,
+        "http": http,
+        "backlog": backlog,
+        "limit_concurrency": limit_concurrency,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests_jitter,
+        "graceful_timeout": graceful_timeout,
+    }
+    loop_name, http_name = describe_runtime(loop, http)
+    
+    print(f"启动OCR API服务（生产模式）...")
+    print(f"服务地址: http://{host}:{port}")
+    print(f"工作进程: {workers}，事件循环: {loop_name}，HTTP解析: {http_name}")
+    print(f"监听队列: {backlog}，单进程并发上限: {limit_concurrency or '不限制'}，"
+          f"进程回收: {f'{max_requests}(+{max_requests_jitter})个请求' if max_requests else '不回收'}")
+    print(f"连接分配: {'SO_REUSEPORT（内核均衡）' if reuse_port else '共享监听套接字'}，模型预加载: {'是' if preload else '否'}")
+    print("-" * 50)
+    
+    if not hasattr(os, "fork"):
+        # 不支持fork的平台（Windows）使用uvicorn自带的多进程模式，不支持预加载
+        import uvicorn
+        uvicorn.run(app, host=host, port=port, workers=workers, loop=loop, http=http, backlog=backlog,
+                    limit_concurrency=limit_concurrency, limit_max_requests=max_requests or None,
+                    timeout_graceful_shutdown=graceful_timeout, log_level="warning", access_log=False)
+        return
+    
+    if preload:
+        print("预加载应用和模型...（注意: GPU上下文不能跨fork共享，GPU推理请不要使用预加载）")
+        from uvicorn.importer import import_from_string
+        app = import_from_string(app)
+        # 把预加载的对象移出GC跟踪，避免子进程执行GC时写入对象头导致共享内存页被复制
+        gc.freeze()
+    
+    # 监听套接字由主进程创建并持有，工作进程回收重启期间到达的连接在监听队列中等待，不会被拒绝。
+    # 启用SO_REUSEPORT时每个工作进程槽位一个套接字，由内核按连接哈希分配到各槽位
+    if reuse_port:
+        sockets = [create_listen_socket(host, port, backlog, reuse_port=True) for _ in range(workers)]
+    else:
+        sockets = [create_listen_socket(host, port, backlog)] * workers
+    
+    children = {}
+    stopping = False
+    
+    stop_signals = {signal.SIGTERM, signal.SIGINT}
+    
+    def spawn(slot):
+        # fork期间屏蔽退出信号：子进程先恢复默认信号处理再解除屏蔽，避免继承主进程的处理函数后忽略退出信号
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                # 恢复默认信号处理，由uvicorn安装自己的优雅退出处理
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+                for other in set(sockets) - {sockets[slot]}:
+                    other.close()
+                run_worker(app, sockets[slot], options)
+            except BaseException as e:
+                print(f"工作进程异常退出: {e}")
+                code = 1
+            finally:
+                flush_worker_logs()
+                os._exit(code)
+        children[pid] = (slot, time.monotonic())
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+        print(f"✓ 工作进程已启动: {pid}", flush=True)
+    
+    def handle_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    
+    for slot in range(workers):
+        spawn(slot)
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        child = children.pop(pid, None)
+        if child is None or stopping:
+            continue
+        slot, started = child
+        
+        code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        if code == 0:
+            print(f"工作进程 {pid} 已回收，启动新进程", flush=True)
+        else:
+            print(f"✗ 工作进程 {pid} 异常退出（{code}），重新启动", flush=True)
+            # 启动后立即崩溃时稍作等待，避免快速循环重启
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+        spawn(slot)
+    
+    for sock in set(sockets):
+        sock.close()
+    print("\n服务已停止")
+
+
 def main():
     parser = argparse.ArgumentParser(description="OCR API服务启动脚本")
     parser.add_argument("--host", default="0.0.0.0", help="服务器地址 (默认: 0.0.0.0)")
@@ -93,6 +286,23 @@ def main():
     parser.add_argument("--install", action="store_true", help="安装依赖包")
     parser.add_argument("--skip-checks", action="store_true", help="跳过环境检查")
     
+    # 生产模式（多进程）
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数，大于1（或指定了--max-requests、--preload）时启用多进程生产模式 (默认: 1)")
+    parser.add_argument("--preload", action="store_true", help="在fork前预加载应用和模型，工作进程写时复制共享模型权重（仅CPU推理）")
+    parser.add_argument("--loop", choices=["auto", "asyncio", "uvloop"], default="auto",
+                        help="事件循环实现，auto时优先使用uvloop (默认: auto)")
+    parser.add_argument("--http", choices=["auto", "h11", "httptools"], default="auto",
+                        help="HTTP解析器，auto时优先使用httptools (默认: auto)")
+    parser.add_argument("--backlog", type=int, default=2048, help="监听队列长度 (默认: 2048)")
+    parser.add_argument("--limit-concurrency", type=int, default=None,
+                        help="单个工作进程的最大并发连接数，超过时返回503 (默认: 不限制)")
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="工作进程处理该数量的请求后优雅退出并由新进程替换，用于控制内存增长 (默认: 0，不回收)")
+    parser.add_argument("--max-requests-jitter", type=int, default=0,
+                        help="回收阈值的随机抖动上限，避免所有进程同时重启 (默认: 0)")
+    parser.add_argument("--reuse-port", action="store_true", help="每个工作进程使用SO_REUSEPORT独立监听，由内核均衡分配连接")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="工作进程优雅退出的最长等待时间，秒 (默认: 30)")
+    
     args = parser.parse_args()
     
     print("=" * 50)
@@ -127,6 +337,26 @@ def main():
     print("-" * 50)
     
     # 启动服务器
+    if args.workers > 1 or args.max_requests or args.preload:
+        if args.reload:
+            print("错误: 多进程生产模式不支持热重载")
+            sys.exit(1)
+        start_production_server(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            preload=args.preload,
+            loop=args.loop,
+            http=args.http,
+            backlog=args.backlog,
+            limit_concurrency=args.limit_concurrency,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            reuse_port=args.reuse_port,
+            graceful_timeout=args.graceful_timeout
+        )
+        return
+    
     start_server(
         host=args.host,
         port=args.port,
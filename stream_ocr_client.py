@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式OCR客户端 - 通过WebSocket连续识别屏幕截图或图片帧
+使用/ocr/stream接口：会话开始时发送一次识别选项，之后只发送二进制图片帧，识别结果异步推送回来
+
+特性:
+  - 每帧只有WebSocket帧头开销，没有HTTP请求头、base64编码和JSON包装
+  - 发送和接收相互独立：发送方按固定帧率发送，不等待上一帧的结果
+  - 服务端识别不过来时只识别最新的一帧，结果中的dropped为被跳过的帧数
+
+依赖: pip install "websockets>=14"
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+try:
+    # 新的asyncio客户端（旧版的websockets.connect不支持additional_headers参数）
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    connect = None
+
+
+class StreamOCRClient:
+    """流式OCR客户端类"""
+
+    def __init__(self, api_url: str = "ws://192.168.16.228:8000", options: Optional[Dict] = None,
+                 api_key: Optional[str] = None, priority: Optional[str] = None):
+        """
+        初始化流式OCR客户端
+
+        Args:
+            api_url: OCR API服务地址（ws://或wss://，也可以直接使用http://地址）
+            options: 会话的识别选项，与base64接口的options相同，如 {"ocr.engine": "paddleocr"}
+            api_key: API密钥，通过X-API-Key请求头发送（可选）
+            priority: 请求优先级，通过X-OCR-Priority请求头发送（可选）
+        """
+        if connect is None:
+            raise ImportError('流式OCR客户端需要14及以上版本的websockets库: pip install "websockets>=14"')
+        api_url = api_url.rstrip('/')
+        if api_url.startswith("http"):
+            api_url = "ws" + api_url[len("http"):]
+        self.stream_url = f"{api_url}/ocr/stream"
+        self.options = options
+        self.headers = {}
+        if api_key:
+            self.headers["X-API-Key"] = api_key
+        if priority:
+            self.headers["X-OCR-Priority"] = priority
+        self._connection = None
+
+    async def __aenter__(self) -> "StreamOCRClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        """建立WebSocket会话并发送识别选项"""
+        self._connection = await connect(self.stream_url, additional_headers=self.headers, max_size=None)
+        if self.options:
+            await self._connection.send(json.dumps(self.options))
+            ready = json.loads(await self._connection.recv())
+            if ready.get("type") != "ready":
+                raise Exception(f"会话建立失败: {ready.get('detail', ready)}")
+
+    async def close(self):
+        """关闭会话"""
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def send_frame(self, image_bytes: bytes):
+        """发送一帧编码后的图片（PNG/JPEG等），不等待识别结果"""
+        await self._connection.send(image_bytes)
+
+    async def results(self) -> AsyncIterator[Dict]:
+        """
+        按推送顺序返回服务端的消息，会话关闭时结束
+
+        Yields:
+            Dict: {"type": "result", "frame": 帧序号, "dropped": 已丢弃帧数, "result": 识别结果}
+                  或 {"type": "error", "frame": 帧序号, "detail": 错误信息}
+        """
+        try:
+            async for message in self._connection:
+                yield json.loads(message)
+        except ConnectionClosed:
+            return
+
+
+def grab_screen(image_format: str = "png") -> bytes:
+    """截取整个屏幕并编码"""
+    from PIL import ImageGrab
+
+    buffer = io.BytesIO()
+    ImageGrab.grab().save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+async def _run(args) -> int:
+    """命令行：按固定帧率发送屏幕截图或图片文件，打印推送回来的识别结果"""
+    options = {"ocr.engine": args.engine, "data.format": "text"}
+    if args.engine == "paddleocr":
+        options["paddleocr.device"] = args.device
+
+    frames = [Path(path).read_bytes() for path in args.image_path]
+    if not frames and not args.screen:
+        print("请指定图片文件或使用 --screen 截取屏幕", file=sys.stderr)
+        return 1
+
+    async with StreamOCRClient(args.url, options, api_key=args.api_key, priority=args.priority) as client:
+        async def send():
+            interval = 1.0 / args.fps
+            for index in range(args.frames):
+                started = time.monotonic()
+                data = grab_screen() if args.screen else frames[index % len(frames)]
+                await client.send_frame(data)
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+            # 等待最后一帧的结果
+            await asyncio.sleep(args.linger)
+            await client.close()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            async for message in client.results():
+                if message.get("type") == "result":
+                    print(f"帧 {message['frame']}（已跳过 {message['dropped']} 帧）:\n{message['result'].get('data')}\n"
+                          + "-" * 40)
+                else:
+                    print(f"❌ 帧 {message.get('frame')}: {message.get('detail')}", file=sys.stderr)
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+    return 0
+
+
+def main():
+    """命令行主函数"""
+    parser = argparse.ArgumentParser(
+        description="流式OCR客户端 - 通过WebSocket连续识别屏幕截图或图片帧",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  python stream_ocr_client.py --screen --fps 5 --frames 50
+  python stream_ocr_client.py --engine paddleocr --device cpu --fps 10 --frames 100 frame1.png frame2.png
+        """
+    )
+    parser.add_argument('image_path', nargs='*', help='循环发送的图片文件路径')
+    parser.add_argument('--url', default='ws://192.168.16.228:8000',
+                        help='OCR API服务地址 (默认: ws://192.168.16.228:8000)')
+    parser.add_argument('--screen', action='store_true', help='截取屏幕作为图片帧')
+    parser.add_argument('--fps', type=float, default=5.0, help='发送帧率 (默认: 5)')
+    parser.add_argument('--frames', type=int, default=50, help='发送的总帧数 (默认: 50)')
+    parser.add_argument('--linger', type=float, default=2.0, help='发送完毕后等待结果的时间，秒 (默认: 2)')
+    parser.add_argument('--engine', choices=['umi_ocr', 'paddleocr'], default='umi_ocr',
+                        help='OCR引擎 (默认: umi_ocr)')
+    parser.add_argument('--device', choices=['gpu', 'cpu'], default='gpu',
+                        help='PaddleOCR设备类型 (默认: gpu)')
+    parser.add_argument('--api-key', help='API密钥，服务端按密钥限流 (可选)')
+    parser.add_argument('--priority', help='请求优先级，如interactive、bulk (可选)')
+
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步OCR客户端测试脚本
+用于验证async_ocr_client.py的基本功能
+"""
+
+import sys
+import os
+import asyncio
+import base64
+import logging
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 1x1像素红色点PNG
+TEST_BASE64 = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+
+
+def test_import():
+    """测试模块导入"""
+    from async_ocr_client import AsyncOCRClient
+    logger.info("✅ 异步OCR客户端模块导入成功")
+    return True
+
+
+def test_client_init():
+    """测试客户端初始化"""
+    from async_ocr_client import AsyncOCRClient
+
+    async def run():
+        async with AsyncOCRClient("http://localhost:8000/", engine="paddleocr", device="cpu",
+                                  max_connections=3, max_concurrency=2, timeout=5) as client:
+            assert client.api_url == "http://localhost:8000"
+            assert client._build_options(None) == {
+                "data.format": "text",
+                "ocr.engine": "paddleocr",
+                "paddleocr.device": "cpu"
+            }
+        return True
+
+    result = asyncio.run(run())
+    logger.info("✅ 客户端初始化成功")
+    return result
+
+
+def test_recognize_many_errors():
+    """测试批量识别在服务不可用时逐个返回异常"""
+    from async_ocr_client import AsyncOCRClient
+
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
+        tmp_file.write(base64.b64decode(TEST_BASE64))
+        tmp_path = tmp_file.name
+
+    async def run():
+        paths = [tmp_path, "不存在的图片.png", tmp_path]
+        results = []
+        # 端口9（discard）通常没有服务监听，连接会立即失败
+        async with AsyncOCRClient("http://127.0.0.1:9", max_concurrency=2, timeout=2) as client:
+            async for image_path, result in client.recognize_many(paths):
+                results.append((image_path, result))
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        os.unlink(tmp_path)
+
+    assert len(results) == 3
+    assert all(isinstance(result, Exception) for _, result in results)
+    assert any(isinstance(result, FileNotFoundError) for _, result in results)
+    logger.info("✅ 批量识别异常处理测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始异步OCR客户端测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("模块导入测试", test_import),
+        ("客户端初始化测试", test_client_init),
+        ("批量识别异常处理测试", test_recognize_many_errors),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
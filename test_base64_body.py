@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+base64请求体流式解析测试脚本
+用于验证任意分块下的解码结果、data:前缀与JSON转义、逐块校验与提前拒绝，以及携带图片字节的请求对象
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _png(width=64, height=48):
+    import io
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _parse(body: bytes, chunk_size: int, max_bytes: int = 10 * 1024 * 1024):
+    from utils.base64_body import Base64BodyParser
+    parser = Base64BodyParser(max_bytes)
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+    return parser.finish()
+
+
+def _rejected(body: bytes, chunk_size: int = 7, max_bytes: int = 10 * 1024 * 1024):
+    from utils.image_utils import ImageRejected
+    try:
+        _parse(body, chunk_size, max_bytes)
+    except ImageRejected as e:
+        return e.reason
+    raise AssertionError("应当拒绝")
+
+
+def test_chunked_decode():
+    """测试任意分块大小下解码结果一致，data:前缀、换行、JSON转义和嵌套的base64字段"""
+    import base64
+    import json
+
+    data = _png()
+    encoded = base64.b64encode(data).decode()
+    options = {"ocr.engine": "paddleocr", "tbpu.ignoreArea": [[[0, 0], [1, 1]]], "note": {"base64": "x"}}
+    # 按76字符换行，且用json.dumps转义出 \n 和 \/
+    wrapped = "\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    bodies = [
+        json.dumps({"base64": encoded, "options": options}),
+        json.dumps({"options": options, "base64": "data:image/png;base64," + wrapped}).replace("/", "\\/"),
+        '{ "base64" :\t"  ' + encoded + '" }',
+    ]
+    for body in bodies:
+        for chunk_size in (1, 3, 4, 5, 64, len(body)):
+            image, document = _parse(body.encode(), chunk_size)
+            assert bytes(image) == data, (body[:40], chunk_size)
+            assert document["base64"] == ""
+    assert _parse(bodies[0].encode(), 5)[1]["options"] == options
+    logger.info("✅ 分块解码测试成功")
+    return True
+
+
+def test_validation():
+    """测试非base64字符、填充位置、长度、不支持的格式和解码后大小在接收过程中被拒绝"""
+    import base64
+    import json
+    from utils.base64_body import Base64BodyParser
+    from utils.image_utils import ImageRejected
+
+    encoded = base64.b64encode(_png()).decode()
+    assert _rejected(json.dumps({"base64": encoded[:40] + "$" + encoded[40:]}).encode()) == "invalid"
+    assert _rejected(json.dumps({"base64": "QQ==" + encoded}).encode()) == "invalid"
+    assert _rejected(json.dumps({"base64": encoded[:-1]}).encode()) == "invalid"
+    assert _rejected(json.dumps({"base64": ""}).encode()) == "invalid"
+    assert _rejected(json.dumps({"base64": encoded}).encode(), max_bytes=100) == "too_large"
+
+    # 不支持的格式在解码出图片头时拒绝，不再接收剩余的请求体
+    parser = Base64BodyParser(10 * 1024 * 1024)
+    try:
+        parser.feed(b'{"base64": "' + base64.b64encode(b"%PDF-1.7 " + b"x" * 30))
+        raise AssertionError("应当拒绝")
+    except ImageRejected as e:
+        assert e.reason == "format"
+
+    for body in (b'{"base64": "' + encoded.encode(), b"[1]", b'{"base64": "QUFB", "base64": "QUFB"}'):
+        try:
+            _parse(body, 8)
+            raise AssertionError("应当拒绝")
+        except ImageRejected:
+            raise
+        except ValueError:
+            pass
+    # 没有base64字段时由请求模型报告缺少字段
+    image, document = _parse(b'{"options": {}}', 4)
+    assert not image and document == {"options": {}}
+    logger.info("✅ 校验测试成功")
+    return True
+
+
+def test_request_with_image():
+    """测试携带图片字节的请求：复制选项时保留图片，按编码后的长度计算，读取图片头时不复制缓冲区"""
+    import base64
+    from models.ocr_models import OCROptions, OCRRequest
+    from utils.image_utils import open_buffer, read_image_size
+
+    data = bytearray(_png(320, 200))
+    request = OCRRequest.from_image(data)
+    copied = request.model_copy(update={"options": OCROptions(ocr_engine="paddleocr")})
+    assert copied.image is data and copied.image_bytes() is data
+    assert copied.base64_length() == len(base64.b64encode(data))
+    assert read_image_size(data) == (320, 200)
+    assert read_image_size(memoryview(data)) == (320, 200)
+
+    source = open_buffer(data)
+    assert source.read(8) == bytes(data[:8])
+    source.seek(-4, 2)
+    assert source.read() == bytes(data[-4:])
+    logger.info("✅ 携带图片字节的请求测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始base64请求体流式解析测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("分块解码测试", test_chunked_decode),
+        ("校验测试", test_validation),
+        ("携带图片字节的请求测试", test_request_with_image),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
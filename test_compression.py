@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求体压缩测试脚本
+用于验证gzip请求体的解压、解压炸弹的拦截和响应压缩的协商
+"""
+
+import sys
+import os
+import gzip
+import json
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _make_app(max_size: int):
+    """只有一个回显接口的测试应用，挂载与main.py相同的中间件"""
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.gzip import GZipMiddleware
+    from utils.compression import GzipRequestMiddleware
+
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.json()
+        return {"length": len(body["base64"]), "blocks": [{"text": "x" * 40}] * 100}
+
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+    app.add_middleware(GzipRequestMiddleware, paths=["/echo"], max_size=max_size)
+    return app
+
+
+def test_gzip_decoder():
+    """测试分块解压、多成员拼接和截断数据"""
+    import zlib
+    from utils.compression import _GzipDecoder
+
+    data = os.urandom(3000) * 20
+    compressed = gzip.compress(data) + gzip.compress(b"tail")
+    decoder = _GzipDecoder(len(data) + 4)
+    for start in range(0, len(compressed), 100):
+        decoder.feed(compressed[start:start + 100])
+    assert decoder.finish() == data + b"tail"
+
+    try:
+        decoder = _GzipDecoder(10 ** 6)
+        decoder.feed(compressed[:-5])
+        decoder.finish()
+        assert False, "截断的数据应该解压失败"
+    except zlib.error:
+        pass
+    logger.info("✅ 分块解压测试成功")
+    return True
+
+
+def test_decompression_bomb():
+    """测试解压后超过上限的请求体在完全展开之前被拒绝"""
+    from utils.compression import RequestTooLarge, _GzipDecoder
+
+    bomb = gzip.compress(b"\0" * (64 * 1024 * 1024))
+    assert len(bomb) < 128 * 1024
+    try:
+        _GzipDecoder(1024 * 1024).feed(bomb)
+        assert False, "超过上限的请求体应该被拒绝"
+    except RequestTooLarge:
+        pass
+    logger.info("✅ 解压炸弹测试成功")
+    return True
+
+
+def test_middleware():
+    """测试gzip请求体、不支持的编码和响应压缩协商"""
+    from fastapi.testclient import TestClient
+
+    client = TestClient(_make_app(max_size=1024 * 1024))
+    payload = json.dumps({"base64": "A" * 50000}).encode()
+
+    response = client.post("/echo", content=gzip.compress(payload),
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 200, response.text
+    assert response.json()["length"] == 50000
+    # TestClient默认发送Accept-Encoding: gzip
+    assert response.headers.get("content-encoding") == "gzip"
+
+    response = client.post("/echo", content=payload, headers={"Content-Type": "application/json",
+                                                              "Accept-Encoding": "identity"})
+    assert response.status_code == 200 and "content-encoding" not in response.headers
+
+    response = client.post("/echo", content=payload,
+                           headers={"Content-Type": "application/json", "Content-Encoding": "br"})
+    assert response.status_code == 415
+
+    response = client.post("/echo", content=b"not gzip",
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+    bomb = gzip.compress(json.dumps({"base64": "A" * (4 * 1024 * 1024)}).encode())
+    response = client.post("/echo", content=bomb,
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 413
+    logger.info("✅ 中间件测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始压缩测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("分块解压测试", test_gzip_decoder),
+        ("解压炸弹测试", test_decompression_bomb),
+        ("中间件测试", test_middleware),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
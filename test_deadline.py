@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求处理时限测试脚本
+用于验证剩余时限的计算，以及超过时限时排队中的请求被丢弃、不再占用引擎
+"""
+
+import sys
+import os
+import time
+import asyncio
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_context_timeout():
+    """测试上游超时时间取剩余时限与默认超时中较小的一个"""
+    from services.request_context import DeadlineExceeded, RequestContext
+
+    assert RequestContext().timeout(60) == 60
+
+    context = RequestContext(deadline=time.monotonic() + 5)
+    assert 4 < context.timeout(60) <= 5
+    assert context.timeout(2) == 2
+
+    expired = RequestContext(deadline=time.monotonic() - 0.1)
+    assert expired.remaining() < 0
+    try:
+        expired.timeout(60)
+        raise AssertionError("超过时限时应当抛出DeadlineExceeded")
+    except DeadlineExceeded:
+        pass
+    logger.info("✅ 剩余时限测试成功")
+    return True
+
+
+def test_queued_work_dropped():
+    """测试超过时限仍在排队的请求被丢弃，引擎只执行按时开始的请求"""
+    from services.scheduler import PriorityScheduler
+
+    async def scenario():
+        scheduler = PriorityScheduler("test", 1, {"interactive": 1})
+        executed = []
+
+        async def recognize(name, duration):
+            async with scheduler.slot("interactive", name):
+                executed.append(name)
+                await asyncio.sleep(duration)
+
+        # 第一个请求占用唯一的槽位0.2秒，第二个请求的时限只有0.05秒
+        first = asyncio.create_task(recognize("first", 0.2))
+        await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(recognize("late", 0.2), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        await first
+        return executed, scheduler.stats()["classes"]["interactive"]
+
+    executed, stats = asyncio.run(scenario())
+    assert executed == ["first"], executed
+    assert stats["dropped"] == 1 and stats["completed"] == 1 and stats["queued"] == 0
+    logger.info("✅ 超时请求丢弃测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始请求处理时限测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("剩余时限测试", test_context_timeout),
+        ("超时请求丢弃测试", test_queued_work_dropped),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
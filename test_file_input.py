@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文件输入测试脚本
+用于验证路径限制在允许的根目录下（包括..和符号链接）、mmap映射的读取与解除映射，以及直接从映射读取图片头
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _status(func, *args):
+    from utils.file_input import FileInputError
+    try:
+        func(*args)
+    except FileInputError as e:
+        return e.status_code
+    raise AssertionError("应当拒绝")
+
+
+def test_resolve_input_path():
+    """测试相对路径、根目录内的绝对路径，拒绝根目录之外的路径、符号链接、不存在的文件和未启用的情况"""
+    import tempfile
+    from utils.file_input import resolve_input_path
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "root")
+        os.makedirs(os.path.join(root, "sub"))
+        inside = os.path.join(root, "sub", "a.png")
+        outside = os.path.join(directory, "b.png")
+        for path in (inside, outside):
+            with open(path, "wb") as file:
+                file.write(b"x")
+
+        real_inside = os.path.realpath(inside)
+        assert resolve_input_path("sub/a.png", root) == real_inside
+        assert resolve_input_path(inside, root) == real_inside
+        assert resolve_input_path("sub/../sub/a.png", root) == real_inside
+        assert _status(resolve_input_path, "../b.png", root) == 403
+        assert _status(resolve_input_path, outside, root) == 403
+        assert _status(resolve_input_path, "sub/a.png", "") == 403
+        assert _status(resolve_input_path, "sub/missing.png", root) == 404
+        assert _status(resolve_input_path, "sub", root) == 404
+        if hasattr(os, "symlink"):
+            os.symlink(outside, os.path.join(root, "link.png"))
+            assert _status(resolve_input_path, "link.png", root) == 403
+    logger.info("✅ 路径限制测试成功")
+    return True
+
+
+def test_map_file():
+    """测试映射的内容与图片头读取，退出后解除映射，空文件和过大的文件被拒绝"""
+    import io
+    import tempfile
+    from PIL import Image
+    from utils.file_input import map_file
+    from utils.image_utils import inspect_image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 200), "white").save(buffer, format="PNG")
+    data = buffer.getvalue()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "a.png")
+        with open(path, "wb") as file:
+            file.write(data)
+        with map_file(path, len(data)) as image:
+            assert isinstance(image, memoryview) and image.tobytes() == data
+            assert inspect_image(image, max_pixels=1_000_000).size == (320, 200)
+        try:
+            image.tobytes()
+            raise AssertionError("退出后应当解除映射")
+        except ValueError:
+            pass
+
+        def enter(*args):
+            with map_file(*args):
+                pass
+
+        assert _status(enter, path, len(data) - 1) == 413
+        empty = os.path.join(directory, "empty.png")
+        open(empty, "wb").close()
+        assert _status(enter, empty, 1024) == 400
+    logger.info("✅ 文件映射测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始本地文件输入测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("路径限制测试", test_resolve_input_path),
+        ("文件映射测试", test_map_file),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量识别测试脚本
+用于验证帧差分、变化区域扩展和识别结果拼接
+"""
+
+import sys
+import os
+import io
+import asyncio
+import logging
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _block(text, x0, y0, x1, y1):
+    from models.ocr_models import OCRTextBlock
+    return OCRTextBlock(text=text, score=0.9, box=[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], end="\n")
+
+
+def test_changed_regions():
+    """测试没有变化、局部变化和尺寸变化三种情况"""
+    from utils.frame_diff import changed_regions
+
+    previous = np.full((200, 300, 3), 255, dtype=np.uint8)
+    current = previous.copy()
+    assert changed_regions(previous, current) == []
+
+    # 轻微的压缩噪声不算变化
+    current[10:20, 10:20] = 250
+    assert changed_regions(previous, current) == []
+
+    current[100:110, 150:170] = 0
+    regions = changed_regions(previous, current)
+    assert len(regions) == 1, regions
+    x0, y0, x1, y1 = regions[0]
+    assert x0 <= 150 and y0 <= 100 and x1 >= 170 and y1 >= 110, regions
+    # 变化区域只比变化像素大一个网格单元加边距
+    assert (x1 - x0) * (y1 - y0) < 300 * 200 / 10, regions
+
+    # 相距很远的两处变化得到两个区域
+    current[0:5, 0:5] = 0
+    assert len(changed_regions(previous, current)) == 2
+
+    assert changed_regions(previous, np.zeros((100, 300, 3), dtype=np.uint8)) is None
+    logger.info("✅ 变化区域测试成功")
+    return True
+
+
+def test_expand_and_splice():
+    """测试变化区域扩展到整个文本块，并替换上一帧中对应的文本块"""
+    from utils.frame_diff import expand_to_blocks, splice_blocks
+
+    previous = [_block("title", 10, 10, 200, 30), _block("old value", 10, 50, 200, 70),
+                _block("footer", 10, 150, 200, 170)]
+    regions = expand_to_blocks([(100, 55, 120, 65)], previous)
+    assert regions == [(10, 50, 200, 70)], regions
+
+    blocks = splice_blocks(previous, regions, [_block("new value", 10, 50, 200, 70)])
+    assert [block.text for block in blocks] == ["title", "new value", "footer"]
+    logger.info("✅ 区域扩展与拼接测试成功")
+    return True
+
+
+def test_blocks_without_box():
+    """测试没有坐标的文本块不参与区域扩展，拼接时视为已变化并被新结果取代，新结果中没有坐标的文本块排在最后"""
+    from utils.frame_diff import block_bounds, expand_to_blocks, splice_blocks
+
+    no_box = _block("no box", 0, 0, 0, 0)
+    no_box.box = []
+    assert block_bounds(no_box) is None
+
+    previous = [_block("title", 10, 10, 200, 30), no_box, _block("old value", 10, 50, 200, 70)]
+    regions = expand_to_blocks([(100, 55, 120, 65)], previous)
+    assert regions == [(10, 50, 200, 70)], regions
+
+    updated_no_box = no_box.model_copy(update={"text": "new no box"})
+    blocks = splice_blocks(previous, regions, [updated_no_box, _block("new value", 10, 50, 200, 70)])
+    assert [block.text for block in blocks] == ["title", "new value", "new no box"]
+    # 没有重新识别的区域时保留上一帧的全部文本块
+    assert [block.text for block in splice_blocks(previous, [], [])] == ["title", "old value", "no box"]
+    logger.info("✅ 无坐标文本块测试成功")
+    return True
+
+
+def test_incremental_stream():
+    """测试增量模式下只把变化区域提交给OCR服务"""
+    from PIL import Image
+    from models.ocr_models import OCRDataFormat, OCROptions, OCRResponse
+    from services.frame_stream import FrameStream
+    from services.request_context import RequestContext
+
+    def encode(array):
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    class RegionService:
+        """把识别区域原样作为文本块返回的假OCR服务"""
+
+        def __init__(self):
+            self.requests = []
+
+        async def recognize_image(self, request, context):
+            self.requests.append(request.options.ocr_regions)
+            # 整帧识别时返回两行文字，第二行覆盖之后发生变化的位置
+            regions = request.options.ocr_regions or [[[10, 10], [100, 30]], [[290, 195], [350, 225]]]
+            blocks = [_block(f"{x0},{y0}", x0, y0, x1, y1) for (x0, y0), (x1, y1) in regions]
+            return OCRResponse(code=100, data=blocks, time=0.01, timestamp=0.0)
+
+    frame = np.full((300, 400, 3), 255, dtype=np.uint8)
+    changed = frame.copy()
+    changed[200:220, 300:340] = 0
+
+    async def scenario():
+        service = RegionService()
+        options = OCROptions(**{"stream.incremental": True, "data.format": OCRDataFormat.TEXT})
+        stream = FrameStream(service, options)
+        modes = []
+        for array in (frame, frame, changed):
+            result = await stream.recognize(encode(array), RequestContext())
+            modes.append(stream.last_update["mode"])
+        return service.requests, modes, result
+
+    requests, modes, result = asyncio.run(scenario())
+    assert modes == ["full", "unchanged", "incremental"], modes
+    # 第一帧整帧识别，第二帧没有调用OCR服务，第三帧只识别变化区域
+    assert len(requests) == 2 and requests[0] is None and len(requests[1]) == 1, requests
+    assert isinstance(result.data, str)
+    logger.info("✅ 增量识别会话测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始增量识别测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("变化区域测试", test_changed_regions),
+        ("区域扩展与拼接测试", test_expand_and_splice),
+        ("无坐标文本块测试", test_blocks_without_box),
+        ("增量识别会话测试", test_incremental_stream),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
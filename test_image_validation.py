@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片校验测试脚本
+用于验证魔数识别格式、只读取图片头的尺寸与帧数校验，以及边接收边计数的请求体大小限制
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _encode(image, image_format, **params):
+    import io
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+
+def _rejected(func, *args):
+    from utils.image_utils import ImageRejected
+    try:
+        func(*args)
+    except ImageRejected as e:
+        return e.reason
+    raise AssertionError("应当拒绝")
+
+
+def test_inspect_image():
+    """测试按魔数识别格式，读取宽高和帧数，拒绝不支持的格式、无效的图片头和超过上限的图片"""
+    from PIL import Image
+    from utils.image_utils import inspect_image, sniff_image_format
+
+    image = Image.new("RGB", (300, 200), "white")
+    for image_format in ("JPEG", "PNG", "BMP", "TIFF", "WEBP"):
+        data = _encode(image, image_format)
+        assert sniff_image_format(data[:16]) == image_format
+        info = inspect_image(data, max_pixels=1_000_000)
+        assert (info.format, info.size, info.frames) == (image_format, (300, 200), 1)
+
+    assert _rejected(inspect_image, _encode(image, "GIF"), 1_000_000) == "format"
+    assert _rejected(inspect_image, b"%PDF-1.7 not an image", 1_000_000) == "format"
+    assert _rejected(inspect_image, b"\x89PNG\r\n\x1a\n" + b"\x00" * 32, 1_000_000) == "invalid"
+    assert _rejected(inspect_image, _encode(image, "PNG"), 50_000) == "too_large"
+
+    pages = _encode(image, "TIFF", save_all=True, append_images=[image.copy()])
+    assert _rejected(inspect_image, pages, 1_000_000) == "frames"
+    assert inspect_image(pages, 1_000_000, max_frames=2).frames == 2
+    logger.info("✅ 图片头校验测试成功")
+    return True
+
+
+def test_inspect_upload():
+    """测试上传文件的大小校验与文件指针位置，读取上传文件的全部内容，base64图片头超出开头一段时完整解码"""
+    import base64
+    import io
+    from PIL import Image
+    from starlette.datastructures import UploadFile
+    from utils.image_utils import inspect_upload, read_base64_image_size, read_upload
+
+    data = _encode(Image.new("RGB", (640, 480), "white"), "PNG")
+    upload = UploadFile(io.BytesIO(data), size=len(data), filename="a.png")
+    assert inspect_upload(upload, max_bytes=len(data), max_pixels=1_000_000).size == (640, 480)
+    assert upload.file.tell() == 0
+    assert _rejected(inspect_upload, upload, len(data) - 1, 1_000_000) == "too_large"
+    assert _rejected(inspect_upload, UploadFile(io.BytesIO(b""), size=0), 1024, 1_000_000) == "invalid"
+
+    upload.file.seek(10)
+    assert read_upload(upload) == data
+    try:
+        read_upload(UploadFile(io.BytesIO(b""), size=0))
+        raise AssertionError("应当拒绝")
+    except ValueError:
+        pass
+
+    # ICC配置文件让JPEG的尺寸信息出现在100KB之后
+    jpeg = _encode(Image.new("RGB", (800, 600), "white"), "JPEG", icc_profile=os.urandom(100 * 1024))
+    encoded = base64.b64encode(jpeg).decode()
+    assert read_base64_image_size(encoded) == (800, 600)
+    assert read_base64_image_size(encoded[:-1]) is None
+    logger.info("✅ 上传文件校验测试成功")
+    return True
+
+
+def test_body_size_limit():
+    """测试声明长度和分块传输的请求体超过上限时返回413，未超过时正常处理"""
+    from fastapi import FastAPI, File, UploadFile
+    from fastapi.testclient import TestClient
+    from utils.body_limit import BodySizeLimitMiddleware
+
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": 4096})
+    client = TestClient(app)
+
+    assert client.post("/upload", files={"file": ("a.bin", b"x" * 1024)}).json() == {"size": 1024}
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 8192)})
+    assert response.status_code == 413
+
+    def chunks():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.bin"\r\n\r\n'
+        for _ in range(16):
+            yield b"x" * 1024
+        yield b"\r\n--b--\r\n"
+
+    # 没有Content-Length（分块传输）时边接收边计数
+    response = client.post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413 and "4096" in response.json()["detail"]
+    logger.info("✅ 请求体大小限制测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始图片校验测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("图片头校验测试", test_inspect_image),
+        ("上传文件校验测试", test_inspect_upload),
+        ("请求体大小限制测试", test_body_size_limit),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理进程池测试脚本
+用于验证共享内存中的图片、识别结果的编码与还原，以及工作进程退出后的自动重启与重试
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_shared_memory_arrays():
+    """测试切片视图写入共享内存后按布局还原"""
+    import numpy as np
+    from services.inference_pool import _arrays_size, _ensure_buffer, _read_arrays, _write_arrays
+
+    image = np.random.default_rng(0).integers(0, 255, (120, 200, 3), dtype=np.uint8)
+    arrays = [image[10:50, 30:150], image[::2, ::3], np.arange(5, dtype=np.int32)]
+
+    shm = _ensure_buffer(None, _arrays_size(arrays))
+    try:
+        layout = _write_arrays(shm.buf, arrays)
+        restored = _read_arrays(shm.buf, layout, copy=True)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert all(offset % 8 == 0 for offset, _, _ in layout)
+    assert all(np.array_equal(a, b) for a, b in zip(arrays, restored))
+    logger.info("✅ 共享内存数组测试成功")
+    return True
+
+
+def test_result_round_trip():
+    """测试识别结果编码后还原为相同的文本块"""
+    import numpy as np
+    from services.inference_pool import _pack_result, _unpack_result
+
+    result = {
+        "rec_texts": ["第一行", "", "second line"],
+        "rec_scores": np.array([0.98, 0.5, 0.87]),
+        "rec_polys": [
+            np.array([[1, 2], [30, 2], [30, 20], [1, 20]], dtype=np.int16),
+            np.array([[0, 0], [1, 0], [1, 1], [0, 1]]),
+            np.array([[5, 40], [90, 40], [90, 60], [5, 60]]),
+        ],
+    }
+    restored = _unpack_result(_pack_result(result))
+    assert restored["rec_texts"] == result["rec_texts"]
+    assert np.array_equal(restored["rec_scores"], result["rec_scores"])
+    assert all(np.array_equal(a, b) for a, b in zip(restored["rec_polys"], result["rec_polys"]))
+
+    empty = _unpack_result(_pack_result({"rec_texts": [], "rec_scores": [], "rec_polys": []}))
+    assert empty["rec_texts"] == [] and len(empty["rec_polys"]) == 0
+    logger.info("✅ 识别结果编码测试成功")
+    return True
+
+
+# 测试用的假PaddleOCR：返回工作进程的pid，第一个像素值不为0时先等待（单位0.1秒），便于在推理过程中结束进程
+_FAKE_PADDLEOCR = """
+import os
+import time
+
+
+class PaddleOCR:
+    def __init__(self, **kwargs):
+        pass
+
+    def predict(self, input):
+        time.sleep(int(input.flat[0]) / 10)
+        return [{"rec_texts": [str(os.getpid())], "rec_scores": [1.0], "rec_polys": [[[0, 0], [1, 0], [1, 1], [0, 1]]]}]
+"""
+
+
+def test_worker_supervision():
+    """测试空闲的工作进程退出后由监控线程立即重启，推理过程中退出时在重启的进程上重试当前请求"""
+    import signal
+    import tempfile
+    import threading
+    import time
+    import numpy as np
+    from services.inference_pool import ProcessEngine
+
+    def wait_for(condition, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "等待超时"
+            time.sleep(0.05)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "paddleocr.py"), "w") as file:
+            file.write(_FAKE_PADDLEOCR)
+        # spawn方式启动的工作进程沿用父进程的sys.path
+        sys.path.insert(0, directory)
+        engine = ProcessEngine("cpu")
+        try:
+            engine.start()
+            engine.wait_ready()
+            idle = np.zeros((4, 4, 3), dtype=np.uint8)
+            first_pid = int(engine.predict(idle)[0]["rec_texts"][0])
+
+            # 空闲时结束工作进程：不需要等到下一次请求，监控线程立即重启
+            os.kill(first_pid, signal.SIGKILL)
+            wait_for(lambda: engine.restarts == 1 and engine.process is not None and engine.process.pid != first_pid)
+            wait_for(lambda: engine.process.is_alive())
+            second_pid = int(engine.predict(idle)[0]["rec_texts"][0])
+            assert second_pid != first_pid
+
+            # 推理过程中结束工作进程：当前请求在新的工作进程上重试，不返回错误
+            slow = idle.copy()
+            slow.flat[0] = 10
+            results = []
+            worker = threading.Thread(target=lambda: results.append(engine.predict(slow)))
+            worker.start()
+            time.sleep(0.5)
+            os.kill(second_pid, signal.SIGKILL)
+            worker.join(timeout=30)
+            third_pid = int(results[0][0]["rec_texts"][0])
+            assert third_pid not in (first_pid, second_pid)
+            assert engine.restarts == 2
+
+            # 停止后不再重启
+            process = engine.process
+            engine.stop()
+            time.sleep(0.5)
+            assert not process.is_alive() and engine.process is None
+        finally:
+            engine.stop()
+            sys.path.remove(directory)
+    logger.info("✅ 工作进程监控测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始推理进程池测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("共享内存数组测试", test_shared_memory_arrays),
+        ("识别结果编码测试", test_result_round_trip),
+        ("工作进程监控测试", test_worker_supervision),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排版解析测试脚本
+用于验证分栏、分行、段落判断和各排版解析方案的结束符
+"""
+
+import sys
+import os
+import random
+import time
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _block(text, x0, y0, x1, y1):
+    from models.ocr_models import OCRTextBlock
+    return OCRTextBlock(text=text, score=0.9, box=[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], end="")
+
+
+def _two_column_page():
+    """通栏标题 + 两栏正文（每栏第3行是段落末尾的短行）+ 通栏页脚，顺序打乱"""
+    blocks = [_block("Title", 100, 20, 900, 50)]
+    for column, x in enumerate((100, 520)):
+        for row in range(6):
+            width = 200 if row == 2 else 380
+            blocks.append(_block(f"c{column}r{row}", x, 80 + row * 30, x + width, 100 + row * 30))
+    blocks.append(_block("Footer", 100, 300, 900, 320))
+    random.Random(1).shuffle(blocks)
+    return blocks
+
+
+def test_multi_column():
+    """测试多栏：先读完左栏再读右栏，通栏文本块在各部分之间"""
+    from utils.layout import layout_text, parse_layout
+
+    text = layout_text(parse_layout(_two_column_page(), "multi_line"))
+    expected = ["Title"] + [f"c0r{row}" for row in range(6)] + [f"c1r{row}" for row in range(6)] + ["Footer"]
+    assert text == "\n".join(expected), text
+
+    text = layout_text(parse_layout(_two_column_page(), "multi_para"))
+    assert text == "Title\nc0r0 c0r1 c0r2\nc0r3 c0r4 c0r5\nc1r0 c1r1 c1r2\nc1r3 c1r4 c1r5\nFooter", text
+    logger.info("✅ 多栏排版测试成功")
+    return True
+
+
+def test_single_column():
+    """测试单栏：同一行的文本块从左到右，中文行之间直接相连"""
+    from utils.layout import layout_text, parse_layout
+
+    text = layout_text(parse_layout(_two_column_page(), "single_line"))
+    assert text.split("\n")[1] == "c0r0 c1r0", text
+
+    blocks = [_block("第一行文字", 10, 10, 400, 30), _block("第二行文字", 10, 40, 400, 60),
+              _block("english", 10, 70, 400, 90), _block("words", 10, 100, 400, 120)]
+    text = layout_text(parse_layout(blocks, "single_none"))
+    assert text == "第一行文字第二行文字english words", text
+    logger.info("✅ 单栏排版测试成功")
+    return True
+
+
+def test_code_indent():
+    """测试保留缩进：行首缩进按字宽换算为空格"""
+    from utils.layout import layout_text, parse_layout
+
+    blocks = [_block("return 1", 140, 40, 220, 60), _block("def f():", 100, 10, 180, 30), _block("x", 100, 70, 110, 90)]
+    text = layout_text(parse_layout(blocks, "single_code"))
+    assert text == "def f():\n    return 1\nx", repr(text)
+    logger.info("✅ 保留缩进测试成功")
+    return True
+
+
+def test_invalid_parser():
+    """测试不支持的方案和不做处理的方案"""
+    from utils.layout import parse_layout
+
+    blocks = _two_column_page()
+    assert parse_layout(blocks, "none") == blocks
+    try:
+        parse_layout(blocks, "magic")
+        assert False, "不支持的方案应该报错"
+    except ValueError:
+        pass
+    logger.info("✅ 方案校验测试成功")
+    return True
+
+
+def test_large_page():
+    """测试上万个文本块的页面"""
+    from utils.layout import parse_layout
+
+    rng = random.Random(0)
+    blocks = []
+    for column in range(4):
+        for row in range(2500):
+            x, y = 50 + column * 500 + rng.randint(0, 5), 50 + row * 25 + rng.randint(-2, 2)
+            blocks.append(_block(f"{column}-{row}", x, y, x + rng.randint(200, 450), y + 20))
+    expected = [block.text for block in blocks]
+    rng.shuffle(blocks)
+
+    start = time.perf_counter()
+    ordered = parse_layout(blocks, "multi_para")
+    elapsed = time.perf_counter() - start
+    assert [block.text for block in ordered] == expected
+    assert elapsed < 1.0, elapsed
+    logger.info(f"✅ 大页面测试成功，10000个文本块耗时 {elapsed * 1000:.1f}毫秒")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始排版解析测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("多栏排版测试", test_multi_column),
+        ("单栏排版测试", test_single_column),
+        ("保留缩进测试", test_code_indent),
+        ("方案校验测试", test_invalid_parser),
+        ("大页面测试", test_large_page),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志工具测试脚本
+用于验证队列日志（包括fork后的子进程）、请求摘要和采样限速
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ListHandler(logging.Handler):
+    """把日志记录保存到列表中"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_queue_handler():
+    """测试队列处理器在后台线程中输出，停止时处理完剩余的记录"""
+    import threading
+    from utils.log_utils import create_queue_handler
+
+    target = ListHandler()
+    threads = []
+    target.emit = lambda record: (threads.append(threading.current_thread()), target.records.append(record))
+    handler = create_queue_handler(target)
+    test_logger = logging.getLogger("test.queue")
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    test_logger.addHandler(handler)
+    try:
+        for index in range(100):
+            test_logger.info("第 %d 条", index)
+    finally:
+        test_logger.removeHandler(handler)
+        handler.stop_listener()
+
+    assert [record.getMessage() for record in target.records] == [f"第 {index} 条" for index in range(100)]
+    assert all(thread is not threading.current_thread() for thread in threads)
+    logger.info("✅ 队列日志测试成功")
+    return True
+
+
+def test_queue_handler_after_fork():
+    """测试fork后子进程重新启动监听线程：子进程的日志被写出，父进程队列中的记录不会在子进程中重复输出"""
+    import tempfile
+    from utils.log_utils import create_queue_handler, stop_queue_listeners
+
+    if not hasattr(os, "fork"):
+        logger.info("⚠️ 当前平台不支持fork，跳过")
+        return True
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "worker.log")
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(process)d %(message)s"))
+        handler = create_queue_handler(file_handler)
+        test_logger = logging.getLogger("test.queue.fork")
+        test_logger.propagate = False
+        test_logger.setLevel(logging.INFO)
+        test_logger.addHandler(handler)
+        try:
+            for index in range(50):
+                test_logger.info("fork前 %d", index)
+            pid = os.fork()
+            if pid == 0:
+                # 与start.py的工作进程相同：记录日志后以os._exit退出，不执行atexit
+                code = 1
+                try:
+                    test_logger.info("工作进程日志")
+                    stop_queue_listeners()
+                    code = 0
+                finally:
+                    os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+            test_logger.info("fork后")
+        finally:
+            test_logger.removeHandler(handler)
+            handler.stop_listener()
+            file_handler.close()
+
+        with open(path, encoding="utf-8") as file:
+            lines = [line.rstrip("\n").split(" ", 1) for line in file]
+    messages = [message for _, message in lines]
+    assert sorted(messages) == sorted([f"fork前 {index}" for index in range(50)] + ["工作进程日志", "fork后"])
+    assert [int(process) for process, message in lines if message == "工作进程日志"] == [pid]
+    logger.info("✅ fork后队列日志测试成功")
+    return True
+
+
+def test_sampler():
+    """测试采样、限速与被跳过行数的统计"""
+    from utils.log_utils import LogSampler
+
+    now = [0.0]
+    sampler = LogSampler(sample_rate=1.0, max_per_second=2, clock=lambda: now[0])
+    assert [sampler.allow()[0] for _ in range(4)] == [True, True, False, False]
+    # 重要的记录不受限速，并带上之前被跳过的行数
+    assert sampler.allow(important=True) == (True, 2)
+    now[0] = 1.0
+    assert sampler.allow() == (True, 0)
+
+    values = iter([0.05, 0.5, 0.09, 0.95])
+    sampler = LogSampler(sample_rate=0.1, rand=lambda: next(values))
+    assert [sampler.allow()[0] for _ in range(4)] == [True, False, True, False]
+    assert sampler.suppressed == 1
+    logger.info("✅ 采样限速测试成功")
+    return True
+
+
+def test_request_summary():
+    """测试每个请求一行摘要，包含接口补充的字段"""
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from utils.log_utils import LogSampler, RequestLogMiddleware, format_fields
+
+    assert format_fields({"a": 1, "b": None, "c": "x y", "d": 1.25}) == 'a=1 c="x y" d=1.2'
+
+    target = ListHandler()
+    summary_logger = logging.getLogger("test.request")
+    summary_logger.propagate = False
+    summary_logger.setLevel(logging.INFO)
+    summary_logger.addHandler(target)
+
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok(request: Request):
+        request.state.log_fields = {"engine": "paddleocr", "blocks": 3}
+        return {"ok": True}
+
+    app.add_middleware(RequestLogMiddleware, sampler=LogSampler(sample_rate=0.0), log=summary_logger)
+    client = TestClient(app)
+    try:
+        # 采样比例为0时成功请求不输出，404总是输出并带上被跳过的行数
+        assert client.get("/ok").status_code == 200
+        assert client.get("/missing").status_code == 404
+        assert len(target.records) == 1
+        message = target.records[0].getMessage()
+        assert "path=/missing status=404" in message and "suppressed=1" in message
+
+        app.user_middleware.clear()
+        app.middleware_stack = None
+        app.add_middleware(RequestLogMiddleware, log=summary_logger)
+        client = TestClient(app)
+        client.get("/ok")
+        message = target.records[-1].getMessage()
+        assert message.startswith("request method=GET path=/ok status=200 ")
+        assert "engine=paddleocr blocks=3" in message
+    finally:
+        summary_logger.removeHandler(target)
+    logger.info("✅ 请求摘要测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始日志工具测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("队列日志测试", test_queue_handler),
+        ("fork后队列日志测试", test_queue_handler_after_fork),
+        ("采样限速测试", test_sampler),
+        ("请求摘要测试", test_request_summary),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
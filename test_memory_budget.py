@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存预算测试脚本
+用于验证内存预估、预算预留与归还、排队顺序、超时和取消
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_estimate():
+    """测试按base64长度和图片头中的宽高预估内存"""
+    import base64
+    import io
+    from PIL import Image
+    from services.memory_budget import estimate_bytes
+    from utils.image_utils import read_base64_image_size
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (4000, 3000), "white").save(buffer, format="PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    size = read_base64_image_size(encoded)
+    assert size == (4000, 3000)
+    # 压缩后只有几十KB的图片解码后约8400万字节
+    assert estimate_bytes(len(encoded), size, 7) == len(encoded) * 2 + 4000 * 3000 * 7
+    assert estimate_bytes(len(encoded), None, 7) == len(encoded) * 2
+    logger.info("✅ 内存预估测试成功")
+    return True
+
+
+def test_reserve_and_release():
+    """测试预留、归还与峰值，预算不足时按到达顺序等待"""
+    import asyncio
+    from services.memory_budget import MemoryBudget
+
+    async def run():
+        budget = MemoryBudget(capacity=100, max_wait=5)
+        order = []
+        release = {name: asyncio.Event() for name in ("a", "b", "c")}
+
+        async def request(name, nbytes):
+            async with budget.reserve(nbytes):
+                order.append(name)
+                await release[name].wait()
+
+        tasks = [asyncio.ensure_future(request("a", 60))]
+        await asyncio.sleep(0)
+        # b放不下开始排队；c虽然放得下，也排在b之后
+        tasks += [asyncio.ensure_future(request("b", 50)), asyncio.ensure_future(request("c", 10))]
+        await asyncio.sleep(0)
+        assert order == ["a"] and budget.reserved == 60 and budget.stats()["waiting"] == 2
+
+        release["a"].set()
+        await asyncio.sleep(0.01)
+        assert order == ["a", "b", "c"] and budget.reserved == 60
+        release["b"].set()
+        release["c"].set()
+        await asyncio.gather(*tasks)
+        assert budget.reserved == 0 and budget.peak == 60
+        stats = budget.stats()
+        assert stats["admitted"] == 3 and stats["waited"] == 2
+
+    asyncio.run(run())
+    logger.info("✅ 预留与归还测试成功")
+    return True
+
+
+def test_rejection_and_cancel():
+    """测试超过整个预算直接拒绝、等待超时拒绝，取消等待后移出队列"""
+    import asyncio
+    from services.memory_budget import MemoryBudget, MemoryBudgetExceeded
+
+    async def run():
+        budget = MemoryBudget(capacity=100, max_wait=0.05)
+        try:
+            await budget.acquire(101)
+            raise AssertionError("超过整个预算的请求应当被拒绝")
+        except MemoryBudgetExceeded as e:
+            assert e.too_large
+
+        await budget.acquire(80)
+        try:
+            await budget.acquire(30)
+            raise AssertionError("等待超时的请求应当被拒绝")
+        except MemoryBudgetExceeded as e:
+            assert not e.too_large
+        assert budget.stats()["waiting"] == 0 and budget.rejected == {"too_large": 1, "timeout": 1}
+
+        # 排在队首的大请求被取消后，之后放得下的请求立即获得预算
+        budget.max_wait = 5
+        large = asyncio.ensure_future(budget.acquire(50))
+        small = asyncio.ensure_future(budget.acquire(20))
+        await asyncio.sleep(0)
+        assert not small.done()
+        large.cancel()
+        await asyncio.sleep(0.01)
+        assert small.done() and budget.reserved == 100
+        budget.release(20)
+        budget.release(80)
+        assert budget.reserved == 0 and budget.peak == 100
+
+    asyncio.run(run())
+    logger.info("✅ 拒绝与取消测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始内存预算测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("内存预估测试", test_estimate),
+        ("预留与归还测试", test_reserve_and_release),
+        ("拒绝与取消测试", test_rejection_and_cancel),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复查找测试脚本
+用于验证感知哈希、多索引哈希缓存的基本功能与缩略图确认
+"""
+
+import sys
+import os
+import io
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _make_image_bytes(image_format: str, quality: int = 95, shift: int = 0) -> bytes:
+    """生成带文字条纹的测试图片"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (320, 200), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(6):
+        draw.rectangle([20 + shift, 20 + i * 30, 200 + i * 15 + shift, 35 + i * 30], fill="black")
+
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format=image_format, quality=quality)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def _make_document_bytes(word: str, image_format: str = "PNG", quality: int = 95) -> bytes:
+    """生成A4尺寸的文档图片，第20行的最后一个词可替换"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=22)
+    for i in range(50):
+        draw.text((80, 80 + i * 32), f"Line {i:02d} the quick brown fox jumps over the lazy dog "
+                                     f"{word if i == 20 else 'amount'}", fill="black", font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def _make_response(text: str):
+    from models.ocr_models import OCRResponse
+    return OCRResponse(code=100, data=text, time=0.1, timestamp=0.0)
+
+
+def test_recompressed_image_hash():
+    """测试重新压缩的图片哈希相近，内容不同的图片哈希相远"""
+    from utils.phash import fingerprint_bytes, hamming_distance
+
+    png_hash, _, width, height = fingerprint_bytes(_make_image_bytes("PNG"))
+    jpeg_hash, _, _, _ = fingerprint_bytes(_make_image_bytes("JPEG", quality=40))
+    other_hash, _, _, _ = fingerprint_bytes(_make_image_bytes("PNG", shift=80))
+
+    assert (width, height) == (320, 200)
+    assert hamming_distance(png_hash, jpeg_hash) <= 4
+    assert hamming_distance(png_hash, other_hash) > 4
+    logger.info("✅ 感知哈希测试成功")
+    return True
+
+
+def test_cache_lookup_threshold():
+    """测试缓存按汉明距离阈值命中"""
+    from services.near_duplicate_cache import NearDuplicateCache
+
+    cache = NearDuplicateCache(threshold=3, capacity=16)
+    key = (320, 200, "")
+    base = 0x0F0F_0F0F_0F0F_0F0F
+    cache.store(key, base, _make_response("原始结果"))
+
+    hit = cache.lookup(key, base ^ 0b111)
+    assert hit is not None and hit[1] == 3
+    assert cache.lookup(key, base ^ 0b1111) is None
+    # 图片尺寸或选项不同时不能复用
+    assert cache.lookup((640, 400, ""), base) is None
+    logger.info("✅ 缓存阈值测试成功")
+    return True
+
+
+def test_thumbnail_confirmation():
+    """测试只差一个字的文档图片哈希相同，但缩略图确认后不复用；重新压缩的图片仍然复用"""
+    from services.near_duplicate_cache import NearDuplicateCache
+    from utils.phash import fingerprint_bytes
+
+    key = (1240, 1754, "")
+    base_hash, base_thumbnail, _, _ = fingerprint_bytes(_make_document_bytes("amount"))
+    # 白底文档的哈希对压缩噪声敏感（重新压缩后距离可达6），放宽阈值，由缩略图确认保证不误判
+    cache = NearDuplicateCache(threshold=8, capacity=16, pixel_tolerance=10)
+    cache.store(key, base_hash, _make_response("amount"), base_thumbnail)
+
+    for word in ("amounts", "amouni", "1234567"):
+        phash, thumbnail, _, _ = fingerprint_bytes(_make_document_bytes(word))
+        assert phash == base_hash
+        assert cache.lookup(key, phash, thumbnail) is None, word
+    assert cache.rejected == 3
+
+    for quality in (85, 40, 20):
+        phash, thumbnail, _, _ = fingerprint_bytes(_make_document_bytes("amount", "JPEG", quality))
+        hit = cache.lookup(key, phash, thumbnail)
+        assert hit is not None and hit[0].data == "amount", quality
+    logger.info("✅ 缩略图确认测试成功")
+    return True
+
+
+def test_cache_eviction():
+    """测试缓存按LRU淘汰且索引同步清理"""
+    from services.near_duplicate_cache import NearDuplicateCache
+
+    cache = NearDuplicateCache(threshold=2, capacity=2)
+    key = (1, 1, "")
+    cache.store(key, 0x1, _make_response("a"))
+    cache.store(key, 0xFFFF_0000, _make_response("b"))
+    # 访问第一个条目，使第二个条目成为最久未使用
+    assert cache.lookup(key, 0x1) is not None
+    cache.store(key, 0xFFFF_FFFF_0000_0000, _make_response("c"))
+
+    assert len(cache) == 2
+    assert cache.lookup(key, 0xFFFF_0000) is None
+    assert cache.lookup(key, 0x1)[0].data == "a"
+    assert sum(len(bucket) for bucket in cache._index.values()) == 2 * 3
+    logger.info("✅ 缓存淘汰测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始近似重复查找测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("感知哈希测试", test_recompressed_image_hash),
+        ("缓存阈值测试", test_cache_lookup_threshold),
+        ("缩略图确认测试", test_thumbnail_confirmation),
+        ("缓存淘汰测试", test_cache_eviction),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
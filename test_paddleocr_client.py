@@ -162,6 +162,195 @@ def test_command_line_interface():
         logger.error(f"❌ 命令行接口测试失败: {e}")
         return False
 
+def test_upload_preprocessing():
+    """测试上传前的缩小、重新压缩和坐标还原"""
+    import base64
+    import io
+    import tempfile
+    import numpy as np
+    from PIL import Image
+    from paddleocr_client import PaddleOCRClient
+    from client_utils import rescale_blocks
+    
+    # 生成带噪声的大图（模拟相机照片，压缩率低）
+    pixels = np.random.default_rng(0).integers(0, 255, (1200, 2000, 3), dtype=np.uint8)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        tmp_path = os.path.join(directory, "photo.png")
+        Image.fromarray(pixels).save(tmp_path, format='PNG')
+        
+        client = PaddleOCRClient(max_side=500, quality=80, image_format="jpeg")
+        base64_image, scale = client._prepare_image(tmp_path)
+        
+        uploaded = Image.open(io.BytesIO(base64.b64decode(base64_image)))
+        assert uploaded.size == (500, 300)
+        assert uploaded.format == "JPEG"
+        assert scale == 4.0
+        
+        # 未设置max_side时原样上传
+        original, scale = PaddleOCRClient()._prepare_image(tmp_path)
+        with open(tmp_path, 'rb') as f:
+            assert base64.b64decode(original) == f.read()
+        assert scale == 1.0
+    
+    blocks = rescale_blocks([{"text": "a", "box": [[10, 20], [30, 20], [30, 40], [10, 40]]}], 4.0)
+    assert blocks[0]["box"] == [[40, 80], [120, 80], [120, 160], [40, 160]]
+    assert blocks[0]["text"] == "a"
+    
+    logger.info("✅ 上传预处理测试成功")
+    return True
+
+def test_multipart_stream():
+    """测试流式multipart请求体的分隔符、字段编码、文件内容和长度"""
+    import base64
+    import tempfile
+    from client_utils import MultipartFileStream
+    
+    # 1x1像素红色点PNG，重复写入以跨越多个读取块
+    test_base64 = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+    file_bytes = base64.b64decode(test_base64) * 5000
+    
+    with tempfile.TemporaryDirectory() as directory:
+        tmp_path = os.path.join(directory, 'sc"an.png')
+        with open(tmp_path, 'wb') as f:
+            f.write(file_bytes)
+        
+        fields = {"ocr.engine": "paddleocr", "ocr.language": None, "ocr.regions": [[[0, 0], [1, 1]]]}
+        body = MultipartFileStream(fields, tmp_path, "image/png", tmp_path)
+        assert body.content_type.startswith("multipart/form-data; boundary=")
+        boundary = body.content_type.split("boundary=", 1)[1].encode()
+        chunks = list(body)
+        body.close()
+        
+        # 值为None的字段被跳过，列表按JSON编码，文件名中的引号被替换
+        expected = (
+            b'--' + boundary + b'\r\nContent-Disposition: form-data; name="ocr.engine"\r\n\r\npaddleocr\r\n'
+            + b'--' + boundary + b'\r\nContent-Disposition: form-data; name="ocr.regions"\r\n\r\n[[[0, 0], [1, 1]]]\r\n'
+            + b'--' + boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="sc_an.png"\r\n'
+            + b'Content-Type: image/png\r\n\r\n'
+            + file_bytes
+            + b'\r\n--' + boundary + b'--\r\n'
+        )
+        content = b"".join(chunks)
+        assert content == expected
+        assert len(body) == len(expected)
+        assert len(chunks) > 1 and all(len(chunk) <= MultipartFileStream.CHUNK_SIZE for chunk in chunks)
+        
+        # 内存中的文件字节与磁盘文件得到相同的请求体（分隔符除外），read(size)按大小分段读取
+        body = MultipartFileStream({}, "a.png", "image/png", file_bytes)
+        boundary = body.content_type.split("boundary=", 1)[1].encode()
+        first = body.read(10)
+        rest = body.read()
+        assert len(first) == 10 and body.read() == b""
+        assert first + rest == (
+            b'--' + boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n'
+            + b'Content-Type: image/png\r\n\r\n' + file_bytes + b'\r\n--' + boundary + b'--\r\n'
+        )
+        assert len(body) == len(first + rest)
+    
+    logger.info("✅ 流式multipart请求体测试成功")
+    return True
+
+def test_batch_resume():
+    """测试批量识别中断后续跑：跳过清单中已完成的图片，重新识别失败的图片，每张图片只保留一行结果"""
+    import json
+    import tempfile
+    from paddleocr_client import PaddleOCRClient
+    
+    failing = {"b.png"}
+    
+    def fake_recognize_text(self, image_path, device=None, verbose=True):
+        name = os.path.basename(image_path)
+        if name in failing:
+            raise Exception("服务不可用")
+        return f"text of {name}"
+    
+    def read_rows(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+    
+    original = PaddleOCRClient.recognize_text
+    PaddleOCRClient.recognize_text = fake_recognize_text
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ("a.png", "b.png", "c.png")]
+            output_path = os.path.join(directory, "results.jsonl")
+            client = PaddleOCRClient("http://localhost:8000")
+            
+            stats = client.batch_recognize_to_jsonl(paths, output_path, workers=2, verbose=False)
+            assert (stats["succeeded"], stats["failed"], stats["skipped"]) == (2, 1, 0)
+            assert sorted(row["path"] for row in read_rows(output_path)) == paths
+            
+            # 第二次运行时b.png仍然失败：旧的错误行被替换，不会重复
+            stats = client.batch_recognize_to_jsonl(paths, output_path, workers=2, verbose=False)
+            assert (stats["succeeded"], stats["failed"], stats["skipped"]) == (0, 1, 2)
+            rows = read_rows(output_path)
+            assert sorted(row["path"] for row in rows) == paths
+            
+            # 中断时写了一半的行同样被删除
+            with open(output_path, 'a', encoding='utf-8') as f:
+                f.write('{"path": "')
+            failing.clear()
+            stats = client.batch_recognize_to_jsonl(paths, output_path, workers=2, verbose=False)
+            assert (stats["succeeded"], stats["failed"], stats["skipped"]) == (1, 0, 2)
+            rows = read_rows(output_path)
+            assert sorted(row["path"] for row in rows) == paths
+            assert all(row["error"] is None for row in rows)
+            assert (rows[-1]["path"], rows[-1]["text"]) == (paths[1], "text of b.png")
+            
+            # 全部完成后再次运行不识别、不改写结果文件
+            stats = client.batch_recognize_to_jsonl(paths, output_path, workers=2, verbose=False)
+            assert (stats["succeeded"], stats["failed"], stats["skipped"]) == (0, 0, 3)
+            assert read_rows(output_path) == rows
+    finally:
+        PaddleOCRClient.recognize_text = original
+    
+    logger.info("✅ 批量识别续跑测试成功")
+    return True
+
+def test_load_manifest():
+    """测试读取清单文件：文件不存在时为空集合，忽略空行"""
+    import tempfile
+    from paddleocr_client import load_manifest
+    
+    with tempfile.TemporaryDirectory() as directory:
+        manifest_path = os.path.join(directory, "results.jsonl.manifest")
+        assert load_manifest(manifest_path) == set()
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            f.write("/data/a.png\n\n/data/b c.png\n/data/a.png\n")
+        assert load_manifest(manifest_path) == {"/data/a.png", "/data/b c.png"}
+    
+    logger.info("✅ 清单读取测试成功")
+    return True
+
+def test_collect_image_paths():
+    """测试展开目录（递归、只保留图片、按路径排序）、通配符（支持**）和普通路径，按绝对路径去重"""
+    import tempfile
+    from paddleocr_client import collect_image_paths
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("b.png", "a.JPG", "notes.txt", os.path.join("sub", "c.webp"), os.path.join("sub", "deep", "d.png")):
+            path = os.path.join(directory, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'wb').close()
+        
+        def under(*names):
+            return [os.path.join(directory, name) for name in names]
+        
+        assert collect_image_paths([directory]) == under("a.JPG", "b.png", "sub/c.webp", "sub/deep/d.png")
+        assert collect_image_paths([os.path.join(directory, "*.png")]) == under("b.png")
+        assert collect_image_paths([os.path.join(directory, "**", "*.png")]) == under("b.png", "sub/deep/d.png")
+        assert collect_image_paths([os.path.join(directory, "*.txt")]) == []
+        
+        # 普通路径原样保留（不检查是否存在），与目录、通配符展开的结果去重
+        missing = os.path.join(directory, "missing.png")
+        paths = collect_image_paths([os.path.join(directory, "b.png"), missing, directory,
+                                     os.path.join(directory, "sub", "..", "b.png")])
+        assert paths == under("b.png", "missing.png", "a.JPG", "sub/c.webp", "sub/deep/d.png")
+    
+    logger.info("✅ 图片路径展开测试成功")
+    return True
+
 def main():
     """主测试函数"""
     logger.info("🧪 开始PaddleOCR客户端测试")
@@ -173,6 +362,11 @@ def main():
         ("Base64转换测试", test_base64_conversion),
         ("便捷函数测试", test_convenience_function),
         ("命令行接口测试", test_command_line_interface),
+        ("上传预处理测试", test_upload_preprocessing),
+        ("流式multipart请求体测试", test_multipart_stream),
+        ("批量识别续跑测试", test_batch_resume),
+        ("清单读取测试", test_load_manifest),
+        ("图片路径展开测试", test_collect_image_paths),
     ]
     
     passed = 0
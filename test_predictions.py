@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预测结果转换测试脚本
+用于验证PaddleOCR预测结果的文本、置信度、文本框一次性转换为文本块
+"""
+
+import sys
+import os
+import time
+import logging
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def make_prediction(count: int, offset: int = 0) -> dict:
+    """生成与PaddleOCR 3.x预测结果字段相同的字典：每行一个四边形文本框"""
+    rows = np.arange(count, dtype=np.int16)[:, None]
+    polys = np.stack([
+        np.hstack([np.full_like(rows, 10), rows * 30 + offset]),
+        np.hstack([np.full_like(rows, 400), rows * 30 + offset]),
+        np.hstack([np.full_like(rows, 400), rows * 30 + 20 + offset]),
+        np.hstack([np.full_like(rows, 10), rows * 30 + 20 + offset]),
+    ], axis=1)
+    return {
+        "rec_texts": [f"line {i}" for i in range(count)],
+        "rec_scores": np.linspace(0.5, 1.0, count, dtype=np.float32),
+        "rec_polys": list(polys),
+        "rec_boxes": np.hstack([polys[:, 0], polys[:, 2]]),
+    }
+
+
+def test_full_fidelity():
+    """测试文本、置信度、文本框与预测结果一一对应，空文本被过滤"""
+    from utils.predictions import prediction_blocks
+
+    res = make_prediction(3)
+    res["rec_texts"][1] = ""
+    blocks = prediction_blocks(res)
+    assert [block.text for block in blocks] == ["line 0", "line 2"]
+    assert blocks[0].score == 0.5 and blocks[1].score == 1.0
+    assert blocks[1].box == [[10, 60], [400, 60], [400, 80], [10, 80]]
+    assert all(type(value) is int for point in blocks[1].box for value in point)
+    assert all(block.end == " " for block in blocks)
+    logger.info("✅ 完整转换测试成功")
+    return True
+
+
+def test_polygon_sources():
+    """测试文本框来源的回退顺序和坐标平移"""
+    from utils.predictions import prediction_blocks
+
+    expected = [[15, 7], [405, 7], [405, 27], [15, 27]]
+
+    res = make_prediction(2)
+    assert prediction_blocks(res, dx=5, dy=7)[0].box == expected
+
+    # 没有rec_polys时使用数量一致的dt_polys，再没有时使用rec_boxes
+    res = make_prediction(2)
+    res["dt_polys"] = res.pop("rec_polys")
+    assert prediction_blocks(res, dx=5, dy=7)[0].box == expected
+    res.pop("dt_polys")
+    assert prediction_blocks(res, dx=5, dy=7)[0].box == expected
+
+    # 顶点数不一致时逐个转换
+    res = make_prediction(2)
+    res["rec_polys"] = [res["rec_polys"][0], np.array([[0, 0], [1, 0], [1, 1], [0, 1], [0, 2]])]
+    blocks = prediction_blocks(res)
+    assert len(blocks[0].box) == 4 and len(blocks[1].box) == 5
+
+    # 没有置信度和文本框时使用默认值
+    blocks = prediction_blocks({"rec_texts": ["a"]})
+    assert blocks[0].score == 1.0 and blocks[0].box == []
+    assert prediction_blocks({"rec_texts": []}) == []
+    logger.info("✅ 文本框来源测试成功")
+    return True
+
+
+def test_pool_roundtrip():
+    """测试推理进程传回的结果（共享内存数组还原）可以直接转换"""
+    from services.inference_pool import _pack_result, _unpack_result
+    from utils.predictions import prediction_blocks
+
+    res = make_prediction(50)
+    restored = _unpack_result(_pack_result(res))
+    assert isinstance(restored["rec_polys"], np.ndarray) and restored["rec_polys"].shape == (50, 4, 2)
+    assert prediction_blocks(restored) == prediction_blocks(res)
+    logger.info("✅ 推理进程结果转换测试成功")
+    return True
+
+
+def test_large_page():
+    """测试上万行的页面转换耗时"""
+    from utils.predictions import prediction_blocks
+
+    res = make_prediction(10000)
+    start = time.perf_counter()
+    blocks = prediction_blocks(res)
+    elapsed = time.perf_counter() - start
+    assert len(blocks) == 10000
+    assert elapsed < 2.0, elapsed
+    logger.info(f"✅ 大页面测试成功，10000行耗时 {elapsed * 1000:.1f}毫秒")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始预测结果转换测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("完整转换测试", test_full_fidelity),
+        ("文本框来源测试", test_polygon_sources),
+        ("推理进程结果转换测试", test_pool_roundtrip),
+        ("大页面测试", test_large_page),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
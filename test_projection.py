@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果筛选与字段投影测试脚本
+用于验证data.fields、data.min_score、data.max_blocks选项
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _blocks():
+    from models.ocr_models import OCRTextBlock
+    return [
+        OCRTextBlock(text=text, score=score, box=[[0, y], [50, y], [50, y + 10], [0, y + 10]], end=" ")
+        for text, score, y in (("a", 0.9, 0), ("noise", 0.2, 20), ("b", 0.8, 40), ("c", 0.95, 60))
+    ]
+
+
+def test_options():
+    """测试字段选项的解析与校验"""
+    from pydantic import ValidationError
+    from models.ocr_models import OCROptions
+
+    options = OCROptions.model_validate({"data.fields": " box,text,box ", "data.min_score": 0.5, "data.max_blocks": 2})
+    assert options.data_fields == ["text", "box"]
+    assert OCROptions.model_validate({"data.fields": ["end", "score"]}).data_fields == ["score", "end"]
+
+    for invalid in ({"data.fields": "text,polygon"}, {"data.fields": ","}, {"data.min_score": 1.5},
+                    {"data.max_blocks": 0}):
+        try:
+            OCROptions.model_validate(invalid)
+        except ValidationError:
+            continue
+        raise AssertionError(f"应当拒绝: {invalid}")
+    logger.info("✅ 选项校验测试成功")
+    return True
+
+
+def test_select_blocks():
+    """测试按置信度和数量筛选，筛选后拼接纯文本"""
+    from utils.projection import join_blocks, select_blocks
+
+    blocks = _blocks()
+    assert [block.text for block in select_blocks(blocks, min_score=0.5)] == ["a", "b", "c"]
+    assert [block.text for block in select_blocks(blocks, min_score=0.5, max_blocks=2)] == ["a", "b"]
+    assert [block.text for block in select_blocks(blocks, max_blocks=1)] == ["a"]
+    assert select_blocks(blocks, min_score=0.99) == []
+    assert join_blocks(select_blocks(blocks, min_score=0.5)) == "a b c "
+    assert join_blocks([]) == ""
+
+    # 与未筛选时的拼接结果一致：排版后最后一个文本块的结束符同样保留
+    from utils.layout import layout_text, parse_layout
+    laid_out = parse_layout(_blocks(), "multi_line")
+    assert join_blocks(select_blocks(laid_out, min_score=0.0)) == layout_text(laid_out)
+    logger.info("✅ 筛选测试成功")
+    return True
+
+
+def test_projection():
+    """测试投影后的字典只包含指定字段，全部字段时与响应模型的序列化结果一致"""
+    from pydantic_core import to_json
+    from models.ocr_models import OCRResponse, TEXT_BLOCK_FIELDS
+    from utils.projection import project_blocks, response_content
+
+    blocks = _blocks()
+    assert project_blocks(blocks, ["text"]) == [{"text": "a"}, {"text": "noise"}, {"text": "b"}, {"text": "c"}]
+    assert project_blocks(blocks, ["text", "box"])[0] == {"text": "a", "box": [[0, 0], [50, 0], [50, 10], [0, 10]]}
+
+    result = OCRResponse(code=100, data=blocks, time=0.5, timestamp=1.0)
+    assert to_json(response_content(result, TEXT_BLOCK_FIELDS)) == result.model_dump_json().encode()
+    assert response_content(result, ["text"], exclude_none=True).keys() == {"code", "data", "time", "timestamp"}
+
+    failed = OCRResponse(code=200, data="识别失败", time=0.0, timestamp=0.0)
+    assert response_content(failed, ["text"])["data"] == "识别失败"
+    logger.info("✅ 字段投影测试成功")
+    return True
+
+
+def test_incremental_stream_selection():
+    """测试增量流式识别保存完整结果，只在返回时筛选"""
+    import asyncio
+    import io
+    from PIL import Image
+    from models.ocr_models import OCROptions, OCRResponse
+    from services.frame_stream import FrameStream
+    from services.request_context import RequestContext
+
+    class FakeService:
+        def __init__(self):
+            self.options = []
+
+        async def recognize_image(self, request, context):
+            self.options.append(request.options)
+            return OCRResponse(code=100, data=_blocks(), time=0.0, timestamp=0.0)
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (100, 100), "white").save(buffer, format="PNG")
+    service = FakeService()
+    options = OCROptions.model_validate({"stream.incremental": True, "data.min_score": 0.5, "data.max_blocks": 2})
+    stream = FrameStream(service, options)
+
+    first = asyncio.run(stream.recognize(buffer.getvalue(), RequestContext()))
+    second = asyncio.run(stream.recognize(buffer.getvalue(), RequestContext()))
+    assert service.options[0].data_min_score is None and service.options[0].data_max_blocks is None
+    assert [block.text for block in first.data] == ["a", "b"]
+    assert stream.last_update["mode"] == "unchanged" and [block.text for block in second.data] == ["a", "b"]
+    assert len(stream._previous_blocks) == 4
+    logger.info("✅ 增量流式筛选测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始结果筛选与字段投影测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("选项校验测试", test_options),
+        ("筛选测试", test_select_blocks),
+        ("字段投影测试", test_projection),
+        ("增量流式筛选测试", test_incremental_stream_selection),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客户端限流测试脚本
+用于验证令牌桶的补充、按百万像素计费与按API密钥单独配置的限流速率
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_token_bucket():
+    """测试令牌桶按时间补充令牌，超过容量的请求在桶满时放行"""
+    from services.rate_limiter import TokenBucket
+
+    bucket = TokenBucket(rate=2.0, capacity=4.0, now=0.0)
+    for _ in range(4):
+        assert bucket.wait_time(1.0) == 0.0
+        bucket.take(1.0)
+    assert abs(bucket.wait_time(1.0) - 0.5) < 1e-9
+
+    bucket.refill(1.0)
+    assert abs(bucket.tokens - 2.0) < 1e-9
+    bucket.refill(100.0)
+    assert bucket.tokens == 4.0
+
+    # 10个令牌的请求超过容量，桶满时按容量扣除
+    assert bucket.wait_time(10.0) == 0.0
+    bucket.take(10.0)
+    assert bucket.tokens == 0.0
+    logger.info("✅ 令牌桶测试成功")
+    return True
+
+
+def test_rate_limiter():
+    """测试请求数与百万像素数限流，被拒绝的请求不扣除令牌"""
+    from services.rate_limiter import RateLimiter, make_limits, client_label
+
+    limiter = RateLimiter(make_limits(0.001, 0.001, request_burst=3, megapixel_burst=10),
+                          {client_label("vip"): make_limits(1000, 1000)})
+
+    # 请求数限制
+    assert [limiter.acquire("ip:1.2.3.4") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("ip:1.2.3.4") > 0
+    # 其他客户端不受影响
+    assert limiter.acquire("ip:5.6.7.8", 8.0) == 0.0
+    # 像素数不足时拒绝，且不扣除请求数令牌
+    assert limiter.acquire("ip:5.6.7.8", 4.0) > 0
+    assert limiter.acquire("ip:5.6.7.8", 2.0) == 0.0
+
+    # 单独配置的API密钥使用自己的速率
+    vip = client_label("vip")
+    assert all(limiter.acquire(vip, 12.0) == 0.0 for _ in range(50))
+
+    stats = limiter.stats()
+    assert stats["rejected"] == 2
+    assert stats["clients"]["ip:5.6.7.8"]["admitted"] == 2
+    assert stats["clients"]["ip:5.6.7.8"]["rejected"] == 1
+    assert stats["overrides"][vip]["requests_per_second"] == 1000
+    assert "vip" not in str(stats)
+    logger.info("✅ 客户端限流测试成功")
+    return True
+
+
+def test_client_eviction():
+    """测试跟踪的客户端数量有上限"""
+    from services.rate_limiter import RateLimiter, make_limits
+
+    limiter = RateLimiter(make_limits(1, 0), max_clients=8)
+    for index in range(20):
+        limiter.acquire(f"ip:10.0.0.{index}")
+    clients = limiter.stats()["clients"]
+    assert len(clients) == 8 and "ip:10.0.0.19" in clients and "ip:10.0.0.0" not in clients
+    logger.info("✅ 客户端淘汰测试成功")
+    return True
+
+
+def test_resolve_client_id():
+    """测试只有单独配置的API密钥按密钥区分，未配置的密钥按客户端IP区分"""
+    from services.rate_limiter import client_label, resolve_client_id
+
+    known_keys = {"vip": (1000, 1000)}
+    assert resolve_client_id("vip", "1.2.3.4", known_keys) == client_label("vip")
+    # 随意填写的密钥不能得到新的令牌桶
+    assert resolve_client_id("random-1", "1.2.3.4", known_keys) == "ip:1.2.3.4"
+    assert resolve_client_id("random-2", "1.2.3.4", known_keys) == "ip:1.2.3.4"
+    assert resolve_client_id(None, "1.2.3.4", known_keys) == "ip:1.2.3.4"
+    assert resolve_client_id("random-1", None, known_keys) == "anonymous"
+    logger.info("✅ 客户端标识测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始客户端限流测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("令牌桶测试", test_token_bucket),
+        ("客户端限流测试", test_rate_limiter),
+        ("客户端淘汰测试", test_client_eviction),
+        ("客户端标识测试", test_resolve_client_id),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区域识别测试脚本
+用于验证识别区域的格式校验、裁剪到图片范围，以及识别结果平移回原图坐标
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_clip_regions():
+    """测试区域裁剪到图片范围、角点顺序归一化，忽略裁剪后为空的区域，格式错误时报错"""
+    from utils.regions import clip_regions
+
+    regions = [
+        [[10, 20], [110, 70]],
+        # 右下角在前、超出图片范围
+        [[250, 150], [150, 90]],
+        # 完全位于图片之外
+        [[300, 300], [400, 400]],
+        # 宽度为0
+        [[50, 10], [50, 60]],
+        [[-20, -5], [30, 40]],
+    ]
+    assert clip_regions(regions, 200, 100) == [(10, 20, 110, 70), (150, 90, 200, 100), (0, 0, 30, 40)]
+    assert clip_regions([], 200, 100) == []
+
+    for region in ([[10, 20]], [[10, 20], [30]], [[1, 2], [3, 4], [5, 6]], None):
+        try:
+            clip_regions([region], 200, 100)
+            raise AssertionError("应当拒绝")
+        except ValueError:
+            pass
+    logger.info("✅ 区域裁剪测试成功")
+    return True
+
+
+def test_translate_blocks():
+    """测试文本块坐标平移到原图坐标，其余字段不变，不修改原文本块"""
+    from models.ocr_models import OCRTextBlock
+    from utils.regions import translate_blocks
+
+    block = OCRTextBlock(text="hello", score=0.8, box=[[0, 0], [40, 0], [40, 10], [0, 10]], end="\n")
+    translated = translate_blocks([block], 150, 90)
+    assert len(translated) == 1
+    assert translated[0].box == [[150, 90], [190, 90], [190, 100], [150, 100]]
+    assert (translated[0].text, translated[0].score, translated[0].end) == ("hello", 0.8, "\n")
+    assert block.box == [[0, 0], [40, 0], [40, 10], [0, 10]]
+    assert translate_blocks([], 1, 1) == []
+    logger.info("✅ 坐标平移测试成功")
+    return True
+
+
+def test_region_options():
+    """测试格式错误的识别区域在请求校验时被拒绝（两个引擎都返回422，而不是识别时报错）"""
+    from pydantic import ValidationError
+    from models.ocr_models import OCROptions
+
+    regions = [[[10, 20], [110, 70]]]
+    assert OCROptions.model_validate({"ocr.regions": regions}).ocr_regions == regions
+    assert OCROptions.model_validate({"ocr.regions": []}).ocr_regions == []
+    for region in ([[10, 20]], [[10, 20], [30]], [[1, 2], [3, 4], [5, 6]], [[1, 2, 3], [4, 5]]):
+        try:
+            OCROptions.model_validate({"ocr.regions": [region]})
+            raise AssertionError(f"应当拒绝: {region}")
+        except ValidationError as e:
+            assert "识别区域格式错误" in str(e)
+    logger.info("✅ 区域选项校验测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始区域识别测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("区域裁剪测试", test_clip_regions),
+        ("坐标平移测试", test_translate_blocks),
+        ("区域选项校验测试", test_region_options),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+优先级调度器测试脚本
+用于验证权重分配、预留槽位、客户端间公平排队与排队取消
+"""
+
+import sys
+import os
+import asyncio
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def _run_jobs(scheduler, jobs, order):
+    """按给定的优先级列表并发提交任务，记录获得槽位的顺序"""
+    async def job(priority):
+        async with scheduler.slot(priority):
+            order.append(priority)
+            await asyncio.sleep(0.001)
+
+    await asyncio.gather(*[job(priority) for priority in jobs])
+
+
+def test_weighted_sharing():
+    """测试两个类别都在排队时按权重分配槽位"""
+    from services.scheduler import PriorityScheduler
+
+    scheduler = PriorityScheduler("test", 1, {"interactive": 3, "bulk": 1})
+    order = []
+    asyncio.run(_run_jobs(scheduler, ["bulk"] * 20 + ["interactive"] * 20, order))
+
+    # 第一个bulk任务直接拿到空闲槽位，之后两个类别都在排队，前16个槽位中交互请求约占3/4
+    window = order[1:17]
+    assert 12 <= window.count("interactive") <= 13, order
+    assert len(order) == 40
+    logger.info("✅ 权重分配测试成功")
+    return True
+
+
+def test_reserved_slots():
+    """测试批量任务占满共享槽位时，交互请求仍然可以使用预留槽位"""
+    from services.scheduler import PriorityScheduler
+
+    async def scenario():
+        scheduler = PriorityScheduler("test", 3, {"interactive": 1, "bulk": 1}, {"interactive": 1})
+        release = asyncio.Event()
+
+        async def bulk():
+            async with scheduler.slot("bulk"):
+                await release.wait()
+
+        bulk_tasks = [asyncio.create_task(bulk()) for _ in range(5)]
+        await asyncio.sleep(0)
+        stats = scheduler.stats()["classes"]["bulk"]
+        assert stats["running"] == 2 and stats["queued"] == 3, stats
+
+        async with scheduler.slot("interactive"):
+            assert scheduler.stats()["classes"]["interactive"]["running"] == 1
+
+        release.set()
+        await asyncio.gather(*bulk_tasks)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shared_capacity"] == 2
+    assert stats["classes"]["bulk"]["completed"] == 5
+    assert stats["classes"]["interactive"]["completed"] == 1
+    logger.info("✅ 预留槽位测试成功")
+    return True
+
+
+def test_client_round_robin():
+    """测试同一优先级内各客户端轮流获得槽位"""
+    from services.scheduler import PriorityScheduler
+
+    async def scenario():
+        scheduler = PriorityScheduler("test", 1, {"bulk": 1})
+        order = []
+
+        async def job(client_id):
+            async with scheduler.slot("bulk", client_id):
+                order.append(client_id)
+                await asyncio.sleep(0.001)
+
+        # 客户端a一次提交10个请求，随后b、c各提交2个
+        jobs = [job("a") for _ in range(10)] + [job("b") for _ in range(2)] + [job("c") for _ in range(2)]
+        await asyncio.gather(*jobs)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    # 第一个a请求直接获得槽位，之后三个客户端轮流，b、c不用等a的整批请求
+    assert order[:7] == ["a", "a", "b", "c", "a", "b", "c"], order
+    assert stats["classes"]["bulk"]["queued_clients"] == 0
+    logger.info("✅ 客户端公平排队测试成功")
+    return True
+
+
+def test_cancel_waiter():
+    """测试取消排队中的请求会移出队列，且不占用槽位"""
+    from services.scheduler import PriorityScheduler
+
+    async def scenario():
+        scheduler = PriorityScheduler("test", 1, {"interactive": 1, "bulk": 1})
+        release = asyncio.Event()
+
+        async def hold(priority):
+            async with scheduler.slot(priority):
+                await release.wait()
+
+        holder = asyncio.create_task(hold("bulk"))
+        queued = asyncio.create_task(hold("interactive"))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["classes"]["interactive"]["queued"] == 1
+
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert scheduler.stats()["classes"]["interactive"]["queued"] == 0
+        assert scheduler.stats()["classes"]["interactive"]["dropped"] == 1
+
+        release.set()
+        await holder
+        async with scheduler.slot("interactive"):
+            pass
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["classes"]["bulk"]["running"] == 0
+    assert stats["classes"]["interactive"]["running"] == 0
+    assert stats["classes"]["interactive"]["completed"] == 1
+    logger.info("✅ 排队取消测试成功")
+    return True
+
+
+def test_resize():
+    """测试调整槽位数：扩容后排队的请求立即获得槽位，预留槽位按新的槽位数重新分配，缩容后运行数降下来之前不再分配"""
+    from services.scheduler import PriorityScheduler
+
+    async def scenario():
+        scheduler = PriorityScheduler("test", 1, {"interactive": 1, "bulk": 1}, {"interactive": 1})
+        assert scheduler.stats()["classes"]["interactive"]["reserved"] == 0
+        release = asyncio.Event()
+        running_at_start = []
+
+        async def bulk():
+            async with scheduler.slot("bulk"):
+                running_at_start.append(scheduler.stats()["classes"]["bulk"]["running"])
+                await release.wait()
+
+        tasks = [asyncio.create_task(bulk()) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["classes"]["bulk"]["running"] == 1
+
+        scheduler.resize(3)
+        stats = scheduler.stats()
+        assert stats["capacity"] == 3 and stats["shared_capacity"] == 2
+        assert stats["classes"]["interactive"]["reserved"] == 1
+        assert stats["classes"]["bulk"]["running"] == 2 and stats["classes"]["bulk"]["queued"] == 2
+
+        scheduler.resize(1)
+        assert scheduler.stats()["classes"]["interactive"]["reserved"] == 0
+        release.set()
+        await asyncio.gather(*tasks)
+        # 缩容后开始的两个请求都是独占唯一的槽位
+        assert running_at_start == [1, 2, 1, 1], running_at_start
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["capacity"] == 1 and stats["classes"]["bulk"]["completed"] == 4
+    logger.info("✅ 调整槽位数测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始优先级调度器测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("权重分配测试", test_weighted_sharing),
+        ("预留槽位测试", test_reserved_slots),
+        ("客户端公平排队测试", test_client_round_robin),
+        ("排队取消测试", test_cancel_waiter),
+        ("调整槽位数测试", test_resize),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
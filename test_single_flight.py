@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相同请求合并测试脚本
+用于验证single-flight的结果共享与取消语义
+"""
+
+import sys
+import os
+import asyncio
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _make_response(text: str):
+    from models.ocr_models import OCRResponse
+    return OCRResponse(code=100, data=text, time=0.1, timestamp=0.0)
+
+
+def test_concurrent_requests_share_result():
+    """测试相同键的并发请求只执行一次"""
+    from services.single_flight import SingleFlight
+
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return _make_response("共享结果")
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*[flights.do("same", work) for _ in range(5)])
+        other = await flights.do("other", work)
+        return flights, results, other
+
+    flights, results, other = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result.data == "共享结果" for result in results)
+    assert flights.shared == 4
+    assert len(flights) == 0
+    assert other.data == "共享结果"
+    logger.info("✅ 结果共享测试成功")
+    return True
+
+
+def test_waiter_cancel_keeps_shared_work():
+    """测试单个等待方取消不影响其他等待方，全部取消时才取消共享任务"""
+    from services.single_flight import SingleFlight
+
+    state = {"finished": False, "cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(0.1)
+            state["finished"] = True
+            return _make_response("完成")
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        flights = SingleFlight()
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        assert first.cancelled()
+        assert result.data == "完成" and state["finished"]
+
+        # 所有等待方都取消后共享任务也被取消，新的相同请求重新发起计算
+        state["finished"] = False
+        only = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.sleep(0)
+        retry = await flights.do("key", work)
+        assert state["cancelled"] and retry.data == "完成"
+        return True
+
+    result = asyncio.run(run())
+    logger.info("✅ 等待方取消测试成功")
+    return result
+
+
+def test_service_coalesces_identical_requests():
+    """测试OCRService按图片和选项合并请求"""
+    from models.ocr_models import OCRRequest, OCROptions
+    from services.single_flight import RequestCoalescer
+
+    calls = []
+
+    async def run():
+        coalescer = RequestCoalescer()
+
+        async def recognize(request):
+            calls.append(request.options.ocr_language if request.options else None)
+            await asyncio.sleep(0.05)
+            return _make_response(request.base64)
+
+        same = OCRRequest(base64="aGVsbG8=")
+        other_options = OCRRequest(base64="aGVsbG8=", options=OCROptions(ocr_language="models/config_en.txt"))
+        requests = [same, same.model_copy(), other_options]
+        return await asyncio.gather(*[coalescer.run(r, lambda r=r: recognize(r)) for r in requests])
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result.data == "aGVsbG8=" for result in results)
+    logger.info("✅ 服务请求合并测试成功")
+    return True
+
+
+def test_borrowed_request_does_not_lead():
+    """测试借用图片数据的请求可以加入已有的计算，但不会发起其他请求等待的共享计算"""
+    from models.ocr_models import OCRRequest
+    from services.single_flight import RequestCoalescer
+
+    calls = []
+
+    async def run():
+        coalescer = RequestCoalescer()
+
+        async def recognize(name):
+            calls.append(name)
+            await asyncio.sleep(0.05)
+            return _make_response(name)
+
+        def submit(request, name):
+            return asyncio.ensure_future(coalescer.run(request, lambda: recognize(name)))
+
+        owned = OCRRequest.from_image(b"image")
+        borrowed = OCRRequest.from_image(memoryview(b"image"), borrowed=True)
+
+        # 借用的请求先到：单独识别，之后的相同请求不会加入
+        first = submit(borrowed, "borrowed")
+        await asyncio.sleep(0.01)
+        assert len(coalescer.flights) == 0
+        second = submit(owned, "owned")
+        await asyncio.sleep(0.01)
+        # 借用的请求后到：加入已有的计算
+        third = submit(borrowed, "joined")
+        results = await asyncio.gather(first, second, third)
+        return coalescer, [result.data for result in results]
+
+    coalescer, results = asyncio.run(run())
+    assert calls == ["borrowed", "owned"], calls
+    assert results == ["borrowed", "owned", "owned"], results
+    assert coalescer.flights.shared == 1
+    logger.info("✅ 借用数据请求合并测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始相同请求合并测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("结果共享测试", test_concurrent_requests_share_result),
+        ("等待方取消测试", test_waiter_cancel_keeps_shared_work),
+        ("服务请求合并测试", test_service_coalesces_identical_requests),
+        ("借用数据请求合并测试", test_borrowed_request_does_not_lead),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动脚本测试
+用于验证监听套接字的创建，以及生产模式下工作进程被回收或崩溃后由主进程自动补充
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 测试用的最小ASGI应用：返回工作进程的PID，/crash 使工作进程异常退出
+STUB_APP = '''
+import os
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            await send({"type": message["type"] + ".complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+    if scope["path"] == "/crash":
+        os._exit(3)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+'''
+
+
+def _free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_create_listen_socket():
+    """测试监听套接字处于监听状态、可被子进程继承，SO_REUSEPORT时多个套接字可以绑定同一端口"""
+    import socket
+    from start import create_listen_socket
+
+    sock = create_listen_socket("127.0.0.1", 0, 16)
+    try:
+        port = sock.getsockname()[1]
+        assert sock.get_inheritable()
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN) == 1
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR) == 1
+        with socket.create_connection(("127.0.0.1", port), timeout=5):
+            conn, _ = sock.accept()
+            conn.close()
+    finally:
+        sock.close()
+
+    if hasattr(socket, "SO_REUSEPORT"):
+        first = create_listen_socket("127.0.0.1", 0, 16, reuse_port=True)
+        try:
+            port = first.getsockname()[1]
+            second = create_listen_socket("127.0.0.1", port, 16, reuse_port=True)
+            assert second.getsockname()[1] == port
+            second.close()
+            # 未设置SO_REUSEPORT时端口已被占用
+            try:
+                create_listen_socket("127.0.0.1", port, 16).close()
+                raise AssertionError("应当绑定失败")
+            except OSError:
+                pass
+        finally:
+            first.close()
+
+    if socket.has_ipv6:
+        try:
+            sock = create_listen_socket("::1", 0, 16)
+        except OSError:
+            # 环境未启用IPv6
+            pass
+        else:
+            assert sock.family == socket.AF_INET6
+            sock.close()
+    logger.info("✅ 监听套接字测试成功")
+    return True
+
+
+def test_supervisor_restarts():
+    """测试工作进程达到请求数上限被回收、崩溃后都由主进程启动新进程，主进程收到SIGTERM后停止所有工作进程"""
+    import signal
+    import subprocess
+    import tempfile
+    import time
+    import httpx
+
+    if not hasattr(os, "fork"):
+        logger.info("⚠️ 当前平台不支持fork，跳过")
+        return True
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+
+    def get_pid(exclude=(), timeout=15):
+        # 工作进程重启期间连接在监听队列中等待或被重置；uvicorn每0.1秒检查一次请求数上限，
+        # 紧接着的请求仍可能由将要退出的进程处理，重试直到其他进程响应
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                pid = int(httpx.get(url, timeout=5).text)
+                if pid not in exclude:
+                    return pid
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "等待工作进程超时"
+            time.sleep(0.1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "stub_app.py"), "w", encoding="utf-8") as f:
+            f.write(STUB_APP)
+        code = (
+            "import sys, start\n"
+            f"sys.path.insert(0, {directory!r})\n"
+            f"start.start_production_server(host='127.0.0.1', port={port}, workers=1, max_requests=2, "
+            "graceful_timeout=1, loop='asyncio', http='h11', app='stub_app:app')\n"
+        )
+        supervisor = subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            first = get_pid()
+            # 处理满2个请求后回收
+            second = get_pid(exclude={first})
+
+            try:
+                httpx.get(f"{url}/crash", timeout=5)
+            except httpx.TransportError:
+                pass
+            third = get_pid(exclude={first, second})
+        finally:
+            supervisor.send_signal(signal.SIGTERM)
+            output, _ = supervisor.communicate(timeout=30)
+
+    assert supervisor.returncode == 0, output
+    assert f"工作进程 {first} 已回收，启动新进程" in output, output
+    assert f"✗ 工作进程 {second} 异常退出（3），重新启动" in output, output
+    assert "服务已停止" in output, output
+    for pid in (first, second, third):
+        try:
+            os.kill(pid, 0)
+            raise AssertionError(f"工作进程 {pid} 仍在运行")
+        except ProcessLookupError:
+            pass
+    logger.info("✅ 工作进程重启测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始启动脚本测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("监听套接字测试", test_create_listen_socket),
+        ("工作进程重启测试", test_supervisor_restarts),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
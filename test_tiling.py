@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块识别测试脚本
+用于验证分块方案覆盖整图、分块结果平移回整图坐标，以及接缝处重复文本块的去除
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _block(text, x0, y0, x1, y1, score=0.9):
+    from models.ocr_models import OCRTextBlock
+    return OCRTextBlock(text=text, score=score, box=[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], end=" ")
+
+
+def test_compute_tiles():
+    """测试分块不越出图片、不超过分块边长，核心区恰好不重不漏地覆盖整图；重叠宽度不小于分块边长时报错"""
+    import numpy as np
+    from utils.tiling import compute_tiles
+
+    for width, height, tile_size, overlap in ((1000, 100, 600, 200), (2500, 1800, 640, 64), (300, 200, 640, 64),
+                                              (1281, 641, 640, 0)):
+        coverage = np.zeros((height, width), dtype=np.int32)
+        for (x0, y0, x1, y1), (cx0, cy0, cx1, cy1) in compute_tiles(width, height, tile_size, overlap):
+            assert 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height
+            assert x1 - x0 <= tile_size and y1 - y0 <= tile_size
+            assert x0 <= cx0 < cx1 <= x1 and y0 <= cy0 < cy1 <= y1
+            coverage[cy0:cy1, cx0:cx1] += 1
+        assert (coverage == 1).all(), (width, height, tile_size, overlap)
+
+    for tile_size, overlap in ((0, 0), (64, 64), (64, -1)):
+        try:
+            compute_tiles(100, 100, tile_size, overlap)
+            raise AssertionError("应当拒绝")
+        except ValueError:
+            pass
+    logger.info("✅ 分块方案测试成功")
+    return True
+
+
+def test_merge_tile_blocks():
+    """测试坐标平移回整图、中心点不在核心区的文本块被丢弃、接缝处的重复文本块只保留更完整的一个"""
+    from utils.tiling import compute_tiles, merge_tile_blocks
+
+    # 宽1000的图片按600分块、重叠200：分块 [0,600) 与 [400,1000)，核心区以500为界
+    tiles = compute_tiles(1000, 100, 600, 200)
+    assert [tile for tile, _ in tiles] == [(0, 0, 600, 100), (400, 0, 1000, 100)]
+
+    left = [
+        _block("a", 10, 10, 200, 30),
+        # 跨越接缝的一行文字，在左侧分块中被切在600处（整图 300-600）
+        _block("seam-left", 300, 50, 600, 70),
+        # 中心点在右侧分块的核心区内，由右侧分块负责
+        _block("owned-by-right", 520, 10, 590, 30),
+    ]
+    right = [
+        # 同一行文字在右侧分块中被切在开头（分块坐标 20-300，整图 420-700）
+        _block("seam-right", 20, 50, 300, 70, score=0.99),
+        _block("owned-by-right", 120, 10, 190, 30),
+        _block("b", 500, 80, 550, 95),
+        _block("no-box", 0, 0, 0, 0),
+    ]
+    right[-1].box = []
+
+    merged = merge_tile_blocks(list(zip(tiles, [left, right])))
+    assert [block.text for block in merged] == ["a", "owned-by-right", "seam-left", "b", "no-box"]
+    assert merged[1].box == [[520, 10], [590, 10], [590, 30], [520, 30]]
+    assert merged[3].box == [[900, 80], [950, 80], [950, 95], [900, 95]]
+    assert merged[2].box[1] == [600, 50]
+    logger.info("✅ 分块结果合并测试成功")
+    return True
+
+
+def test_suppress_duplicates():
+    """测试只去除来自不同分块的重复文本块，面积相同时保留置信度更高的"""
+    import numpy as np
+    from utils.tiling import _suppress_duplicates
+
+    bounds = np.array([[0, 0, 100, 20], [10, 0, 100, 20], [0, 0, 100, 20], [200, 0, 300, 20]], dtype=np.float64)
+    scores = np.array([0.8, 0.9, 0.95, 0.9])
+    # 同一分块内重叠的文本块不视为重复
+    assert _suppress_duplicates(bounds, scores, np.array([0, 0, 0, 1]), 0.5).tolist() == [True, True, True, True]
+    # 0与2面积相同，保留置信度更高的2；1被更大的2覆盖
+    assert _suppress_duplicates(bounds, scores, np.array([0, 1, 2, 2]), 0.5).tolist() == [False, False, True, True]
+    logger.info("✅ 重复文本块去除测试成功")
+    return True
+
+
+def test_tile_options():
+    """测试重叠宽度不小于分块边长的识别选项在请求校验时被拒绝"""
+    from pydantic import ValidationError
+    from models.ocr_models import OCROptions
+
+    assert OCROptions.model_validate({"ocr.tile_size": 640, "ocr.tile_overlap": 64}).ocr_tile_overlap == 64
+    assert OCROptions.model_validate({"ocr.tile_overlap": 64}).ocr_tile_size is None
+    try:
+        OCROptions.model_validate({"ocr.tile_size": 64, "ocr.tile_overlap": 64})
+        raise AssertionError("应当拒绝")
+    except ValidationError as e:
+        assert "ocr.tile_overlap" in str(e)
+    logger.info("✅ 分块选项校验测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始分块识别测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("分块方案测试", test_compute_tiles),
+        ("分块结果合并测试", test_merge_tile_blocks),
+        ("重复文本块去除测试", test_suppress_duplicates),
+        ("分块选项校验测试", test_tile_options),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
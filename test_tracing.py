@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求链路追踪测试脚本
+用于验证traceparent解析、span记录、追踪中间件与导出格式
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ListExporter:
+    """把导出的span保存到列表中"""
+
+    def __init__(self):
+        self.spans = []
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, spans):
+        self.spans.extend(spans)
+        self.exported += len(spans)
+
+    def close(self):
+        pass
+
+
+def test_traceparent():
+    """测试traceparent请求头的解析"""
+    from services.tracing import parse_traceparent
+
+    trace_id, span_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert parse_traceparent(f"00-{trace_id}-{span_id}-01") == (trace_id, span_id, True)
+    assert parse_traceparent(f"00-{trace_id.upper()}-{span_id}-00") == (trace_id, span_id, False)
+    for invalid in (None, "", "00-abc-def-01", f"ff-{trace_id}-{span_id}-01", f"00-{'0' * 32}-{span_id}-01"):
+        assert parse_traceparent(invalid) is None
+    logger.info("✅ traceparent解析测试成功")
+    return True
+
+
+def test_spans():
+    """测试span嵌套、未采样时为空操作、已结束阶段的记录与传递的请求头"""
+    import asyncio
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+    from services import tracing
+
+    # 没有追踪时不记录，也不传递请求头
+    with tracing.span("outside") as span:
+        span.set(a=1)
+    assert tracing.current_span() is None and tracing.propagation_headers() == {}
+
+    exporter = ListExporter()
+    tracer = tracing.Tracer(exporter, sample_rate=0.0)
+    root = tracer.start("GET /")
+    token = tracing._current_span.set(root)
+    try:
+        assert tracing.span("skipped") is tracing._NOOP_SPAN
+        assert tracing.propagation_headers()["traceparent"].endswith("-00")
+    finally:
+        tracing._current_span.reset(token)
+    tracer.finish(root)
+    assert exporter.spans == [] and tracer.stats()["traces"] == 1
+
+    tracer = tracing.Tracer(exporter, sample_rate=1.0)
+    root = tracer.start("GET /", "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert root.trace.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736" and root.parent_id == "00f067aa0ba902b7"
+
+    def in_thread():
+        with tracing.span("thread"):
+            pass
+
+    async def handler():
+        start = tracing.now()
+        with tracing.span("outer", engine="umi_ocr") as outer:
+            tracing.record_span("wait", start)
+            headers = tracing.propagation_headers()
+            # 执行器线程中复制上下文后，span挂在提交时的span下
+            with ThreadPoolExecutor(1) as executor:
+                executor.submit(contextvars.copy_context().run, in_thread).result()
+            try:
+                with tracing.span("failed"):
+                    raise ValueError("bad")
+            except ValueError:
+                pass
+        return outer, headers
+
+    token = tracing._current_span.set(root)
+    try:
+        outer, headers = asyncio.run(handler())
+    finally:
+        tracing._current_span.reset(token)
+    tracer.finish(root)
+
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {"GET /", "outer", "wait", "thread", "failed"}
+    assert spans["outer"].parent_id == root.span_id and spans["outer"].attributes == {"engine": "umi_ocr"}
+    assert spans["wait"].parent_id == outer.span_id and spans["thread"].parent_id == outer.span_id
+    assert spans["failed"].error == "ValueError: bad"
+    assert headers["traceparent"] == f"00-{root.trace.trace_id}-{outer.span_id}-01"
+    logger.info("✅ span记录测试成功")
+    return True
+
+
+def test_middleware():
+    """测试中间件返回追踪ID，按接口处理函数推算请求体解析和响应序列化"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from pydantic import BaseModel
+    from services import tracing
+
+    class Body(BaseModel):
+        text: str
+
+    app = FastAPI()
+
+    @app.post("/echo")
+    @tracing.traced_handler
+    async def echo(body: Body):
+        with tracing.span("work"):
+            return body
+
+    exporter = ListExporter()
+    app.add_middleware(tracing.TracingMiddleware, tracer=tracing.Tracer(exporter, sample_rate=1.0))
+    client = TestClient(app)
+
+    response = client.post("/echo", json={"text": "hello"})
+    assert response.status_code == 200 and response.json() == {"text": "hello"}
+    trace_id = response.headers["x-trace-id"]
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {"POST /echo", tracing.HANDLER_SPAN, "work", "request.parse", "response.serialize"}
+    assert all(span.trace.trace_id == trace_id for span in exporter.spans)
+    root = spans["POST /echo"]
+    assert root.attributes["http.status_code"] == 200 and root.kind == tracing.SPAN_KIND_SERVER
+    assert spans["request.parse"].end == spans[tracing.HANDLER_SPAN].start
+    assert spans["response.serialize"].start == spans[tracing.HANDLER_SPAN].end
+
+    # 校验失败时处理函数没有执行，只有根span
+    exporter.spans.clear()
+    assert client.post("/echo", json={}).status_code == 422
+    assert [span.name for span in exporter.spans] == ["POST /echo"]
+    logger.info("✅ 追踪中间件测试成功")
+    return True
+
+
+def test_exporters():
+    """测试OTLP请求体格式与JSONL文件导出"""
+    import json
+    import tempfile
+    from services import tracing
+
+    trace = tracing.Trace("4bf92f3577b34da6a3ce929d0e0e4736", True)
+    root = tracing.Span(trace, "POST /api/ocr", kind=tracing.SPAN_KIND_SERVER, start=1000)
+    root.finish(5000)
+    child = tracing.Span(trace, "umi_ocr.request", root.span_id, tracing.SPAN_KIND_CLIENT,
+                         {"http.status_code": 200, "retry": False, "ratio": 0.5, "url": "http://x"}, start=2000)
+    child.error = "HTTPError: timeout"
+    child.finish(3000)
+
+    payload = tracing.otlp_payload(trace.spans, "umi-ocr-api")
+    resource_spans = payload["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"][0]["value"] == {"stringValue": "umi-ocr-api"}
+    otlp_root, otlp_child = resource_spans["scopeSpans"][0]["spans"]
+    assert "parentSpanId" not in otlp_root and otlp_child["parentSpanId"] == root.span_id
+    assert otlp_child["startTimeUnixNano"] == "2000" and otlp_child["status"]["code"] == 2
+    assert [attribute["value"] for attribute in otlp_child["attributes"]] == [
+        {"intValue": "200"}, {"boolValue": False}, {"doubleValue": 0.5}, {"stringValue": "http://x"}]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces", "spans.jsonl")
+        exporter = tracing.JsonlSpanExporter(path, max_bytes=600, backups=2)
+        for _ in range(3):
+            exporter.export(trace.spans)
+        exporter.close()
+        with open(path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+        # 超过文件大小后轮转到备份文件
+        assert os.path.exists(path + ".1")
+        assert records and records[-1]["name"] == "umi_ocr.request" and records[-1]["duration_ms"] == 0.001
+        assert records[-1]["parent_span_id"] == root.span_id and records[-1]["error"] == "HTTPError: timeout"
+        assert exporter.exported == 6
+    logger.info("✅ 导出格式测试成功")
+    return True
+
+
+def test_otlp_exporter_after_fork():
+    """测试fork后子进程重新启动OTLP导出线程，子进程的span被发送到采集器"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from services import tracing
+
+    if not hasattr(os, "fork"):
+        logger.info("⚠️ 当前平台不支持fork，跳过")
+        return True
+
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received.extend(item["name"] for item in payload["resourceSpans"][0]["scopeSpans"][0]["spans"])
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    exporter = tracing.OtlpSpanExporter(f"http://127.0.0.1:{server.server_port}/v1/traces", interval=0.05)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                trace = tracing.Trace("4bf92f3577b34da6a3ce929d0e0e4736", True)
+                tracing.Span(trace, "worker.span").finish()
+                exporter.export(trace.spans)
+                exporter.close()
+                code = 0 if exporter.exported == 1 else 2
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0, status
+        assert received == ["worker.span"]
+        # 父进程的导出线程不受影响
+        trace = tracing.Trace("4bf92f3577b34da6a3ce929d0e0e4736", True)
+        tracing.Span(trace, "parent.span").finish()
+        exporter.export(trace.spans)
+    finally:
+        exporter.close()
+        server.shutdown()
+        server.server_close()
+    assert received == ["worker.span", "parent.span"] and exporter.exported == 1
+    logger.info("✅ fork后OTLP导出测试成功")
+    return True
+
+
+def main():
+    """主测试函数"""
+    logger.info("🧪 开始请求链路追踪测试")
+    logger.info("=" * 50)
+
+    tests = [
+        ("traceparent解析测试", test_traceparent),
+        ("span记录测试", test_spans),
+        ("追踪中间件测试", test_middleware),
+        ("导出格式测试", test_exporters),
+        ("fork后OTLP导出测试", test_otlp_exporter_after_fork),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        logger.info(f"\n🔧 执行测试: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+            else:
+                logger.warning(f"⚠️ 测试失败: {test_name}")
+        except Exception as e:
+            logger.error(f"💥 测试异常: {test_name} - {e!r}")
+
+    logger.info("\n" + "=" * 50)
+    logger.info(f"📊 测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+base64请求体的流式解析
+边接收边解析 {"base64": "...", "options": {...}} 形式的JSON请求体：顶层base64字段的值按块校验、解码到字节缓冲区，
+其余部分（识别选项）很小，收集后再用json解析；不生成完整的请求体、base64字符串和清理后的副本，
+每个请求的峰值内存约为解码后的图片大小
+"""
+
+import binascii
+import json
+import logging
+from typing import AsyncIterable, Optional, Tuple
+
+from utils.image_utils import ImageRejected, sniff_image_format
+
+logger = logging.getLogger(__name__)
+
+_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_WHITESPACE = b" \t\r\n"
+# JSON字符串中base64数据可能出现的转义：\/ 是 /，\n \r \t 是换行（部分编码器按固定宽度换行）
+_ESCAPES = {ord("/"): b"/", ord("n"): b"", ord("r"): b"", ord("t"): b""}
+_DATA_PREFIX = b"data:"
+# data:image/xxx;base64, 前缀的最大长度
+_PREFIX_LIMIT = 256
+# 解码出的图片头达到这个长度时按魔数检查格式，不支持的格式不再接收剩余的请求体
+_SNIFF_BYTES = 16
+# 顶层字符串超过这个长度时不记录内容（只需要识别base64字段名）
+_KEY_LIMIT = 64
+# base64字段以外的部分逐字节扫描，超过这个大小时拒绝（识别选项通常只有几百字节）
+_REST_LIMIT = 1024 * 1024
+
+_QUOTE, _BACKSLASH, _COLON, _COMMA = ord('"'), ord("\\"), ord(":"), ord(",")
+
+
+def _invalid(detail: str = "") -> ImageRejected:
+    return ImageRejected("无效的base64图片数据" + (f": {detail}" if detail else ""))
+
+
+class Base64BodyParser:
+    """
+    增量解析base64识别请求的JSON请求体
+
+    依次调用feed传入接收到的数据块，最后调用finish取得解码后的图片字节和其余的JSON文档（base64字段的值替换为空字符串）。
+    base64字段的值去掉data:前缀和空白后逐块校验字符集与填充，凑满4个字符的部分立即解码；
+    解码出图片头后按魔数检查格式，超过max_bytes时立即停止
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.image = bytearray()
+        # 除base64字段的值以外的部分
+        self._rest = bytearray()
+        # JSON结构的词法状态
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[bytes] = None
+        self._key: Optional[bytes] = None
+        self._after_colon = False
+        # base64字段的值的解析状态
+        self._in_value = False
+        self._found = False
+        self._value_escape = False
+        self._prefix: Optional[bytearray] = None
+        self._pending = b""
+        self._padded = False
+        self._sniffed = False
+
+    def feed(self, chunk: bytes):
+        """解析一块请求体数据"""
+        position = 0
+        while position < len(chunk):
+            if self._in_value:
+                position = self._feed_value(chunk, position)
+            else:
+                position = self._feed_structure(chunk, position)
+
+    def _feed_structure(self, chunk: bytes, start: int) -> int:
+        """逐字节扫描JSON结构并保存到_rest，遇到顶层base64字段的值时返回值的起始位置"""
+        rest = self._rest
+        for index in range(start, len(chunk)):
+            char = chunk[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == _BACKSLASH:
+                    self._escape = True
+                elif char == _QUOTE:
+                    self._in_string = False
+                    if self._depth == 1:
+                        end = len(rest) + index - start
+                        rest += chunk[start:index + 1]
+                        start = index + 1
+                        length = end - self._string_start
+                        self._last_string = bytes(rest[self._string_start:end]) if length <= _KEY_LIMIT else None
+                continue
+            if char == _QUOTE:
+                if self._depth == 1 and self._after_colon and self._key == b"base64":
+                    if self._found:
+                        raise ValueError("base64字段重复")
+                    rest += chunk[start:index + 1]
+                    self._enter_value()
+                    return index + 1
+                self._in_string = True
+                self._string_start = len(rest) + index - start + 1
+            elif char in b"{[":
+                self._depth += 1
+            elif char in b"}]":
+                self._depth -= 1
+            elif self._depth == 1 and char == _COLON:
+                self._key = self._last_string
+                self._after_colon = True
+                continue
+            elif self._depth == 1 and char == _COMMA:
+                self._key = None
+            if char not in _WHITESPACE:
+                self._after_colon = False
+        rest += chunk[start:]
+        if len(rest) > _REST_LIMIT:
+            raise ValueError(f"请求体中base64字段以外的部分超过 {_REST_LIMIT} bytes")
+        return len(chunk)
+
+    def _enter_value(self):
+        self._in_value = True
+        self._found = True
+        self._prefix = bytearray()
+
+    def _feed_value(self, chunk: bytes, start: int) -> int:
+        """处理base64字段的值，遇到结束的引号时返回引号之后的位置"""
+        end = chunk.find(b'"', start)
+        segment = chunk[start:end if end >= 0 else len(chunk)]
+        if self._value_escape:
+            segment = b"\\" + segment
+            self._value_escape = False
+        if b"\\" in segment:
+            segment = self._unescape(segment, closed=end >= 0)
+        self._add(segment)
+        if end < 0:
+            return len(chunk)
+        self._finish_value()
+        self._rest += b'"'
+        self._last_string = None
+        self._after_colon = False
+        return end + 1
+
+    def _unescape(self, segment: bytes, closed: bool) -> bytes:
+        """还原JSON转义，数据块末尾的反斜杠留到下一块处理"""
+        parts = segment.split(b"\\")
+        output = [parts[0]]
+        for number, part in enumerate(parts[1:], 1):
+            if not part:
+                if number == len(parts) - 1 and not closed:
+                    self._value_escape = True
+                    break
+                # 转义的引号或反斜杠都不是base64字符
+                raise _invalid()
+            replacement = _ESCAPES.get(part[0])
+            if replacement is None:
+                raise _invalid()
+            output.append(replacement)
+            output.append(part[1:])
+        return b"".join(output)
+
+    def _add(self, segment: bytes):
+        """校验并解码base64字符，不足4个字符的部分留到下一块"""
+        if self._prefix is not None:
+            # 值的开头可能是data:image/xxx;base64,前缀，确定之前先缓存
+            self._prefix += segment
+            prefix = self._prefix.lstrip(_WHITESPACE)
+            if prefix.startswith(_DATA_PREFIX):
+                comma = prefix.find(b",")
+                if comma < 0:
+                    if len(prefix) > _PREFIX_LIMIT:
+                        raise _invalid("data:前缀过长")
+                    return
+                segment = bytes(prefix[comma + 1:])
+            elif len(prefix) < len(_DATA_PREFIX) and _DATA_PREFIX.startswith(prefix):
+                return
+            else:
+                segment = bytes(prefix)
+            self._prefix = None
+
+        chars = segment.translate(None, _WHITESPACE)
+        if chars.translate(None, _ALPHABET):
+            raise _invalid("包含非base64字符")
+        if self._pending:
+            chars = self._pending + chars
+        usable = len(chars) - len(chars) % 4
+        self._pending = chars[usable:]
+        if usable:
+            self._decode(chars[:usable] if usable < len(chars) else chars)
+
+    def _decode(self, quads: bytes):
+        if self._padded:
+            raise _invalid("填充字符之后还有数据")
+        padding = quads.find(b"=")
+        if padding >= 0:
+            if padding < len(quads) - 2 or quads[-1] != ord("="):
+                raise _invalid("填充字符位置不正确")
+            self._padded = True
+        if len(self.image) + len(quads) // 4 * 3 - quads.count(b"=") > self.max_bytes:
+            raise ImageRejected(f"图片过大: 解码后超过 {self.max_bytes} bytes", "too_large")
+        try:
+            self.image += binascii.a2b_base64(quads)
+        except binascii.Error as e:
+            raise _invalid(str(e))
+        if not self._sniffed and len(self.image) >= _SNIFF_BYTES:
+            self._sniffed = True
+            if sniff_image_format(bytes(self.image[:_SNIFF_BYTES])) is None:
+                raise ImageRejected("不支持的图片格式（支持JPEG、PNG、BMP、TIFF、WebP）", "format")
+
+    def _finish_value(self):
+        self._in_value = False
+        if self._prefix is not None:
+            # 值很短，没有凑够判断前缀的长度
+            prefix, self._prefix = bytes(self._prefix), None
+            self._add(prefix)
+        if self._pending:
+            raise _invalid("数据长度不是4的倍数")
+
+    def finish(self) -> Tuple[bytearray, dict]:
+        """
+        结束解析
+
+        Returns:
+            Tuple[bytearray, dict]: 解码后的图片字节（没有base64字段时为空），其余的JSON文档
+
+        Raises:
+            ValueError: 请求体不是JSON对象
+            ImageRejected: base64数据无效或图片为空
+        """
+        if self._in_value:
+            raise ValueError("请求体不完整")
+        try:
+            document = json.loads(self._rest)
+        except ValueError as e:
+            raise ValueError(f"无效的JSON请求体: {e}")
+        if not isinstance(document, dict):
+            raise ValueError("请求体必须是JSON对象")
+        if self._found and not self.image:
+            raise _invalid()
+        return self.image, document
+
+
+async def parse_base64_body(stream: AsyncIterable[bytes], max_bytes: int) -> Tuple[bytearray, dict]:
+    """
+    边接收边解析base64识别请求的请求体
+
+    Args:
+        stream: 请求体数据块（例如Request.stream()）
+        max_bytes: 解码后图片的最大字节数
+
+    Returns:
+        Tuple[bytearray, dict]: 解码后的图片字节，其余的JSON文档
+    """
+    parser = Base64BodyParser(max_bytes)
+    async for chunk in stream:
+        parser.feed(chunk)
+    return parser.finish()
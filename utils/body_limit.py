@@ -0,0 +1,55 @@
+"""
+请求体大小限制
+按路径限制请求体的字节数：声明的Content-Length超过上限时直接拒绝，不读取请求体；
+没有声明长度（分块传输）或声明不实时，边接收边计数，超过上限立即中止解析，不会先把整个请求体写入内存或临时文件
+"""
+
+import logging
+from typing import Dict
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """
+    限制指定路径的请求体大小，超过时返回413
+
+    接收过程中超过上限时在receive中抛出HTTPException，FastAPI解析请求体（表单、JSON）时原样抛出，由异常处理返回413
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"请求体过大，最大允许: {limit} bytes"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"拒绝请求 {scope['path']}: Content-Length {content_length} 超过 {limit}")
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"拒绝请求 {scope['path']}: 请求体超过 {limit} bytes")
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
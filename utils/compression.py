@@ -0,0 +1,122 @@
+"""
+请求体解压
+接受 Content-Encoding: gzip 的请求体（base64编码本身有1/4的冗余，base64接口的JSON请求体压缩后通常只有原来的1/2到3/4），
+边接收边解压，解压后的大小超过上限时立即拒绝，防止解压炸弹
+"""
+
+import logging
+import zlib
+from typing import Iterable
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# 每次解压输出的最大字节数：输入中高度压缩的数据分多步展开，每一步都检查大小上限
+_CHUNK_SIZE = 256 * 1024
+
+
+class RequestTooLarge(Exception):
+    """解压后的请求体超过大小上限"""
+
+
+class _GzipDecoder:
+    """增量gzip解压器，输出大小受限"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._output = bytearray()
+
+    def feed(self, data: bytes):
+        while data:
+            if self._decompressor.eof:
+                # 上一个gzip成员已经结束，之后的数据是下一个成员
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._output += self._decompressor.decompress(data, _CHUNK_SIZE)
+            if len(self._output) > self.max_size:
+                raise RequestTooLarge(f"解压后的请求体超过 {self.max_size} 字节")
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+            else:
+                data = self._decompressor.unconsumed_tail
+
+    def finish(self) -> bytes:
+        if not self._decompressor.eof:
+            raise zlib.error("gzip数据不完整")
+        return bytes(self._output)
+
+
+class GzipRequestMiddleware:
+    """
+    解压指定路径的gzip请求体
+
+    请求体在交给应用之前完整解压（JSON请求体本来就需要完整读取），
+    其他路径和没有Content-Encoding的请求原样传递
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_size: int):
+        self.app = app
+        self.paths = set(paths)
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = headers.get("content-encoding", "identity").strip().lower()
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        if encoding != "gzip":
+            response = JSONResponse({"detail": f"不支持的Content-Encoding: {encoding}，只支持gzip"}, status_code=415)
+            await response(scope, receive, send)
+            return
+
+        decoder = _GzipDecoder(self.max_size)
+        received = 0
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body = message.get("body", b"")
+                received += len(body)
+                decoder.feed(body)
+                if not message.get("more_body", False):
+                    break
+            body = decoder.finish()
+        except RequestTooLarge as e:
+            logger.warning(f"拒绝gzip请求体: {e}")
+            response = JSONResponse({"detail": str(e)}, status_code=413)
+            await response(scope, receive, send)
+            return
+        except zlib.error as e:
+            response = JSONResponse({"detail": f"无效的gzip请求体: {e}"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        logger.debug("解压gzip请求体: %d -> %d bytes", received, len(body))
+
+        # 去掉Content-Encoding，Content-Length改为解压后的长度
+        raw_headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope = dict(scope, headers=raw_headers)
+
+        sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decompressed, send)
@@ -0,0 +1,97 @@
+"""
+本地文件输入
+调用方与API在同一主机或共享卷上时，按路径识别允许的根目录下的图片：文件通过mmap只读映射，不读入Python字节串，
+图片头校验、解码和发送给Umi-OCR时直接使用映射的内存，省去客户端base64编码、上传和服务端解码
+"""
+
+import logging
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class FileInputError(Exception):
+    """本地文件输入被拒绝，status_code为对应的HTTP状态码"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def resolve_input_path(path: str, root: str) -> str:
+    """
+    把请求中的路径解析为根目录下的真实路径
+
+    相对路径相对根目录；解析符号链接和..之后仍然必须位于根目录下（指向根目录之外的符号链接同样拒绝）
+
+    Args:
+        path: 请求中的文件路径
+        root: 允许的根目录，为空表示未启用本地文件输入
+
+    Returns:
+        str: 文件的真实路径
+
+    Raises:
+        FileInputError: 未启用（403）、不在根目录下（403）、文件不存在（404）
+    """
+    if not root:
+        raise FileInputError("未启用本地文件输入，请设置环境变量 OCR_FILE_INPUT_ROOT", 403)
+    if not path or "\x00" in path:
+        raise FileInputError("无效的文件路径")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    try:
+        inside = os.path.commonpath([root, resolved]) == root
+    except ValueError:
+        # Windows下位于不同的驱动器
+        inside = False
+    if not inside:
+        raise FileInputError(f"文件不在允许的目录下: {path}", 403)
+    if not os.path.isfile(resolved):
+        raise FileInputError(f"文件不存在: {path}", 404)
+    return resolved
+
+
+@contextmanager
+def map_file(path: str, max_bytes: int) -> Iterator[memoryview]:
+    """
+    只读映射文件，退出时解除映射
+
+    识别期间文件不能被原地截断或改写（映射的页面会失效），写入方应当先写临时文件再重命名
+
+    Args:
+        path: 文件路径
+        max_bytes: 文件的最大字节数
+
+    Yields:
+        memoryview: 映射的文件内容
+
+    Raises:
+        FileInputError: 文件为空、过大（413）或无法读取（403）
+    """
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                raise FileInputError("文件为空")
+            if size > max_bytes:
+                raise FileInputError(f"图片过大: {size} bytes，最大允许: {max_bytes} bytes", 413)
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except PermissionError:
+        raise FileInputError("没有读取文件的权限", 403)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        # 解码和base64编码都是顺序读取，提示内核预读
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # 仍有对象引用映射的内存（例如被取消的请求在线程池中计算的哈希），由垃圾回收解除映射
+            logger.debug("文件映射仍在使用，延迟解除映射: %s", path)
@@ -0,0 +1,190 @@
+"""
+帧差分工具
+比较连续两帧找出发生变化的区域，只对变化区域重新识别，并把新的文本块拼接回上一帧的识别结果
+"""
+
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.ocr_models import OCRTextBlock
+
+logger = logging.getLogger(__name__)
+
+# 区域：(x0, y0, x1, y1)，左闭右开
+Box = Tuple[int, int, int, int]
+
+# 变化区域向外扩展的像素数，避免紧贴变化边缘的文字被截断
+_PADDING = 8
+
+
+def changed_cells(previous: np.ndarray, current: np.ndarray, threshold: int, cell: int) -> np.ndarray:
+    """
+    按网格计算发生变化的单元格
+
+    Args:
+        previous: 上一帧（H x W 或 H x W x C，uint8）
+        current: 当前帧，形状与上一帧相同
+        threshold: 像素任一通道的差值超过该值即视为变化，过滤压缩噪声
+        cell: 网格单元格边长（像素）
+
+    Returns:
+        np.ndarray: 形状为 (ceil(H/cell), ceil(W/cell)) 的布尔数组
+    """
+    # 无符号差的绝对值：max - min，不需要转换成更宽的整数类型
+    diff = np.maximum(previous, current)
+    diff -= np.minimum(previous, current)
+
+    # 通道维并入行内（H x W*C），按列归约时一个单元格正好覆盖cell个像素的全部通道，
+    # 避免在长度只有3的最后一维上逐像素归约
+    height, width = diff.shape[:2]
+    channels = diff.shape[2] if diff.ndim == 3 else 1
+    mask = diff.reshape(height, width * channels) > threshold
+
+    # 先按行、再按列把像素归约到单元格，最后一行/列的单元格可以不满
+    rows = np.logical_or.reduceat(mask, np.arange(0, height, cell), axis=0)
+    return np.logical_or.reduceat(rows, np.arange(0, width * channels, cell * channels), axis=1)
+
+
+def _cell_components(grid: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """变化单元格的8连通域，返回每个连通域的单元格范围 (列起点, 行起点, 列终点, 行终点)，终点不包含"""
+    remaining = set(zip(*np.nonzero(grid)))
+    components = []
+    while remaining:
+        stack = [remaining.pop()]
+        row0 = row1 = stack[0][0]
+        col0 = col1 = stack[0][1]
+        while stack:
+            row, col = stack.pop()
+            row0, row1 = min(row0, row), max(row1, row)
+            col0, col1 = min(col0, col), max(col1, col)
+            for neighbor in ((row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)):
+                if neighbor in remaining:
+                    remaining.remove(neighbor)
+                    stack.append(neighbor)
+        components.append((int(col0), int(row0), int(col1) + 1, int(row1) + 1))
+    return components
+
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(a: Box, b: Box) -> Box:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def merge_boxes(boxes: Sequence[Box]) -> List[Box]:
+    """合并相互重叠的区域，直到没有重叠"""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        result: List[Box] = []
+        for box in merged:
+            for index, other in enumerate(result):
+                if _overlaps(box, other):
+                    result[index] = _union(box, other)
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+
+def changed_regions(previous: np.ndarray, current: np.ndarray, threshold: int = 24,
+                    cell: int = 16) -> Optional[List[Box]]:
+    """
+    计算两帧之间发生变化的区域
+
+    Args:
+        previous: 上一帧
+        current: 当前帧
+        threshold: 像素差值阈值
+        cell: 网格单元格边长（像素）
+
+    Returns:
+        Optional[List[Box]]: 变化区域列表（已扩展边缘并合并重叠区域），没有变化时为空列表；
+            两帧尺寸不同时返回None，需要整帧识别
+    """
+    if previous.shape != current.shape:
+        return None
+    grid = changed_cells(previous, current, threshold, cell)
+    if not grid.any():
+        return []
+
+    height, width = current.shape[:2]
+    boxes = [
+        (max(0, c0 * cell - _PADDING), max(0, r0 * cell - _PADDING),
+         min(width, c1 * cell + _PADDING), min(height, r1 * cell + _PADDING))
+        for c0, r0, c1, r1 in _cell_components(grid)
+    ]
+    return merge_boxes(boxes)
+
+
+def block_bounds(block: OCRTextBlock) -> Optional[Box]:
+    """文本块的外接矩形，没有坐标的文本块返回None"""
+    if not block.box:
+        return None
+    xs = [point[0] for point in block.box]
+    ys = [point[1] for point in block.box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def expand_to_blocks(regions: Sequence[Box], blocks: Sequence[OCRTextBlock]) -> List[Box]:
+    """
+    把变化区域扩展到完整覆盖与其相交的上一帧文本块
+
+    一行文字中只有几个字变化时，变化区域只覆盖这一行的一部分；扩展后整行重新识别，
+    避免拼接时丢掉这一行中没有变化的部分。没有坐标的文本块不参与扩展
+    """
+    bounds = [box for box in map(block_bounds, blocks) if box is not None]
+    expanded = list(regions)
+    while True:
+        grown = []
+        for region in expanded:
+            for box in bounds:
+                if _overlaps(region, box):
+                    region = _union(region, box)
+            grown.append(region)
+        grown = merge_boxes(grown)
+        if grown == expanded:
+            return grown
+        expanded = grown
+
+
+def _is_replaced(block: OCRTextBlock, regions: Sequence[Box]) -> bool:
+    """上一帧的文本块是否被重新识别的结果取代：与任一区域相交；没有坐标时无法判断位置，只要有区域重新识别就视为已变化"""
+    bounds = block_bounds(block)
+    if bounds is None:
+        return bool(regions)
+    return any(_overlaps(bounds, region) for region in regions)
+
+
+def _reading_order(block: OCRTextBlock) -> Tuple[float, float]:
+    """从上到下、从左到右的排序键，没有坐标的文本块排在最后"""
+    bounds = block_bounds(block)
+    if bounds is None:
+        return float("inf"), float("inf")
+    return bounds[1], bounds[0]
+
+
+def splice_blocks(previous: Sequence[OCRTextBlock], regions: Sequence[Box],
+                  updated: Sequence[OCRTextBlock]) -> List[OCRTextBlock]:
+    """
+    把变化区域的新识别结果拼接到上一帧的识别结果中
+
+    Args:
+        previous: 上一帧的文本块
+        regions: 重新识别的区域（已通过expand_to_blocks扩展）
+        updated: 变化区域内重新识别出的文本块（整帧坐标）
+
+    Returns:
+        List[OCRTextBlock]: 按从上到下、从左到右排列的文本块，没有坐标的文本块排在最后
+    """
+    kept = [block for block in previous if not _is_replaced(block, regions)]
+    blocks = kept + list(updated)
+    blocks.sort(key=_reading_order)
+    return blocks
@@ -1,101 +1,194 @@
 import base64
 import io
-from typing import Union
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple, Union
 from fastapi import UploadFile
-from starlette.datastructures import UploadFile as StarletteUploadFile
+from PIL import Image
+from models.ocr_models import ImageData
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 读取base64图片尺寸时先解码的前缀长度（字符数，4的倍数），常见格式的图片头都在这个范围内
+_SIZE_PROBE_CHARS = 64 * 1024
 
-def image_to_base64(image_data: Union[bytes, UploadFile]) -> str:
+
+def read_upload(file: UploadFile) -> bytes:
     """
-    将图片数据转换为base64编码字符串
+    读取上传文件的全部内容
     
     Args:
-        image_data: 图片字节数据或UploadFile对象
+        file: UploadFile对象
         
     Returns:
-        str: base64编码字符串（不含前缀）
+        bytes: 图片文件字节数据
         
     Raises:
-        ValueError: 当图片数据无效时
+        ValueError: 文件为空时
     """
-    try:
-        logger.info(f"开始处理图片数据，类型: {type(image_data)}")
-        
-        # 检查是否为UploadFile对象（支持FastAPI和Starlette的UploadFile）
-        if isinstance(image_data, (UploadFile, StarletteUploadFile)):
-            # 如果是UploadFile对象，确保文件指针在开始位置
-            logger.info(f"处理UploadFile对象: {image_data.filename}")
-            image_data.file.seek(0)
-            image_bytes = image_data.file.read()
-            
-            # 检查是否成功读取了数据
-            if not image_bytes:
-                raise ValueError("无法读取上传文件的内容，文件可能为空或已损坏")
-                
-            logger.info(f"成功读取UploadFile，大小: {len(image_bytes)} bytes")
-        else:
-            # 如果是字节数据
-            image_bytes = image_data
-            
-            # 检查字节数据是否有效
-            if not image_bytes:
-                raise ValueError("图片字节数据为空")
-                
-            logger.info(f"接收到字节数据，大小: {len(image_bytes)} bytes")
-            
-        # 转换为base64
-        base64_str = base64.b64encode(image_bytes).decode('utf-8')
+    file.file.seek(0)
+    image_bytes = file.file.read()
+    if not image_bytes:
+        raise ValueError("无法读取上传文件的内容，文件可能为空或已损坏")
+    logger.debug("成功读取上传文件: %s, 大小: %d bytes", file.filename, len(image_bytes))
+    return image_bytes
+
+
+class _BufferReader(io.RawIOBase):
+    """按需读取内存缓冲区的文件对象（BytesIO会复制bytes以外的整个缓冲区）"""
+
+    def __init__(self, data: ImageData):
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def open_buffer(image_data: ImageData) -> BinaryIO:
+    """把图片字节数据包装为文件对象，不复制整个缓冲区"""
+    if isinstance(image_data, bytes):
+        # BytesIO与bytes共享内存，只在写入时复制
+        return io.BytesIO(image_data)
+    return io.BufferedReader(_BufferReader(image_data))
+
+
+# 文件头魔数与对应的Pillow格式名称（只接受这些格式，不信任客户端声明的Content-Type）
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+
+
+class ImageRejected(ValueError):
+    """
+    图片未通过校验
+
+    reason: format（不支持的格式）、invalid（无法解析的图片头）、too_large（文件或像素数超过上限）、frames（帧数超过上限）
+    """
+
+    def __init__(self, message: str, reason: str = "invalid"):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """从图片头读取的信息"""
+
+    format: str
+    width: int
+    height: int
+    frames: int = 1
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """按文件头的魔数识别图片格式，返回Pillow格式名称，不支持的格式返回None"""
+    for signature, image_format in _SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def inspect_image(image_data: Union[ImageData, BinaryIO], max_pixels: int, max_frames: int = 1) -> ImageInfo:
+    """
+    只解析图片头校验图片：按魔数识别格式，读取宽高和帧数，不解码像素数据
+    
+    Args:
+        image_data: 图片字节数据或文件对象（文件对象读取后恢复原来的位置）
+        max_pixels: 最大像素数
+        max_frames: 最大帧数（多帧TIFF、动画WebP/PNG）
         
-        logger.info(f"成功将图片转换为base64，长度: {len(base64_str)}")
-        return base64_str
+    Returns:
+        ImageInfo: 图片格式、宽高和帧数
         
-    except Exception as e:
-        logger.error(f"图片转base64失败: {str(e)}")
-        import traceback
-        logger.error(f"错误堆栈: {traceback.format_exc()}")
-        raise ValueError(f"图片处理失败: {str(e)}")
+    Raises:
+        ImageRejected: 不支持的格式、无法解析的图片头、像素数或帧数超过上限
+    """
+    source = open_buffer(image_data) if isinstance(image_data, (bytes, bytearray, memoryview)) else image_data
+    position = source.tell()
+    try:
+        image_format = sniff_image_format(source.read(16))
+        source.seek(position)
+        if image_format is None:
+            raise ImageRejected("不支持的图片格式（支持JPEG、PNG、BMP、TIFF、WebP）", "format")
+        try:
+            # 只尝试魔数对应的解析器
+            with Image.open(source, formats=[image_format]) as image:
+                width, height = image.size
+                frames = getattr(image, "n_frames", 1)
+        except Image.DecompressionBombError as e:
+            raise ImageRejected(f"图片像素数过大: {e}", "too_large")
+        except Exception as e:
+            raise ImageRejected(f"无效的{image_format}图片: {e}")
+    finally:
+        source.seek(position)
+    
+    if width * height > max_pixels:
+        raise ImageRejected(
+            f"图片尺寸 {width}x{height} 超过上限 {max_pixels / 1_000_000:g} 百万像素", "too_large"
+        )
+    if frames > max_frames:
+        raise ImageRejected(f"图片有 {frames} 帧，最多支持 {max_frames} 帧", "frames")
+    return ImageInfo(image_format, width, height, frames)
 
 
-def validate_image_file(file: UploadFile) -> bool:
+def inspect_upload(file: UploadFile, max_bytes: int, max_pixels: int, max_frames: int = 1) -> ImageInfo:
     """
-    验证上传的文件是否为有效的图片格式
+    校验上传的图片文件：文件大小、实际格式（魔数）和图片头中的尺寸、帧数
     
     Args:
         file: UploadFile对象
+        max_bytes: 最大文件字节数
+        max_pixels: 最大像素数
+        max_frames: 最大帧数
         
     Returns:
-        bool: 是否为有效图片
-    """
-    # 支持的图片格式
-    allowed_types = [
-        'image/jpeg',
-        'image/jpg', 
-        'image/png',
-        'image/bmp',
-        'image/tiff',
-        'image/webp'
-    ]
-    
-    # 检查文件类型
-    if file.content_type not in allowed_types:
-        logger.warning(f"不支持的文件类型: {file.content_type}")
-        return False
-    
-    # 检查文件大小（限制为10MB）
-    file.file.seek(0, 2)  # 移动到文件末尾
-    file_size = file.file.tell()
-    file.file.seek(0)  # 重置文件指针
-    
-    max_size = 10 * 1024 * 1024  # 10MB
-    if file_size > max_size:
-        logger.warning(f"文件过大: {file_size} bytes，最大允许: {max_size} bytes")
-        return False
+        ImageInfo: 图片格式、宽高和帧数
+        
+    Raises:
+        ImageRejected: 文件为空、过大或图片未通过校验
+    """
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, 2)
+        file_size = file.file.tell()
+    file.file.seek(0)
+    if file_size == 0:
+        raise ImageRejected("上传的文件为空")
+    if file_size > max_bytes:
+        raise ImageRejected(f"文件过大: {file_size} bytes，最大允许: {max_bytes} bytes", "too_large")
     
-    logger.info(f"图片验证通过: {file.filename}, 类型: {file.content_type}, 大小: {file_size} bytes")
-    return True
+    info = inspect_image(file.file, max_pixels, max_frames)
+    logger.debug("图片验证通过: %s, 声明类型: %s, 实际格式: %s, 尺寸: %dx%d, 大小: %d bytes",
+                 file.filename, file.content_type, info.format, info.width, info.height, file_size)
+    return info
 
 
 def clean_base64_string(base64_str: str) -> str:
@@ -116,3 +209,76 @@ def clean_base64_string(base64_str: str) -> str:
     base64_str = base64_str.strip()
     
     return base64_str
+
+
+def decode_image(image_data: ImageData) -> Image.Image:
+    """
+    将图片字节数据解码为PIL图片
+    
+    Args:
+        image_data: 图片文件字节数据
+        
+    Returns:
+        Image.Image: PIL图片对象
+    """
+    image = Image.open(open_buffer(image_data))
+    image.load()
+    return image
+
+
+def encode_image(image: Image.Image, image_format: str = "PNG", **params) -> bytes:
+    """
+    将PIL图片编码为图片字节
+    
+    Args:
+        image: PIL图片对象
+        image_format: 编码格式（默认PNG，无损）
+        params: 传给Image.save的编码参数（如PNG的compress_level）
+        
+    Returns:
+        bytes: 编码后的图片字节
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+
+def read_image_size(image_data: Union[ImageData, BinaryIO]) -> Optional[Tuple[int, int]]:
+    """
+    只解析图片头读取宽高，不解码像素数据
+    
+    Args:
+        image_data: 图片字节数据或文件对象（文件对象读取后需要调用方自行重置指针）
+        
+    Returns:
+        Optional[Tuple[int, int]]: (宽, 高)，无法识别时返回None
+    """
+    try:
+        source = open_buffer(image_data) if isinstance(image_data, (bytes, bytearray, memoryview)) else image_data
+        with Image.open(source) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def read_base64_image_size(base64_str: str) -> Optional[Tuple[int, int]]:
+    """
+    读取base64图片的宽高，先只解码开头的一段，图片头不在这一段内时再完整解码
+    
+    Args:
+        base64_str: base64编码的图片数据（不含前缀）
+        
+    Returns:
+        Optional[Tuple[int, int]]: (宽, 高)，无法识别时返回None
+    """
+    size = None
+    try:
+        size = read_image_size(base64.b64decode(base64_str[:_SIZE_PROBE_CHARS]))
+    except ValueError:
+        pass
+    if size is None and len(base64_str) > _SIZE_PROBE_CHARS:
+        try:
+            size = read_image_size(base64.b64decode(base64_str))
+        except ValueError:
+            pass
+    return size
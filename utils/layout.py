@@ -0,0 +1,230 @@
+"""
+排版解析
+按阅读顺序排列文本块并设置结束符，方案名称与Umi-OCR的tbpu.parser一致。
+所有文本块的坐标一次性转换为NumPy数组，分栏、分行、段落判断都是数组运算，上万个文本块也只需要几毫秒
+"""
+
+import itertools
+import logging
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from models.ocr_models import OCRTextBlock
+
+logger = logging.getLogger(__name__)
+
+# 支持的排版解析方案（与Umi-OCR的tbpu.parser一致）
+PARSERS = (
+    "multi_para",   # 多栏-按自然段换行
+    "multi_line",   # 多栏-总是换行
+    "multi_none",   # 多栏-无换行
+    "single_para",  # 单栏-按自然段换行
+    "single_line",  # 单栏-总是换行
+    "single_none",  # 单栏-无换行
+    "single_code",  # 单栏-保留缩进
+    "none",         # 不做处理
+)
+
+# 宽度超过文本总宽度该比例的文本块视为通栏（标题、通栏段落），把页面分成上下几个部分，各部分单独分栏
+_WIDE_RATIO = 0.6
+
+# 两个文本块中心的垂直距离小于行高的该比例时属于同一行
+_LINE_TOLERANCE = 0.3
+
+
+def check_parser(parser: str):
+    """
+    检查排版解析方案是否受支持
+
+    Raises:
+        ValueError: 不支持的排版解析方案
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"不支持的排版解析方案: {parser}。支持的方案: {', '.join(PARSERS)}")
+
+
+def block_arrays(blocks: Sequence[OCRTextBlock]) -> np.ndarray:
+    """
+    文本块的外接矩形
+
+    Returns:
+        np.ndarray: 形状为 (N, 4) 的数组，每行为 (x0, y0, x1, y1)
+    """
+    if all(len(block.box) == 4 for block in blocks):
+        # 四边形顶点展平后一次性读入，比逐个构造嵌套列表的数组快一倍
+        flat = itertools.chain.from_iterable(itertools.chain.from_iterable(block.box for block in blocks))
+        points = np.fromiter(flat, dtype=np.float64, count=len(blocks) * 8).reshape(-1, 4, 2)
+        return np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+    # 顶点数不一致时逐个计算
+    return np.array([
+        [min(p[0] for p in block.box), min(p[1] for p in block.box),
+         max(p[0] for p in block.box), max(p[1] for p in block.box)]
+        for block in blocks
+    ], dtype=np.float64).reshape(-1, 4)
+
+
+def _split_points(start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """
+    按起点排好序的区间中，与之前所有区间都不重叠的位置（新的一组从这里开始）
+
+    Returns:
+        np.ndarray: 布尔数组，第一个区间总是True
+    """
+    reach = np.maximum.accumulate(stop)
+    split = np.empty(len(start), dtype=bool)
+    split[0] = True
+    split[1:] = start[1:] > reach[:-1]
+    return split
+
+
+def reading_order(boxes: np.ndarray, multi_column: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    计算阅读顺序
+
+    多栏时先用通栏文本块把页面分成上下几个部分，每个部分内按文本块的水平投影分栏（投影不重叠即为不同的栏），
+    栏内按垂直位置分行，行内从左到右；各部分从上到下、栏从左到右阅读
+
+    Args:
+        boxes: block_arrays返回的外接矩形数组
+        multi_column: 是否分栏
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (阅读顺序的索引, 每个位置的分组编号, 每个位置的行编号)，
+            分组为栏或通栏文本块，编号按阅读顺序递增
+    """
+    count = len(boxes)
+    x0, y0, x1, y1 = boxes.T
+    height = np.maximum(y1 - y0, 1.0)
+    center = (y0 + y1) / 2
+
+    section = np.zeros(count, dtype=np.int64)
+    group = np.zeros(count, dtype=np.int64)
+    if multi_column and count > 1:
+        wide = (x1 - x0) > (x1.max() - x0.min()) * _WIDE_RATIO
+        if wide.all():
+            wide[:] = False
+        # 通栏文本块把页面分成若干部分：每个文本块所在的部分为其上方（含自身）的通栏文本块数量
+        section = np.searchsorted(np.sort(center[wide]), center, side="right")
+
+        # 各部分的坐标平移到互不重叠的范围，一次排序就能在所有部分中同时分栏
+        narrow = np.flatnonzero(~wide)
+        stride = x1.max() - x0.min() + 1
+        offset = section[narrow] * stride
+        by_x = narrow[np.lexsort((x0[narrow] + offset, section[narrow]))]
+        offset = section[by_x] * stride
+        column = np.empty(count, dtype=np.int64)
+        column[by_x] = np.cumsum(_split_points(x0[by_x] + offset, x1[by_x] + offset))
+        # 通栏文本块在所在部分中排在各栏之前
+        column[wide] = 0
+        _, group = np.unique(section * (count + 1) + column, return_inverse=True)
+
+    # 每个分组内按中心排序，中心超出之前各行范围的文本块开始新的一行
+    stride = center.max() - center.min() + height.max() + 1
+    by_y = np.lexsort((center, group))
+    offset = group[by_y] * stride
+    line = np.empty(count, dtype=np.int64)
+    line[by_y] = np.cumsum(_split_points(center[by_y] + offset, center[by_y] + height[by_y] * _LINE_TOLERANCE + offset))
+
+    order = np.lexsort((x0, line, group))
+    return order, group[order], line[order]
+
+
+def _soft_join(previous: str, following: str) -> str:
+    """不换行时两段文字之间的分隔符：两侧都是西文字符时为空格，中文直接相连"""
+    if previous and following and previous[-1].isascii() and following[0].isascii() and not previous[-1].isspace():
+        return " "
+    return ""
+
+
+def parse_layout(blocks: Sequence[OCRTextBlock], parser: str) -> List[OCRTextBlock]:
+    """
+    按排版解析方案排列文本块并设置结束符
+
+    - 同一行的文本块之间为空格（保留缩进方案按间距换算为多个空格）
+    - 总是换行：每行末尾为换行
+    - 按自然段换行：段落末尾为换行，段落内的行按西文加空格、中文直接相连的方式拼接；
+      下一行与本行的间距超过行高的0.7倍、本行明显短于栏宽、下一行首行缩进时视为段落结束
+    - 无换行：所有行按段落内的方式拼接
+    - 最后一个文本块的结束符为空
+
+    Args:
+        blocks: 文本块
+        parser: 排版解析方案，见PARSERS
+
+    Returns:
+        List[OCRTextBlock]: 按阅读顺序排列的文本块（原地修改结束符，保留缩进方案还会修改文本）
+
+    Raises:
+        ValueError: 不支持的排版解析方案
+    """
+    check_parser(parser)
+    if parser == "none" or not blocks:
+        return list(blocks)
+
+    boxes = block_arrays(blocks)
+    order, group, line = reading_order(boxes, parser.startswith("multi"))
+    boxes = boxes[order]
+    x0, y0, x1, y1 = boxes.T
+    height = np.maximum(y1 - y0, 1.0)
+    count = len(order)
+
+    # 每一行的范围：行首位置和行内归约
+    line_start = np.flatnonzero(np.r_[True, line[1:] != line[:-1]])
+    line_x0 = np.minimum.reduceat(x0, line_start)
+    line_x1 = np.maximum.reduceat(x1, line_start)
+    line_y0 = np.minimum.reduceat(y0, line_start)
+    line_y1 = np.maximum.reduceat(y1, line_start)
+    line_height = np.maximum(line_y1 - line_y0, 1.0)
+    line_group = group[line_start]
+
+    # 每一栏的左右边界
+    group_start = np.flatnonzero(np.r_[True, line_group[1:] != line_group[:-1]])
+    group_x0 = np.repeat(np.minimum.reduceat(line_x0, group_start), np.diff(np.r_[group_start, len(line_start)]))
+    group_x1 = np.repeat(np.maximum.reduceat(line_x1, group_start), np.diff(np.r_[group_start, len(line_start)]))
+
+    # 每一行之后是否分段（每栏的最后一行总是分段）
+    same_group_next = np.r_[line_group[1:] == line_group[:-1], False]
+    next_gap = np.r_[line_y0[1:] - line_y1[:-1], 0.0]
+    next_indent = np.r_[line_x0[1:] - group_x0[1:], 0.0]
+    short_line = line_x1 < group_x1 - np.maximum(2 * line_height, (group_x1 - group_x0) * 0.15)
+    paragraph_end = ~same_group_next | (next_gap > line_height * 0.7) | short_line | (next_indent > line_height)
+
+    ordered = [blocks[index] for index in order.tolist()]
+    texts = [block.text for block in ordered]
+    # 每个位置的文本块是否为行尾、所在行之后是否分段（转换为列表后逐个设置结束符）
+    last_in_line = np.zeros(count, dtype=bool)
+    last_in_line[np.r_[line_start[1:] - 1, count - 1]] = True
+    line_sizes = np.diff(np.r_[line_start, count])
+    breaks_after = np.repeat(paragraph_end, line_sizes).tolist()
+    last_in_line = last_in_line.tolist()
+
+    if parser == "single_code":
+        # 按文本块的平均字宽把行首缩进和块间距换算为空格
+        lengths = np.fromiter((max(len(text), 1) for text in texts), dtype=np.float64, count=count)
+        char_width = max(float(np.median((x1 - x0) / lengths)), 1.0)
+        indent = np.rint((line_x0 - group_x0) / char_width).astype(np.int64)
+        gaps = np.maximum(np.r_[np.rint((x0[1:] - x1[:-1]) / char_width).astype(np.int64), 1], 1).tolist()
+        for start, spaces in zip(line_start.tolist(), indent.tolist()):
+            if spaces > 0:
+                texts[start] = " " * spaces + texts[start]
+                ordered[start].text = texts[start]
+
+    always_break = parser in ("multi_line", "single_line", "single_code")
+    paragraphs = parser.endswith("_para")
+    for position, block in enumerate(ordered):
+        if position == count - 1:
+            end = ""
+        elif not last_in_line[position]:
+            end = " " * gaps[position] if parser == "single_code" else " "
+        elif always_break or (paragraphs and breaks_after[position]):
+            end = "\n"
+        else:
+            end = _soft_join(texts[position], texts[position + 1])
+        block.end = end
+    return ordered
+
+
+def layout_text(blocks: Sequence[OCRTextBlock]) -> str:
+    """按结束符拼接文本块为纯文本"""
+    return "".join(block.text + block.end for block in blocks)
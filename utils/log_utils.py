@@ -0,0 +1,194 @@
+"""
+日志工具
+- 队列日志：请求处理线程只把日志记录放入队列，格式化输出和控制台I/O在单独的监听线程中完成
+- 请求摘要：每个HTTP请求只输出一行 key=value 格式的摘要（方法、路径、状态、耗时、识别结果等）
+- 采样与限速：失败和慢请求的摘要总是输出，其余按比例采样并限制每秒行数，被跳过的行数记在下一行摘要中
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# 当前进程中各队列处理器的停止函数
+_stop_callbacks = []
+
+
+def stop_queue_listeners():
+    """
+    停止所有队列处理器的监听线程，处理完队列中剩余的记录
+
+    正常退出时由atexit调用；以os._exit退出的进程（start.py的工作进程）不执行atexit，需要在退出前显式调用
+    """
+    for stop in list(_stop_callbacks):
+        stop()
+
+
+def create_queue_handler(handler: logging.Handler) -> logging.Handler:
+    """
+    把日志处理器包装为队列处理器
+
+    返回的处理器只把日志记录放入无界队列，由后台监听线程交给handler输出；
+    进程退出或调用处理器的stop_listener()时处理完队列中剩余的记录。
+    fork只复制调用fork的线程，子进程中监听线程不存在：fork后子进程换用新的队列并重新启动监听线程
+    （父进程队列中尚未输出的记录由父进程输出，不会重复）
+
+    Args:
+        handler: 实际输出日志的处理器
+
+    Returns:
+        logging.Handler: 添加到日志记录器上的队列处理器
+    """
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+
+    def stop():
+        # 重复调用时监听线程已经结束
+        if listener._thread is not None:
+            listener.stop()
+
+    atexit.register(stop)
+    _stop_callbacks.append(stop)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.listener = listener
+    # 提前停止监听线程（处理完队列中剩余的记录），可以重复调用
+    queue_handler.stop_listener = stop
+
+    def restart_in_child():
+        child_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        queue_handler.queue = listener.queue = child_queue
+        # 父进程中已经停止的监听线程不重新启动
+        if listener._thread is not None:
+            listener._thread = None
+            listener.start()
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=restart_in_child)
+    return queue_handler
+
+
+class LogSampler:
+    """
+    请求摘要的采样与限速
+
+    重要的记录（失败、慢请求）总是输出；其余记录按sample_rate的比例随机采样，
+    输出的行数再受每秒max_per_second行的令牌桶限制（0表示不限速）
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_second: float = 0,
+                 clock: Callable[[], float] = time.monotonic, rand: Callable[[], float] = random.random):
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._clock = clock
+        self._rand = rand
+        self._tokens = max(max_per_second, 1.0)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        # 上一次输出之后被跳过的记录数
+        self.suppressed = 0
+
+    def allow(self, important: bool = False) -> Tuple[bool, int]:
+        """
+        判断是否输出一条记录
+
+        Returns:
+            Tuple[bool, int]: (是否输出, 输出时为之前被跳过的记录数，并清零)
+        """
+        with self._lock:
+            if not important and not self._take():
+                self.suppressed += 1
+                return False, 0
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+    def _take(self) -> bool:
+        if self.sample_rate < 1.0 and self._rand() >= self.sample_rate:
+            return False
+        if self.max_per_second <= 0:
+            return True
+        now = self._clock()
+        self._tokens = min(max(self.max_per_second, 1.0), self._tokens + (now - self._updated) * self.max_per_second)
+        self._updated = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+def format_fields(fields: Dict[str, object]) -> str:
+    """格式化为 key=value 形式，含空格、等号或引号的值加引号，None不输出"""
+    parts = []
+    for key, value in fields.items():
+        if value is None:
+            continue
+        if isinstance(value, float):
+            text = f"{value:.1f}"
+        else:
+            text = str(value)
+            if not text or any(char in text for char in ' ="'):
+                text = '"' + text.replace('"', '\\"') + '"'
+        parts.append(f"{key}={text}")
+    return " ".join(parts)
+
+
+class RequestLogMiddleware:
+    """
+    每个HTTP请求输出一行摘要
+
+    接口通过 request.state.log_fields 补充识别相关的字段（引擎、状态码、文本块数量等）；
+    响应状态码不小于400或耗时不小于slow_ms毫秒的请求总是输出，其余按采样器决定
+    """
+
+    def __init__(self, app: ASGIApp, sampler: Optional[LogSampler] = None, slow_ms: float = 1000,
+                 log: Optional[logging.Logger] = None):
+        self.app = app
+        self.sampler = sampler or LogSampler()
+        self.slow_ms = slow_ms
+        self.log = log or logging.getLogger("ocr.request")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.log.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        # 接口写入的字段保存在共享的state字典中（内层中间件复制scope时仍指向同一个字典）
+        state = scope.setdefault("state", {})
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            emit, suppressed = self.sampler.allow(important=status >= 400 or duration_ms >= self.slow_ms)
+            if emit:
+                fields = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": duration_ms,
+                    "bytes": sent,
+                }
+                fields.update(state.get("log_fields") or {})
+                if suppressed:
+                    fields["suppressed"] = suppressed
+                self.log.info("request %s", format_fields(fields))
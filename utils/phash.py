@@ -0,0 +1,84 @@
+"""
+感知哈希工具
+在缩小后的灰度图上计算差值哈希（dHash），视觉上相同的图片即使字节不同也会得到相同或相近的哈希值。
+64位哈希只反映整体亮度分布，改动几个字的两张文档图片哈希通常完全相同，因此同时保留灰度缩略图，
+哈希相近的候选再逐像素比较缩略图确认
+"""
+
+import numpy as np
+from PIL import Image
+
+from utils.image_utils import open_buffer
+
+# 哈希边长，哈希位数为 HASH_SIZE * HASH_SIZE
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# 确认用的灰度缩略图边长：缩略图的一个像素对应A4扫描件（约1240x1754）的10x14像素，改动一个字符也能察觉
+THUMBNAIL_SIZE = 128
+
+# 每个比特位的权重，用于把布尔矩阵打包成整数
+_BIT_WEIGHTS = 1 << np.arange(HASH_BITS, dtype=np.uint64)
+
+
+def dhash(image: Image.Image) -> int:
+    """
+    计算图片的差值哈希
+
+    将图片缩小为 (HASH_SIZE+1) x HASH_SIZE 的灰度图，比较每行相邻像素的亮度，
+    亮度递增记为1，否则记为0。
+
+    Args:
+        image: PIL图片对象
+
+    Returns:
+        int: HASH_BITS位的哈希值
+    """
+    # JPEG可以在解码阶段直接缩小，避免解码全尺寸图片
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(_BIT_WEIGHTS[bits].sum())
+
+
+def thumbnail(image: Image.Image) -> np.ndarray:
+    """
+    计算用于确认近似重复的灰度缩略图
+
+    不使用JPEG的解码阶段缩小（draft）：DCT缩小与完整解码后缩小的结果差异比重新压缩带来的差异还大
+
+    Args:
+        image: PIL图片对象
+
+    Returns:
+        np.ndarray: THUMBNAIL_SIZE x THUMBNAIL_SIZE 的uint8灰度数组
+    """
+    small = image.convert("L").resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BOX)
+    return np.asarray(small, dtype=np.uint8)
+
+
+def fingerprint_bytes(image_bytes: bytes) -> tuple:
+    """
+    计算图片字节数据的差值哈希与确认用的缩略图（只解码一次）
+
+    Args:
+        image_bytes: 图片文件字节数据
+
+    Returns:
+        tuple: (哈希值, 缩略图, 图片宽度, 图片高度)
+    """
+    image = Image.open(open_buffer(image_bytes))
+    width, height = image.size
+    small = thumbnail(image)
+    return dhash(Image.fromarray(small)), small, width, height
+
+
+def max_pixel_difference(a: np.ndarray, b: np.ndarray) -> int:
+    """计算两张缩略图逐像素亮度差的最大值（0-255）"""
+    return int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个哈希值的汉明距离"""
+    return bin(a ^ b).count("1")
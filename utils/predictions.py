@@ -0,0 +1,112 @@
+"""
+PaddleOCR预测结果转换
+PaddleOCR 3.x 每张图片返回一个结果字典，文本、置信度、文本框分别以批量数组给出（rec_texts、rec_scores、rec_polys），
+这里一次性转换整页的数组，不逐个文本框判断字段、转换类型
+"""
+
+import gc
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+from models.ocr_models import OCRTextBlock
+
+logger = logging.getLogger(__name__)
+
+# 文本块数量达到该值时，构造期间暂停循环垃圾回收：每个文本块带有5个列表，
+# 上万个文本块会触发上百次回收（包括遍历整个堆的完整回收），占转换耗时的三到四成
+_GC_PAUSE_MIN_BLOCKS = 1000
+
+
+def _stack_polygons(polys) -> Optional[np.ndarray]:
+    """把文本框列表合并为 (N, P, 2) 的整数数组，各文本框顶点数不同时返回None"""
+    try:
+        # 同形状数组的列表一次性合并（比逐个reshape后再stack快数倍）
+        stacked = np.asarray(polys)
+    except ValueError:
+        return None
+    if stacked.ndim != 3 or stacked.shape[2] != 2:
+        return None
+    return stacked.astype(np.int64, copy=False)
+
+
+def _polygons(res, count: int):
+    """
+    与rec_texts一一对应的文本框
+
+    优先使用rec_polys（识别后保留的文本框），其次是数量一致的dt_polys（检测框），
+    最后是rec_boxes（(N, 4) 的外接矩形，转换为四个顶点）
+
+    Returns:
+        np.ndarray | list | None: (N, P, 2) 数组；顶点数不一致时为逐个转换的列表；没有坐标时为None
+    """
+    for key in ("rec_polys", "dt_polys"):
+        polys = res.get(key)
+        if polys is not None and len(polys) == count:
+            if count == 0:
+                return np.empty((0, 4, 2), dtype=np.int64)
+            stacked = _stack_polygons(polys)
+            if stacked is not None:
+                return stacked
+            return [np.asarray(poly).reshape(-1, 2).astype(np.int64) for poly in polys]
+
+    boxes = res.get("rec_boxes")
+    if boxes is not None and len(boxes) == count:
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        x0, y0, x1, y1 = boxes.T
+        return np.stack([np.stack([x0, y0], 1), np.stack([x1, y0], 1),
+                         np.stack([x1, y1], 1), np.stack([x0, y1], 1)], axis=1)
+    return None
+
+
+def prediction_blocks(res, dx: int = 0, dy: int = 0, end: str = " ") -> List[OCRTextBlock]:
+    """
+    把单张图片的预测结果转换为文本块
+
+    Args:
+        res: 预测结果（PaddleOCR的结果对象或同样字段的字典）
+        dx: 文本框x坐标的平移量（区域识别时为区域左上角，直接换算到原图坐标）
+        dy: 文本框y坐标的平移量
+        end: 文本块的结束符
+
+    Returns:
+        List[OCRTextBlock]: 非空文本的文本块，带置信度和文本框坐标
+    """
+    texts = res.get("rec_texts")
+    if not texts:
+        return []
+    texts = list(texts)
+    count = len(texts)
+
+    scores = np.ones(count, dtype=np.float64)
+    rec_scores = res.get("rec_scores")
+    if rec_scores is not None:
+        rec_scores = np.asarray(rec_scores, dtype=np.float64).ravel()[:count]
+        scores[:len(rec_scores)] = rec_scores
+
+    polys = _polygons(res, count)
+    pause_gc = count >= _GC_PAUSE_MIN_BLOCKS and gc.isenabled()
+    if pause_gc:
+        gc.disable()
+    try:
+        if polys is None:
+            logger.warning("PaddleOCR结果中没有文本框坐标")
+            boxes = [[] for _ in range(count)]
+        elif isinstance(polys, np.ndarray):
+            if dx or dy:
+                polys = polys + np.array([dx, dy], dtype=np.int64)
+            # 一次tolist把整页坐标转换为嵌套列表
+            boxes = polys.tolist()
+        else:
+            boxes = [(poly + np.array([dx, dy], dtype=np.int64)).tolist() for poly in polys]
+
+        # 类型已经统一为Python原生类型，逐个校验的开销很小（不比model_construct慢）
+        return [
+            OCRTextBlock(text=text, score=score, box=box, end=end)
+            for text, score, box in zip(texts, scores.tolist(), boxes)
+            if text
+        ]
+    finally:
+        if pause_gc:
+            gc.enable()
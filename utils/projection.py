@@ -0,0 +1,88 @@
+"""
+识别结果筛选与字段投影
+按置信度和数量筛选文本块，只输出调用方需要的字段。
+投影后的文本块直接构造为只含所需字段的字典，由pydantic-core一次性序列化，不生成也不序列化未使用的字段
+"""
+
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from models.ocr_models import OCROptions, OCRResponse, OCRTextBlock
+
+
+def has_selection(options: Optional[OCROptions]) -> bool:
+    """是否指定了按置信度或数量筛选文本块"""
+    return bool(options and (options.data_min_score is not None or options.data_max_blocks is not None))
+
+
+def select_blocks(blocks: Sequence[OCRTextBlock], min_score: Optional[float] = None,
+                  max_blocks: Optional[int] = None) -> List[OCRTextBlock]:
+    """
+    筛选文本块
+
+    Args:
+        blocks: 文本块（阅读顺序）
+        min_score: 最低置信度，低于该值的文本块被丢弃
+        max_blocks: 最多保留的文本块数量，按原有顺序保留前面的文本块
+
+    Returns:
+        List[OCRTextBlock]: 筛选后的文本块
+    """
+    if min_score is not None:
+        blocks = [block for block in blocks if block.score >= min_score]
+    if max_blocks is not None:
+        blocks = blocks[:max_blocks]
+    return list(blocks)
+
+
+def join_blocks(blocks: Sequence[OCRTextBlock]) -> str:
+    """
+    按结束符拼接筛选后的文本块为纯文本
+
+    与未筛选时的拼接规则相同（每个文本块都加上自己的结束符，包括最后一个），筛选只去掉文本块，不改变格式
+    """
+    return "".join(block.text + block.end for block in blocks)
+
+
+def project_blocks(blocks: Sequence[OCRTextBlock], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    只保留指定字段的文本块字典
+
+    Args:
+        blocks: 文本块
+        fields: 字段名，取值见TEXT_BLOCK_FIELDS
+
+    Returns:
+        List[Dict[str, Any]]: 每个文本块一个字典
+    """
+    if len(fields) == 1:
+        field = fields[0]
+        return [{field: value} for value in map(attrgetter(field), blocks)]
+    getter = attrgetter(*fields)
+    return [dict(zip(fields, values)) for values in map(getter, blocks)]
+
+
+def response_content(result: OCRResponse, fields: Sequence[str], exclude_none: bool = False) -> Dict[str, Any]:
+    """
+    识别结果转换为字典，文本块只包含指定字段
+
+    Args:
+        result: 识别结果
+        fields: 文本块字段
+        exclude_none: 是否省略值为None的字段
+
+    Returns:
+        Dict[str, Any]: 与OCRResponse序列化结果相同结构的字典
+    """
+    data = project_blocks(result.data, fields) if isinstance(result.data, list) else result.data
+    content = {
+        "code": result.code,
+        "data": data,
+        "time": result.time,
+        "timestamp": result.timestamp,
+        "reused": result.reused,
+        "reuse_distance": result.reuse_distance,
+    }
+    if exclude_none:
+        content = {key: value for key, value in content.items() if value is not None}
+    return content
@@ -0,0 +1,65 @@
+"""
+区域识别工具
+处理调用方指定的识别区域，并把区域内的识别结果换算回原图坐标
+"""
+
+import logging
+from typing import List, Tuple
+
+from models.ocr_models import OCRTextBlock
+
+logger = logging.getLogger(__name__)
+
+
+def clip_regions(regions: List[List[List[int]]], width: int, height: int) -> List[Tuple[int, int, int, int]]:
+    """
+    将识别区域裁剪到图片范围内
+
+    Args:
+        regions: 识别区域列表，每一项为 [[左上角x,y],[右下角x,y]]，与tbpu.ignoreArea格式一致
+        width: 图片宽度
+        height: 图片高度
+
+    Returns:
+        List[Tuple[int, int, int, int]]: (x0, y0, x1, y1) 列表，已去除裁剪后为空的区域
+
+    Raises:
+        ValueError: 区域格式错误时
+    """
+    clipped = []
+    for region in regions:
+        try:
+            (x0, y0), (x1, y1) = region
+        except (TypeError, ValueError):
+            raise ValueError(f"识别区域格式错误，应为[[左上角x,y],[右下角x,y]]: {region}")
+
+        x0, x1 = sorted((max(0, min(int(x0), width)), max(0, min(int(x1), width))))
+        y0, y1 = sorted((max(0, min(int(y0), height)), max(0, min(int(y1), height))))
+        if x1 - x0 < 1 or y1 - y0 < 1:
+            logger.warning(f"识别区域超出图片范围或为空，已忽略: {region}")
+            continue
+        clipped.append((x0, y0, x1, y1))
+    return clipped
+
+
+def translate_blocks(blocks: List[OCRTextBlock], dx: int, dy: int) -> List[OCRTextBlock]:
+    """
+    将文本块坐标平移到原图坐标
+
+    Args:
+        blocks: 区域坐标下的文本块列表
+        dx: 区域左上角x坐标
+        dy: 区域左上角y坐标
+
+    Returns:
+        List[OCRTextBlock]: 原图坐标下的文本块列表
+    """
+    return [
+        OCRTextBlock(
+            text=block.text,
+            score=block.score,
+            box=[[point[0] + dx, point[1] + dy] for point in block.box],
+            end=block.end
+        )
+        for block in blocks
+    ]
@@ -0,0 +1,185 @@
+"""
+大图分块识别工具
+将大图切分为相互重叠的分块，并把各分块的识别结果合并回整图坐标
+"""
+
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from models.ocr_models import OCRTextBlock
+
+logger = logging.getLogger(__name__)
+
+# 分块区域：(x0, y0, x1, y1)，左闭右开
+Tile = Tuple[int, int, int, int]
+
+
+def _axis_spans(length: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    计算单个坐标轴上的分块范围
+
+    Returns:
+        List[Tuple[int, int, int, int]]: (起点, 终点, 核心区起点, 核心区终点)
+            核心区为相邻分块重叠带的中线所划分出的区域，所有分块的核心区恰好覆盖整个坐标轴
+    """
+    if length <= tile_size:
+        return [(0, length, 0, length)]
+
+    step = tile_size - overlap
+    starts = list(range(0, length - tile_size, step)) + [length - tile_size]
+
+    spans = []
+    for i, start in enumerate(starts):
+        end = start + tile_size
+        core_start = 0 if i == 0 else (start + starts[i - 1] + tile_size) // 2
+        core_end = length if i == len(starts) - 1 else (starts[i + 1] + end) // 2
+        spans.append((start, end, core_start, core_end))
+    return spans
+
+
+def compute_tiles(width: int, height: int, tile_size: int, overlap: int) -> List[Tuple[Tile, Tile]]:
+    """
+    计算图片的分块方案
+
+    Args:
+        width: 图片宽度
+        height: 图片高度
+        tile_size: 分块边长
+        overlap: 相邻分块的重叠宽度
+
+    Returns:
+        List[Tuple[Tile, Tile]]: (分块区域, 核心区域) 列表，按行优先排列
+    """
+    if tile_size <= 0:
+        raise ValueError(f"分块边长必须大于0: {tile_size}")
+    if overlap < 0 or overlap >= tile_size:
+        raise ValueError(f"重叠宽度必须在 [0, {tile_size}) 范围内: {overlap}")
+
+    tiles = []
+    for y0, y1, cy0, cy1 in _axis_spans(height, tile_size, overlap):
+        for x0, x1, cx0, cx1 in _axis_spans(width, tile_size, overlap):
+            tiles.append(((x0, y0, x1, y1), (cx0, cy0, cx1, cy1)))
+    return tiles
+
+
+def _block_bounds(blocks: List[OCRTextBlock]) -> np.ndarray:
+    """计算文本块的外接矩形，返回 (N, 4) 数组：x0, y0, x1, y1"""
+    bounds = np.empty((len(blocks), 4), dtype=np.float64)
+    for i, block in enumerate(blocks):
+        points = np.asarray(block.box, dtype=np.float64).reshape(-1, 2)
+        bounds[i, :2] = points.min(axis=0)
+        bounds[i, 2:] = points.max(axis=0)
+    return bounds
+
+
+def _suppress_duplicates(bounds: np.ndarray, scores: np.ndarray, tile_ids: np.ndarray,
+                         containment: float) -> np.ndarray:
+    """
+    去除跨越分块接缝产生的重复文本块
+
+    两个来自不同分块的文本块，如果交叠面积占较小者面积的比例超过阈值，
+    则只保留面积更大（即更完整）的那一个，面积相同时保留置信度更高的。
+
+    Returns:
+        np.ndarray: 需要保留的文本块布尔掩码
+    """
+    count = len(bounds)
+    keep = np.ones(count, dtype=bool)
+    if count < 2:
+        return keep
+
+    areas = np.maximum(bounds[:, 2] - bounds[:, 0], 1) * np.maximum(bounds[:, 3] - bounds[:, 1], 1)
+    # 按面积、置信度从大到小依次处理，较大的文本块优先保留
+    order = np.lexsort((-scores, -areas))
+
+    for idx in order:
+        if not keep[idx]:
+            continue
+        ix0 = np.maximum(bounds[idx, 0], bounds[:, 0])
+        iy0 = np.maximum(bounds[idx, 1], bounds[:, 1])
+        ix1 = np.minimum(bounds[idx, 2], bounds[:, 2])
+        iy1 = np.minimum(bounds[idx, 3], bounds[:, 3])
+        inter = np.clip(ix1 - ix0, 0, None) * np.clip(iy1 - iy0, 0, None)
+        ratio = inter / np.minimum(areas[idx], areas)
+
+        duplicates = (ratio > containment) & (tile_ids != tile_ids[idx]) & keep
+        duplicates[idx] = False
+        keep &= ~duplicates
+
+    return keep
+
+
+def merge_tile_blocks(tile_results: List[Tuple[Tuple[Tile, Tile], List[OCRTextBlock]]],
+                      containment: float = 0.5) -> List[OCRTextBlock]:
+    """
+    合并各分块的识别结果
+
+    1. 将文本框坐标从分块坐标平移回整图坐标
+    2. 丢弃中心点不在本分块核心区内的文本块（它们由相邻分块负责）
+    3. 对接缝附近仍然重叠的文本块去重
+    4. 按从上到下、从左到右的顺序重新排列
+
+    Args:
+        tile_results: (分块方案, 分块识别结果) 列表
+        containment: 判定重复的交叠比例阈值
+
+    Returns:
+        List[OCRTextBlock]: 整图坐标下的文本块列表
+    """
+    blocks: List[OCRTextBlock] = []
+    tile_ids: List[int] = []
+    # 没有坐标的文本块无法定位和去重，按原顺序附加在结果末尾
+    unplaced: List[OCRTextBlock] = []
+
+    tiles = [tile for (tile, _), _ in tile_results]
+    cores = [core for (_, core), _ in tile_results]
+
+    for tile_id, ((tile, core), tile_blocks) in enumerate(tile_results):
+        x0, y0 = tile[0], tile[1]
+        cx0, cy0, cx1, cy1 = core
+        for block in tile_blocks:
+            if not block.box:
+                unplaced.append(block)
+                continue
+
+            box = [[point[0] + x0, point[1] + y0] for point in block.box]
+            center_x = sum(point[0] for point in box) / len(box)
+            center_y = sum(point[1] for point in box) / len(box)
+            if not (cx0 <= center_x < cx1 and cy0 <= center_y < cy1):
+                continue
+
+            blocks.append(OCRTextBlock(text=block.text, score=block.score, box=box, end=block.end))
+            tile_ids.append(tile_id)
+
+    if not blocks:
+        return unplaced
+
+    bounds = _block_bounds(blocks)
+    scores = np.array([block.score for block in blocks], dtype=np.float64)
+    keep = np.ones(len(blocks), dtype=bool)
+
+    # 只有靠近分块接缝（与相邻分块重叠的区域）的文本块才可能重复，只对它们做两两比较。
+    # 接缝区域以核心区边界为中线，宽度与分块越出核心区的部分相同
+    tile_bounds = np.array([tiles[i] for i in tile_ids], dtype=np.float64)
+    core_bounds = np.array([cores[i] for i in tile_ids], dtype=np.float64)
+    inner = 2 * core_bounds - tile_bounds
+    crossing = np.flatnonzero(
+        (bounds[:, 0] < inner[:, 0]) | (bounds[:, 1] < inner[:, 1]) |
+        (bounds[:, 2] > inner[:, 2]) | (bounds[:, 3] > inner[:, 3])
+    )
+    if len(crossing) > 1:
+        keep[crossing] = _suppress_duplicates(
+            bounds[crossing], scores[crossing], np.array(tile_ids)[crossing], containment
+        )
+
+    kept = np.flatnonzero(keep)
+    # 先按行（文本块顶部）再按列（文本块左侧）排序
+    kept = kept[np.lexsort((bounds[kept, 0], bounds[kept, 1]))]
+
+    removed = len(blocks) - len(kept)
+    if removed:
+        logger.debug(f"分块合并去除重复文本块: {removed}")
+
+    return [blocks[i] for i in kept] + unplaced